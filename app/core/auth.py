@@ -1,16 +1,125 @@
 """Authentication and JWT handling."""
 
+import hashlib
+import time
 import jwt
-from typing import Dict, Any, Optional
+from typing import Dict, Any, NamedTuple, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.requests import HTTPConnection
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
 from app.core.exceptions import AuthenticationException
 
 # Security scheme for FastAPI
 security = HTTPBearer()
-settings = get_settings()
+
+
+class _RejectedToken(NamedTuple):
+    """Negative cache entry for a token that failed verification."""
+    message: str
+
+
+# Verified claims (or rejections) keyed by SHA-256 of the raw token; sized on first use
+_token_cache: Optional[TTLCache[bytes, Any]] = None
+_negative_hits = 0
+
+
+def _get_token_cache() -> TTLCache[bytes, Any]:
+    """Get the verified-token cache, creating it from settings on first use."""
+    global _token_cache
+    if _token_cache is None:
+        settings = get_settings()
+        _token_cache = TTLCache(
+            max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+            default_ttl=settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS,
+        )
+    return _token_cache
+
+
+def _claims_ttl(claims: Dict[str, Any]) -> float:
+    """Seconds a verified token may stay cached (until exp, capped)."""
+    max_ttl = float(get_settings().AUTH_TOKEN_CACHE_MAX_TTL_SECONDS)
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)):
+        return max_ttl
+    return min(exp - time.time(), max_ttl)
+
+
+def _decode_token(token: str, key: bytes) -> Dict[str, Any]:
+    """Decode a raw (prefix-less) token and cache the result under ``key``."""
+    try:
+        # JWT形式チェックは削除 - jwt.decode()に任せる
+        decoded = jwt.decode(
+            token,
+            get_settings().SUPABASE_JWT_SECRET,
+            algorithms=["HS256"],
+            options={"verify_aud": False}  # Supabase doesn't always include aud
+        )
+    except jwt.ExpiredSignatureError:
+        _reject(key, "Token has expired")
+    except jwt.InvalidTokenError as e:
+        _reject(key, f"Invalid token: {str(e)}")
+    except Exception as e:
+        # Unexpected failures are not cached
+        raise AuthenticationException(f"Token verification failed: {str(e)}")
+    
+    _get_token_cache().set(key, decoded, ttl=_claims_ttl(decoded))
+    return decoded
+
+
+def _reject(key: bytes, message: str) -> None:
+    """Remember a failed verification for the negative TTL and raise."""
+    _get_token_cache().set(key, _RejectedToken(message), ttl=get_settings().AUTH_TOKEN_NEGATIVE_TTL_SECONDS)
+    raise AuthenticationException(message)
+
+
+def verify_raw_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token that has no 'Bearer ' prefix, using the claims cache.
+    
+    Fast path for callers that already extracted the credentials (e.g. the
+    HTTPBearer dependency). Cache hits return the cached claims dict without
+    decoding; treat it as read-only.
+    
+    Args:
+        token: Raw JWT token string
+        
+    Returns:
+        Dict containing user data from token
+        
+    Raises:
+        AuthenticationException: If token is invalid or expired
+    """
+    global _negative_hits
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _get_token_cache().get(key)
+    if cached is None:
+        return _decode_token(token, key)
+    if type(cached) is _RejectedToken:
+        _negative_hits += 1
+        raise AuthenticationException(cached.message)
+    return cached
+
+
+def get_token_cache_stats() -> Dict[str, int]:
+    """
+    Get verified-token cache counters.
+    
+    Returns:
+        Dict with size, hits, misses, negative_hits and evictions
+    """
+    stats = _get_token_cache().stats()
+    stats["negative_hits"] = _negative_hits
+    return stats
+
+
+def clear_token_cache() -> None:
+    """Drop all cached verification results and reset counters."""
+    global _negative_hits
+    _get_token_cache().clear()
+    _negative_hits = 0
 
 
 def verify_jwt_token(token: Optional[str]) -> Dict[str, Any]:
@@ -29,27 +138,11 @@ def verify_jwt_token(token: Optional[str]) -> Dict[str, Any]:
     if not token:
         raise AuthenticationException("Missing authorization token")
     
-    try:
-        # Remove 'Bearer ' prefix if present
-        if token.startswith('Bearer '):
-            token = token[7:]
-        
-        # JWT形式チェックは削除 - jwt.decode()に任せる
-        decoded = jwt.decode(
-            token,
-            settings.SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            options={"verify_aud": False}  # Supabase doesn't always include aud
-        )
-        
-        return decoded
-        
-    except jwt.ExpiredSignatureError:
-        raise AuthenticationException("Token has expired")
-    except jwt.InvalidTokenError as e:
-        raise AuthenticationException(f"Invalid token: {str(e)}")
-    except Exception as e:
-        raise AuthenticationException(f"Token verification failed: {str(e)}")
+    # Remove 'Bearer ' prefix if present
+    if token.startswith('Bearer '):
+        token = token[7:]
+    
+    return verify_raw_token(token)
 
 
 def get_current_user(authorization: str) -> Dict[str, Any]:
@@ -86,7 +179,8 @@ def get_current_user_dependency(
     if not credentials:
         raise AuthenticationException("Missing authorization credentials")
     
-    return verify_jwt_token(credentials.credentials)
+    # HTTPBearer already stripped the scheme
+    return verify_raw_token(credentials.credentials)
 
 
 async def get_current_user_async(
@@ -104,4 +198,47 @@ async def get_current_user_async(
     Raises:
         AuthenticationException: If authentication fails
     """
-    return get_current_user_dependency(credentials)
\ No newline at end of file
+    if not credentials:
+        raise AuthenticationException("Missing authorization credentials")
+    
+    return verify_raw_token(credentials.credentials)
+
+
+def connection_token(connection: HTTPConnection) -> Optional[str]:
+    """
+    Return the token of a request or long-lived connection.
+    
+    Args:
+        connection: Incoming HTTP request or WebSocket
+        
+    Returns:
+        The ``Authorization: Bearer`` token, else the ``access_token`` query
+        parameter, or None
+    """
+    scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return connection.query_params.get("access_token") or None
+
+
+async def get_connection_user(connection: HTTPConnection) -> Dict[str, Any]:
+    """
+    Authenticate a long-lived connection (SSE or WebSocket).
+    
+    Browsers cannot set headers on EventSource or WebSocket connections, so
+    the token may come from the ``Authorization: Bearer`` header or from the
+    ``access_token`` query parameter. It is verified once per connection.
+    
+    Args:
+        connection: Incoming HTTP request or WebSocket
+        
+    Returns:
+        Dict containing user data
+        
+    Raises:
+        AuthenticationException: If authentication fails
+    """
+    token = connection_token(connection)
+    if not token:
+        raise AuthenticationException("Missing authorization credentials")
+    return verify_raw_token(token)
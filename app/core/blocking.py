@@ -0,0 +1,95 @@
+"""Bounded thread pool for blocking calls.
+
+Synchronous Supabase SDK calls (background writers, token store, master
+data loads) must not run on the event loop. They used to go through
+``asyncio.to_thread``, which shares the loop's default executor with
+everything else in the process: a burst of slow PostgREST calls could take
+every default thread and stall unrelated work (DNS lookups, other
+``to_thread`` users). :func:`run_blocking` uses a dedicated pool of
+``DB_THREAD_POOL_SIZE`` threads instead; excess calls queue for a thread
+rather than growing the pool.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """Fixed-size thread pool awaited from the event loop."""
+
+    def __init__(self, max_workers: int, name: str = "blocking"):
+        """
+        Initialize executor.
+
+        Args:
+            max_workers: Threads in the pool (calls beyond this queue)
+            name: Thread name prefix
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.in_flight = 0
+        self.calls = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        Context variables are propagated, as with ``asyncio.to_thread``.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool size, running/queued call counts and total calls."""
+        return {
+            "max_workers": self.max_workers,
+            "running": min(self.in_flight, self.max_workers),
+            "queued": max(0, self.in_flight - self.max_workers),
+            "calls": self.calls,
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting calls; running calls finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_blocking_executor: Optional[BlockingExecutor] = None
+_blocking_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> BlockingExecutor:
+    """Get the process-wide blocking call executor singleton."""
+    global _blocking_executor
+    if _blocking_executor is None:
+        with _blocking_executor_lock:
+            if _blocking_executor is None:
+                _blocking_executor = BlockingExecutor(get_settings().DB_THREAD_POOL_SIZE, name="supabase")
+    return _blocking_executor
+
+
+def shutdown_blocking_executor() -> None:
+    """Shut the executor down (application shutdown); a later call creates a new one."""
+    global _blocking_executor
+    with _blocking_executor_lock:
+        if _blocking_executor is not None:
+            _blocking_executor.shutdown()
+            _blocking_executor = None
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call on the shared bounded pool (see :class:`BlockingExecutor`)."""
+    return await get_blocking_executor().run(fn, *args, **kwargs)
@@ -0,0 +1,339 @@
+"""Small in-process caches shared by the core modules."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Awaitable, Callable, Dict, Generic, Hashable, NamedTuple, Optional, Set, Tuple, TypeVar,
+)
+
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache where every entry carries its own expiry time.
+
+    Entries are evicted when they expire or when the cache grows beyond
+    ``max_size`` (least recently used first). All operations are O(1) and
+    guarded by a lock so the cache can be shared between the event loop and
+    worker threads.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        default_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            max_size: Maximum number of entries kept
+            default_ttl: TTL in seconds used when ``set`` gets no explicit expiry
+            clock: Monotonic time source (injectable for tests)
+            on_evict: Optional callback invoked with (key, value) on eviction
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._on_evict = on_evict
+        self._data: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the cached value or None when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                self._evicted(key, value)
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds until the entry expires (defaults to ``default_ttl``)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, self._clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                self._evicted(old_key, old_value)
+
+    def pop(self, key: K) -> Optional[V]:
+        """Remove and return an entry without counting it as a hit or miss."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries and return how many were removed."""
+        now = self._clock()
+        removed = []
+        with self._lock:
+            for key, (value, expires_at) in list(self._data.items()):
+                if expires_at <= now:
+                    del self._data[key]
+                    removed.append((key, value))
+        for key, value in removed:
+            self._evicted(key, value)
+        return len(removed)
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss counters."""
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._data.get(key)  # type: ignore[arg-type]
+        return entry is not None and entry[1] > self._clock()
+
+    def _evicted(self, key: K, value: V) -> None:
+        self.evictions += 1
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+
+class CacheLookup(NamedTuple, Generic[V]):
+    """Result of a stale-while-revalidate lookup."""
+
+    value: V
+    #: Seconds since the value was loaded
+    age: float
+    #: ``"HIT"`` (fresh), ``"STALE"`` (served while revalidating or after a
+    #: failed reload) or ``"MISS"`` (loaded by this call)
+    status: str
+
+
+@dataclass
+class _SWREntry(Generic[V]):
+    value: V
+    loaded_at: float
+    weight: int
+    #: Set by ``invalidate``: the next read reloads before answering
+    invalid: bool = False
+
+
+class SWRCache(Generic[K, V]):
+    """
+    Async stale-while-revalidate cache with a weighted LRU memory cap.
+
+    * Younger than ``fresh_ttl``: served as is.
+    * Up to ``fresh_ttl + stale_ttl``: served immediately while one
+      background reload per key refreshes it.
+    * Older, missing or invalidated: loaded before answering; if that load
+      fails and an old value exists, the old value is served instead.
+
+    Concurrent loads of one key share a single call. The total weight of all
+    entries (``weigh(value)``, e.g. the number of items in a list) is kept at
+    or below ``max_weight`` by evicting least recently used entries.
+    Meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        fresh_ttl: float,
+        stale_ttl: float,
+        max_weight: int,
+        weigh: Callable[[V], int] = lambda value: 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            fresh_ttl: Seconds a value is served without revalidation
+            stale_ttl: Further seconds a value is served while revalidating
+            max_weight: Upper bound on the summed weight of all entries
+            weigh: Weight of a value (at least 1 is charged per entry)
+            clock: Monotonic time source (injectable for tests)
+        """
+        if max_weight <= 0:
+            raise ValueError("max_weight must be positive")
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self._clock = clock
+        self._data: "OrderedDict[K, _SWREntry[V]]" = OrderedDict()
+        self._weight = 0
+        self._flight: SingleFlight[K, V] = SingleFlight()
+        self._revalidations: Set[asyncio.Task] = set()
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    async def get(self, key: K, load: Callable[[], Awaitable[V]]) -> CacheLookup[V]:
+        """
+        Return the cached value for ``key``, loading it with ``load`` if needed.
+
+        Args:
+            key: Cache key
+            load: Zero-argument coroutine function producing a fresh value
+
+        Returns:
+            Value with its age and cache status
+
+        Raises:
+            Whatever ``load`` raised, when there is no value to fall back to
+        """
+        entry = self._data.get(key)
+        now = self._clock()
+        if entry is not None and not entry.invalid:
+            age = now - entry.loaded_at
+            if age < self.fresh_ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return CacheLookup(entry.value, age, "HIT")
+            if age < self.fresh_ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                self._revalidate(key, load)
+                return CacheLookup(entry.value, age, "STALE")
+
+        try:
+            value = await self._load(key, load)
+        except Exception:
+            # Keep answering with the last good value (EDGE-001)
+            entry = self._data.get(key)
+            if entry is None:
+                raise
+            self.fallbacks += 1
+            logger.warning("Reload of %r failed; serving cached value", key, exc_info=True)
+            return CacheLookup(entry.value, self._clock() - entry.loaded_at, "STALE")
+        self.misses += 1
+        return CacheLookup(value, 0.0, "MISS")
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> int:
+        """
+        Mark matching entries for reload on their next read.
+
+        Values are kept so a failing reload can still fall back to them.
+
+        Args:
+            predicate: Selects the keys to invalidate
+
+        Returns:
+            Number of entries invalidated
+        """
+        self._generation += 1
+        count = 0
+        for key, entry in self._data.items():
+            if predicate(key):
+                entry.invalid = True
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        self._data.clear()
+        self._weight = 0
+        self.hits = self.stale_hits = self.misses = 0
+        self.fallbacks = self.revalidations = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size, weight and hit/miss counters."""
+        return {
+            "size": len(self._data),
+            "weight": self._weight,
+            "max_weight": self.max_weight,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    async def _load(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        async def load_and_store() -> V:
+            generation = self._generation
+            value = await load()
+            # An invalidation during the load may have raced the new data
+            self._store(key, value, invalid=generation != self._generation)
+            return value
+
+        return await self._flight.do(key, load_and_store)
+
+    def _revalidate(self, key: K, load: Callable[[], Awaitable[V]]) -> None:
+        if self._flight.in_flight(key):
+            return
+        self.revalidations += 1
+        task = asyncio.ensure_future(self._load(key, load))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidated)
+
+    def _revalidated(self, task: asyncio.Task) -> None:
+        self._revalidations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background revalidation failed", exc_info=task.exception())
+
+    def _store(self, key: K, value: V, invalid: bool = False) -> None:
+        weight = max(1, self._weigh(value))
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._weight -= old.weight
+        self._data[key] = _SWREntry(value, self._clock(), weight, invalid)
+        self._weight += weight
+        while self._weight > self.max_weight and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self._weight -= evicted.weight
+            self.evictions += 1
@@ -30,8 +30,135 @@ class Settings(BaseSettings):
     # PostgreSQL Direct Connection (optional)
     POSTGRES_URL: str = ""
     POSTGRES_URL_NON_POOLING: str = ""
+    # Direct asyncpg read path for stream lists/search (PostgREST stays the fallback)
+    POSTGRES_READ_PATH_ENABLED: bool = False
+    POSTGRES_POOL_MIN_SIZE: int = 1
+    POSTGRES_POOL_MAX_SIZE: int = 5  # per worker process
+    POSTGRES_COMMAND_TIMEOUT_SECONDS: float = 5.0
+    # Several workers/replicas: advisory-lock leader election and channel partitioning
+    # (one session per worker; needs a direct or session-mode URL, not a transaction pooler)
+    COORDINATION_ENABLED: bool = False
+    COORDINATION_NAMESPACE: int = 1396787015  # advisory lock class shared by one deployment
+    COORDINATION_POLL_INTERVAL_SECONDS: float = 1.0
+    COORDINATION_LEASE_SECONDS: float = 10.0
+    
+    # Supabase client pool settings
+    SUPABASE_USER_CLIENT_CACHE_SIZE: int = 256
+    SUPABASE_USER_CLIENT_MAX_TTL_SECONDS: int = 3600
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = 20
+    SUPABASE_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_HTTP_TIMEOUT: float = 20.0
+    # Threads for synchronous Supabase SDK calls (background jobs); the request path uses the async client
+    DB_THREAD_POOL_SIZE: int = 8
+    
+    # JWT verification cache settings
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_MAX_TTL_SECONDS: int = 3600
+    AUTH_TOKEN_NEGATIVE_TTL_SECONDS: float = 30.0
+    
+    # Stream refresh scheduler settings
+    STREAM_SCHEDULER_ENABLED: bool = True
+    STREAM_REFRESH_INTERVAL_SECONDS: float = 60.0
+    STREAM_REFRESH_MAX_AGE_SECONDS: float = 90.0
+    STREAM_REFRESH_MIN_INTERVAL_SECONDS: float = 15.0
+    # POST /api/streams/refresh answers within this budget (NFR-001: 30s) with whatever finished
+    STREAM_REFRESH_DEADLINE_SECONDS: float = 25.0
+    STREAM_CHANNEL_RELOAD_SECONDS: float = 300.0
+    STREAM_VIEWER_UPDATE_INTERVAL_SECONDS: float = 120.0
+    STREAM_WRITE_BATCH_SIZE: int = 500
+    # Adaptive cadence: live/in-window channels every interval, dormant ones backing off
+    STREAM_ADAPTIVE_POLLING_ENABLED: bool = True
+    STREAM_POLL_TICK_SECONDS: float = 15.0
+    STREAM_POLL_MAX_INTERVAL_SECONDS: float = 900.0
+    STREAM_POLL_BACKOFF_FACTOR: float = 2.0
+    STREAM_POLL_HISTORY_WEEKS: int = 8
+    STREAM_POLL_WINDOW_MIN_WEEKS: int = 2
+    STREAM_POLL_WINDOW_LEAD_SECONDS: float = 900.0
+    
+    # Viewer-count history behind /api/stats (in memory, samples flushed to stream_viewer_samples)
+    VIEWER_HISTORY_ENABLED: bool = True
+    VIEWER_HISTORY_RETENTION_SECONDS: float = 172800.0  # ended streams; the hourly tier covers 48h
+    VIEWER_HISTORY_FLUSH_INTERVAL_SECONDS: float = 60.0
+    VIEWER_HISTORY_FLUSH_BATCH_SIZE: int = 1000
+    
+    # GET /api/streams list cache (stale-while-revalidate)
+    STREAM_CACHE_FRESH_SECONDS: float = 15.0
+    STREAM_CACHE_STALE_SECONDS: float = 300.0
+    STREAM_CACHE_MAX_ITEMS: int = 100000
+    STREAM_CACHE_HISTORY_KEYS: int = 10000
+    STREAM_CACHE_HISTORY_TOMBSTONES: int = 1000
+    
+    # GET /api/streams/events push connections
+    STREAM_EVENTS_MAX_PENDING: int = 256
+    STREAM_EVENTS_HEARTBEAT_SECONDS: float = 25.0
+    STREAM_EVENTS_MAX_CONNECTIONS: int = 10000
+    
+    # API rate limits per user (or per IP when anonymous), per route class. Counted
+    # in each worker process: N workers/replicas let a client make up to N times these
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_MINUTE: int = 100
+    RATE_LIMIT_REFRESH_PER_MINUTE: int = 6
+    RATE_LIMIT_EVENTS_PER_MINUTE: int = 30
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    
+    # Prometheus metrics (GET /api/metrics)
+    METRICS_ENABLED: bool = True
+    
+    # Log import/app/lifespan/first-request timings of each worker start
+    STARTUP_PROFILE_ENABLED: bool = False
+    
+    # Debug: log event loop stalls longer than this with the blocking call site (0 = off)
+    EVENT_LOOP_BLOCK_THRESHOLD_MS: float = 0.0
+    
+    # Background dependency checks behind /api/health and /api/health/ready
+    HEALTH_CHECK_ENABLED: bool = True
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 15.0
+    HEALTH_PLATFORM_CHECK_INTERVAL_SECONDS: float = 300.0  # YouTube probes cost 1 quota unit
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 3.0
+    HEALTH_CHECK_RISE: int = 2
+    HEALTH_CHECK_FALL: int = 3
     
     # OAuth settings are managed via database (system_settings table)
+    # Non-empty values below override the corresponding system_settings keys
+    YOUTUBE_API_KEY: str = ""
+    TWITCH_CLIENT_ID: str = ""
+    TWITCH_CLIENT_SECRET: str = ""
+    # OAuth application of YouTube (Google) for refreshing users' tokens
+    YOUTUBE_CLIENT_ID: str = ""
+    YOUTUBE_CLIENT_SECRET: str = ""
+    
+    # Platform API settings
+    YOUTUBE_API_BASE_URL: str = "https://www.googleapis.com/youtube/v3"
+    TWITCH_API_BASE_URL: str = "https://api.twitch.tv/helix"
+    TWITCH_TOKEN_URL: str = "https://id.twitch.tv/oauth2/token"
+    YOUTUBE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    PLATFORM_HTTP_TIMEOUT_SECONDS: float = 20.0
+    PLATFORM_MAX_CONCURRENCY: int = 8
+    # Stop calling a failing platform API (timeouts, 5xx, 429) and serve cached data
+    PLATFORM_CIRCUIT_BREAKER_ENABLED: bool = True
+    PLATFORM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    PLATFORM_CIRCUIT_RESET_SECONDS: float = 30.0
+    PLATFORM_CIRCUIT_MAX_RESET_SECONDS: float = 300.0
+    # Duplicate batch calls still outstanding after the p95 latency (YouTube: costs quota)
+    PLATFORM_HEDGE_ENABLED: bool = False
+    
+    # In-memory platforms/system_settings snapshot (GET /api/platforms, /api/config)
+    MASTER_DATA_TTL_SECONDS: float = 300.0
+    # Reload on Supabase Realtime changes (tables must be in the supabase_realtime publication)
+    MASTER_DATA_REALTIME_ENABLED: bool = False
+    
+    # Proactive refresh of users' OAuth tokens (user_api_keys)
+    OAUTH_TOKEN_REFRESH_ENABLED: bool = True
+    OAUTH_TOKEN_REFRESH_INTERVAL_SECONDS: float = 60.0
+    OAUTH_TOKEN_REFRESH_WINDOW_SECONDS: float = 600.0
+    OAUTH_TOKEN_REFRESH_BATCH_SIZE: int = 100
+    OAUTH_TOKEN_REFRESH_CONCURRENCY: int = 4
+    OAUTH_TOKEN_REFRESH_LEASE_SECONDS: float = 60.0
+    OAUTH_TOKEN_CACHE_SIZE: int = 10000
+    
+    # YouTube Data API quota (units per Pacific-time day, shared by all coordinated workers)
+    YOUTUBE_DAILY_QUOTA_UNITS: int = 10000
+    YOUTUBE_QUOTA_BURST_FRACTION: float = 0.05
     
     # API settings
     API_V1_STR: str = "/api"
@@ -0,0 +1,385 @@
+"""Coordination of several workers or replicas through Postgres (optional).
+
+With ``COORDINATION_ENABLED`` every worker process keeps one dedicated
+asyncpg session (``POSTGRES_URL_NON_POOLING``, or ``POSTGRES_URL`` if it is
+a session-mode connection; session advisory locks and ``LISTEN`` do not
+work through a transaction-mode pooler) and uses it for:
+
+* Membership: the worker holds the advisory lock ``(namespace, worker_id)``
+  for the life of its session. The live workers are the holders of those
+  locks in ``pg_locks``, so a crashed worker drops out as soon as its
+  session ends, with no heartbeat rows to expire.
+* Leadership: every worker retries ``pg_try_advisory_lock(namespace, 0)``
+  each poll; whoever holds it is the leader until its session ends.
+  Server-side TCP keepalives bound how long a vanished host keeps the lock
+  (the lease); a worker whose heartbeat query fails steps down on its own
+  before that.
+* Partitioning: channels are assigned to live workers by consistent
+  hashing (:class:`HashRing`), so a join or leave only moves the share of
+  the worker that joined or left.
+* Broadcast: small JSON messages over ``NOTIFY``, e.g. stream list cache
+  invalidations for users whose channels another worker refreshed.
+
+asyncpg is only imported when coordination is enabled.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+#: Advisory lock object id of the leader lock (worker ids start at 1)
+LEADER_KEY = 0
+#: Broadcast topic announcing a join or a graceful leave
+MEMBERSHIP_TOPIC = "_members"
+#: NOTIFY payloads must stay below 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+MEMBERS_QUERY = """
+SELECT objid::int8 AS key, pid FROM pg_locks
+WHERE locktype = 'advisory' AND granted AND objsubid = 2 AND classid = $1::int8::oid
+  AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+MessageHandler = Callable[[Any], None]
+
+
+def _hash(value: str) -> int:
+    # Stable across processes, unlike hash() with PYTHONHASHSEED
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to worker ids."""
+
+    def __init__(self, members: Iterable[int], replicas: int = 64):
+        """
+        Initialize ring.
+
+        Args:
+            members: Worker ids
+            replicas: Points per worker (more points, more even shares)
+        """
+        points = sorted((_hash(f"{member}#{i}"), member) for member in set(members) for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+        self.members = tuple(sorted(set(self._owners)))
+
+    def owner(self, key: str) -> Optional[int]:
+        """Return the worker owning ``key``, or None if the ring is empty."""
+        if not self._hashes:
+            return None
+        return self._owners[bisect_right(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+class ClusterCoordinator:
+    """Membership, leader election and broadcast over one Postgres session."""
+
+    def __init__(
+        self,
+        dsn: str,
+        namespace: int,
+        worker_id: Optional[int] = None,
+        poll_interval: float = 1.0,
+        lease: float = 10.0,
+        replicas: int = 64
+    ):
+        """
+        Initialize coordinator (connects in :meth:`start`).
+
+        Args:
+            dsn: Postgres connection string of a session (not a transaction pooler)
+            namespace: Advisory lock class id shared by all workers of one
+                       deployment (1..2**31-1); also names the NOTIFY channel
+            worker_id: Worker identity (random if None)
+            poll_interval: Seconds between heartbeats, leader attempts and
+                           membership reads; failover takes about this long
+            lease: Seconds a lost session may keep its locks on the server
+            replicas: Hash ring points per worker
+        """
+        self.dsn = dsn
+        self.namespace = namespace
+        self.worker_id = worker_id or secrets.randbelow(2 ** 31 - 1) + 1
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.replicas = replicas
+        self.channel = f"coordination_{namespace}"
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._ring: Optional[HashRing] = None
+        self._leader = False
+        self.leader_id: Optional[int] = None
+        self.leader_changes = 0
+        self.reconnects = 0
+        self.published = 0
+        self.received = 0
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    @property
+    def connected(self) -> bool:
+        """Whether the coordination session is open."""
+        return self._connection is not None and not self._connection.is_closed()
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker currently holds the leader lock."""
+        return self._leader and self.connected
+
+    @property
+    def members(self) -> Tuple[int, ...]:
+        """Live worker ids as of the last membership read."""
+        return self._ring.members if self._ring is not None else ()
+
+    def owns(self, key: str) -> bool:
+        """
+        Whether this worker is responsible for ``key``.
+
+        Before the first membership read every key is owned, so a worker
+        that cannot reach Postgres still does all the work on its own.
+        After losing the session the last known assignment is kept until
+        the session is back.
+        """
+        if self._ring is None:
+            return True
+        return self._ring.owner(key) == self.worker_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Return identity, membership and message counters."""
+        return {
+            "worker_id": self.worker_id,
+            "connected": self.connected,
+            "leader": self.is_leader,
+            "leader_id": self.leader_id,
+            "members": len(self.members),
+            "leader_changes": self.leader_changes,
+            "reconnects": self.reconnects,
+            "published": self.published,
+            "received": self.received,
+        }
+
+    # ------------------------------------------------------------------
+    # Broadcast
+    # ------------------------------------------------------------------
+
+    def subscribe(self, topic: str, handler: MessageHandler) -> None:
+        """Call ``handler(data)`` for every message other workers publish on ``topic``."""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, data: Any) -> bool:
+        """
+        Send ``data`` (JSON-serializable, under ~7.9 kB encoded) to the other workers.
+
+        Delivery is best effort: nothing is sent while disconnected, and
+        workers that are not listening at that moment never see it.
+
+        Returns:
+            Whether the message was sent
+
+        Raises:
+            ValueError: If the encoded message is too large for ``NOTIFY``
+        """
+        payload = json.dumps({"sender": self.worker_id, "topic": topic, "data": data}, separators=(",", ":"))
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            raise ValueError(f"Message on {topic!r} exceeds {MAX_PAYLOAD_BYTES} bytes")
+        if not self.connected:
+            return False
+        try:
+            async with self._lock:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception:
+            logger.warning("Could not publish %s message", topic, exc_info=True)
+            return False
+        self.published += 1
+        return True
+
+    def _on_notification(self, _connection, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("sender") == self.worker_id:
+            return
+        self.received += 1
+        topic = message.get("topic")
+        if topic == MEMBERSHIP_TOPIC:
+            # Re-read membership now instead of at the next poll
+            self._wake.set()
+            return
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(message.get("data"))
+            except Exception:
+                logger.exception("Coordination handler for %s failed", topic)
+
+    # ------------------------------------------------------------------
+    # Session
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """
+        Join the cluster and start the background loop.
+
+        Waits one poll interval after joining, so workers started together
+        see each other before their first cycle. If Postgres is unreachable
+        the worker runs standalone and the loop keeps reconnecting.
+        """
+        if self._task is not None:
+            return
+        try:
+            await self._connect()
+            await asyncio.sleep(self.poll_interval)
+            await self._poll()
+        except Exception:
+            logger.exception("Could not join the worker cluster; running standalone until Postgres is reachable")
+            await self._disconnect()
+        self._task = asyncio.create_task(self._run(), name="cluster-coordinator")
+
+    async def stop(self) -> None:
+        """Leave the cluster: release the locks and tell the other workers."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.connected:
+            await self.publish(MEMBERSHIP_TOPIC, {"left": self.worker_id})
+        await self._disconnect()
+
+    async def _run(self) -> None:
+        backoff = self.poll_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval if self.connected else backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                if not self.connected:
+                    await self._disconnect()
+                    await self._connect()
+                    self.reconnects += 1
+                await self._poll()
+                backoff = self.poll_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Coordination session failed; stepping down", exc_info=True)
+                await self._disconnect()
+                backoff = min(backoff * 2, 30.0)
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn, statement_cache_size=0, timeout=self.lease)
+        try:
+            # The server drops a silent client (and its locks) within about ``lease`` seconds
+            idle = max(1, int(self.lease / 2))
+            interval = max(1, int(self.lease / 6))
+            for name, value in (
+                ("tcp_keepalives_idle", idle),
+                ("tcp_keepalives_interval", interval),
+                ("tcp_keepalives_count", 3),
+                ("tcp_user_timeout", int(self.lease * 1000)),
+            ):
+                try:
+                    await connection.execute(f"SET {name} = {value}")
+                except asyncpg.PostgresError as e:
+                    logger.warning("Could not set %s on the coordination session: %s", name, e)
+            while not await connection.fetchval("SELECT pg_try_advisory_lock($1, $2)", self.namespace, self.worker_id):
+                # Another live worker drew the same id
+                self.worker_id = secrets.randbelow(2 ** 31 - 1) + 1
+            await connection.add_listener(self.channel, self._on_notification)
+        except BaseException:
+            connection.terminate()
+            raise
+        connection.add_termination_listener(lambda _connection: self._wake.set())
+        self._connection = connection
+        logger.info("Joined worker cluster %d as worker %d", self.namespace, self.worker_id)
+        await self.publish(MEMBERSHIP_TOPIC, {"joined": self.worker_id})
+
+    async def _disconnect(self) -> None:
+        self._set_leader(False)
+        connection, self._connection = self._connection, None
+        if connection is None or connection.is_closed():
+            return
+        try:
+            await asyncio.wait_for(connection.close(), timeout=self.poll_interval)
+        except Exception:
+            connection.terminate()
+
+    async def _poll(self) -> None:
+        """Heartbeat, leader attempt and membership read in one round trip each."""
+        timeout = min(self.poll_interval, self.lease / 4)
+        async with self._lock:
+            if not self._leader:
+                leader = await self._connection.fetchval(
+                    "SELECT pg_try_advisory_lock($1, $2)", self.namespace, LEADER_KEY, timeout=timeout,
+                )
+            else:
+                leader = True
+            rows = await self._connection.fetch(MEMBERS_QUERY, self.namespace, timeout=timeout)
+        leader_pid = next((row["pid"] for row in rows if row["key"] == LEADER_KEY), None)
+        members = {row["key"]: row["pid"] for row in rows if row["key"] != LEADER_KEY}
+        self.leader_id = next((member for member, pid in members.items() if pid == leader_pid), None)
+        if self._ring is None or self._ring.members != tuple(sorted(members)):
+            self._ring = HashRing(members, self.replicas)
+            logger.info("Worker cluster %d has %d live workers", self.namespace, len(members))
+        self._set_leader(leader)
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader != self._leader:
+            self._leader = leader
+            self.leader_changes += 1
+            logger.info("Worker %d %s leader", self.worker_id, "became" if leader else "is no longer")
+
+
+_coordinator: Optional[ClusterCoordinator] = None
+
+
+def get_coordinator() -> Optional[ClusterCoordinator]:
+    """Return the process-wide coordinator, or None when coordination is off."""
+    return _coordinator
+
+
+async def start_coordinator() -> Optional[ClusterCoordinator]:
+    """
+    Join the worker cluster from settings.
+
+    Returns:
+        The started coordinator, or None if coordination is disabled or no
+        Postgres URL is configured
+    """
+    global _coordinator
+    settings = get_settings()
+    dsn = settings.POSTGRES_URL_NON_POOLING or settings.POSTGRES_URL
+    if not settings.COORDINATION_ENABLED or not dsn:
+        return None
+    coordinator = ClusterCoordinator(
+        dsn,
+        namespace=settings.COORDINATION_NAMESPACE,
+        poll_interval=settings.COORDINATION_POLL_INTERVAL_SECONDS,
+        lease=settings.COORDINATION_LEASE_SECONDS,
+    )
+    await coordinator.start()
+    _coordinator = coordinator
+    return coordinator
+
+
+async def stop_coordinator() -> None:
+    """Leave the worker cluster."""
+    global _coordinator
+    if _coordinator is not None:
+        await _coordinator.stop()
+        _coordinator = None
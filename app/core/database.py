@@ -1,55 +1,479 @@
 """Database connection and Supabase client management."""
 
-from typing import Optional
-from supabase import create_client, Client
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
+import httpx
+import jwt
+
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.metrics import SUPABASE_REQUEST_DURATION
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client
+
+
+def _table_of(path: str) -> str:
+    """Metric label for a Supabase URL path (``/rest/v1/streams`` -> ``streams``)."""
+    parts = path.strip("/").split("/")
+    if parts[:2] == ["rest", "v1"] and len(parts) > 2:
+        return "/".join(parts[2:4]) if parts[2] == "rpc" else parts[2]
+    return parts[0] or "other"
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Transport wrapper recording call latency by table, method and status."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        """
+        Initialize wrapper.
+
+        Args:
+            transport: Transport doing the actual I/O
+        """
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, timing it until the response headers arrive."""
+        status = "error"
+        started = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            SUPABASE_REQUEST_DURATION.labels(
+                _table_of(request.url.path), request.method, status
+            ).observe(time.perf_counter() - started)
+
+    def close(self) -> None:
+        """Close the wrapped transport."""
+        self.transport.close()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of :class:`InstrumentedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        """
+        Initialize wrapper.
+
+        Args:
+            transport: Transport doing the actual I/O
+        """
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, timing it until the response headers arrive."""
+        status = "error"
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            SUPABASE_REQUEST_DURATION.labels(
+                _table_of(request.url.path), request.method, status
+            ).observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+def _user_client_ttl(user_jwt: str, max_ttl: float) -> float:
+    """Seconds until the token expires, capped at ``max_ttl``."""
+    try:
+        claims = jwt.decode(user_jwt, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        # Malformed tokens are not cached; PostgREST will reject them anyway
+        return 0.0
+    exp = claims.get("exp")
+    if exp is None:
+        return max_ttl
+    return min(float(exp) - time.time(), max_ttl)
+
+
+class SupabaseClientRegistry:
+    """
+    Registry of long-lived Supabase clients.
+
+    Holds one admin (service role) client and a bounded LRU cache of
+    per-user RLS clients keyed by JWT. Every client gets its own lightweight
+    ``httpx.Client`` (PostgREST mutates base_url/headers on the client it is
+    given, so sharing one would leak Authorization headers between users),
+    but all of them sit on a single keep-alive transport so TLS connections
+    to PostgREST are reused across requests and users.
 
-settings = get_settings()
+    User clients are evicted when the token's ``exp`` passes, so a cached
+    client never outlives the JWT it carries.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        anon_key: str,
+        service_role_key: str,
+        max_user_clients: int = 256,
+        max_user_client_ttl: float = 3600.0,
+        max_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 20.0,
+        transport: Optional[httpx.BaseTransport] = None
+    ):
+        """
+        Initialize registry.
+
+        Args:
+            supabase_url: Supabase project URL
+            anon_key: Anon key used for RLS clients
+            service_role_key: Service role key used for the admin client
+            max_user_clients: Maximum number of cached per-user clients
+            max_user_client_ttl: Upper bound on how long a user client is cached
+            max_connections: Connection limit of the shared pool
+            keepalive_expiry: Idle seconds before a pooled connection is closed
+            timeout: Request timeout in seconds
+            transport: Optional transport override (tests/benchmarks)
+        """
+        self.supabase_url = supabase_url
+        self.anon_key = anon_key
+        self.service_role_key = service_role_key
+        self.max_user_client_ttl = max_user_client_ttl
+        self.timeout = timeout
+        self.transport = InstrumentedTransport(transport or httpx.HTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        ))
+        self._admin_client: Optional["Client"] = None
+        self._admin_lock = threading.Lock()
+        self._user_clients: TTLCache[str, "Client"] = TTLCache(
+            max_size=max_user_clients,
+            default_ttl=max_user_client_ttl,
+        )
+        self.clients_created = 0
+
+    def admin(self) -> "Client":
+        """Return the shared service-role client, creating it on first use."""
+        if self._admin_client is None:
+            with self._admin_lock:
+                if self._admin_client is None:
+                    self._admin_client = self._create(self.service_role_key)
+        return self._admin_client
+
+    def for_user(self, user_jwt: str) -> "Client":
+        """
+        Return the cached RLS client for a user JWT.
+
+        Args:
+            user_jwt: User's JWT token from Supabase Auth
+
+        Returns:
+            Supabase client sending the JWT as its Authorization header
+        """
+        client = self._user_clients.get(user_jwt)
+        if client is not None:
+            return client
+
+        client = self._create(self.anon_key, user_jwt)
+        ttl = self._token_ttl(user_jwt)
+        if ttl > 0:
+            self._user_clients.set(user_jwt, client, ttl=ttl)
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters for the per-user client cache."""
+        return {
+            "clients_created": self.clients_created,
+            "admin_client": self._admin_client is not None,
+            "user_clients": self._user_clients.stats(),
+        }
+
+    def close(self) -> None:
+        """Drop all cached clients and close the shared connection pool."""
+        self._user_clients.clear()
+        self._admin_client = None
+        self.transport.close()
+
+    def _create(self, api_key: str, user_jwt: Optional[str] = None) -> "Client":
+        # The SDK (gotrue, postgrest, realtime, storage3...) loads on the first client, not at import
+        from supabase import ClientOptions, create_client
+
+        headers: Dict[str, str] = {}
+        if user_jwt:
+            # PostgRESTはAuthorizationヘッダーのJWTでRLSを評価する
+            headers["Authorization"] = f"Bearer {user_jwt}"
+        options = ClientOptions(
+            headers={**ClientOptions().headers, **headers},
+            auto_refresh_token=False,
+            persist_session=False,
+            httpx_client=httpx.Client(
+                transport=self.transport,
+                timeout=self.timeout,
+                follow_redirects=True,
+            ),
+        )
+        client = create_client(self.supabase_url, api_key, options=options)
+        self.clients_created += 1
+        return client
+
+    def _token_ttl(self, user_jwt: str) -> float:
+        """Seconds until the token expires, capped at ``max_user_client_ttl``."""
+        return _user_client_ttl(user_jwt, self.max_user_client_ttl)
 
 
-def get_supabase_client(user_jwt: Optional[str] = None) -> Client:
+class AsyncSupabaseClientRegistry:
     """
-    Create and return Supabase client.
-    
+    Registry of long-lived async Supabase clients for the request path.
+
+    Same layout as :class:`SupabaseClientRegistry` (one admin client, LRU
+    of per-user RLS clients, one keep-alive pool), but built on
+    ``AsyncClient`` so a PostgREST call awaits the socket instead of holding
+    the event loop or a worker thread. httpx async connections belong to the
+    event loop that opened them, so a registry is only used on its own loop.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        anon_key: str,
+        service_role_key: str,
+        max_user_clients: int = 256,
+        max_user_client_ttl: float = 3600.0,
+        max_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 20.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize registry.
+
+        Args:
+            supabase_url: Supabase project URL
+            anon_key: Anon key used for RLS clients
+            service_role_key: Service role key used for the admin client
+            max_user_clients: Maximum number of cached per-user clients
+            max_user_client_ttl: Upper bound on how long a user client is cached
+            max_connections: Connection limit of the shared pool
+            keepalive_expiry: Idle seconds before a pooled connection is closed
+            timeout: Request timeout in seconds
+            transport: Optional transport override (tests/benchmarks)
+        """
+        self.supabase_url = supabase_url
+        self.anon_key = anon_key
+        self.service_role_key = service_role_key
+        self.max_user_client_ttl = max_user_client_ttl
+        self.timeout = timeout
+        self.transport = InstrumentedAsyncTransport(transport or httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        ))
+        self._admin_client: Optional["AsyncClient"] = None
+        self._user_clients: TTLCache[str, "AsyncClient"] = TTLCache(
+            max_size=max_user_clients,
+            default_ttl=max_user_client_ttl,
+        )
+        self.clients_created = 0
+
+    async def admin(self) -> "AsyncClient":
+        """Return the shared service-role client, creating it on first use."""
+        if self._admin_client is None:
+            client = await self._create(self.service_role_key)
+            # Another task may have finished first; keep a single admin client
+            if self._admin_client is None:
+                self._admin_client = client
+        return self._admin_client
+
+    async def for_user(self, user_jwt: str) -> "AsyncClient":
+        """
+        Return the cached RLS client for a user JWT.
+
+        Args:
+            user_jwt: User's JWT token from Supabase Auth
+
+        Returns:
+            Async Supabase client sending the JWT as its Authorization header
+        """
+        client = self._user_clients.get(user_jwt)
+        if client is not None:
+            return client
+
+        client = await self._create(self.anon_key, user_jwt)
+        ttl = _user_client_ttl(user_jwt, self.max_user_client_ttl)
+        if ttl > 0:
+            self._user_clients.set(user_jwt, client, ttl=ttl)
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters for the per-user client cache."""
+        return {
+            "clients_created": self.clients_created,
+            "admin_client": self._admin_client is not None,
+            "user_clients": self._user_clients.stats(),
+        }
+
+    async def aclose(self) -> None:
+        """Drop all cached clients and close the shared connection pool."""
+        self._user_clients.clear()
+        self._admin_client = None
+        await self.transport.aclose()
+
+    async def _create(self, api_key: str, user_jwt: Optional[str] = None) -> "AsyncClient":
+        from supabase import AsyncClientOptions, acreate_client
+
+        headers: Dict[str, str] = {}
+        if user_jwt:
+            # PostgRESTはAuthorizationヘッダーのJWTでRLSを評価する
+            headers["Authorization"] = f"Bearer {user_jwt}"
+        options = AsyncClientOptions(
+            headers={**AsyncClientOptions().headers, **headers},
+            auto_refresh_token=False,
+            persist_session=False,
+            httpx_client=httpx.AsyncClient(
+                transport=self.transport,
+                timeout=self.timeout,
+                follow_redirects=True,
+            ),
+        )
+        client = await acreate_client(self.supabase_url, api_key, options=options)
+        self.clients_created += 1
+        return client
+
+
+_registry: Optional[SupabaseClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> SupabaseClientRegistry:
+    """Get the process-wide Supabase client registry singleton."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = get_settings()
+                _registry = SupabaseClientRegistry(
+                    supabase_url=settings.SUPABASE_URL,
+                    anon_key=settings.SUPABASE_ANON_KEY,
+                    service_role_key=settings.SUPABASE_SERVICE_ROLE_KEY,
+                    max_user_clients=settings.SUPABASE_USER_CLIENT_CACHE_SIZE,
+                    max_user_client_ttl=settings.SUPABASE_USER_CLIENT_MAX_TTL_SECONDS,
+                    max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+                    timeout=settings.SUPABASE_HTTP_TIMEOUT,
+                )
+    return _registry
+
+
+_async_registry: Optional[AsyncSupabaseClientRegistry] = None
+_async_registry_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client_registry() -> AsyncSupabaseClientRegistry:
+    """
+    Get the async Supabase client registry of the running event loop.
+
+    A registry created on another (finished) loop is replaced, since its
+    pooled connections cannot be used from this one.
+    """
+    global _async_registry, _async_registry_loop
+    loop = asyncio.get_running_loop()
+    if _async_registry is None or _async_registry_loop is not loop:
+        settings = get_settings()
+        _async_registry = AsyncSupabaseClientRegistry(
+            supabase_url=settings.SUPABASE_URL,
+            anon_key=settings.SUPABASE_ANON_KEY,
+            service_role_key=settings.SUPABASE_SERVICE_ROLE_KEY,
+            max_user_clients=settings.SUPABASE_USER_CLIENT_CACHE_SIZE,
+            max_user_client_ttl=settings.SUPABASE_USER_CLIENT_MAX_TTL_SECONDS,
+            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+            timeout=settings.SUPABASE_HTTP_TIMEOUT,
+        )
+        _async_registry_loop = loop
+    return _async_registry
+
+
+def set_async_client_registry(registry: Optional[AsyncSupabaseClientRegistry]) -> None:
+    """Use ``registry`` on the running event loop (tests/benchmarks); None resets."""
+    global _async_registry, _async_registry_loop
+    _async_registry = registry
+    _async_registry_loop = asyncio.get_running_loop() if registry is not None else None
+
+
+async def close_async_client_registry() -> None:
+    """Close the async registry and its connection pool (application shutdown)."""
+    global _async_registry, _async_registry_loop
+    registry, _async_registry, _async_registry_loop = _async_registry, None, None
+    if registry is not None:
+        await registry.aclose()
+
+
+async def get_async_supabase_client(user_jwt: Optional[str] = None) -> "AsyncClient":
+    """
+    Return a pooled async Supabase client.
+
+    Args:
+        user_jwt: Optional user JWT token for RLS authentication
+                 (service role access if None, as in :func:`get_supabase_client`)
+
+    Returns:
+        Configured async Supabase client instance
+    """
+    registry = get_async_client_registry()
+    if user_jwt:
+        return await registry.for_user(user_jwt)
+    return await registry.admin()
+
+
+def close_client_registry() -> None:
+    """Close the registry and its connection pool (application shutdown)."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
+
+
+def get_supabase_client(user_jwt: Optional[str] = None) -> "Client":
+    """
+    Return a pooled Supabase client.
+
     Args:
         user_jwt: Optional user JWT token for RLS authentication
                  If provided, client will use user context for RLS
                  If None, client will use service role for admin operations
-                 
+
     Returns:
         Configured Supabase client instance
-        
+
     Note:
         - With user_jwt: RLS policies apply, user sees only their data
         - Without user_jwt: Service role access, can see all data
+        - Clients are reused; do not close or mutate the returned client
     """
-    supabase_url = settings.SUPABASE_URL
-    
+    registry = get_client_registry()
     if user_jwt:
-        # Use anon key with user JWT for RLS-enabled access
-        client = create_client(supabase_url, settings.SUPABASE_ANON_KEY)
-        # Set the user's JWT token for RLS context
-        try:
-            # Supabase Python SDK方式でJWTを設定
-            client.auth.set_session(user_jwt, "")
-        except Exception:
-            # 別の方式でJWTを設定 (ヘッダー直接設定)
-            client.auth._session = {"access_token": user_jwt}
-        return client
-    else:
-        # Use service role key for admin/system operations
-        client = create_client(supabase_url, settings.SUPABASE_SERVICE_ROLE_KEY)
-        return client
+        return registry.for_user(user_jwt)
+    return registry.admin()
 
 
-def get_supabase_admin_client() -> Client:
+def get_supabase_admin_client() -> "Client":
     """
     Get Supabase client with admin (service role) privileges.
-    
+
     Returns:
         Supabase client with full database access
-        
+
     Note:
         Use this for:
         - System operations
@@ -60,20 +484,20 @@ def get_supabase_admin_client() -> Client:
     return get_supabase_client(user_jwt=None)
 
 
-def get_supabase_user_client(user_jwt: str) -> Client:
+def get_supabase_user_client(user_jwt: str) -> "Client":
     """
     Get Supabase client with user context for RLS.
-    
+
     Args:
         user_jwt: User's JWT token from Supabase Auth
-        
+
     Returns:
         Supabase client with user context (RLS applies)
-        
+
     Note:
         Use this for:
         - User-specific operations
         - API endpoints that serve user data
         - Operations where RLS should apply
     """
-    return get_supabase_client(user_jwt=user_jwt)
\ No newline at end of file
+    return get_supabase_client(user_jwt=user_jwt)
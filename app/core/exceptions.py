@@ -111,4 +111,50 @@ class ExternalAPIException(AppException):
             status_code=503,
             error_code="API_UNAVAILABLE",
             details=details
-        )
\ No newline at end of file
+        )
+
+
+class ServiceUnavailableException(AppException):
+    """Service temporarily unavailable exception."""
+    
+    def __init__(self, message: str = "Service temporarily unavailable", details: Optional[Dict[str, Any]] = None):
+        """Initialize service unavailable exception."""
+        super().__init__(
+            message=message,
+            status_code=503,
+            error_code="SERVICE_UNAVAILABLE",
+            details=details
+        )
+
+
+class PlatformRateLimitException(ExternalAPIException):
+    """External platform rate limit / quota exceeded exception."""
+    
+    def __init__(self, message: str, platform: str, retry_after: Optional[int] = None, details: Optional[Dict[str, Any]] = None):
+        """Initialize platform rate limit exception."""
+        details = details or {}
+        if retry_after is not None:
+            details["retry_after_seconds"] = retry_after
+        super().__init__(message=message, platform=platform, details=details)
+        self.error_code = "RATE_LIMITED"
+
+
+class QuotaExceededException(PlatformRateLimitException):
+    """Daily platform API quota exhausted (or reserved for later) exception."""
+    
+    def __init__(self, message: str, platform: str, retry_after: Optional[int] = None, details: Optional[Dict[str, Any]] = None):
+        """Initialize quota exceeded exception."""
+        super().__init__(message=message, platform=platform, retry_after=retry_after, details=details)
+        self.error_code = "QUOTA_EXCEEDED"
+
+
+class CircuitOpenException(ExternalAPIException):
+    """Platform API calls suspended by its circuit breaker exception."""
+    
+    def __init__(self, message: str, platform: str, retry_after: Optional[int] = None):
+        """Initialize circuit open exception."""
+        details: Dict[str, Any] = {}
+        if retry_after is not None:
+            details["retry_after_seconds"] = retry_after
+        super().__init__(message=message, platform=platform, details=details)
+        self.error_code = "CIRCUIT_OPEN"
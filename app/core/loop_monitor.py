@@ -0,0 +1,150 @@
+"""Event loop stall detection (debug mode, ``EVENT_LOOP_BLOCK_THRESHOLD_MS``).
+
+A heartbeat task wakes up every few milliseconds. When it oversleeps by
+more than the threshold, something held the loop. A watchdog thread
+notices the missing heartbeat while the stall is still going on and
+captures the loop thread's stack, so the report names the blocking call
+site (e.g. a synchronous Supabase call made straight from a handler), not
+just the task it happened in.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_LIBRARY_PATHS = tuple(
+    os.path.realpath(path) for path in {sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")}
+    if path
+)
+
+
+@dataclass(frozen=True)
+class LoopBlock:
+    """One event loop stall."""
+
+    #: Seconds the loop was unavailable
+    duration: float
+    #: Innermost application frame of the stack (``file:line in function``)
+    call_site: str
+    #: Formatted stack of the loop thread, outermost first
+    stack: List[str]
+
+
+def _call_site(frames: traceback.StackSummary) -> str:
+    """Innermost frame outside the stdlib and installed packages (innermost frame if none)."""
+    for frame in reversed(frames):
+        if not os.path.realpath(frame.filename).startswith(_LIBRARY_PATHS):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    frame = frames[-1]
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+
+class EventLoopBlockDetector:
+    """Detects and reports event loop stalls longer than a threshold."""
+
+    def __init__(
+        self,
+        threshold: float,
+        interval: Optional[float] = None,
+        max_reports: int = 100,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize detector.
+
+        Args:
+            threshold: Stall length in seconds worth reporting
+            interval: Heartbeat period (default: a quarter of the threshold)
+            max_reports: Most recent stalls kept for :meth:`stats`
+            clock: Monotonic time source
+        """
+        self.threshold = threshold
+        self.interval = interval or max(threshold / 4, 0.001)
+        self._clock = clock
+        self.reports: Deque[LoopBlock] = deque(maxlen=max_reports)
+        self.blocks = 0
+        self.longest = 0.0
+        self._last_beat = clock()
+        self._captured: Optional[traceback.StackSummary] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread."""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = self._clock()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat(), name="loop-block-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-block-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return stall count, the longest stall and the latest reports."""
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "longest_ms": round(self.longest * 1000, 3),
+            "recent": [
+                {"duration_ms": round(block.duration * 1000, 3), "call_site": block.call_site}
+                for block in self.reports
+            ],
+        }
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = self._clock()
+            stall = now - self._last_beat - self.interval
+            self._last_beat = now
+            captured, self._captured = self._captured, None
+            if stall >= self.threshold:
+                self._report(stall, captured)
+
+    def _report(self, duration: float, frames: Optional[traceback.StackSummary]) -> None:
+        if frames:
+            block = LoopBlock(duration, _call_site(frames), frames.format())
+        else:
+            # Stall ended before the watchdog looked; only the duration is known
+            block = LoopBlock(duration, "unknown", [])
+        self.blocks += 1
+        self.longest = max(self.longest, duration)
+        self.reports.append(block)
+        logger.warning(
+            "Event loop blocked for %.1f ms at %s\n%s",
+            duration * 1000, block.call_site, "".join(block.stack),
+        )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if self._captured is not None:
+                continue
+            if self._clock() - self._last_beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._captured = traceback.extract_stack(frame)
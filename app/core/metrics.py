@@ -0,0 +1,266 @@
+"""Prometheus-text metrics with low recording overhead.
+
+Instruments are created once at import time and record into preallocated
+per-label-set children: a counter is one float, a histogram one list of
+bucket counts plus a sum. Recording takes no lock; under thread contention
+(Supabase calls run in worker threads) an increment can in rare cases be lost
+to the GIL switching mid-update, which is acceptable for monitoring and keeps
+the request path free of blocking. Cumulative bucket counts are only computed
+when ``/api/metrics`` is scraped.
+
+Values that already live in other components (cache hit counters, scheduler
+state) are not duplicated: they are read at scrape time and rendered with
+:func:`render_family`.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+#: Latency buckets in seconds, including the NFR-002 (3s) and NFR-001 (30s) limits
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_family(
+    name: str,
+    kind: str,
+    help_text: str,
+    samples: Mapping[LabelValues, float],
+    labelnames: Sequence[str] = ()
+) -> str:
+    """
+    Render one metric family from values computed at scrape time.
+
+    Args:
+        name: Metric name
+        kind: ``"counter"`` or ``"gauge"``
+        help_text: HELP line
+        samples: Value per label value tuple (``()`` when unlabelled)
+        labelnames: Label names matching the tuples
+
+    Returns:
+        Exposition text block
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for values, value in samples.items():
+        lines.append(f"{name}{_format_labels(labelnames, values)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Child for one label value combination (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def clear(self) -> None:
+        """Drop every recorded value (tests)."""
+        self._children.clear()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def render(self) -> str:
+        """Exposition text of this metric."""
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled counter."""
+        self._children[()].inc(amount)
+
+    def render(self) -> str:
+        return render_family(
+            self.name, self.kind, self.help,
+            {values: child.value for values, child in list(self._children.items())},
+            self.labelnames,
+        )
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the unlabelled gauge."""
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled gauge."""
+        self._children[()].set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # Bucket i holds bounds[i-1] < value <= bounds[i]; cumulated on render
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution over fixed, preallocated buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        """Record into the unlabelled histogram."""
+        self._children[()].observe(value)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bucket_names = self.labelnames + ("le",)
+        edges = [_format_value(b) for b in self.bounds] + ["+Inf"]
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for edge, count in zip(edges, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_names, values + (edge,))} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """Set of instruments rendered together."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add an instrument; returns it for assignment at module level."""
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, extra: Optional[Iterable[str]] = None) -> str:
+        """Exposition text of every instrument followed by ``extra`` blocks."""
+        blocks = [metric.render() for metric in self._metrics]
+        blocks.extend(extra or ())
+        return "".join(blocks)
+
+    def clear(self) -> None:
+        """Reset every instrument (tests)."""
+        for metric in self._metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+# Route metrics (MetricsMiddleware)
+HTTP_REQUEST_DURATION: Histogram = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT: Gauge = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+))
+
+# Supabase (PostgREST) calls
+SUPABASE_REQUEST_DURATION: Histogram = REGISTRY.register(Histogram(
+    "supabase_request_duration_seconds", "Supabase REST call latency by table, method and status",
+    ("table", "method", "status"),
+))
+
+# Platform API calls
+PLATFORM_REQUEST_DURATION: Histogram = REGISTRY.register(Histogram(
+    "platform_request_duration_seconds", "Platform API call latency by platform, operation and outcome",
+    ("platform", "operation", "outcome"),
+))
+YOUTUBE_QUOTA_UNITS: Counter = REGISTRY.register(Counter(
+    "youtube_quota_units_total", "YouTube Data API quota units consumed by operation",
+    ("operation",),
+))
+
+# Stream refresh scheduler
+REFRESH_CYCLE_DURATION: Histogram = REGISTRY.register(Histogram(
+    "stream_refresh_cycle_duration_seconds", "Duration of a full scheduler refresh cycle",
+))
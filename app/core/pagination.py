@@ -0,0 +1,115 @@
+"""Keyset (cursor) pagination over lists sorted by ``(sort value, id)``.
+
+A page cursor holds the sort key of the last row the client received; the
+next page starts right after that key instead of at a row offset. Pages
+therefore neither skip nor repeat rows that kept their position while the
+list was reordered between requests, and finding the start is a binary
+search (or, in SQL, an index range scan on ``(sort column DESC, id DESC)``)
+instead of walking ``offset`` rows.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from app.core.exceptions import ValidationException
+
+T = TypeVar("T")
+
+SortKey = Tuple[Any, Any]
+
+
+def encode_page_cursor(sort: str, key: SortKey) -> str:
+    """Opaque cursor pointing after the row with sort key ``key``."""
+    raw = json.dumps([sort, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_page_cursor(cursor: str, sort: str) -> SortKey:
+    """
+    Decode a page cursor issued for ``sort``.
+
+    Args:
+        cursor: Value of the ``cursor`` parameter
+        sort: Sort order of the request
+
+    Returns:
+        Sort key of the last row of the previous page
+
+    Raises:
+        ValidationException: If the cursor is malformed or for another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValidationException("Invalid cursor", details={"cursor": cursor})
+    if cursor_sort != sort:
+        raise ValidationException(
+            "Cursor was issued for another sort order",
+            details={"cursor_sort": cursor_sort, "sort": sort},
+        )
+    if isinstance(value, (list, dict)) or isinstance(row_id, (list, dict)):
+        raise ValidationException("Invalid cursor", details={"cursor": cursor})
+    return value, row_id
+
+
+def keyset_start(items: Sequence[T], after: SortKey, key: Callable[[T], SortKey]) -> int:
+    """
+    Index of the first item sorting after ``after`` in a descending list.
+
+    Args:
+        items: Items sorted by ``key`` in descending order
+        after: Sort key of the last item already returned
+        key: Sort key of an item
+
+    Returns:
+        Start index of the next page
+    """
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        try:
+            before = key(items[mid]) >= after
+        except TypeError:
+            # Value of another type than the list's (tampered cursor)
+            raise ValidationException("Invalid cursor")
+        if before:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def keyset_page(
+    items: Sequence[T],
+    sort: str,
+    key: Callable[[T], SortKey],
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[T], Optional[str]]:
+    """
+    Cut the page following ``cursor`` from a descending list.
+
+    Args:
+        items: Items sorted by ``key`` in descending order
+        sort: Sort order name, bound into the cursors
+        key: Sort key of an item
+        limit: Page size
+        cursor: Cursor of the previous page (None = first page)
+
+    Returns:
+        Tuple of (page items, cursor of the next page or None on the last page)
+    """
+    start = keyset_start(items, decode_page_cursor(cursor, sort), key) if cursor else 0
+    page = list(items[start:start + limit])
+    next_cursor = None
+    if page and start + limit < len(items):
+        next_cursor = encode_page_cursor(sort, key(page[-1]))
+    return page, next_cursor
+
+
+def page_info(total: int, limit: int, next_cursor: Optional[str]) -> Dict[str, Any]:
+    """``pagination`` block of a keyset page."""
+    return {"total": total, "limit": limit, "nextCursor": next_cursor, "hasMore": next_cursor is not None}
@@ -0,0 +1,203 @@
+"""Direct Postgres connection pool for the hottest read paths (optional).
+
+Reads normally go through PostgREST over HTTP. With
+``POSTGRES_READ_PATH_ENABLED`` the stream list and search queries run on
+an asyncpg pool instead: binary protocol, server-side prepared statements
+and no JSON round trip. Every query runs in its own read-only transaction
+that first sets ``role`` and ``request.jwt.claims`` exactly like PostgREST
+does, so the RLS policies (``auth.uid()``) apply unchanged.
+
+asyncpg is only imported when the pool is enabled.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+#: Same transaction-local settings PostgREST applies before every query
+SET_REQUEST_CONTEXT = "SELECT set_config('role', $1, true), set_config('request.jwt.claims', $2, true)"
+
+
+class PostgresPool:
+    """
+    asyncpg pool with per-transaction RLS context and failure back-off.
+
+    After a connection or query failure the pool reports itself unavailable
+    for ``retry_after`` seconds, so callers go straight to their PostgREST
+    fallback instead of paying a connect timeout on every request; a
+    successful :meth:`health_check` makes it available again.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 5,
+        statement_cache_size: int = 100,
+        command_timeout: float = 5.0,
+        retry_after: float = 30.0,
+        clock=time.monotonic
+    ):
+        """
+        Initialize pool (connections are opened by :meth:`open`).
+
+        Args:
+            dsn: Postgres connection string
+            min_size: Connections kept open per worker process
+            max_size: Connection limit per worker process
+            statement_cache_size: Prepared statements cached per connection;
+                                  0 when connecting through a transaction-mode
+                                  pooler (PgBouncer/Supavisor port 6543)
+            command_timeout: Per-query timeout in seconds
+            retry_after: Seconds to bypass the pool after a failure
+            clock: Monotonic clock (tests)
+        """
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self.retry_after = retry_after
+        self._clock = clock
+        self._pool = None
+        self._failed_at: Optional[float] = None
+        self.queries = 0
+        self.failures = 0
+
+    async def open(self) -> None:
+        """Create the asyncpg pool."""
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+            command_timeout=self.command_timeout,
+            # Recycle idle connections before server/pooler idle timeouts do
+            max_inactive_connection_lifetime=300.0,
+        )
+
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @property
+    def available(self) -> bool:
+        """Whether callers should use the pool rather than their fallback."""
+        if self._pool is None:
+            return False
+        return self._failed_at is None or self._clock() - self._failed_at >= self.retry_after
+
+    async def fetch(self, claims: Dict[str, Any], query: str, *args: Any) -> List[Any]:
+        """
+        Run one query as the user described by ``claims``.
+
+        Args:
+            claims: JWT claims (``sub``, ``role``) exposed to RLS policies
+            query: SQL with ``$n`` placeholders (prepared and cached per connection)
+            *args: Query parameters
+
+        Returns:
+            asyncpg records
+
+        Raises:
+            RuntimeError: If the pool is not open
+            Exception: asyncpg/OS errors; the pool backs off before the next use
+        """
+        if self._pool is None:
+            raise RuntimeError("Postgres pool is not open")
+        self.queries += 1
+        try:
+            async with self._pool.acquire() as connection:
+                async with connection.transaction(readonly=True):
+                    await connection.execute(
+                        SET_REQUEST_CONTEXT, claims.get("role", "authenticated"), json.dumps(claims)
+                    )
+                    rows = await connection.fetch(query, *args)
+        except Exception:
+            self.failures += 1
+            self._failed_at = self._clock()
+            raise
+        return rows
+
+    async def health_check(self) -> None:
+        """
+        Run ``SELECT 1`` on a pooled connection.
+
+        Raises:
+            Exception: If no connection can be acquired or the query fails
+        """
+        if self._pool is None:
+            raise RuntimeError("Postgres pool is not open")
+        async with self._pool.acquire() as connection:
+            await connection.fetchval("SELECT 1")
+        self._failed_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and query counters."""
+        pool = self._pool
+        return {
+            "size": pool.get_size() if pool is not None else 0,
+            "idle": pool.get_idle_size() if pool is not None else 0,
+            "max_size": self.max_size,
+            "queries": self.queries,
+            "failures": self.failures,
+            "available": self.available,
+        }
+
+
+_postgres_pool: Optional[PostgresPool] = None
+
+
+def get_postgres_pool() -> Optional[PostgresPool]:
+    """Return the process-wide pool, or None when the direct read path is off."""
+    return _postgres_pool
+
+
+async def open_postgres_pool() -> Optional[PostgresPool]:
+    """
+    Open the process-wide pool from settings.
+
+    Prefers ``POSTGRES_URL_NON_POOLING`` (direct connections keep prepared
+    statements); with only ``POSTGRES_URL`` (a transaction-mode pooler)
+    statement caching is disabled. If the pool cannot be opened the app keeps
+    reading through PostgREST.
+
+    Returns:
+        The open pool, or None if the read path is disabled or unavailable
+    """
+    global _postgres_pool
+    settings = get_settings()
+    dsn = settings.POSTGRES_URL_NON_POOLING or settings.POSTGRES_URL
+    if not settings.POSTGRES_READ_PATH_ENABLED or not dsn:
+        return None
+    pool = PostgresPool(
+        dsn,
+        min_size=settings.POSTGRES_POOL_MIN_SIZE,
+        max_size=settings.POSTGRES_POOL_MAX_SIZE,
+        statement_cache_size=100 if settings.POSTGRES_URL_NON_POOLING else 0,
+        command_timeout=settings.POSTGRES_COMMAND_TIMEOUT_SECONDS,
+    )
+    try:
+        await pool.open()
+    except Exception:
+        logger.exception("Could not open the Postgres pool; reading through PostgREST")
+        return None
+    _postgres_pool = pool
+    return pool
+
+
+async def close_postgres_pool() -> None:
+    """Close the process-wide pool."""
+    global _postgres_pool
+    if _postgres_pool is not None:
+        await _postgres_pool.close()
+        _postgres_pool = None
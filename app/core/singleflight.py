@@ -0,0 +1,63 @@
+"""Single-flight call coalescing for asyncio."""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """
+    Run at most one call per key at a time.
+
+    Callers arriving while a call for the same key is in flight await that
+    call and receive the same result (or exception). Nothing is cached: once
+    the call finishes the next caller starts a new one, so failures are never
+    replayed to later callers. A cancelled caller does not cancel the shared
+    call.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._calls: Dict[K, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn`` for ``key`` or join the call already running.
+
+        Args:
+            key: Coalescing key (the refresh scope)
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            Result of the shared call
+
+        Raises:
+            Whatever the shared call raised
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            self.started += 1
+            future.add_done_callback(lambda f, k=key: self._done(k, f))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def in_flight(self, key: K) -> bool:
+        """Whether a call for ``key`` is currently running."""
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _done(self, key: K, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,75 @@
+"""Startup profiling (``STARTUP_PROFILE_ENABLED``).
+
+Records how long a worker takes from the start of ``import main`` to
+serving its first request, split into phases:
+
+* ``imported``: application modules imported;
+* ``app_created``: ``create_app()`` returned (routers and middleware built);
+* ``ready``: lifespan startup finished (clients warmed, master data loaded);
+* ``first_request``: the first HTTP response was sent.
+
+Each phase is reported in seconds since the import started, together with
+the interpreter's own uptime at that point, so time spent before ``main``
+was imported (interpreter and server start) shows up as the difference.
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+#: Phases in the order they happen
+PHASES = ("imported", "app_created", "ready", "first_request")
+
+
+def process_uptime() -> Optional[float]:
+    """Seconds since this process started (Linux only; None elsewhere)."""
+    try:
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # Field 22 (after the parenthesised command name) is the start time in clock ticks since boot
+            started = int(stat.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Phase timings of one worker start."""
+
+    def __init__(self, origin: float, clock: Callable[[], float] = time.perf_counter):
+        """
+        Initialize profile.
+
+        Args:
+            origin: ``clock()`` value when ``import main`` started
+            clock: Monotonic time source
+        """
+        self.origin = origin
+        self._clock = clock
+        self.phases: Dict[str, float] = {}
+        self.process_uptime: Optional[float] = None
+
+    def mark(self, phase: str) -> None:
+        """Record ``phase`` as reached now (only the first time)."""
+        if phase not in self.phases:
+            self.phases[phase] = round(self._clock() - self.origin, 6)
+            if phase == PHASES[-1]:
+                self.process_uptime = process_uptime()
+                logger.info("Startup profile: %s", self.report())
+
+    @property
+    def complete(self) -> bool:
+        """Whether the first request has been served."""
+        return PHASES[-1] in self.phases
+
+    def report(self) -> Dict[str, Optional[float]]:
+        """
+        Get the recorded phases.
+
+        Returns:
+            Seconds since import per reached phase, plus ``process_uptime``
+            (seconds since the process started) at the first request
+        """
+        return {**self.phases, "process_uptime": self.process_uptime}
@@ -0,0 +1,231 @@
+"""Data versions, strong ETags and delta cursors for cached lists.
+
+Every time a cached list is reloaded its rows are compared with the previous
+load of the same key. Only when something actually changed does the list get
+a new version from one process-wide counter; each row remembers the version
+it last changed in and removed rows leave a tombstone. From that:
+
+* the ETag of a response is derived from the version (no body hashing), so an
+  unchanged list answers ``304 Not Modified`` without being serialized;
+* a cursor handed out with version ``v`` lets the next request ask for the
+  rows changed or removed after ``v`` only.
+
+Cursors and ETags carry a per-process epoch, so ones issued before a restart
+(or by another worker) are simply treated as unknown: the client gets the
+full list again.
+"""
+
+import base64
+import binascii
+import itertools
+import secrets
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from app.core.exceptions import ValidationException
+
+K = TypeVar("K", bound=Hashable)
+
+Row = Dict[str, Any]
+
+#: Changes per process, so versions of another process never match
+_EPOCH = secrets.token_hex(4)
+
+
+@dataclass(frozen=True)
+class VersionedList:
+    """Immutable snapshot of a list with per-row change versions."""
+
+    items: List[Row]
+    version: int
+    #: Row id -> version the row was last added or changed in
+    stamps: Dict[Any, int] = field(repr=False)
+    #: Removed row id -> version it was removed in
+    tombstones: Dict[Any, int] = field(repr=False)
+    #: Oldest version a delta can be computed from
+    horizon: int = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[Row], List[Any]]]:
+        """
+        Rows added or changed, and ids removed, after ``version``.
+
+        Args:
+            version: Version the client already has
+
+        Returns:
+            Tuple of (upserted rows in list order, removed ids), or None if
+            the history does not reach back to ``version``
+        """
+        if version < self.horizon or version > self.version:
+            return None
+        if version == self.version:
+            return [], []
+        # stamps is built in list order, one entry per (unique) row id
+        upserted = [item for item, stamp in zip(self.items, self.stamps.values()) if stamp > version]
+        removed = [row_id for row_id, stamp in self.tombstones.items() if stamp > version]
+        return upserted, removed
+
+
+class VersionStore(Generic[K]):
+    """
+    Assigns versions to successive loads of keyed lists.
+
+    Keeps the latest snapshot per key (least recently used keys beyond
+    ``max_keys`` are forgotten) and at most ``max_tombstones`` removed rows
+    per key; cursors older than what is kept fall back to a full list.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 10000,
+        max_tombstones: int = 1000,
+        id_of: Callable[[Row], Any] = lambda row: row["id"]
+    ):
+        """
+        Initialize store.
+
+        Args:
+            max_keys: Maximum number of keys with history
+            max_tombstones: Removed rows remembered per key
+            id_of: Extracts the unique id of a row
+        """
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        self.max_keys = max_keys
+        self.max_tombstones = max_tombstones
+        self._id_of = id_of
+        self._latest: "OrderedDict[K, Tuple[VersionedList, int]]" = OrderedDict()
+        self._versions = itertools.count(1)
+        self._tickets = itertools.count(1)
+
+    def begin(self) -> int:
+        """Return a ticket to take before loading; orders concurrent loads."""
+        return next(self._tickets)
+
+    def latest(self, key: K) -> Optional[VersionedList]:
+        """Return the newest snapshot recorded for ``key``."""
+        entry = self._latest.get(key)
+        return entry[0] if entry else None
+
+    def record(self, key: K, items: List[Row], ticket: int) -> VersionedList:
+        """
+        Record a freshly loaded list.
+
+        A load that started before the one already recorded (``ticket`` is
+        older) carries older data: the recorded snapshot is returned instead,
+        so versions never go backwards.
+
+        Args:
+            key: List key
+            items: Rows in list order
+            ticket: Value of :meth:`begin` taken before the load started
+
+        Returns:
+            Snapshot to serve; the previous one if nothing changed
+        """
+        entry = self._latest.get(key)
+        if entry is not None and ticket < entry[1]:
+            self._latest.move_to_end(key)
+            return entry[0]
+        previous = entry[0] if entry else None
+        snapshot = self._diff(previous, items)
+        self._latest[key] = (snapshot, ticket)
+        self._latest.move_to_end(key)
+        while len(self._latest) > self.max_keys:
+            self._latest.popitem(last=False)
+        return snapshot
+
+    def _diff(self, previous: Optional[VersionedList], items: List[Row]) -> VersionedList:
+        rows = {self._id_of(item): item for item in items}
+        if previous is None:
+            version = next(self._versions)
+            return VersionedList(items, version, dict.fromkeys(rows, version), {}, horizon=version)
+
+        old_rows = {self._id_of(item): item for item in previous.items}
+        if old_rows == rows and list(old_rows) == list(rows):
+            return previous
+
+        version = next(self._versions)
+        stamps = {
+            row_id: previous.stamps[row_id] if old_rows.get(row_id) == row else version
+            for row_id, row in rows.items()
+        }
+        tombstones = {row_id: stamp for row_id, stamp in previous.tombstones.items() if row_id not in rows}
+        for row_id in old_rows.keys() - rows.keys():
+            tombstones[row_id] = version
+        horizon = previous.horizon
+        if len(tombstones) > self.max_tombstones:
+            ordered = sorted(tombstones.items(), key=lambda t: t[1])
+            dropped = ordered[:len(ordered) - self.max_tombstones]
+            # A cursor older than the newest dropped tombstone could miss it
+            horizon = max(horizon, dropped[-1][1])
+            tombstones = dict(ordered[len(dropped):])
+        return VersionedList(items, version, stamps, tombstones, horizon=horizon)
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+
+def _fingerprint(key: Hashable) -> str:
+    return f"{zlib.crc32(repr(key).encode()):08x}"
+
+
+def make_etag(version: int, *variant: Any) -> str:
+    """
+    Strong ETag for a representation of list ``version``.
+
+    Args:
+        version: Data version of the list
+        variant: Request parameters that shape the body (page, mode, ...)
+
+    Returns:
+        Quoted ETag value
+    """
+    return f'"{_EPOCH}-{version:x}-{_fingerprint(variant)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate ``If-None-Match`` against ``etag`` (weak comparison, RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def encode_cursor(key: Hashable, version: int) -> str:
+    """Opaque cursor for ``version`` of the list under ``key``."""
+    raw = f"{_EPOCH}.{_fingerprint(key)}.{version:x}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: Hashable) -> Optional[int]:
+    """
+    Decode a cursor issued for the list under ``key``.
+
+    Args:
+        cursor: Value of the ``since`` parameter
+        key: Key of the list being requested
+
+    Returns:
+        Version the cursor points at, or None if it was issued by another
+        process or for another list
+
+    Raises:
+        ValidationException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        epoch, fingerprint, version = raw.split(".")
+        parsed = int(version, 16)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationException("Invalid cursor", details={"since": cursor})
+    if epoch != _EPOCH or fingerprint != _fingerprint(key):
+        return None
+    return parsed
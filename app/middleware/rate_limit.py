@@ -0,0 +1,250 @@
+"""Per-client API rate limiting (EDGE-102).
+
+Requests are counted per route class and per client: the ``sub`` of a
+verified token when there is one (``Authorization: Bearer`` header, or the
+``access_token`` query parameter ``EventSource`` clients use), the client
+IP otherwise. Each
+(class, client) pair is limited with GCRA (generic cell rate algorithm), an
+exact-rate equivalent of a sliding window that keeps a single float per key:
+the theoretical arrival time (TAT) of the next request. A key whose TAT lies
+in the past carries no state worth keeping, so idle keys are evicted as they
+age out of an LRU order.
+
+The limiter sits behind :class:`RateLimitBackend` so several workers can share
+counters (e.g. a Redis backend running the same arithmetic in a script); the
+default :class:`MemoryRateLimitBackend` is per process, so with several
+workers or replicas a client may get up to one limit per process.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.auth import connection_token, verify_raw_token
+from app.core.config import get_settings
+from app.core.exceptions import AuthenticationException, RateLimitException
+
+
+class RateLimit(NamedTuple):
+    """``limit`` requests per ``period`` seconds, all of which may come in a burst."""
+    limit: int
+    period: float
+
+
+class RouteClass(NamedTuple):
+    """Requests matching ``method`` (None = any) and a path prefix share ``rate``."""
+    name: str
+    path_prefix: str
+    method: Optional[str]
+    rate: RateLimit
+
+
+class RateLimitBackend(ABC):
+    """Storage of rate limit state, local or shared between workers."""
+
+    @abstractmethod
+    async def acquire(self, key: str, rate: RateLimit) -> float:
+        """
+        Count one request for ``key``.
+
+        Args:
+            key: Client and route class identifier
+            rate: Limit applying to the key
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until it would be
+        """
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process GCRA limiter.
+
+    State is one TAT per key in an LRU-ordered dict. Keys whose TAT has
+    passed are dropped from the cold end as new requests arrive, and the
+    dict never grows beyond ``max_keys`` (the least recently seen key is
+    dropped, which forgives at most that client's remaining penalty).
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize backend.
+
+        Args:
+            max_keys: Maximum number of keys tracked
+            clock: Monotonic time source (injectable for tests)
+        """
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        self.max_keys = max_keys
+        self._clock = clock
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    async def acquire(self, key: str, rate: RateLimit) -> float:
+        """Count one request for ``key`` (see :meth:`RateLimitBackend.acquire`)."""
+        return self.acquire_nowait(key, rate)
+
+    def acquire_nowait(self, key: str, rate: RateLimit) -> float:
+        """Synchronous :meth:`acquire`."""
+        now = self._clock()
+        tat_map = self._tat
+        interval = rate.period / rate.limit
+        tat = tat_map.get(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + interval
+        wait = new_tat - now - rate.period
+        if wait > 0:
+            self.limited += 1
+            return wait
+        tat_map[key] = new_tat
+        tat_map.move_to_end(key)
+        self.allowed += 1
+        # Evict idle keys from the cold end (amortized O(1))
+        while True:
+            oldest = next(iter(tat_map))
+            if tat_map[oldest] > now and len(tat_map) <= self.max_keys:
+                break
+            del tat_map[oldest]
+        return 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """Return key count and request counters."""
+        return {"keys": len(self._tat), "allowed": self.allowed, "limited": self.limited}
+
+
+def default_route_classes() -> Tuple[RouteClass, ...]:
+    """Route classes built from settings, most specific first."""
+    settings = get_settings()
+    minute = 60.0
+    return (
+        RouteClass(
+            "refresh", f"{settings.API_V1_STR}/streams/refresh", "POST",
+            RateLimit(settings.RATE_LIMIT_REFRESH_PER_MINUTE, minute),
+        ),
+        RouteClass(
+            "events", f"{settings.API_V1_STR}/streams/events", None,
+            RateLimit(settings.RATE_LIMIT_EVENTS_PER_MINUTE, minute),
+        ),
+        RouteClass("api", settings.API_V1_STR, None, RateLimit(settings.RATE_LIMIT_PER_MINUTE, minute)),
+    )
+
+
+# Process-wide backend shared by every middleware instance
+_rate_limit_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Get the rate limit backend singleton."""
+    global _rate_limit_backend
+    if _rate_limit_backend is None:
+        _rate_limit_backend = MemoryRateLimitBackend(max_keys=get_settings().RATE_LIMIT_MAX_KEYS)
+    return _rate_limit_backend
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware rejecting requests over their route class limit with 429.
+
+    Authenticated requests are counted per user id (token verification goes
+    through the shared claims cache, so the route's own dependency does not
+    decode the JWT again); anonymous requests and invalid tokens are counted
+    per client IP. Paths matching no route class and the exempt prefixes
+    (health probes) are not limited. Behind a proxy, run uvicorn with
+    ``--proxy-headers`` so the client IP is the forwarded one.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        route_classes: Optional[Sequence[RouteClass]] = None,
+        backend: Optional[RateLimitBackend] = None,
+        exempt_prefixes: Sequence[str] = (),
+        enabled: bool = True
+    ):
+        """
+        Initialize middleware.
+
+        Args:
+            app: Downstream ASGI application
+            route_classes: Route classes checked in order (default: from settings)
+            backend: Limiter state (default: process-wide in-memory backend)
+            exempt_prefixes: Path prefixes never limited
+            enabled: False to pass every request through
+        """
+        self.app = app
+        self.route_classes = tuple(route_classes or default_route_classes())
+        self._backend = backend
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.enabled = enabled
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        """Backend in use (resolved lazily so tests can reset the singleton)."""
+        return self._backend if self._backend is not None else get_rate_limit_backend()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Count the request and reject it when over the limit."""
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        route_class = self._match(scope["method"], path)
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+        key = f"{route_class.name}:{self._client_id(scope)}"
+        wait = await self.backend.acquire(key, route_class.rate)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+        await self._reject(route_class, wait)(scope, receive, send)
+
+    def _match(self, method: str, path: str) -> Optional[RouteClass]:
+        if path.startswith(self.exempt_prefixes):
+            return None
+        for route_class in self.route_classes:
+            if path.startswith(route_class.path_prefix) and route_class.method in (None, method):
+                return route_class
+        return None
+
+    @staticmethod
+    def _client_id(scope: Scope) -> str:
+        token = connection_token(HTTPConnection(scope))
+        if token:
+            try:
+                claims = verify_raw_token(token)
+            except AuthenticationException:
+                claims = None
+            if claims and claims.get("sub"):
+                return f"user:{claims['sub']}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    @staticmethod
+    def _reject(route_class: RouteClass, wait: float) -> JSONResponse:
+        retry_after = max(1, math.ceil(wait))
+        exc = RateLimitException(retry_after=retry_after)
+        content: Dict[str, Any] = {
+            "success": False,
+            "error": {
+                "code": exc.error_code,
+                "message": exc.message,
+                "details": {**exc.details, "limit": route_class.rate.limit, "period_seconds": route_class.rate.period},
+            },
+        }
+        return JSONResponse(status_code=exc.status_code, content=content, headers={"Retry-After": str(retry_after)})
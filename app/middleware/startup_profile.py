@@ -0,0 +1,37 @@
+"""Time-to-first-request measurement."""
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.startup import StartupProfile
+
+
+class StartupProfileMiddleware:
+    """
+    ASGI middleware marking the first HTTP response of the worker.
+
+    After the first request it is a single attribute check per request.
+    """
+
+    def __init__(self, app: ASGIApp, profile: StartupProfile):
+        """
+        Initialize middleware.
+
+        Args:
+            app: Downstream ASGI application
+            profile: Profile to mark ``first_request`` on
+        """
+        self.app = app
+        self.profile = profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Pass the request through, marking the end of the first response."""
+        if scope["type"] != "http" or self.profile.complete:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_mark(message: Message) -> None:
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                self.profile.mark("first_request")
+
+        await self.app(scope, receive, send_and_mark)
@@ -0,0 +1,16 @@
+"""Channel domain models."""
+
+from typing import NamedTuple
+
+
+class ChannelKey(NamedTuple):
+    """Platform-level identity of a channel, shared by all subscribers."""
+    platform: str
+    channel_id: str
+
+
+class ChannelSubscription(NamedTuple):
+    """A user's row in the ``channels`` table pointing at a platform channel."""
+    id: str
+    user_id: str
+    key: ChannelKey
@@ -0,0 +1,50 @@
+"""Stream domain models and refresh schemas."""
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PlatformStream(BaseModel):
+    """Live stream as reported by a platform API, normalized."""
+    
+    platform: str
+    platform_channel_id: str
+    platform_stream_id: str
+    title: str
+    description: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    viewer_count: int = 0
+    game_name: Optional[str] = None
+    tags: Optional[List[str]] = None
+    started_at: datetime
+    is_live: bool = True
+
+
+def stream_url(platform: str, platform_stream_id: str, channel_name: str) -> Optional[str]:
+    """Public watch URL of a stream."""
+    if platform == "youtube":
+        return f"https://www.youtube.com/watch?v={platform_stream_id}"
+    if platform == "twitch":
+        return f"https://www.twitch.tv/{channel_name}"
+    return None
+
+
+class RefreshError(BaseModel):
+    """Per-channel refresh failure (spec: RefreshError)."""
+    
+    channel_id: str
+    platform: str
+    error_code: str
+    error_message: str
+
+
+class RefreshStreamsRequest(BaseModel):
+    """Body of ``POST /api/streams/refresh``."""
+    
+    channel_ids: Optional[List[str]] = Field(
+        default=None,
+        description="channels.id values to refresh (default: all of the user's channels)"
+    )
+    force_refresh: bool = False
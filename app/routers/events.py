@@ -0,0 +1,109 @@
+"""Live stream change push endpoints (Server-Sent Events and WebSocket)."""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
+
+from app.core.auth import get_connection_user
+from app.core.config import get_settings
+from app.core.exceptions import AppException, ServiceUnavailableException
+from app.services.stream_events import EventSubscriber, StreamEventBroker, sse_frame, ws_message
+
+router = APIRouter()
+
+#: Sent when events were dropped: the client must reload GET /api/streams
+RESYNC = {"reason": "events dropped", "reload": "/api/streams"}
+
+
+def get_event_broker(connection: HTTPConnection) -> StreamEventBroker:
+    """
+    FastAPI dependency returning the running event broker.
+
+    Raises:
+        ServiceUnavailableException: If the broker is not running
+    """
+    broker = getattr(connection.app.state, "stream_events", None)
+    if broker is None:
+        raise ServiceUnavailableException("Stream events are not available")
+    return broker
+
+
+async def _sse(broker: StreamEventBroker, user_id: str) -> AsyncIterator[bytes]:
+    subscriber = broker.subscribe(user_id)
+    try:
+        heartbeat = get_settings().STREAM_EVENTS_HEARTBEAT_SECONDS
+        yield f"retry: {int(heartbeat * 1000)}\n".encode() + sse_frame("ready", {"user_id": user_id})
+        while not subscriber.closed:
+            events, resync = await subscriber.next_batch(heartbeat)
+            if resync:
+                yield sse_frame("resync", RESYNC)
+            if events:
+                yield b"".join(event.sse for event in events)
+            elif not resync:
+                # Comment line: keeps proxies from closing the idle connection
+                yield b": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+@router.get("/streams/events")
+async def stream_events(
+    user: Dict[str, Any] = Depends(get_connection_user),
+    broker: StreamEventBroker = Depends(get_event_broker)
+):
+    """
+    Push live stream changes of the user's channels as Server-Sent Events.
+
+    Events are ``stream.live``, ``stream.ended``, ``stream.viewers`` and
+    ``stream.updated``; ``resync`` means events were dropped for this slow
+    connection and the list should be reloaded. The token may be passed as
+    ``access_token`` query parameter for ``EventSource`` clients.
+    """
+    broker.check_capacity()
+    return StreamingResponse(
+        _sse(broker, user["sub"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _watch_disconnect(websocket: WebSocket, subscriber: EventSubscriber) -> None:
+    # Client messages are ignored; only the disconnect matters
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscriber.close()
+
+
+@router.websocket("/streams/events/ws")
+async def stream_events_ws(websocket: WebSocket):
+    """WebSocket variant of ``GET /streams/events`` (one JSON message per event)."""
+    try:
+        user = await get_connection_user(websocket)
+        broker = get_event_broker(websocket)
+        broker.check_capacity()
+    except AppException as e:
+        # 1013 = try again later, 1008 = policy violation
+        await websocket.close(code=1013 if e.status_code == 503 else 1008, reason=e.message)
+        return
+
+    await websocket.accept()
+    subscriber = broker.subscribe(user["sub"])
+    watcher = asyncio.create_task(_watch_disconnect(websocket, subscriber))
+    try:
+        await websocket.send_text(ws_message("ready", {"user_id": user["sub"]}))
+        while not subscriber.closed:
+            events, resync = await subscriber.next_batch(get_settings().STREAM_EVENTS_HEARTBEAT_SECONDS)
+            if resync:
+                await websocket.send_text(ws_message("resync", RESYNC))
+            for event in events:
+                await websocket.send_text(event.message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscriber)
@@ -1,54 +1,75 @@
 """Health check endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from datetime import datetime
 import time
 from typing import Dict, Any
 
 from app.core.config import get_settings
+from app.core.exceptions import ServiceUnavailableException
 
 router = APIRouter()
-settings = get_settings()
 
 # Track application start time
 _start_time = time.time()
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, Any]:
+async def health_check(request: Request) -> Dict[str, Any]:
     """
     System health check endpoint.
     
-    Returns application status and basic system information.
+    Returns application status, basic system information and the latest
+    background check of every dependency (Supabase, Supabase Auth,
+    platform APIs); no dependency is contacted by this request.
     No authentication required.
     """
     current_time = datetime.utcnow()
     uptime_seconds = int(time.time() - _start_time)
+    checks: Dict[str, Any] = {
+        "application": {
+            "status": "up",
+            "last_check_at": current_time.isoformat() + "Z"
+        }
+    }
+    status = "healthy"
+    monitor = getattr(request.app.state, "health_monitor", None)
+    if monitor is not None:
+        snapshot = monitor.snapshot()
+        status = snapshot["status"]
+        checks.update(snapshot["checks"])
     
     return {
         "success": True,
         "data": {
-            "status": "healthy",
-            "version": settings.APP_VERSION,
+            "status": status,
+            "version": get_settings().APP_VERSION,
             "timestamp": current_time.isoformat() + "Z",
             "uptime_seconds": uptime_seconds,
-            "checks": {
-                "application": {
-                    "status": "up",
-                    "last_check_at": current_time.isoformat() + "Z"
-                }
-            }
+            "checks": checks
         }
     }
 
 
 @router.get("/health/ready")
-async def readiness_check() -> Dict[str, Any]:
+async def readiness_check(request: Request) -> Dict[str, Any]:
     """
     Kubernetes readiness check endpoint.
     
-    Returns whether the application is ready to serve traffic.
+    Returns whether the application is ready to serve traffic: every
+    critical dependency was up at its last background check.
+    
+    Raises:
+        ServiceUnavailableException: If a critical dependency is down or
+                                     not checked yet (503)
     """
+    monitor = getattr(request.app.state, "health_monitor", None)
+    if monitor is not None and not monitor.ready:
+        checks = monitor.snapshot()["checks"]
+        raise ServiceUnavailableException(
+            "Service is not ready",
+            details={"checks": {name: check for name, check in checks.items() if check["critical"]}},
+        )
     return {
         "success": True,
         "data": {
@@ -0,0 +1,249 @@
+"""Prometheus metrics endpoint."""
+
+from typing import Any, Dict, Iterator, List
+
+from fastapi import APIRouter, Request, Response
+
+from app.core.auth import get_token_cache_stats
+from app.core.blocking import get_blocking_executor
+from app.core.database import get_client_registry
+from app.core.metrics import CONTENT_TYPE, REGISTRY, render_family
+from app.core.postgres import get_postgres_pool
+from app.middleware.rate_limit import get_rate_limit_backend
+from app.services.base import HttpPlatformService
+from app.services.stream_cache import get_stream_cache
+
+router = APIRouter()
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _cache_families() -> Iterator[str]:
+    caches: Dict[str, Dict[str, Any]] = {
+        "stream_list": get_stream_cache().stats(),
+        "auth_token": get_token_cache_stats(),
+        "supabase_user_client": get_client_registry().stats()["user_clients"],
+    }
+    results = ("hits", "stale_hits", "negative_hits", "misses")
+    yield render_family(
+        "cache_requests_total", "counter", "Cache lookups by cache and result",
+        {(name, result): stats[result] for name, stats in caches.items() for result in results if result in stats},
+        ("cache", "result"),
+    )
+    yield render_family(
+        "cache_entries", "gauge", "Entries held by each cache",
+        {(name,): stats["size"] for name, stats in caches.items()},
+        ("cache",),
+    )
+    yield render_family(
+        "cache_evictions_total", "counter", "Cache evictions",
+        {(name,): stats["evictions"] for name, stats in caches.items() if "evictions" in stats},
+        ("cache",),
+    )
+
+
+def _scheduler_families(scheduler) -> Iterator[str]:
+    stats = scheduler.stats()
+    gauges = {
+        "stream_refresh_tracked_channels": ("Distinct channels tracked by the scheduler", "tracked_channels"),
+        "stream_refresh_owned_channels": ("Tracked channels this worker refreshes", "owned_channels"),
+        "stream_refresh_failing_channels": ("Channels whose last refresh failed", "failing_channels"),
+        "stream_refresh_never_fetched_channels": ("Tracked channels without any successful fetch", "never_fetched"),
+        "stream_refresh_data_age_seconds": ("Age of the oldest fetched channel data (refresh lag)", "max_data_age_seconds"),
+        "stream_refresh_last_cycle_seconds": ("Duration of the last refresh cycle", "last_cycle_seconds"),
+    }
+    for name, (help_text, field) in gauges.items():
+        yield render_family(name, "gauge", help_text, {(): stats[field]})
+    if "cadence" in stats:
+        cadence = stats["cadence"]
+        yield render_family(
+            "stream_refresh_cadence_channels", "gauge", "Owned channels by polling state",
+            {("live",): cadence["live"], ("backed_off",): cadence["backed_off"],
+             ("frequent",): cadence["scheduled"] - cadence["live"] - cadence["backed_off"]},
+            ("state",),
+        )
+        yield render_family(
+            "stream_refresh_start_windows", "gauge", "Learned hour-of-week start windows", {(): cadence["windows"]},
+        )
+    yield render_family(
+        "stream_refresh_upstream_calls_total", "counter", "Platform batch fetches started by the scheduler",
+        {(): stats["upstream_calls"]},
+    )
+    yield render_family(
+        "stream_refresh_deadline_exceeded_total", "counter",
+        "Channels returned from cache because the refresh deadline passed",
+        {(): stats["deadline_exceeded"]},
+    )
+    resilience = {
+        platform: service.stats()
+        for platform, service in scheduler.services.items()
+        if isinstance(service, HttpPlatformService)
+    }
+    circuits = {platform: s["circuit"] for platform, s in resilience.items() if s["circuit"] is not None}
+    if circuits:
+        yield render_family(
+            "platform_circuit_state", "gauge", "Platform API circuit state (0 closed, 1 half-open, 2 open)",
+            {(platform,): CIRCUIT_STATES[c["state"]] for platform, c in circuits.items()},
+            ("platform",),
+        )
+        yield render_family(
+            "platform_circuit_trips_total", "counter", "Times a platform API circuit opened",
+            {(platform,): c["trips"] for platform, c in circuits.items()},
+            ("platform",),
+        )
+        yield render_family(
+            "platform_circuit_rejected_total", "counter", "Platform API calls not made because the circuit was open",
+            {(platform,): c["rejected"] for platform, c in circuits.items()},
+            ("platform",),
+        )
+    if resilience:
+        yield render_family(
+            "platform_hedged_requests_total", "counter", "Duplicate requests sent for slow platform batch calls",
+            {(platform,): s["hedged_requests"] for platform, s in resilience.items()},
+            ("platform",),
+        )
+        yield render_family(
+            "platform_hedge_wins_total", "counter", "Hedged calls answered by the duplicate request first",
+            {(platform,): s["hedge_wins"] for platform, s in resilience.items()},
+            ("platform",),
+        )
+    quotas = {
+        platform: service.quota.stats()
+        for platform, service in scheduler.services.items()
+        if getattr(service, "quota", None) is not None
+    }
+    if quotas:
+        yield render_family(
+            "platform_quota_remaining_units", "gauge", "Platform API quota units left today",
+            {(platform,): stats["remaining"] for platform, stats in quotas.items()},
+            ("platform",),
+        )
+
+
+def _runtime_families(state) -> List[str]:
+    families = list(_cache_families())
+    scheduler = getattr(state, "stream_scheduler", None)
+    if scheduler is not None:
+        families.extend(_scheduler_families(scheduler))
+    writer = getattr(state, "stream_writer", None)
+    if writer is not None:
+        families.append(render_family(
+            "stream_writer_rows_written_total", "counter", "Stream rows upserted",
+            {(): writer.stats()["rows_written"]},
+        ))
+    broker = getattr(state, "stream_events", None)
+    if broker is not None:
+        stats = broker.stats()
+        families.append(render_family(
+            "stream_events_connections", "gauge", "Open SSE/WebSocket connections", {(): stats["connections"]},
+        ))
+        families.append(render_family(
+            "stream_events_dropped_total", "counter", "Push events dropped by slow consumers", {(): stats["dropped"]},
+        ))
+        families.append(render_family(
+            "stream_events_peer_total", "counter", "Push events exchanged with other workers",
+            {("relayed",): stats["events_relayed"], ("received",): stats["events_received"],
+             ("failed",): stats["relay_failures"]},
+            ("outcome",),
+        ))
+    search_index = getattr(state, "stream_search", None)
+    if search_index is not None:
+        families.append(render_family(
+            "stream_search_documents", "gauge", "Live streams in the search index", {(): len(search_index)},
+        ))
+    viewer_history = getattr(state, "viewer_history", None)
+    if viewer_history is not None:
+        stats = viewer_history.stats()
+        families.append(render_family(
+            "viewer_history_streams", "gauge", "Streams with viewer history in memory", {(): stats["streams"]},
+        ))
+        families.append(render_family(
+            "viewer_history_memory_bytes", "gauge", "Bytes held by viewer history buffers", {(): stats["memory_bytes"]},
+        ))
+        families.append(render_family(
+            "viewer_history_pending_samples", "gauge", "Viewer samples waiting to be written",
+            {(): stats["pending_samples"]},
+        ))
+        families.append(render_family(
+            "viewer_history_samples_total", "counter", "Viewer samples by outcome",
+            {("recorded",): stats["samples_recorded"], ("flushed",): stats["samples_flushed"],
+             ("dropped",): stats["samples_dropped"]},
+            ("outcome",),
+        ))
+    token_manager = getattr(state, "token_manager", None)
+    if token_manager is not None:
+        stats = token_manager.stats()
+        families.append(render_family(
+            "oauth_token_refreshes_total", "counter", "Proactive OAuth token refreshes by result",
+            {(result,): stats[result] for result in ("refreshed", "failed", "revoked", "leases_lost")},
+            ("result",),
+        ))
+    monitor = getattr(state, "health_monitor", None)
+    if monitor is not None:
+        checks = monitor.snapshot()["checks"]
+        families.append(render_family(
+            "health_dependency_up", "gauge", "Whether a dependency is up per background health checks",
+            {(name,): int(check["status"] == "up") for name, check in checks.items()},
+            ("dependency",),
+        ))
+    coordinator = getattr(state, "coordinator", None)
+    if coordinator is not None:
+        stats = coordinator.stats()
+        families.append(render_family(
+            "cluster_members", "gauge", "Live workers in the coordination cluster", {(): stats["members"]},
+        ))
+        families.append(render_family(
+            "cluster_leader", "gauge", "Whether this worker holds the leader lock", {(): int(stats["leader"])},
+        ))
+        families.append(render_family(
+            "cluster_leader_changes_total", "counter", "Leadership gained or lost by this worker",
+            {(): stats["leader_changes"]},
+        ))
+    postgres = get_postgres_pool()
+    if postgres is not None:
+        stats = postgres.stats()
+        families.append(render_family(
+            "postgres_pool_connections", "gauge", "Direct Postgres pool connections by state",
+            {("idle",): stats["idle"], ("busy",): stats["size"] - stats["idle"]},
+            ("state",),
+        ))
+        families.append(render_family(
+            "postgres_pool_queries_total", "counter", "Queries on the direct Postgres pool by result",
+            {("ok",): stats["queries"] - stats["failures"], ("failed",): stats["failures"]},
+            ("result",),
+        ))
+    stats = get_blocking_executor().stats()
+    families.append(render_family(
+        "db_thread_pool_calls", "gauge", "Synchronous Supabase calls on the bounded thread pool by state",
+        {("running",): stats["running"], ("queued",): stats["queued"]},
+        ("state",),
+    ))
+    loop_monitor = getattr(state, "loop_monitor", None)
+    if loop_monitor is not None:
+        families.append(render_family(
+            "event_loop_blocks_total", "counter", "Event loop stalls longer than EVENT_LOOP_BLOCK_THRESHOLD_MS",
+            {(): loop_monitor.blocks},
+        ))
+    rate_limits = get_rate_limit_backend()
+    if hasattr(rate_limits, "stats"):
+        stats = rate_limits.stats()
+        families.append(render_family(
+            "rate_limit_requests_total", "counter", "Requests checked by the rate limiter",
+            {("allowed",): stats["allowed"], ("limited",): stats["limited"]},
+            ("result",),
+        ))
+    return families
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request) -> Response:
+    """
+    Prometheus text exposition of request, data layer and cache metrics.
+
+    No authentication required; expose it to the scraper network only.
+    NFR-001/NFR-002 compliance is the share of
+    ``http_request_duration_seconds`` observations of ``/api/streams/refresh``
+    under the ``le="30"`` bucket and of ``/api/streams`` under ``le="3"``.
+    """
+    body = REGISTRY.render(_runtime_families(request.app.state))
+    return Response(content=body, media_type=CONTENT_TYPE)
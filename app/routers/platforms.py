@@ -0,0 +1,61 @@
+"""Platform and client configuration endpoints."""
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response
+
+from app.core.auth import get_current_user_async
+from app.core.exceptions import ServiceUnavailableException
+from app.core.versioning import etag_matches
+from app.services.master_data import MasterDataSnapshot
+
+router = APIRouter()
+
+
+def get_master_data(request: Request) -> MasterDataSnapshot:
+    """
+    FastAPI dependency returning the current master data snapshot.
+
+    Raises:
+        ServiceUnavailableException: If the master data has not been loaded
+    """
+    store = getattr(request.app.state, "master_data", None)
+    snapshot = store.snapshot if store is not None else None
+    if snapshot is None:
+        raise ServiceUnavailableException("Platform data is not available")
+    return snapshot
+
+
+def _cached_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/platforms")
+async def list_platforms(
+    if_none_match: Optional[str] = Header(None),
+    user: Dict[str, Any] = Depends(get_current_user_async),
+    snapshot: MasterDataSnapshot = Depends(get_master_data)
+) -> Response:
+    """
+    List the supported streaming platforms.
+
+    Served from the in-memory master data snapshot with a precomputed body
+    and ``ETag``; ``If-None-Match`` with the current ETag gets ``304``.
+    """
+    return _cached_json(snapshot.platforms_body, snapshot.platforms_etag, if_none_match)
+
+
+@router.get("/config")
+async def get_config(
+    if_none_match: Optional[str] = Header(None),
+    user: Dict[str, Any] = Depends(get_current_user_async),
+    snapshot: MasterDataSnapshot = Depends(get_master_data)
+) -> Response:
+    """
+    Application settings for clients (supported platforms, paging limits, refresh interval).
+
+    Served from the in-memory master data snapshot like ``GET /api/platforms``.
+    """
+    return _cached_json(snapshot.config_body, snapshot.config_etag, if_none_match)
@@ -0,0 +1,167 @@
+"""Viewer statistics endpoints.
+
+Served from the in-memory viewer history (:mod:`app.services.viewer_history`)
+of the channels this worker refreshes. With several workers, channels
+another worker owns are read from ``stream_viewer_samples`` (up to one flush
+interval behind). Channels whose samples could not be read are listed in
+``unavailable_channels`` instead of being silently left out.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional, Set
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.core.auth import get_current_user_async
+from app.core.config import get_settings
+from app.core.exceptions import ServiceUnavailableException
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.routers.streams import get_stream_scheduler
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.stream_repository import fetch_viewer_samples
+from app.services.viewer_history import ViewerHistory, combined_aggregate
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+#: ``resolution`` query values to seconds per point
+RESOLUTIONS = {"1m": 60, "10m": 600, "1h": 3600}
+
+
+def get_viewer_history(request: Request) -> ViewerHistory:
+    """
+    FastAPI dependency returning the viewer history.
+
+    Raises:
+        ServiceUnavailableException: If viewer history is not recorded
+    """
+    history = getattr(request.app.state, "viewer_history", None)
+    if history is None:
+        raise ServiceUnavailableException("Viewer statistics are not available")
+    return history
+
+
+async def _peer_history(
+    history: ViewerHistory,
+    scheduler: StreamRefreshScheduler,
+    channels: List[ChannelSubscription]
+) -> Optional[ViewerHistory]:
+    """
+    History of the channels other workers record, from the stored samples.
+
+    Returns:
+        Replica history (empty when every channel is local), or None if the
+        samples could not be read
+    """
+    keys = {c.key for c in channels if not scheduler.is_owned(c.key)}
+    if not keys:
+        return history.replica([], live_within=0)
+    settings = get_settings()
+    since = datetime.fromtimestamp(history.now() - history.retention, timezone.utc).isoformat()
+    try:
+        rows = await fetch_viewer_samples(keys, since)
+    except Exception:
+        logger.warning("Could not read viewer samples of %d channels", len(keys), exc_info=True)
+        return None
+    # Samples reach the table up to one flush after the owner took them
+    live_within = settings.VIEWER_HISTORY_FLUSH_INTERVAL_SECONDS + 2 * settings.STREAM_REFRESH_INTERVAL_SECONDS
+    return history.replica(rows, live_within)
+
+
+def _source(scheduler: StreamRefreshScheduler, peers: Optional[ViewerHistory], key: ChannelKey) -> str:
+    if scheduler.is_owned(key):
+        return "memory"
+    return "database" if peers is not None else "unavailable"
+
+
+@router.get("/stats/user")
+async def user_stats(
+    user: Dict[str, Any] = Depends(get_current_user_async),
+    scheduler: StreamRefreshScheduler = Depends(get_stream_scheduler),
+    history: ViewerHistory = Depends(get_viewer_history)
+) -> Dict[str, Any]:
+    """
+    Aggregate viewer statistics over the streams of the user's channels.
+
+    ``peak_viewers`` is the highest sample, ``average_viewers`` is
+    time-weighted over the observed stream time and ``watch_time_hours``
+    counts viewer-hours. ``covered_channels`` is the number of channels
+    included; the others are listed in ``unavailable_channels``.
+    """
+    channels = scheduler.user_channels(user["sub"])
+    peers = await _peer_history(history, scheduler, channels)
+    local: Set[ChannelKey] = set()
+    remote: Set[ChannelKey] = set()
+    unavailable = []
+    for channel in channels:
+        source = _source(scheduler, peers, channel.key)
+        if source == "memory":
+            local.add(channel.key)
+        elif source == "database":
+            remote.add(channel.key)
+        else:
+            unavailable.append(channel.id)
+    parts = [(history, history.slots_for(local))]
+    if peers is not None:
+        parts.append((peers, peers.slots_for(remote)))
+    return {
+        "success": True,
+        "data": {
+            "total_channels": len(channels),
+            "covered_channels": len(channels) - len(unavailable),
+            "unavailable_channels": unavailable,
+            **combined_aggregate(parts),
+            "retention_hours": history.retention / 3600,
+        }
+    }
+
+
+@router.get("/stats/channels")
+async def channel_stats(
+    platform: Optional[str] = Query(None, description="Only channels of this platform"),
+    resolution: Optional[Literal["1m", "10m", "1h"]] = Query(
+        None, description="Include a viewer time series at this resolution"
+    ),
+    user: Dict[str, Any] = Depends(get_current_user_async),
+    scheduler: StreamRefreshScheduler = Depends(get_stream_scheduler),
+    history: ViewerHistory = Depends(get_viewer_history)
+) -> Dict[str, Any]:
+    """
+    Per-channel viewer statistics of the user's channels.
+
+    With ``resolution`` every channel carries ``series``: its summed viewers
+    per point as ``[unix time, viewers]`` pairs, oldest first. ``source``
+    tells where a channel's figures come from: ``memory``, ``database``
+    (recorded by another worker) or ``unavailable`` (no figures).
+    """
+    channels = [
+        c for c in scheduler.user_channels(user["sub"])
+        if platform is None or c.key.platform == platform
+    ]
+    peers = await _peer_history(history, scheduler, channels)
+    items = []
+    for channel in channels:
+        source = _source(scheduler, peers, channel.key)
+        holder = history if source == "memory" else peers
+        slots = holder.slots_for([channel.key]) if holder is not None else []
+        item = {
+            "channel_id": channel.id,
+            "platform": channel.key.platform,
+            "platform_channel_id": channel.key.channel_id,
+            "source": source,
+            **combined_aggregate([(holder, slots)] if holder is not None else []),
+        }
+        if resolution is not None:
+            points = holder.series(slots, RESOLUTIONS[resolution]) if holder is not None else []
+            item["series"] = [list(point) for point in points]
+        items.append(item)
+    items.sort(key=lambda item: (-item["watch_time_hours"], item["channel_id"]))
+    return {
+        "success": True,
+        "data": {
+            "channels": items,
+            "retention_hours": history.retention / 3600,
+        }
+    }
@@ -0,0 +1,395 @@
+"""Stream endpoints."""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+
+from app.core.auth import get_current_user_async
+from app.core.config import get_settings
+from app.core.exceptions import NotFoundException, ServiceUnavailableException, ValidationException
+from app.core.pagination import encode_page_cursor, keyset_page, page_info
+from app.core.postgres import get_postgres_pool
+from app.core.singleflight import SingleFlight
+from app.core.versioning import decode_cursor, encode_cursor, etag_matches, make_etag
+from app.models.channel import ChannelSubscription
+from app.models.stream import PlatformStream, RefreshError, RefreshStreamsRequest
+from app.services.postgres_service import search_user_stream_payloads
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.stream_cache import SORT_KEYS, format_duration, get_stream_cache, load_versioned_stream_list
+from app.services.stream_repository import search_user_streams
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def get_stream_scheduler(request: Request) -> StreamRefreshScheduler:
+    """
+    FastAPI dependency returning the running refresh scheduler.
+
+    Raises:
+        ServiceUnavailableException: If the scheduler is not running
+    """
+    scheduler = getattr(request.app.state, "stream_scheduler", None)
+    if scheduler is None:
+        raise ServiceUnavailableException("Stream refresh is not available")
+    return scheduler
+
+
+def _iso(timestamp: float) -> Optional[str]:
+    if not timestamp:
+        return None
+    return datetime.utcfromtimestamp(timestamp).isoformat() + "Z"
+
+
+def stream_payload(subscription: ChannelSubscription, stream: PlatformStream) -> Dict[str, Any]:
+    """Serialize a platform stream for the user's channel row."""
+    payload = stream.model_dump(mode="json")
+    payload["channel_id"] = subscription.id
+    return payload
+
+
+async def _resolve_channels(
+    scheduler: StreamRefreshScheduler,
+    user_id: str,
+    channel_ids: Optional[List[str]]
+) -> List[ChannelSubscription]:
+    """Return the user's channel rows, reloading once if some are unknown."""
+    channels = scheduler.user_channels(user_id)
+    known = {c.id for c in channels}
+    if not channels or (channel_ids and not known.issuperset(channel_ids)):
+        # Channel added since the last reload
+        await scheduler.reload_channels(force=True)
+        channels = scheduler.user_channels(user_id)
+        known = {c.id for c in channels}
+
+    if channel_ids:
+        missing = [cid for cid in channel_ids if cid not in known]
+        if missing:
+            raise NotFoundException("Channel not found", details={"channel_ids": missing})
+        wanted = set(channel_ids)
+        channels = [c for c in channels if c.id in wanted]
+    return channels
+
+
+@router.get("/streams")
+async def list_streams(
+    response: Response,
+    platform: Literal["all", "youtube", "twitch"] = "all",
+    category: Optional[str] = Query(None, max_length=255),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    sort: Literal["viewers", "recent"] = "viewers",
+    cursor: Optional[str] = Query(None, max_length=512, description="pagination.nextCursor of the previous page"),
+    since: Optional[str] = Query(None, max_length=128, description="Cursor from meta.cursor: return only changes"),
+    if_none_match: Optional[str] = Header(None),
+    user: Dict[str, Any] = Depends(get_current_user_async)
+) -> Any:
+    """
+    List live streams of the user's channels.
+
+    Served from the per-user stream list cache: fresh lists are returned as
+    is, stale ones are returned immediately while they are reloaded in the
+    background, and the last good list is returned if the database is
+    unavailable. ``Age`` and ``X-Cache`` headers (and ``data.cache``) report
+    how old the data is.
+
+    Pages are selected either by ``offset`` or, preferably, by ``cursor``
+    (keyset pagination on ``(viewerCount, id)`` or ``(startedAt, id)``),
+    which does not skip or repeat streams when a refresh reorders the list.
+
+    The ``ETag`` changes only when the list data changes (``duration`` and
+    ``data.cache`` are derived at response time and not versioned), so
+    ``If-None-Match`` polls of an unchanged list get ``304 Not Modified``.
+    With ``since`` set to a previous ``meta.cursor`` the response carries
+    only ``data.changes`` (upserted streams and removed ids, unpaginated);
+    if the cursor is too old or from another server the full list is
+    returned with ``meta.reset`` set.
+    """
+    if cursor and offset:
+        raise ValidationException("Use either cursor or offset, not both")
+    user_id = user["sub"]
+    key = (user_id, platform, category, sort)
+    lookup = await get_stream_cache().get(key, lambda: load_versioned_stream_list(key))
+    stream_list = lookup.value
+    etag = make_etag(stream_list.version, limit, offset, cursor, since)
+    headers = {"ETag": etag, "Age": str(int(lookup.age)), "X-Cache": lookup.status}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    now = datetime.now(timezone.utc)
+    cache = {
+        "status": lookup.status,
+        "age_seconds": round(lookup.age, 3),
+        "data_as_of": (now - timedelta(seconds=lookup.age)).isoformat().replace("+00:00", "Z"),
+    }
+    meta = {"version": stream_list.version, "cursor": encode_cursor(key, stream_list.version)}
+    if since is not None:
+        since_version = decode_cursor(since, key)
+        changes = stream_list.changes_since(since_version) if since_version is not None else None
+        if changes is not None:
+            upserted, removed = changes
+            return {
+                "success": True,
+                "data": {
+                    "changes": {
+                        "upserted": [{**item, "duration": format_duration(item["startedAt"], now)} for item in upserted],
+                        "removed": removed,
+                    },
+                    "total": len(stream_list),
+                    "cache": cache,
+                },
+                "meta": {**meta, "since": since_version},
+            }
+        meta["reset"] = True
+
+    items = stream_list.items
+    if cursor:
+        selected, next_cursor = keyset_page(items, sort, SORT_KEYS[sort], limit, cursor)
+        pagination = page_info(len(items), limit, next_cursor)
+    else:
+        selected = items[offset:offset + limit]
+        has_more = offset + limit < len(items)
+        pagination = {
+            "total": len(items),
+            "limit": limit,
+            "offset": offset,
+            "hasMore": has_more,
+            "nextCursor": encode_page_cursor(sort, SORT_KEYS[sort](selected[-1])) if has_more and selected else None,
+        }
+    page = [{**item, "duration": format_duration(item["startedAt"], now)} for item in selected]
+    return {
+        "success": True,
+        "data": {
+            "streams": page,
+            "pagination": pagination,
+            "cache": cache,
+        },
+        "meta": meta,
+    }
+
+
+def _search_row_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize a ``streams`` search row like :func:`stream_payload`."""
+    channel = row.get("channels") or {}
+    return {
+        "platform": (channel.get("platforms") or {}).get("name", ""),
+        "platform_channel_id": channel.get("channel_id"),
+        "platform_stream_id": row["platform_stream_id"],
+        "title": row["title"],
+        "description": row.get("description"),
+        "thumbnail_url": row.get("thumbnail_url"),
+        "viewer_count": row.get("viewer_count") or 0,
+        "game_name": row.get("game_name"),
+        "tags": row.get("tags"),
+        "started_at": row["started_at"],
+        "is_live": row.get("is_live", True),
+        "channel_id": channel.get("id"),
+    }
+
+
+async def _search_via_postgrest(
+    user_id: str,
+    query: str,
+    platform: Optional[str],
+    platform_id: Optional[str],
+    game_name: Optional[str],
+    tags: Optional[List[str]],
+    min_viewers: Optional[int],
+    max_viewers: Optional[int],
+    is_live: bool,
+    started_after: Optional[datetime],
+    started_before: Optional[datetime],
+    limit: int,
+    offset: int
+) -> Tuple[List[Dict[str, Any]], int]:
+    try:
+        rows, total = await search_user_streams(
+            user_id, query or None, platform, platform_id, game_name, tags,
+            min_viewers, max_viewers, is_live,
+            started_after.isoformat() if started_after else None,
+            started_before.isoformat() if started_before else None,
+            limit, offset,
+        )
+    except Exception as e:
+        raise ServiceUnavailableException("Stream search is temporarily unavailable") from e
+    return [_search_row_payload(row) for row in rows], total
+
+
+@router.get("/streams/search")
+async def search_streams(
+    request: Request,
+    query: str = Query("", max_length=200),
+    platform: Optional[Literal["youtube", "twitch"]] = None,
+    platform_id: Optional[str] = Query(None, max_length=64),
+    game_name: Optional[str] = Query(None, max_length=255),
+    tags: Optional[List[str]] = Query(None),
+    min_viewers: Optional[int] = Query(None, ge=0),
+    max_viewers: Optional[int] = Query(None, ge=0),
+    is_live: bool = True,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    user: Dict[str, Any] = Depends(get_current_user_async)
+) -> Dict[str, Any]:
+    """
+    Search streams of the user's channels by title, game name and tags.
+
+    Live searches are answered from the in-memory index of the live set.
+    Non-live or time-bounded searches, ``platform_id`` filters, searches
+    issued before the index has seen all of the user's channels, and (with
+    several workers) searches over channels another worker refreshes use
+    Postgres full-text search instead (``search_meta.source`` tells which).
+    """
+    started = time.perf_counter()
+    user_id = user["sub"]
+    scheduler = getattr(request.app.state, "stream_scheduler", None)
+    index = getattr(request.app.state, "stream_search", None)
+    subscriptions = {c.key: c for c in scheduler.user_channels(user_id)} if scheduler is not None else {}
+    use_index = (
+        index is not None and subscriptions and is_live
+        and platform_id is None and started_after is None and started_before is None
+        and all(scheduler.is_owned(key) for key in subscriptions)
+        and index.covers(subscriptions)
+    )
+    if use_index:
+        matches = index.search(
+            query, keys=set(subscriptions), platform=platform, game_name=game_name, tags=tags,
+            min_viewers=min_viewers, max_viewers=max_viewers,
+        )
+        total = len(matches)
+        streams = [stream_payload(subscriptions[key], stream) for key, stream in matches[offset:offset + limit]]
+    else:
+        streams = None
+        pool = get_postgres_pool()
+        if pool is not None and pool.available:
+            try:
+                streams, total = await search_user_stream_payloads(
+                    pool, user_id, query or None, platform, platform_id, game_name, tags,
+                    min_viewers, max_viewers, is_live, started_after, started_before, limit, offset,
+                )
+            except Exception:
+                logger.warning("Postgres stream search failed; falling back to PostgREST", exc_info=True)
+        if streams is None:
+            streams, total = await _search_via_postgrest(
+                user_id, query, platform, platform_id, game_name, tags, min_viewers, max_viewers,
+                is_live, started_after, started_before, limit, offset,
+            )
+
+    return {
+        "success": True,
+        "data": {
+            "streams": streams,
+            "meta": {
+                "total_count": total,
+                "page": offset // limit + 1,
+                "per_page": limit,
+                "has_next": offset + limit < total,
+                "has_prev": offset > 0,
+            },
+            "search_meta": {
+                "query": query,
+                "total_matches": total,
+                "search_time_ms": round((time.perf_counter() - started) * 1000, 3),
+                "source": "index" if use_index else "database",
+            },
+        }
+    }
+
+
+# Concurrent refreshes of the same scope (user + channel selection) share one run
+_refresh_flight: SingleFlight[Tuple[Any, ...], Dict[str, Any]] = SingleFlight()
+
+
+@router.post("/streams/refresh")
+async def refresh_streams(
+    body: Optional[RefreshStreamsRequest] = None,
+    user: Dict[str, Any] = Depends(get_current_user_async),
+    scheduler: StreamRefreshScheduler = Depends(get_stream_scheduler)
+) -> Dict[str, Any]:
+    """
+    Return the latest stream snapshot for the user's channels.
+
+    Upstream APIs are only called when the shared snapshot of a channel is
+    older than STREAM_REFRESH_MAX_AGE_SECONDS (or STREAM_REFRESH_MIN_INTERVAL_SECONDS
+    with ``force_refresh``); otherwise the background scheduler's data is served.
+    Concurrent requests for the same scope (e.g. several tabs of one user)
+    join a single in-flight refresh and receive the same response.
+    The response is sent within STREAM_REFRESH_DEADLINE_SECONDS: channels
+    whose platform has not answered by then (or whose platform circuit is
+    open) keep their cached streams and are listed in ``errors``.
+    Explicitly listed ``channel_ids`` also return to frequent background
+    polling if the adaptive cadence had backed them off. Without
+    ``channel_ids`` or ``force_refresh``, channels the cadence backed off
+    are only fetched once their next background check is due.
+    """
+    body = body or RefreshStreamsRequest()
+    scope = (
+        user["sub"],
+        tuple(sorted(set(body.channel_ids))) if body.channel_ids else None,
+        body.force_refresh,
+    )
+    return await _refresh_flight.do(scope, lambda: _refresh(scheduler, user["sub"], body))
+
+
+async def _refresh(
+    scheduler: StreamRefreshScheduler,
+    user_id: str,
+    body: RefreshStreamsRequest
+) -> Dict[str, Any]:
+    started = scheduler.now()
+    deadline = time.monotonic() + get_settings().STREAM_REFRESH_DEADLINE_SECONDS
+    channels = await _resolve_channels(scheduler, user_id, body.channel_ids)
+
+    settings = get_settings()
+    max_age = (
+        settings.STREAM_REFRESH_MIN_INTERVAL_SECONDS if body.force_refresh
+        else settings.STREAM_REFRESH_MAX_AGE_SECONDS
+    )
+    keys = {c.key for c in channels}
+    if body.channel_ids:
+        # Explicitly requested channels go back to frequent polling
+        scheduler.reset_schedule(keys)
+    snapshots = await scheduler.refresh(
+        keys,
+        max_age=max_age,
+        timeout=max(0.0, deadline - time.monotonic()),
+        # A periodic "all my channels" refresh must not undo the back-off
+        follow_cadence=not body.channel_ids and not body.force_refresh,
+    )
+
+    streams: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    updated = 0
+    oldest = None
+    for channel in channels:
+        snapshot = snapshots[channel.key]
+        if snapshot.error_code:
+            errors.append(RefreshError(
+                channel_id=channel.id,
+                platform=channel.key.platform,
+                error_code=snapshot.error_code,
+                error_message=snapshot.error_message or "",
+            ).model_dump())
+        if snapshot.fetched_at >= started:
+            updated += len(snapshot.streams)
+        if snapshot.fetched_at and (oldest is None or snapshot.fetched_at < oldest):
+            oldest = snapshot.fetched_at
+        streams.extend(stream_payload(channel, s) for s in snapshot.streams)
+
+    return {
+        "success": True,
+        "data": {
+            "refreshed_at": datetime.utcnow().isoformat() + "Z",
+            "data_as_of": _iso(oldest or 0),
+            "total_channels_checked": len(channels),
+            "total_streams_found": len(streams),
+            "total_streams_updated": updated,
+            "errors": errors,
+            "streams": streams,
+        }
+    }
@@ -0,0 +1,242 @@
+"""Base class for platform stream services."""
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.exceptions import CircuitOpenException, ExternalAPIException, PlatformRateLimitException
+from app.core.metrics import PLATFORM_REQUEST_DURATION
+from app.models.stream import PlatformStream
+from app.services.resilience import CLOSED, CircuitBreaker, LatencyTracker
+
+
+class StreamPlatformService(ABC):
+    """
+    Abstract client for one streaming platform.
+    
+    Implementations fetch the live streams of many channels in as few
+    upstream calls as the platform allows.
+    """
+    
+    #: Platform name as stored in ``platforms.name`` ('youtube', 'twitch', ...)
+    platform: str = ""
+    #: Channels per ``fetch_live_streams`` call made by the scheduler (None:
+    #: all at once, e.g. when the service plans a quota over the whole set);
+    #: each chunk's results are usable as soon as it finishes
+    fetch_chunk_size: Optional[int] = None
+    
+    @abstractmethod
+    async def fetch_live_streams(
+        self,
+        channel_ids: Sequence[str]
+    ) -> Dict[str, List[PlatformStream]]:
+        """
+        Fetch current live streams for platform channel ids.
+        
+        Args:
+            channel_ids: Platform-specific channel identifiers
+            
+        Returns:
+            Mapping of channel id to its live streams; channels that are not
+            live map to an empty list
+            
+        Raises:
+            ExternalAPIException: If the platform API call fails
+        """
+    
+    async def health_check(self) -> None:
+        """
+        Make the cheapest authenticated call the platform offers.
+        
+        Raises:
+            ExternalAPIException: If the platform API is unreachable or
+                                  rejects the credentials
+        """
+    
+    async def aclose(self) -> None:
+        """Release network resources held by the service."""
+
+
+class HttpPlatformService(StreamPlatformService):
+    """
+    Platform service talking JSON over a keep-alive httpx client.
+    
+    With a ``breaker`` calls fail fast while the platform's circuit is open.
+    With ``hedge`` enabled, calls made with ``hedge=True`` (idempotent batch
+    lookups) send a duplicate request once the first has been outstanding for
+    the ``hedge_percentile`` latency of that operation, and use whichever
+    answers first.
+    """
+    
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 20.0,
+        max_connections: int = 16,
+        http_client: Optional[httpx.AsyncClient] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20
+    ):
+        """
+        Initialize service.
+        
+        Args:
+            base_url: Platform API base URL
+            timeout: Per-request timeout in seconds (NFR-004: at most 20s)
+            max_connections: Connection pool size (doubled with hedging)
+            http_client: Optional preconfigured client (tests/benchmarks)
+            breaker: Circuit breaker of the platform (none: never break)
+            hedge: Hedge slow batch calls
+            hedge_percentile: Latency percentile after which a call is hedged
+            hedge_min_samples: Calls of an operation observed before hedging it
+        """
+        self.base_url = base_url.rstrip("/")
+        if hedge:
+            # Room for the duplicate of every batch call in flight
+            max_connections *= 2
+        self.http = http_client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self._latency: Dict[str, LatencyTracker] = defaultdict(lambda: LatencyTracker(min_samples=hedge_min_samples))
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+    
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        hedge: bool = False,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Send a request and return the decoded JSON body.
+        
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            hedge: The call is idempotent and may be duplicated when slow
+            **kwargs: Passed to ``httpx.AsyncClient.request``
+        
+        Raises:
+            CircuitOpenException: If the platform's circuit is open (no call is made)
+            PlatformRateLimitException: On 429 or quota errors
+            ExternalAPIException: On any other transport or HTTP error
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenException(
+                f"{self.platform} API calls suspended after repeated failures; serving cached data",
+                platform=self.platform,
+                retry_after=math.ceil(self.breaker.retry_after),
+            )
+        if hedge and self.hedge and (self.breaker is None or self.breaker.state == CLOSED):
+            delay = self._latency[_operation(url)].percentile(self.hedge_percentile)
+            if delay is not None:
+                return await self._hedged(delay, method, url, **kwargs)
+        return await self._send(method, url, **kwargs)
+    
+    async def _hedged(self, delay: float, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        """Send a request, and a duplicate if no answer came within ``delay`` seconds."""
+        first = asyncio.ensure_future(self._send(method, url, **kwargs))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                self.hedged_requests += 1
+                attempts.append(asyncio.ensure_future(self._send(method, url, **kwargs)))
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not first:
+                            self.hedge_wins += 1
+                        return attempt.result()
+                    error = error or attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+    
+    async def _send(self, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        """One request attempt; reports its outcome to the breaker and latency tracker."""
+        outcome = "ok"
+        operation = _operation(url)
+        retry_after: Optional[int] = None
+        started = time.perf_counter()
+        try:
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                raise ExternalAPIException(f"{self.platform} API timed out", platform=self.platform)
+            except httpx.HTTPError as e:
+                outcome = "transport_error"
+                raise ExternalAPIException(f"{self.platform} API request failed: {e}", platform=self.platform)
+            except asyncio.CancelledError:
+                # Hedged call that lost, or a cancelled caller
+                outcome = "cancelled"
+                raise
+
+            if response.status_code == 429 or self._is_quota_error(response):
+                outcome = "rate_limited"
+                header = response.headers.get("Retry-After")
+                retry_after = int(header) if header and header.isdigit() else None
+                raise PlatformRateLimitException(
+                    f"{self.platform} API rate limit exceeded",
+                    platform=self.platform,
+                    retry_after=retry_after,
+                )
+            if response.status_code >= 400:
+                outcome = f"http_{response.status_code}"
+                raise ExternalAPIException(
+                    f"{self.platform} API returned {response.status_code}",
+                    platform=self.platform,
+                    details={"status_code": response.status_code},
+                )
+            return response.json()
+        finally:
+            elapsed = time.perf_counter() - started
+            PLATFORM_REQUEST_DURATION.labels(self.platform, operation, outcome).observe(elapsed)
+            if outcome == "ok":
+                self._latency[operation].observe(elapsed)
+            if self.breaker is not None:
+                if outcome == "cancelled":
+                    self.breaker.abandon()
+                elif outcome in ("timeout", "transport_error", "rate_limited") or outcome.startswith("http_5"):
+                    self.breaker.record_failure(retry_after)
+                else:
+                    # Other 4xx answers come from a working API
+                    self.breaker.record_success()
+    
+    def _is_quota_error(self, response: httpx.Response) -> bool:
+        """Whether a non-429 response signals an exhausted quota."""
+        return False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Circuit state and hedging counters."""
+        return {
+            "circuit": self.breaker.stats() if self.breaker is not None else None,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+        }
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client."""
+        await self.http.aclose()
+
+
+def _operation(url: str) -> str:
+    """Metrics and latency label of a request: the last URL path segment."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
@@ -0,0 +1,135 @@
+"""Batched multi-id fetch planner for platform APIs.
+
+Platform APIs accept many ids per call (Twitch ``GET /streams``: 100
+``user_id``s, YouTube ``videos.list``/``channels.list``: 50 ids). The planner
+collects every pending lookup from all concurrent callers, de-duplicates ids,
+chunks them to the platform's batch limit, runs the chunks concurrently under
+a limit and hands each caller exactly the results for the ids it asked for.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Sequence, Set, TypeVar
+
+R = TypeVar("R")
+T = TypeVar("T")
+
+BatchFetcher = Callable[[List[str]], Awaitable[Dict[str, R]]]
+
+
+class PartialBatchError(Exception):
+    """Some ids could not be fetched; ``results`` holds the ones that could."""
+
+    def __init__(self, results: Dict[str, Any], errors: Dict[str, BaseException]):
+        self.results = results
+        self.errors = errors
+        super().__init__(f"{len(errors)} of {len(results) + len(errors)} ids failed")
+
+
+def chunked(ids: Sequence[T], size: int) -> List[List[T]]:
+    """Split ids into lists of at most ``size`` items."""
+    return [list(ids[i:i + size]) for i in range(0, len(ids), size)]
+
+
+class BatchPlanner(Generic[R]):
+    """Coalesces concurrent id lookups into platform-sized batch calls."""
+
+    def __init__(
+        self,
+        fetch_batch: BatchFetcher,
+        batch_size: int,
+        max_concurrency: int = 4,
+        default: Optional[Callable[[], R]] = None,
+        linger: float = 0.0
+    ):
+        """
+        Initialize planner.
+
+        Args:
+            fetch_batch: Coroutine fetching up to ``batch_size`` ids in one call;
+                         ids absent from its result resolve to ``default()``
+            batch_size: Platform limit of ids per call
+            max_concurrency: Maximum batch calls in flight at once
+            default: Factory for ids the platform returned nothing for
+            linger: Seconds to wait for more callers before flushing
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.default = default
+        self.linger = linger
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        # Chunk tasks in flight (the loop only keeps weak references)
+        self._chunks: Set[asyncio.Task] = set()
+        self.calls = 0
+
+    async def fetch(self, ids: Sequence[str]) -> Dict[str, R]:
+        """
+        Fetch results for ``ids``, batched with any concurrent callers.
+
+        Returns:
+            Result per id
+
+        Raises:
+            PartialBatchError: If some batches failed (successes are attached)
+        """
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+        for item in dict.fromkeys(ids):
+            future = self._pending.get(item)
+            if future is None:
+                future = loop.create_future()
+                self._pending[item] = future
+            futures[item] = future
+
+        if self._pending and self._flush_handle is None:
+            if self.linger > 0:
+                self._flush_handle = loop.call_later(self.linger, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+
+        # shield: one cancelled caller must not cancel futures others await
+        await asyncio.shield(asyncio.gather(*futures.values(), return_exceptions=True))
+
+        results: Dict[str, R] = {}
+        errors: Dict[str, BaseException] = {}
+        for item, future in futures.items():
+            if future.exception() is not None:
+                errors[item] = future.exception()
+            else:
+                results[item] = future.result()
+        if errors:
+            raise PartialBatchError(results, errors)
+        return results
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for chunk in chunked(list(pending), self.batch_size):
+            task = asyncio.ensure_future(self._run_chunk(chunk, pending))
+            self._chunks.add(task)
+            task.add_done_callback(self._chunks.discard)
+
+    async def _run_chunk(self, chunk: List[str], futures: Dict[str, asyncio.Future]) -> None:
+        error: BaseException = asyncio.CancelledError()
+        try:
+            async with self._semaphore:
+                self.calls += 1
+                found = await self.fetch_batch(chunk)
+            for item in chunk:
+                if futures[item].done():
+                    continue
+                if item in found:
+                    futures[item].set_result(found[item])
+                else:
+                    futures[item].set_result(self.default() if self.default else None)
+        except Exception as e:
+            error = e
+        finally:
+            # Also on cancellation (shutdown, a timeout around fetch_batch):
+            # every caller waiting on this chunk must wake up
+            for item in chunk:
+                if not futures[item].done():
+                    futures[item].set_exception(error)
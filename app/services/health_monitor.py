@@ -0,0 +1,298 @@
+"""
+Background dependency health checks.
+
+Probes run on their own schedule (interval with jitter, per-probe timeout),
+never on the request path: ``/api/health`` and ``/api/health/ready`` only
+read the latest snapshot, so probe traffic to Supabase does not grow with
+the number of replicas times the Kubernetes probe frequency.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, NamedTuple, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.database import get_async_supabase_client
+from app.core.postgres import PostgresPool
+from app.services.base import StreamPlatformService
+
+logger = logging.getLogger(__name__)
+
+#: Raises if the dependency is unavailable
+Probe = Callable[[], Awaitable[None]]
+
+UP = "up"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+
+class HealthCheck(NamedTuple):
+    """One dependency probe and its schedule."""
+    name: str
+    probe: Probe
+    interval: float
+    timeout: float
+    critical: bool = False
+
+
+@dataclass
+class DependencyStatus:
+    """Latest probe result of one dependency."""
+    status: str = UNKNOWN
+    critical: bool = False
+    response_time_ms: Optional[int] = None
+    last_check_at: Optional[str] = None
+    error: Optional[str] = None
+    consecutive_successes: int = 0
+    consecutive_failures: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API representation."""
+        payload: Dict[str, Any] = {
+            "status": self.status,
+            "critical": self.critical,
+            "response_time_ms": self.response_time_ms,
+            "last_check_at": self.last_check_at,
+        }
+        if self.error:
+            payload["error"] = self.error
+        return payload
+
+
+def _timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class HealthMonitor:
+    """
+    Keeps the latest status of every dependency up to date.
+
+    A dependency's status is set by its first probe result and afterwards
+    changes only after ``fall`` consecutive failures (up -> down) or
+    ``rise`` consecutive successes (down -> up), so a single slow or failed
+    probe does not take the pod out of the load balancer and a single
+    success does not put a flapping dependency back. The service is ready
+    while every critical dependency is up.
+    """
+
+    def __init__(
+        self,
+        checks: List[HealthCheck],
+        rise: int = 2,
+        fall: int = 3,
+        jitter: float = 0.1,
+        clock: Callable[[], float] = time.time,
+        rng: Optional[random.Random] = None,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """
+        Initialize monitor.
+
+        Args:
+            checks: Dependency probes (names must be unique)
+            rise: Consecutive successes that turn a down dependency up
+            fall: Consecutive failures that turn an up dependency down
+            jitter: Relative random spread of every probe interval
+            clock: Wall clock for ``last_check_at``
+            rng: Random source for jitter
+            on_close: Releases resources held by the probes, awaited by stop()
+        """
+        self.checks = {check.name: check for check in checks}
+        self.rise = max(1, rise)
+        self.fall = max(1, fall)
+        self.jitter = jitter
+        self._clock = clock
+        self._random = rng or random.Random()
+        self._on_close = on_close
+        self._statuses = {check.name: DependencyStatus(critical=check.critical) for check in checks}
+        self._tasks: List[asyncio.Task] = []
+        self._snapshot: Dict[str, Any] = {}
+        self._rebuild_snapshot()
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    async def check(self, name: str) -> DependencyStatus:
+        """
+        Probe one dependency now and record the result.
+
+        Args:
+            name: Check name
+
+        Returns:
+            The dependency's status after this probe
+        """
+        check = self.checks[name]
+        error = None
+        started = time.perf_counter()
+        try:
+            # Unlike wait_for() on 3.11, timeout() never swallows a stop() cancellation
+            async with asyncio.timeout(check.timeout):
+                await check.probe()
+        except asyncio.TimeoutError:
+            error = f"timed out after {check.timeout:g}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self._record(name, error, time.perf_counter() - started)
+        return self._statuses[name]
+
+    async def check_all(self) -> None:
+        """Probe every dependency concurrently."""
+        await asyncio.gather(*(self.check(name) for name in self.checks))
+
+    def _record(self, name: str, error: Optional[str], elapsed: float) -> None:
+        state = self._statuses[name]
+        previous = state.status
+        if error is None:
+            state.consecutive_successes += 1
+            state.consecutive_failures = 0
+        else:
+            state.consecutive_failures += 1
+            state.consecutive_successes = 0
+        if state.status == UNKNOWN:
+            state.status = UP if error is None else DOWN
+        elif state.status == UP and state.consecutive_failures >= self.fall:
+            state.status = DOWN
+        elif state.status == DOWN and state.consecutive_successes >= self.rise:
+            state.status = UP
+        state.response_time_ms = round(elapsed * 1000)
+        state.last_check_at = _timestamp(self._clock())
+        state.error = error
+        if state.status != previous:
+            log = logger.warning if state.status == DOWN else logger.info
+            log("Dependency %s is %s%s", name, state.status, f": {error}" if error else "")
+        self._rebuild_snapshot()
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _rebuild_snapshot(self) -> None:
+        statuses = self._statuses.values()
+        critical = [s for s in statuses if s.critical]
+        ready = all(s.status == UP for s in critical)
+        if ready and all(s.status == UP for s in statuses):
+            overall = "healthy"
+        elif ready:
+            overall = "degraded"
+        else:
+            overall = "unhealthy"
+        self._snapshot = {
+            "status": overall,
+            "ready": ready,
+            "checks": {name: state.to_dict() for name, state in self._statuses.items()},
+        }
+
+    @property
+    def ready(self) -> bool:
+        """Whether every critical dependency is up."""
+        return self._snapshot["ready"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Latest health state, rebuilt only when a probe completes.
+
+        Returns:
+            ``status`` (healthy/degraded/unhealthy), ``ready`` and per
+            dependency ``checks``
+        """
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start one background probe loop per dependency."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run(check), name=f"health-check-{check.name}")
+                for check in self.checks.values()
+            ]
+
+    async def stop(self) -> None:
+        """Stop the probe loops and release probe resources."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._on_close is not None:
+            await self._on_close()
+
+    def _delay(self, interval: float) -> float:
+        return interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    async def _run(self, check: HealthCheck) -> None:
+        # Spread the first probes so replicas started together do not align
+        await asyncio.sleep(self._random.uniform(0, check.interval * self.jitter))
+        while True:
+            try:
+                await self.check(check.name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Health check %s failed", check.name)
+            await asyncio.sleep(self._delay(check.interval))
+
+
+def create_health_monitor(
+    services: Optional[Mapping[str, StreamPlatformService]] = None,
+    postgres: Optional[PostgresPool] = None
+) -> HealthMonitor:
+    """
+    Build the application monitor from settings.
+
+    Supabase (PostgREST) is critical; Supabase Auth is informational because
+    access tokens are verified locally, platform APIs because the scheduler
+    keeps serving cached streams while they are down, and the direct
+    Postgres pool because reads fall back to PostgREST.
+
+    Args:
+        services: Platform services keyed by platform name
+        postgres: Direct read pool, if enabled
+
+    Returns:
+        Monitor probing Supabase, Supabase Auth and every platform service
+    """
+    settings = get_settings()
+    http = httpx.AsyncClient(timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+
+    async def database() -> None:
+        client = await get_async_supabase_client()
+        await client.table("platforms").select("id").limit(1).execute()
+
+    async def supabase_auth() -> None:
+        response = await http.get(
+            f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/health",
+            headers={"apikey": settings.SUPABASE_ANON_KEY},
+        )
+        response.raise_for_status()
+
+    interval = settings.HEALTH_CHECK_INTERVAL_SECONDS
+    timeout = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    checks = [
+        HealthCheck("database", database, interval, timeout, critical=True),
+        HealthCheck("supabase_auth", supabase_auth, interval, timeout),
+    ]
+    if postgres is not None:
+        # A passing check also ends the pool's post-failure back-off
+        checks.append(HealthCheck("postgres", postgres.health_check, interval, timeout))
+    for platform, service in (services or {}).items():
+        checks.append(HealthCheck(
+            f"{platform}_api", service.health_check, settings.HEALTH_PLATFORM_CHECK_INTERVAL_SECONDS, timeout,
+        ))
+    return HealthMonitor(
+        checks,
+        rise=settings.HEALTH_CHECK_RISE,
+        fall=settings.HEALTH_CHECK_FALL,
+        on_close=http.aclose,
+    )
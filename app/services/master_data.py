@@ -0,0 +1,243 @@
+"""In-memory snapshot of the ``platforms`` and ``system_settings`` tables.
+
+Both tables are read-mostly master data. They are loaded into one immutable
+:class:`MasterDataSnapshot` at startup and reloaded every ``ttl`` seconds,
+or as soon as Supabase Realtime reports a change to either table. A reload
+builds a complete new snapshot and replaces the reference in one
+assignment, so readers never lock and never see a half-updated state.
+
+``GET /api/platforms`` and ``GET /api/config`` bodies and their ETags are
+computed once per snapshot. The ETags hash the body, so every worker
+serving the same data hands out the same ETag.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.core.blocking import run_blocking
+from app.core.config import Settings, get_settings
+from app.services.supabase_service import fetch_platforms, fetch_system_settings
+
+logger = logging.getLogger(__name__)
+
+MasterDataLoader = Callable[[], Awaitable[Tuple[List[Dict[str, Any]], Dict[str, str]]]]
+
+#: Tables whose changes trigger a reload
+WATCHED_TABLES = ("platforms", "system_settings")
+
+
+def _json_body(data: Dict[str, Any]) -> Tuple[bytes, str]:
+    body = json.dumps({"success": True, "data": data}, separators=(",", ":"), default=str).encode()
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def config_payload(platforms: Tuple[Mapping[str, Any], ...], settings: Settings) -> Dict[str, Any]:
+    """``GET /api/config`` data for the given platforms."""
+    return {
+        "app_name": settings.APP_NAME,
+        "app_version": settings.APP_VERSION,
+        "environment": "development" if settings.DEBUG else "production",
+        "supported_platforms": [p["name"] for p in platforms if p.get("is_active", True)],
+        "pagination": {"default_per_page": 20, "max_per_page": 100},
+        "refresh": {"default_interval_minutes": settings.STREAM_REFRESH_INTERVAL_SECONDS / 60},
+    }
+
+
+@dataclass(frozen=True)
+class MasterDataSnapshot:
+    """Immutable view of the master data tables and their API representations."""
+
+    platforms: Tuple[Mapping[str, Any], ...]
+    #: Setting key -> value (includes OAuth client secrets; never serialized)
+    system_settings: Mapping[str, str] = field(repr=False)
+    loaded_at: float
+    platforms_body: bytes = field(repr=False)
+    platforms_etag: str
+    config_body: bytes = field(repr=False)
+    config_etag: str
+
+    @classmethod
+    def build(
+        cls,
+        platform_rows: List[Dict[str, Any]],
+        system_settings: Dict[str, str],
+        settings: Settings,
+        loaded_at: float
+    ) -> "MasterDataSnapshot":
+        """
+        Freeze loaded rows and precompute the response bodies.
+
+        Args:
+            platform_rows: ``platforms`` rows
+            system_settings: ``system_settings`` key/value pairs
+            settings: Application settings (for ``/api/config``)
+            loaded_at: Wall-clock load time
+
+        Returns:
+            New snapshot
+        """
+        platforms = tuple(
+            MappingProxyType({**row, "required_scopes": tuple(row.get("required_scopes") or ())})
+            for row in sorted(platform_rows, key=lambda row: row["name"])
+        )
+        platforms_body, platforms_etag = _json_body({"platforms": [
+            {**p, "required_scopes": list(p["required_scopes"])} for p in platforms
+        ]})
+        config_body, config_etag = _json_body(config_payload(platforms, settings))
+        return cls(
+            platforms=platforms,
+            system_settings=MappingProxyType(dict(system_settings)),
+            loaded_at=loaded_at,
+            platforms_body=platforms_body,
+            platforms_etag=platforms_etag,
+            config_body=config_body,
+            config_etag=config_etag,
+        )
+
+    def platform(self, name: str) -> Optional[Mapping[str, Any]]:
+        """The ``platforms`` row named ``name``, if any."""
+        return next((p for p in self.platforms if p["name"] == name), None)
+
+
+class MasterDataStore:
+    """Holds the current snapshot and keeps it up to date."""
+
+    def __init__(
+        self,
+        loader: MasterDataLoader,
+        ttl: float = 300.0,
+        settings: Optional[Settings] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize store (nothing is loaded until :meth:`reload`).
+
+        Args:
+            loader: Coroutine returning (platform rows, system settings)
+            ttl: Seconds between reloads without change notifications
+            settings: Application settings
+            clock: Wall-clock time source (tests)
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.settings = settings or get_settings()
+        self._clock = clock
+        self._snapshot: Optional[MasterDataSnapshot] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._realtime = None
+        self.reloads = 0
+        self.failures = 0
+
+    @property
+    def snapshot(self) -> Optional[MasterDataSnapshot]:
+        """Current snapshot, or None before the first successful load."""
+        return self._snapshot
+
+    async def reload(self) -> MasterDataSnapshot:
+        """
+        Load both tables and swap in a new snapshot.
+
+        Returns:
+            The new snapshot
+
+        Raises:
+            Exception: If loading fails; the previous snapshot stays in place
+        """
+        try:
+            platform_rows, system_settings = await self.loader()
+        except Exception:
+            self.failures += 1
+            raise
+        snapshot = MasterDataSnapshot.build(platform_rows, system_settings, self.settings, self._clock())
+        self._snapshot = snapshot
+        self.reloads += 1
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Reload as soon as possible (e.g. after a change notification)."""
+        self._changed.set()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, realtime_url: Optional[str] = None, realtime_key: Optional[str] = None) -> None:
+        """
+        Start the reload loop and, optionally, change notifications.
+
+        Args:
+            realtime_url: Supabase project URL to subscribe to table changes
+            realtime_key: API key for the Realtime connection (service role)
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="master-data-reload")
+        if realtime_url and realtime_key and self._realtime is None:
+            self._realtime = asyncio.create_task(
+                self._subscribe(realtime_url, realtime_key), name="master-data-realtime"
+            )
+
+    async def stop(self) -> None:
+        """Stop the reload loop and close the Realtime connection."""
+        for task in (self._task, self._realtime):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._task, self._realtime) if t is not None), return_exceptions=True)
+        self._task = None
+        self._realtime = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(self.ttl):
+                    await self._changed.wait()
+            except TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Master data reload failed; keeping the previous snapshot")
+
+    async def _subscribe(self, url: str, key: str) -> None:
+        from realtime import AsyncRealtimeClient
+
+        client = AsyncRealtimeClient(f"{url.rstrip('/')}/realtime/v1", token=key)
+        try:
+            await client.connect()
+            channel = client.channel("master-data")
+            for table in WATCHED_TABLES:
+                channel.on_postgres_changes("*", schema="public", table=table, callback=lambda _: self.invalidate())
+            await channel.subscribe()
+            # The client's own tasks deliver notifications until stop() cancels us
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Master data change notifications unavailable; reloading every %gs", self.ttl)
+        finally:
+            await client.close()
+
+
+def create_master_data_store() -> MasterDataStore:
+    """
+    Build the application store from settings.
+
+    Returns:
+        Store loading both tables through the admin Supabase client
+    """
+    settings = get_settings()
+
+    async def load() -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        # Supabase SDKは同期クライアントのためスレッドで実行
+        return await asyncio.gather(run_blocking(fetch_platforms), run_blocking(fetch_system_settings))
+
+    return MasterDataStore(load, ttl=settings.MASTER_DATA_TTL_SECONDS, settings=settings)
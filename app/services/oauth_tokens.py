@@ -0,0 +1,421 @@
+"""Proactive OAuth token refresh for ``user_api_keys``.
+
+A background loop scans for user tokens that expire within a window and
+refreshes them ahead of time, in batches with bounded concurrency, so code
+acting on a user's behalf finds a valid access token instead of stopping
+to call the token endpoint. Valid tokens are kept in a bounded in-memory
+cache; :meth:`OAuthTokenManager.get_access_token` only reads the database
+on a cache miss.
+
+Two guards keep a token from being refreshed twice: within a process, one
+refresh per key runs at a time (single-flight); across workers, a refresh
+first takes a lease by compare-and-setting the row's ``updated_at``, and
+scans skip rows whose lease is younger than ``lease`` seconds. With
+coordination enabled only the elected leader scans at all.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import httpx
+
+from app.core.blocking import run_blocking
+from app.core.cache import TTLCache
+from app.core.config import Settings, get_settings
+from app.core.exceptions import ExternalAPIException
+from app.core.singleflight import SingleFlight
+from app.services.supabase_service import (
+    claim_api_key,
+    fetch_api_key,
+    fetch_expiring_api_keys,
+    fetch_system_settings,
+    update_api_key,
+)
+
+logger = logging.getLogger(__name__)
+
+#: (user_id, platform)
+TokenKey = Tuple[str, str]
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _epoch(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class RefreshedToken(NamedTuple):
+    """Token endpoint response of a refresh-token grant."""
+    access_token: str
+    refresh_token: str
+    expires_in: float
+
+
+class OAuthClient:
+    """Token endpoint of one platform's OAuth application."""
+
+    def __init__(
+        self,
+        platform: str,
+        token_url: str,
+        client_id: str,
+        client_secret: str,
+        timeout: float = 20.0,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Initialize client.
+
+        Args:
+            platform: Platform name as stored in ``platforms.name``
+            token_url: OAuth token endpoint
+            client_id: OAuth application client id
+            client_secret: OAuth application client secret
+            timeout: Per-request timeout in seconds
+            http_client: Optional preconfigured client (tests)
+        """
+        self.platform = platform
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.http = http_client or httpx.AsyncClient(timeout=timeout)
+
+    async def refresh(self, refresh_token: str) -> RefreshedToken:
+        """
+        Exchange a refresh token for a new access token.
+
+        Args:
+            refresh_token: The user's current refresh token
+
+        Returns:
+            New access token; the refresh token is kept unless the platform rotated it
+
+        Raises:
+            ExternalAPIException: On transport errors or error responses;
+                                  ``details["status_code"]`` is 400/401 when the
+                                  refresh token was revoked
+        """
+        try:
+            response = await self.http.post(self.token_url, data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            })
+        except httpx.HTTPError as e:
+            raise ExternalAPIException(f"{self.platform} token endpoint request failed: {e}", platform=self.platform)
+        if response.status_code >= 400:
+            raise ExternalAPIException(
+                f"{self.platform} token endpoint returned {response.status_code}",
+                platform=self.platform,
+                details={"status_code": response.status_code},
+            )
+        body = response.json()
+        return RefreshedToken(
+            access_token=body["access_token"],
+            refresh_token=body.get("refresh_token") or refresh_token,
+            expires_in=float(body.get("expires_in", 3600)),
+        )
+
+    async def aclose(self) -> None:
+        """Close the HTTP client."""
+        await self.http.aclose()
+
+
+class TokenStore:
+    """``user_api_keys`` access through a Supabase client."""
+
+    def __init__(self, client=None):
+        """
+        Initialize store.
+
+        Args:
+            client: Supabase client (defaults to the admin client)
+        """
+        self.client = client
+
+    async def expiring(self, expires_before: str, updated_before: str, platforms, limit: int):
+        """Rows to refresh, as :func:`~app.services.supabase_service.fetch_expiring_api_keys`."""
+        # Supabase SDKは同期クライアントのためスレッドで実行
+        return await run_blocking(
+            fetch_expiring_api_keys, expires_before, updated_before, list(platforms), limit, self.client
+        )
+
+    async def load(self, user_id: str, platform: str):
+        """A user's token row for one platform, or None."""
+        return await run_blocking(fetch_api_key, user_id, platform, self.client)
+
+    async def claim(self, key_id: str, seen_updated_at: str, claimed_at: str) -> bool:
+        """Take a row's refresh lease; False if another worker has it."""
+        return await run_blocking(claim_api_key, key_id, seen_updated_at, claimed_at, self.client)
+
+    async def save(self, key_id: str, fields: Dict[str, Any]) -> None:
+        """Update a token row."""
+        await run_blocking(update_api_key, key_id, fields, self.client)
+
+
+class OAuthTokenManager:
+    """Keeps users' OAuth access tokens valid ahead of use."""
+
+    def __init__(
+        self,
+        clients: Mapping[str, OAuthClient],
+        store: Optional[TokenStore] = None,
+        interval: float = 60.0,
+        refresh_window: float = 600.0,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        lease: float = 60.0,
+        cache_size: int = 10000,
+        expiry_margin: float = 60.0,
+        is_leader: Optional[Callable[[], bool]] = None,
+        clock=time.time
+    ):
+        """
+        Initialize manager.
+
+        Args:
+            clients: Platform name to OAuth client
+            store: Token rows (defaults to the admin Supabase client)
+            interval: Seconds between scans for expiring tokens
+            refresh_window: Tokens expiring within this many seconds are refreshed
+            batch_size: Rows loaded and refreshed per batch
+            max_concurrency: Concurrent token endpoint calls
+            lease: Seconds a claimed row is left to the worker that claimed it
+            cache_size: Maximum cached access tokens
+            expiry_margin: Cached tokens are dropped this many seconds before expiry
+            is_leader: Whether this worker runs the background scan (default:
+                       always); on-demand refreshes are not affected
+            clock: Wall-clock time source (tests)
+        """
+        self.clients = dict(clients)
+        self.store = store or TokenStore()
+        self.interval = interval
+        self.refresh_window = refresh_window
+        self.batch_size = batch_size
+        self.lease = lease
+        self.expiry_margin = expiry_margin
+        self.is_leader = is_leader
+        self._clock = clock
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # TTLs are relative, so the cache keeps its own monotonic clock
+        self._cache: TTLCache[TokenKey, str] = TTLCache(cache_size, default_ttl=0.0)
+        self._loads: SingleFlight[TokenKey, Optional[str]] = SingleFlight()
+        self._refreshes: SingleFlight[str, Optional[str]] = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+        self.revoked = 0
+        self.leases_lost = 0
+
+    async def get_access_token(self, user_id: str, platform: str) -> Optional[str]:
+        """
+        Return a valid access token for a user, refreshing it if necessary.
+
+        Args:
+            user_id: Owner of the token
+            platform: Platform name
+
+        Returns:
+            The access token, or None if the user has no usable token
+        """
+        key = (user_id, platform)
+        token = self._cache.get(key)
+        if token is not None:
+            return token
+        return await self._loads.do(key, lambda: self._load(user_id, platform))
+
+    async def refresh_expiring(self) -> int:
+        """
+        Refresh every token expiring within the window.
+
+        Returns:
+            Number of tokens refreshed by this call
+        """
+        refreshed = self.refreshed
+        while self.clients:
+            now = self._clock()
+            rows = await self.store.expiring(
+                _iso(now + self.refresh_window), _iso(now - self.lease), self.clients, self.batch_size,
+            )
+            failed = self.failed
+            await asyncio.gather(*(self._refresh_row(row) for row in rows))
+            # Every row of a batch leaves the scan (refreshed, failed, revoked or
+            # leased by another worker); stop early while the token endpoint is failing
+            if len(rows) < self.batch_size or self.failed - failed == len(rows):
+                break
+        return self.refreshed - refreshed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return refresh counters and cache usage."""
+        return {
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "revoked": self.revoked,
+            "leases_lost": self.leases_lost,
+            "cache": self._cache.stats(),
+        }
+
+    async def _load(self, user_id: str, platform: str) -> Optional[str]:
+        row = await self.store.load(user_id, platform)
+        if row is None or not row.get("is_active", True):
+            return None
+        expires_at = _epoch(row.get("token_expires_at"))
+        if expires_at - self.expiry_margin > self._clock():
+            self._remember(row, row["access_token"], expires_at)
+            return row["access_token"]
+        if not row.get("refresh_token"):
+            return None
+        return await self._refresh_row(row)
+
+    async def _refresh_row(self, row: Dict[str, Any]) -> Optional[str]:
+        return await self._refreshes.do(row["id"], lambda: self._refresh(row))
+
+    async def _refresh(self, row: Dict[str, Any]) -> Optional[str]:
+        platform = row["platforms"]["name"]
+        client = self.clients.get(platform)
+        if client is None:
+            return None
+        async with self._semaphore:
+            now = self._clock()
+            if not await self.store.claim(row["id"], row["updated_at"], _iso(now)):
+                # Another worker is refreshing it; the old token may still be usable
+                self.leases_lost += 1
+                expires_at = _epoch(row.get("token_expires_at"))
+                return row["access_token"] if expires_at > now else None
+            try:
+                token = await client.refresh(row["refresh_token"])
+            except ExternalAPIException as e:
+                if e.details.get("status_code") in (400, 401):
+                    # Revoked or invalid grant: the user has to reconnect the platform
+                    self.revoked += 1
+                    logger.warning("OAuth refresh token of key %s on %s was rejected", row["id"], platform)
+                    await self.store.save(row["id"], {"is_active": False, "updated_at": _iso(self._clock())})
+                else:
+                    # Retried by the first scan after the lease expires
+                    self.failed += 1
+                    logger.warning("OAuth token refresh of key %s on %s failed: %s", row["id"], platform, e.message)
+                return None
+            now = self._clock()
+            expires_at = now + token.expires_in
+            await self.store.save(row["id"], {
+                "access_token": token.access_token,
+                "refresh_token": token.refresh_token,
+                "token_expires_at": _iso(expires_at),
+                "updated_at": _iso(now),
+            })
+        self.refreshed += 1
+        self._remember(row, token.access_token, expires_at)
+        return token.access_token
+
+    def _remember(self, row: Dict[str, Any], access_token: str, expires_at: float) -> None:
+        ttl = expires_at - self.expiry_margin - self._clock()
+        self._cache.set((row["user_id"], row["platforms"]["name"]), access_token, ttl=ttl)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="oauth-token-refresh")
+
+    async def stop(self) -> None:
+        """Stop the background loop and close the OAuth clients."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for client in self.clients.values():
+            await client.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                if self.is_leader is None or self.is_leader():
+                    await self.refresh_expiring()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("OAuth token refresh scan failed")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def build_oauth_clients(
+    system_settings: Optional[Mapping[str, str]] = None,
+    settings: Optional[Settings] = None
+) -> Dict[str, OAuthClient]:
+    """
+    Create an OAuth client for every platform with application credentials.
+
+    Credentials come from the ``system_settings`` table; non-empty
+    environment settings take precedence.
+
+    Args:
+        system_settings: Preloaded system_settings (loaded from the DB if None)
+        settings: Application settings
+
+    Returns:
+        Platform name to OAuth client
+    """
+    settings = settings or get_settings()
+    if system_settings is None:
+        try:
+            system_settings = fetch_system_settings()
+        except Exception:
+            logger.exception("Could not load system_settings; using environment credentials only")
+            system_settings = {}
+
+    clients: Dict[str, OAuthClient] = {}
+    for platform, token_url, client_id, client_secret in (
+        ("youtube", settings.YOUTUBE_TOKEN_URL, settings.YOUTUBE_CLIENT_ID, settings.YOUTUBE_CLIENT_SECRET),
+        ("twitch", settings.TWITCH_TOKEN_URL, settings.TWITCH_CLIENT_ID, settings.TWITCH_CLIENT_SECRET),
+    ):
+        client_id = client_id or system_settings.get(f"{platform}_client_id", "")
+        client_secret = client_secret or system_settings.get(f"{platform}_client_secret", "")
+        if client_id and client_secret:
+            clients[platform] = OAuthClient(
+                platform, token_url, client_id, client_secret, timeout=settings.PLATFORM_HTTP_TIMEOUT_SECONDS,
+            )
+    return clients
+
+
+def create_token_manager(
+    clients: Optional[Mapping[str, OAuthClient]] = None,
+    system_settings: Optional[Mapping[str, str]] = None,
+    is_leader: Optional[Callable[[], bool]] = None
+) -> OAuthTokenManager:
+    """
+    Build the application token manager from settings.
+
+    Args:
+        clients: OAuth clients (built from settings and system_settings if None)
+        system_settings: Preloaded system_settings (loaded from the DB if None)
+        is_leader: Leadership check gating the background scan
+
+    Returns:
+        Manager storing tokens through the admin Supabase client
+    """
+    settings = get_settings()
+    return OAuthTokenManager(
+        clients=build_oauth_clients(system_settings) if clients is None else clients,
+        interval=settings.OAUTH_TOKEN_REFRESH_INTERVAL_SECONDS,
+        refresh_window=settings.OAUTH_TOKEN_REFRESH_WINDOW_SECONDS,
+        batch_size=settings.OAUTH_TOKEN_REFRESH_BATCH_SIZE,
+        max_concurrency=settings.OAUTH_TOKEN_REFRESH_CONCURRENCY,
+        lease=settings.OAUTH_TOKEN_REFRESH_LEASE_SECONDS,
+        cache_size=settings.OAUTH_TOKEN_CACHE_SIZE,
+        is_leader=is_leader,
+    )
@@ -0,0 +1,91 @@
+"""Construction of the configured platform services."""
+
+import logging
+from typing import Dict, Mapping, Optional
+
+from app.core.config import Settings, get_settings
+from app.services.base import StreamPlatformService
+from app.services.resilience import CircuitBreaker
+from app.services.supabase_service import fetch_system_settings
+from app.services.twitch_service import TwitchService
+from app.services.youtube_quota import YouTubeQuota
+from app.services.youtube_service import YouTubeService
+
+logger = logging.getLogger(__name__)
+
+
+def circuit_breaker(platform: str, settings: Settings) -> Optional[CircuitBreaker]:
+    """Circuit breaker of a platform's API calls, or None if disabled."""
+    if not settings.PLATFORM_CIRCUIT_BREAKER_ENABLED:
+        return None
+    return CircuitBreaker(
+        platform,
+        failure_threshold=settings.PLATFORM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.PLATFORM_CIRCUIT_RESET_SECONDS,
+        max_reset_timeout=settings.PLATFORM_CIRCUIT_MAX_RESET_SECONDS,
+    )
+
+
+def build_platform_services(
+    system_settings: Optional[Mapping[str, str]] = None,
+    settings: Optional[Settings] = None
+) -> Dict[str, StreamPlatformService]:
+    """
+    Create a service for every platform that has credentials.
+    
+    Credentials come from the ``system_settings`` table; non-empty
+    environment settings take precedence.
+    
+    Args:
+        system_settings: Preloaded system_settings (loaded from the DB if None)
+        settings: Application settings
+        
+    Returns:
+        Platform name to service
+    """
+    settings = settings or get_settings()
+    if system_settings is None:
+        try:
+            system_settings = fetch_system_settings()
+        except Exception:
+            logger.exception("Could not load system_settings; using environment credentials only")
+            system_settings = {}
+
+    def credential(env_value: str, key: str) -> str:
+        return env_value or system_settings.get(key, "")
+
+    services: Dict[str, StreamPlatformService] = {}
+
+    youtube_key = credential(settings.YOUTUBE_API_KEY, "youtube_api_key")
+    if youtube_key:
+        services["youtube"] = YouTubeService(
+            api_key=youtube_key,
+            base_url=settings.YOUTUBE_API_BASE_URL,
+            max_concurrency=settings.PLATFORM_MAX_CONCURRENCY,
+            timeout=settings.PLATFORM_HTTP_TIMEOUT_SECONDS,
+            quota=YouTubeQuota(
+                daily_limit=settings.YOUTUBE_DAILY_QUOTA_UNITS,
+                burst_fraction=settings.YOUTUBE_QUOTA_BURST_FRACTION,
+            ),
+            breaker=circuit_breaker("youtube", settings),
+            hedge=settings.PLATFORM_HEDGE_ENABLED,
+        )
+
+    twitch_id = credential(settings.TWITCH_CLIENT_ID, "twitch_client_id")
+    twitch_secret = credential(settings.TWITCH_CLIENT_SECRET, "twitch_client_secret")
+    if twitch_id and twitch_secret:
+        services["twitch"] = TwitchService(
+            client_id=twitch_id,
+            client_secret=twitch_secret,
+            base_url=settings.TWITCH_API_BASE_URL,
+            token_url=settings.TWITCH_TOKEN_URL,
+            max_concurrency=settings.PLATFORM_MAX_CONCURRENCY,
+            timeout=settings.PLATFORM_HTTP_TIMEOUT_SECONDS,
+            breaker=circuit_breaker("twitch", settings),
+            hedge=settings.PLATFORM_HEDGE_ENABLED,
+        )
+
+    missing = {"youtube", "twitch"} - set(services)
+    if missing:
+        logger.warning("No credentials for platforms: %s", ", ".join(sorted(missing)))
+    return services
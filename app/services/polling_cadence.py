@@ -0,0 +1,265 @@
+"""Adaptive per-channel polling cadence.
+
+Most tracked channels are offline most of the time, and many stream on a
+weekly routine. Instead of checking every channel once per refresh
+interval, the scheduler asks :class:`PollingCadence` which channels are
+due:
+
+* live channels, and channels inside a start window they were seen going
+  live in before, are checked every ``interval``;
+* other channels back off exponentially with every offline check, up to
+  ``max_interval``, but are never scheduled past the opening of their next
+  start window;
+* an on-demand refresh of a channel resets its back-off.
+
+Start windows are hour-of-week slots (UTC) in which a channel went live in
+at least ``min_weeks`` distinct weeks, learned from ``streams.started_at``
+and from go-live events the scheduler observes. A window opens ``lead``
+seconds before its slot so streams starting on the hour are caught early.
+"""
+
+import heapq
+import math
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.channel import ChannelKey
+
+HOUR = 3600
+WEEK = 7 * 24 * HOUR
+#: The Unix epoch is a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_OFFSET = 3 * 24 * HOUR
+
+
+def hour_of_week(timestamp: float) -> int:
+    """Hour-of-week slot of a Unix timestamp (0 = Monday 00:00 UTC)."""
+    return int(((timestamp + _WEEK_OFFSET) % WEEK) // HOUR)
+
+
+def week_index(timestamp: float) -> int:
+    """Monday-based week number of a Unix timestamp."""
+    return int((timestamp + _WEEK_OFFSET) // WEEK)
+
+
+class StartWindows:
+    """Hour-of-week slots in which each channel usually goes live."""
+
+    def __init__(self, min_weeks: int = 2, lead: float = 900.0):
+        """
+        Initialize model.
+
+        Args:
+            min_weeks: Distinct weeks with a start in a slot that make it a window
+            lead: Seconds before a slot at which its window opens
+        """
+        self.min_weeks = min_weeks
+        self.lead = lead
+        self._weeks: Dict[ChannelKey, Dict[int, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._slots: Dict[ChannelKey, Set[int]] = {}
+
+    def load(self, starts: Iterable[Tuple[ChannelKey, float]]) -> None:
+        """Replace the model with ``(channel, started_at)`` history."""
+        self._weeks.clear()
+        self._slots.clear()
+        for key, started_at in starts:
+            self.record(key, started_at)
+
+    def record(self, key: ChannelKey, started_at: float) -> None:
+        """Add one observed go-live time of a channel."""
+        slot = hour_of_week(started_at)
+        weeks = self._weeks[key][slot]
+        weeks.add(week_index(started_at))
+        if len(weeks) >= self.min_weeks:
+            self._slots.setdefault(key, set()).add(slot)
+
+    def slots(self, key: ChannelKey) -> Set[int]:
+        """Hour-of-week slots that are start windows of a channel."""
+        return self._slots.get(key, set())
+
+    def in_window(self, key: ChannelKey, now: float) -> bool:
+        """Whether ``now`` is inside (or ``lead`` seconds before) a start window."""
+        slots = self._slots.get(key)
+        if not slots:
+            return False
+        return hour_of_week(now) in slots or hour_of_week(now + self.lead) in slots
+
+    def next_opening(self, key: ChannelKey, now: float, horizon: float) -> Optional[float]:
+        """
+        First time after ``now`` and within ``horizon`` seconds at which a window opens.
+
+        Returns:
+            Unix time, or None if no window opens within the horizon
+        """
+        slots = self._slots.get(key)
+        if not slots:
+            return None
+        slot_start = math.floor(now / HOUR) * HOUR
+        for hours in range(1, math.ceil((horizon + self.lead) / HOUR) + 2):
+            start = slot_start + hours * HOUR
+            opening = start - self.lead
+            if opening > now + horizon:
+                return None
+            if opening > now and hour_of_week(start) in slots:
+                return opening
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """Channels with at least one window, and windows in total."""
+        return {
+            "channels_with_windows": len(self._slots),
+            "windows": sum(len(slots) for slots in self._slots.values()),
+        }
+
+
+class PollingCadence:
+    """Per-channel next-check times in a priority queue."""
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        max_interval: float = 900.0,
+        backoff: float = 2.0,
+        windows: Optional[StartWindows] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize cadence.
+
+        Args:
+            interval: Seconds between checks of live and in-window channels
+            max_interval: Longest gap between checks of a dormant channel
+            backoff: Growth of the gap per consecutive offline check
+            windows: Learned start windows (none: pure back-off)
+            clock: Wall-clock time source (tests)
+        """
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.windows = windows or StartWindows()
+        self._clock = clock
+        self._due: Dict[ChannelKey, float] = {}
+        self._heap: List[Tuple[float, ChannelKey]] = []
+        self._misses: Dict[ChannelKey, int] = {}
+        self._live: Set[ChannelKey] = set()
+
+    def sync(self, keys: Iterable[ChannelKey], now: Optional[float] = None) -> None:
+        """
+        Track exactly ``keys``: new channels are due at once, others are dropped.
+
+        Args:
+            keys: Channels this worker polls
+            now: Current time (default: the clock)
+        """
+        now = self._clock() if now is None else now
+        keys = set(keys)
+        for key in list(self._due):
+            if key not in keys:
+                del self._due[key]
+                self._misses.pop(key, None)
+                self._live.discard(key)
+        for key in keys:
+            if key not in self._due:
+                self._schedule(key, now)
+        if len(self._heap) > 2 * len(self._due) + 64:
+            # Drop superseded heap entries
+            self._heap = [(at, key) for key, at in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def due(self, now: Optional[float] = None) -> List[ChannelKey]:
+        """
+        Return the channels whose check is due.
+
+        Each returned channel is rescheduled by :meth:`record` once checked;
+        until then it is provisionally due again after ``interval``, so a
+        check that never reports back is retried.
+        """
+        now = self._clock() if now is None else now
+        keys = []
+        while self._heap and self._heap[0][0] <= now:
+            at, key = heapq.heappop(self._heap)
+            if self._due.get(key) == at:
+                self._schedule(key, now + self.interval)
+                keys.append(key)
+        return keys
+
+    def next_check(self, key: ChannelKey) -> Optional[float]:
+        """Scheduled time of a channel's next check, or None if it is not tracked."""
+        return self._due.get(key)
+
+    def next_due(self) -> Optional[float]:
+        """Time of the earliest scheduled check, or None."""
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def record(
+        self,
+        key: ChannelKey,
+        live: bool,
+        started_at: Optional[float] = None,
+        failed: bool = False,
+        now: Optional[float] = None
+    ) -> float:
+        """
+        Reschedule a channel after a check.
+
+        Args:
+            key: Checked channel
+            live: Whether it was live
+            started_at: Start time of its stream (learned as a window when it
+                        was not live at the previous check)
+            failed: The check failed; retry after ``interval`` without
+                    changing the back-off
+            now: Check time (default: the clock)
+
+        Returns:
+            Time of the next check
+        """
+        if key not in self._due:
+            return math.inf
+        now = self._clock() if now is None else now
+        if not failed:
+            if live:
+                if key not in self._live and started_at is not None:
+                    self.windows.record(key, started_at)
+                self._live.add(key)
+                self._misses[key] = 0
+            else:
+                self._live.discard(key)
+                # Capped: the gap stops growing at max_interval anyway
+                self._misses[key] = min(self._misses.get(key, 0) + 1, 64)
+        return self._schedule(key, now + self.delay(key, now, failed))
+
+    def reset(self, key: ChannelKey, now: Optional[float] = None) -> None:
+        """Forget a channel's back-off (on-demand refresh) and check it within ``interval``."""
+        if key not in self._due:
+            return
+        now = self._clock() if now is None else now
+        self._misses[key] = 0
+        if self._due[key] > now + self.interval:
+            self._schedule(key, now + self.interval)
+
+    def delay(self, key: ChannelKey, now: float, failed: bool = False) -> float:
+        """Seconds until the next check of a channel given its state."""
+        if failed or key in self._live or self.windows.in_window(key, now):
+            return self.interval
+        misses = self._misses.get(key, 0)
+        delay = min(self.max_interval, self.interval * self.backoff ** max(0, misses - 1))
+        opening = self.windows.next_opening(key, now, delay)
+        return delay if opening is None else opening - now
+
+    def stats(self) -> Dict[str, Any]:
+        """Channel counts by state and the learned windows."""
+        dormant = sum(1 for key in self._due if key not in self._live and self._misses.get(key, 0) > 1)
+        return {
+            "scheduled": len(self._due),
+            "live": len(self._live),
+            "backed_off": dormant,
+            **self.windows.stats(),
+        }
+
+    def _schedule(self, key: ChannelKey, at: float) -> float:
+        self._due[key] = at
+        heapq.heappush(self._heap, (at, key))
+        return at
@@ -0,0 +1,156 @@
+"""
+Stream reads over the direct Postgres pool.
+
+Same results as the PostgREST queries in ``supabase_service``, but rows are
+decoded from the binary protocol straight into the response shapes (no
+embedded-JSON intermediate). RLS applies: queries run as ``authenticated``
+with the user's ``sub``; the explicit ``user_id`` filters only help the
+planner use ``idx_channels_user_platform``.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.postgres import PostgresPool
+from app.models.stream import stream_url
+
+LIVE_STREAMS_SQL = """
+SELECT s.id::text AS id, s.title, s.thumbnail_url, s.viewer_count, s.game_name, s.started_at, s.is_live,
+       s.platform_stream_id, c.id::text AS channel_row_id, c.channel_name, c.display_name, p.name AS platform
+FROM streams s
+JOIN channels c ON c.id = s.channel_id
+JOIN platforms p ON p.id = c.platform_id
+WHERE s.is_live
+  AND c.user_id = $1::uuid
+  AND c.is_subscribed
+  AND ($2::text IS NULL OR p.name = $2)
+  AND ($3::text IS NULL OR s.game_name = $3)
+"""
+
+# websearch_to_tsquery over the title, as PostgREST's ``wfts`` filter
+SEARCH_STREAMS_SQL = """
+SELECT s.id::text AS id, s.platform_stream_id, s.title, s.description, s.thumbnail_url, s.viewer_count,
+       s.game_name, s.tags, s.started_at, s.is_live, c.id::text AS channel_row_id, c.channel_id,
+       p.name AS platform, count(*) OVER () AS total
+FROM streams s
+JOIN channels c ON c.id = s.channel_id
+JOIN platforms p ON p.id = c.platform_id
+WHERE c.user_id = $1::uuid
+  AND c.is_subscribed
+  AND ($2::text IS NULL OR to_tsvector(s.title) @@ websearch_to_tsquery($2))
+  AND ($3::text IS NULL OR p.name = $3)
+  AND ($4::text IS NULL OR c.platform_id = $4::uuid)
+  AND ($5::text IS NULL OR s.game_name = $5)
+  AND ($6::text[] IS NULL OR s.tags @> $6)
+  AND ($7::int IS NULL OR s.viewer_count >= $7)
+  AND ($8::int IS NULL OR s.viewer_count <= $8)
+  AND ($9::boolean IS NULL OR s.is_live = $9)
+  AND ($10::timestamptz IS NULL OR s.started_at >= $10)
+  AND ($11::timestamptz IS NULL OR s.started_at <= $11)
+ORDER BY s.viewer_count DESC NULLS LAST, s.id DESC
+LIMIT $12 OFFSET $13
+"""
+
+
+def _claims(user_id: str) -> Dict[str, Any]:
+    return {"sub": user_id, "role": "authenticated"}
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+async def fetch_user_live_stream_items(
+    pool: PostgresPool,
+    user_id: str,
+    platform: Optional[str] = None,
+    category: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load a user's live stream list in the ``GET /api/streams`` item format.
+
+    Args:
+        pool: Open Postgres pool
+        user_id: Owner of the channels (``auth.uid()`` for RLS)
+        platform: Only streams of this platform name
+        category: Only streams with this game/category name
+
+    Returns:
+        Unsorted items, as :func:`~app.services.stream_cache.to_stream_item` builds them
+    """
+    records = await pool.fetch(_claims(user_id), LIVE_STREAMS_SQL, user_id, platform, category)
+    items = []
+    for r in records:
+        platform_name = r["platform"]
+        items.append({
+            "id": r["id"],
+            "title": r["title"],
+            "channelId": r["channel_row_id"],
+            "channelName": r["display_name"] or r["channel_name"] or "",
+            "thumbnailUrl": r["thumbnail_url"],
+            "viewerCount": r["viewer_count"] or 0,
+            "platform": platform_name,
+            "category": r["game_name"],
+            "isLive": r["is_live"],
+            "startedAt": _iso(r["started_at"]),
+            "url": stream_url(platform_name, r["platform_stream_id"], r["channel_name"] or ""),
+        })
+    return items
+
+
+async def search_user_stream_payloads(
+    pool: PostgresPool,
+    user_id: str,
+    query: Optional[str] = None,
+    platform: Optional[str] = None,
+    platform_id: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    min_viewers: Optional[int] = None,
+    max_viewers: Optional[int] = None,
+    is_live: Optional[bool] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Full-text search over a user's ``streams`` rows.
+
+    Args:
+        pool: Open Postgres pool
+        user_id: Owner of the channels (``auth.uid()`` for RLS)
+        Remaining arguments as :func:`~app.services.supabase_service.search_user_streams`
+
+    Returns:
+        Tuple of (search result payloads ordered by viewer count, total match count)
+    """
+    params = (
+        user_id, query, platform, platform_id, game_name, tags, min_viewers, max_viewers,
+        is_live, started_after, started_before,
+    )
+    records = await pool.fetch(_claims(user_id), SEARCH_STREAMS_SQL, *params, limit, offset)
+    if not records and offset:
+        # Past the last page: the window count is only known from the first page
+        first = await pool.fetch(_claims(user_id), SEARCH_STREAMS_SQL, *params, 1, 0)
+        total = first[0]["total"] if first else 0
+    else:
+        total = records[0]["total"] if records else 0
+    payloads = [
+        {
+            "platform": r["platform"],
+            "platform_channel_id": r["channel_id"],
+            "platform_stream_id": r["platform_stream_id"],
+            "title": r["title"],
+            "description": r["description"],
+            "thumbnail_url": r["thumbnail_url"],
+            "viewer_count": r["viewer_count"] or 0,
+            "game_name": r["game_name"],
+            "tags": r["tags"],
+            "started_at": _iso(r["started_at"]),
+            "is_live": r["is_live"],
+            "channel_id": r["channel_row_id"],
+        }
+        for r in records
+    ]
+    return payloads, total
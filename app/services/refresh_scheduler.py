@@ -0,0 +1,521 @@
+"""Server-side stream refresh scheduler.
+
+Instead of every open frontend tab fanning out to YouTube/Twitch on its own
+``POST /api/streams/refresh``, one background task keeps the global set of
+distinct (platform, channel_id) pairs from the ``channels`` table and refreshes
+each pair once per interval no matter how many users subscribe to it. The
+refresh endpoint serves the resulting snapshots and only triggers an early
+refresh when the data it needs is too old.
+
+With several workers or replicas, ``owns`` limits the periodic cycle to the
+channels assigned to this worker (see :mod:`app.core.coordination`), so
+every channel is still fetched once per interval across the deployment.
+
+With a :class:`~app.services.polling_cadence.PollingCadence` the cycle
+runs every ``tick`` seconds and only checks the channels that are due:
+live and about-to-go-live channels every interval, dormant ones less and
+less often.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.core.blocking import run_blocking
+from app.core.config import get_settings
+from app.core.exceptions import AppException
+from app.core.metrics import REFRESH_CYCLE_DURATION
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.models.stream import PlatformStream
+from app.services.base import StreamPlatformService
+from app.services.batch_planner import PartialBatchError, chunked
+from app.services.polling_cadence import WEEK, PollingCadence, StartWindows
+from app.services.supabase_service import fetch_stream_start_history, fetch_tracked_channels
+
+logger = logging.getLogger(__name__)
+
+#: Per-channel errors that are expected while a platform is throttled
+QUIET_ERRORS = ("QUOTA_EXCEEDED", "CIRCUIT_OPEN")
+
+
+@dataclass
+class ChannelSnapshot:
+    """Latest known state of one platform channel."""
+
+    key: ChannelKey
+    streams: List[PlatformStream] = field(default_factory=list)
+    #: Wall-clock time of the last successful fetch (0 = never fetched)
+    fetched_at: float = 0.0
+    #: Wall-clock time of the last attempt, successful or not
+    checked_at: float = 0.0
+    error_code: Optional[str] = None
+    error_message: Optional[str] = None
+
+
+ChannelLoader = Callable[[], Awaitable[Iterable[ChannelSubscription]]]
+StartHistoryLoader = Callable[[], Awaitable[Iterable[Tuple[ChannelKey, float]]]]
+RefreshListener = Callable[[Dict[ChannelKey, ChannelSnapshot]], Awaitable[None]]
+
+
+class StreamRefreshScheduler:
+    """Refreshes every distinct tracked channel once per interval."""
+
+    def __init__(
+        self,
+        services: Mapping[str, StreamPlatformService],
+        channel_loader: ChannelLoader,
+        interval: float = 60.0,
+        channel_reload_interval: float = 300.0,
+        min_reload_interval: float = 5.0,
+        owns: Optional[Callable[[ChannelKey], bool]] = None,
+        cadence: Optional[PollingCadence] = None,
+        tick: float = 15.0,
+        history_loader: Optional[StartHistoryLoader] = None,
+        history_reload_interval: float = 86400.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            services: Platform name to platform service
+            channel_loader: Coroutine returning all tracked channel rows
+            interval: Seconds between refreshes of the same channel
+            channel_reload_interval: Seconds between reloads of the channel set
+            min_reload_interval: Floor between on-demand channel reloads
+            owns: Whether this worker refreshes a channel in the periodic
+                  cycle (default: every channel); on-demand refreshes are
+                  not filtered
+            cadence: Per-channel check schedule (default: every owned
+                     channel every ``interval``)
+            tick: Seconds between cycles when a cadence is set
+            history_loader: Coroutine returning past ``(channel, started_at)``
+                            pairs that seed the cadence's start windows
+            history_reload_interval: Seconds between start history reloads
+            clock: Wall-clock time source (injectable for tests)
+        """
+        self.services = dict(services)
+        self.channel_loader = channel_loader
+        self.interval = interval
+        self.channel_reload_interval = channel_reload_interval
+        self.min_reload_interval = min_reload_interval
+        self.owns = owns
+        self.cadence = cadence
+        self.tick = tick
+        self.history_loader = history_loader
+        self.history_reload_interval = history_reload_interval
+        self._history_loaded_at: Optional[float] = None
+        self._clock = clock
+        self._subscriptions: Dict[ChannelKey, List[ChannelSubscription]] = {}
+        self._by_user: Dict[str, List[ChannelSubscription]] = {}
+        self._snapshots: Dict[ChannelKey, ChannelSnapshot] = {}
+        self._in_flight: Dict[ChannelKey, asyncio.Task] = {}
+        self._listeners: List[RefreshListener] = []
+        self._loaded_at: Optional[float] = None
+        self._reload_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.upstream_calls = 0
+        self.deadline_exceeded = 0
+        self.cycles = 0
+        self.last_cycle_seconds = 0.0
+
+    def now(self) -> float:
+        """Current time on the scheduler's clock."""
+        return self._clock()
+
+    # ------------------------------------------------------------------
+    # Channel set
+    # ------------------------------------------------------------------
+
+    @property
+    def tracked_keys(self) -> List[ChannelKey]:
+        """Distinct (platform, channel_id) pairs currently tracked."""
+        return list(self._subscriptions)
+
+    @property
+    def owned_keys(self) -> List[ChannelKey]:
+        """Tracked channels this worker refreshes in the periodic cycle."""
+        if self.owns is None:
+            return self.tracked_keys
+        return [key for key in self._subscriptions if self.owns(key)]
+
+    def is_owned(self, key: ChannelKey) -> bool:
+        """Whether this worker refreshes ``key`` in the periodic cycle."""
+        return self.owns is None or self.owns(key)
+
+    def subscriptions_for(self, key: ChannelKey) -> List[ChannelSubscription]:
+        """Return the ``channels`` rows that point at a platform channel."""
+        return self._subscriptions.get(key, [])
+
+    def user_channels(self, user_id: str) -> List[ChannelSubscription]:
+        """Return the tracked ``channels`` rows owned by a user."""
+        return self._by_user.get(user_id, [])
+
+    async def reload_channels(self, force: bool = False) -> None:
+        """
+        Reload the tracked channel set from the database.
+
+        Args:
+            force: Reload even if the set was loaded less than
+                   ``min_reload_interval`` seconds ago
+        """
+        async with self._reload_lock:
+            if self._loaded_at is not None:
+                age = self._clock() - self._loaded_at
+                if age < self.min_reload_interval or (not force and age < self.channel_reload_interval):
+                    return
+            rows = await self.channel_loader()
+            self._set_subscriptions(rows)
+            self._loaded_at = self._clock()
+
+    def _set_subscriptions(self, rows: Iterable[ChannelSubscription]) -> None:
+        by_key: Dict[ChannelKey, List[ChannelSubscription]] = defaultdict(list)
+        by_user: Dict[str, List[ChannelSubscription]] = defaultdict(list)
+        for row in rows:
+            by_key[row.key].append(row)
+            by_user[row.user_id].append(row)
+        self._subscriptions = dict(by_key)
+        self._by_user = dict(by_user)
+        # Drop snapshots of channels nobody follows any more
+        for key in list(self._snapshots):
+            if key not in self._subscriptions:
+                del self._snapshots[key]
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def add_listener(self, listener: RefreshListener) -> None:
+        """Register a coroutine called with every batch of fresh snapshots."""
+        self._listeners.append(listener)
+
+    def get_snapshot(self, key: ChannelKey) -> Optional[ChannelSnapshot]:
+        """Return the latest snapshot for a channel, if any."""
+        return self._snapshots.get(key)
+
+    async def refresh(
+        self,
+        keys: Iterable[ChannelKey],
+        max_age: float = 0.0,
+        timeout: Optional[float] = None,
+        follow_cadence: bool = False
+    ) -> Dict[ChannelKey, ChannelSnapshot]:
+        """
+        Return snapshots for ``keys``, refreshing those older than ``max_age``.
+
+        Channels already being fetched are awaited instead of fetched again,
+        so concurrent callers never duplicate upstream calls.
+
+        Args:
+            keys: Channels to return
+            max_age: Maximum acceptable age in seconds of the last attempt
+            timeout: Seconds to wait for fetches (None: until they finish);
+                     channels whose platform batch has not finished by then
+                     are returned with their cached streams and the
+                     ``DEADLINE_EXCEEDED`` error while the fetch continues
+                     in the background
+            follow_cadence: Leave channels the cadence schedules alone until
+                            their next background check is due, so a
+                            backed-off channel keeps its back-off
+
+        Returns:
+            Snapshot per requested key
+        """
+        keys = list(dict.fromkeys(keys))
+        now = self._clock()
+        stale = [
+            key for key in keys
+            if key not in self._in_flight
+            and now - self._snapshots.get(key, ChannelSnapshot(key)).checked_at >= max_age
+            and not (follow_cadence and self._scheduled_later(key, now))
+        ]
+        if stale:
+            task = asyncio.ensure_future(self._fetch(stale))
+            for key in stale:
+                self._in_flight[key] = task
+            task.add_done_callback(lambda _t, ks=stale: self._release(ks, _t))
+
+        pending = {self._in_flight[key] for key in keys if key in self._in_flight}
+        if pending:
+            # shield: a cancelled (or timed out) caller must not cancel the shared fetch
+            waiter = asyncio.shield(asyncio.gather(*pending, return_exceptions=True))
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        snapshots = {key: self._snapshots.get(key) or ChannelSnapshot(key) for key in keys}
+        late = [key for key in keys if self._in_flight.get(key) in pending]
+        if late:
+            self.deadline_exceeded += len(late)
+            logger.warning("Refresh deadline of %.1fs passed with %d channels still being fetched", timeout, len(late))
+            for key in late:
+                snapshots[key] = replace(
+                    snapshots[key],
+                    error_code="DEADLINE_EXCEEDED",
+                    error_message="Refresh deadline passed before the platform answered; serving cached data",
+                )
+        return snapshots
+
+    async def refresh_all(self) -> Dict[ChannelKey, ChannelSnapshot]:
+        """Run one scheduler cycle over every channel this worker owns."""
+        started = time.perf_counter()
+        try:
+            await self.reload_channels()
+            self.cycles += 1
+            if self.cadence is None:
+                # Channels refreshed on demand during the last half interval are skipped
+                return await self.refresh(self.owned_keys, max_age=self.interval / 2)
+            await self._reload_history()
+            now = self._clock()
+            self.cadence.sync(self.owned_keys, now)
+            return await self.refresh(self.cadence.due(now))
+        finally:
+            self.last_cycle_seconds = time.perf_counter() - started
+            REFRESH_CYCLE_DURATION.observe(self.last_cycle_seconds)
+
+    def _scheduled_later(self, key: ChannelKey, now: float) -> bool:
+        if self.cadence is None:
+            return False
+        at = self.cadence.next_check(key)
+        return at is not None and at > now
+
+    def reset_schedule(self, keys: Iterable[ChannelKey]) -> None:
+        """Return channels to frequent polling (a user asked for them explicitly)."""
+        if self.cadence is not None:
+            now = self._clock()
+            for key in keys:
+                self.cadence.reset(key, now)
+
+    async def _reload_history(self) -> None:
+        now = self._clock()
+        if self.history_loader is None or (
+            self._history_loaded_at is not None and now - self._history_loaded_at < self.history_reload_interval
+        ):
+            return
+        self._history_loaded_at = now
+        try:
+            self.cadence.windows.load(await self.history_loader())
+        except Exception:
+            logger.exception("Could not load stream start history; polling without start windows")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return scheduler counters and data freshness.
+
+        ``max_data_age_seconds`` is the refresh lag: how old the oldest
+        successfully fetched data of a channel this worker owns is (with a
+        cadence, dormant channels are up to its ``max_interval`` old). The
+        freshness fields cover owned channels only; other workers report
+        theirs.
+        """
+        now = self._clock()
+        snapshots = [self._snapshots.get(key) for key in self.owned_keys]
+        fetched = [s.fetched_at for s in snapshots if s is not None and s.fetched_at]
+        return {
+            "tracked_channels": len(self._subscriptions),
+            "owned_channels": len(snapshots),
+            "never_fetched": len(snapshots) - len(fetched),
+            "failing_channels": sum(1 for s in snapshots if s is not None and s.error_code),
+            "in_flight": len(self._in_flight),
+            "cycles": self.cycles,
+            "upstream_calls": self.upstream_calls,
+            "deadline_exceeded": self.deadline_exceeded,
+            "last_cycle_seconds": self.last_cycle_seconds,
+            "max_data_age_seconds": now - min(fetched) if fetched else 0.0,
+            **({"cadence": self.cadence.stats()} if self.cadence is not None else {}),
+        }
+
+    def _release(self, keys: Iterable[ChannelKey], task: asyncio.Task) -> None:
+        for key in keys:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+
+    async def _fetch(self, keys: List[ChannelKey]) -> None:
+        by_platform: Dict[str, List[str]] = defaultdict(list)
+        for key in keys:
+            by_platform[key.platform].append(key.channel_id)
+
+        chunks = []
+        for platform, ids in by_platform.items():
+            size = getattr(self.services.get(platform), "fetch_chunk_size", None) or len(ids)
+            chunks.extend((platform, chunk) for chunk in chunked(ids, size))
+        # Every chunk lands on its own, so a slow platform or batch does not
+        # hold back the others (deadline-bound refreshes return what landed)
+        task = asyncio.current_task()
+        await asyncio.gather(*(self._fetch_chunk(platform, ids, task) for platform, ids in chunks))
+
+    async def _fetch_chunk(self, platform: str, channel_ids: List[str], task: Optional[asyncio.Task]) -> None:
+        updated = await self._fetch_platform(platform, channel_ids)
+        self._snapshots.update(updated)
+        self._release(updated, task)
+        if self.cadence is not None:
+            for key, snapshot in updated.items():
+                self.cadence.record(
+                    key,
+                    live=bool(snapshot.streams),
+                    started_at=min((s.started_at.timestamp() for s in snapshot.streams), default=None),
+                    failed=snapshot.error_code is not None,
+                    now=snapshot.checked_at,
+                )
+        await self._notify(updated)
+
+    async def _fetch_platform(self, platform: str, channel_ids: List[str]) -> Dict[ChannelKey, ChannelSnapshot]:
+        now = self._clock()
+        service = self.services.get(platform)
+        if service is None:
+            return self._failed(platform, channel_ids, now, "PLATFORM_UNSUPPORTED",
+                                f"No service configured for platform '{platform}'")
+
+        self.upstream_calls += 1
+        errors: Dict[str, BaseException] = {}
+        try:
+            streams = await service.fetch_live_streams(channel_ids)
+        except PartialBatchError as e:
+            # Some batches failed: keep the channels that did succeed
+            streams, errors = e.results, e.errors
+            # Quota deferrals and open circuits are routine and logged by the service itself
+            failed = sum(1 for error in errors.values() if getattr(error, "error_code", None) not in QUIET_ERRORS)
+            if failed:
+                logger.warning("Refresh partially failed for %s (%d of %d channels)", platform, failed, len(channel_ids))
+        except AppException as e:
+            if e.error_code not in QUIET_ERRORS:
+                logger.warning("Refresh failed for %s (%d channels): %s", platform, len(channel_ids), e.message)
+            return self._failed(platform, channel_ids, now, e.error_code, e.message)
+        except Exception as e:
+            logger.exception("Unexpected refresh failure for %s", platform)
+            return self._failed(platform, channel_ids, now, "INTERNAL_ERROR", str(e))
+
+        snapshots = {}
+        for channel_id in channel_ids:
+            error = errors.get(channel_id)
+            if error is not None:
+                snapshots.update(self._failed(
+                    platform, [channel_id], now,
+                    getattr(error, "error_code", "INTERNAL_ERROR"),
+                    getattr(error, "message", str(error)),
+                ))
+                continue
+            key = ChannelKey(platform, channel_id)
+            snapshots[key] = ChannelSnapshot(
+                key=key,
+                streams=streams.get(channel_id, []),
+                fetched_at=now,
+                checked_at=now,
+            )
+        return snapshots
+
+    def _failed(
+        self,
+        platform: str,
+        channel_ids: List[str],
+        now: float,
+        error_code: str,
+        error_message: str
+    ) -> Dict[ChannelKey, ChannelSnapshot]:
+        """Record a failed attempt, keeping the previously fetched streams."""
+        snapshots = {}
+        for channel_id in channel_ids:
+            key = ChannelKey(platform, channel_id)
+            previous = self._snapshots.get(key) or ChannelSnapshot(key)
+            snapshots[key] = ChannelSnapshot(
+                key=key,
+                streams=previous.streams,
+                fetched_at=previous.fetched_at,
+                checked_at=now,
+                error_code=error_code,
+                error_message=error_message,
+            )
+        return snapshots
+
+    async def _notify(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        for listener in self._listeners:
+            try:
+                await listener(snapshots)
+            except Exception:
+                logger.exception("Refresh listener %r failed", listener)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="stream-refresh-scheduler")
+
+    async def stop(self) -> None:
+        """Stop the background loop and close platform services."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for service in self.services.values():
+            await service.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                await self.refresh_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Stream refresh cycle failed")
+            period = self.interval if self.cadence is None else self.tick
+            await asyncio.sleep(max(0.0, period - (time.monotonic() - started)))
+
+
+def create_stream_scheduler(
+    services: Optional[Mapping[str, StreamPlatformService]] = None,
+    owns: Optional[Callable[[ChannelKey], bool]] = None
+) -> StreamRefreshScheduler:
+    """
+    Build the application scheduler from settings.
+
+    Args:
+        services: Platform services keyed by platform name
+        owns: Channel assignment of this worker (default: every channel)
+
+    Returns:
+        Scheduler loading tracked channels (and, with adaptive polling, their
+        start history) through the admin Supabase client
+    """
+    settings = get_settings()
+
+    async def load_channels() -> List[ChannelSubscription]:
+        # Supabase SDKは同期クライアントのためスレッドで実行
+        return await run_blocking(fetch_tracked_channels)
+
+    async def load_start_history() -> List[Tuple[ChannelKey, float]]:
+        since = datetime.fromtimestamp(time.time() - settings.STREAM_POLL_HISTORY_WEEKS * WEEK, timezone.utc)
+        return await run_blocking(fetch_stream_start_history, since.isoformat())
+
+    cadence = None
+    if settings.STREAM_ADAPTIVE_POLLING_ENABLED:
+        cadence = PollingCadence(
+            interval=settings.STREAM_REFRESH_INTERVAL_SECONDS,
+            max_interval=settings.STREAM_POLL_MAX_INTERVAL_SECONDS,
+            backoff=settings.STREAM_POLL_BACKOFF_FACTOR,
+            windows=StartWindows(
+                min_weeks=settings.STREAM_POLL_WINDOW_MIN_WEEKS,
+                lead=settings.STREAM_POLL_WINDOW_LEAD_SECONDS,
+            ),
+        )
+    return StreamRefreshScheduler(
+        services=services or {},
+        channel_loader=load_channels,
+        interval=settings.STREAM_REFRESH_INTERVAL_SECONDS,
+        channel_reload_interval=settings.STREAM_CHANNEL_RELOAD_SECONDS,
+        owns=owns,
+        cadence=cadence,
+        tick=settings.STREAM_POLL_TICK_SECONDS,
+        history_loader=load_start_history if cadence is not None else None,
+    )
@@ -0,0 +1,183 @@
+"""Circuit breaking and latency tracking for platform API calls.
+
+A :class:`CircuitBreaker` stops calling a platform whose API keeps failing
+(timeouts, transport errors, 5xx, 429). While it is open, calls fail fast
+with :class:`~app.core.exceptions.CircuitOpenException` and the scheduler
+keeps serving the cached streams. After ``reset_timeout`` (or the platform's
+``Retry-After`` of a 429) one probe call is let through: success closes the circuit,
+failure opens it again for twice as long, up to ``max_reset_timeout``.
+
+A :class:`LatencyTracker` keeps recent successful call durations so that
+slow batch calls can be hedged after the observed tail latency.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one platform."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize breaker.
+
+        Args:
+            name: Platform name (logs and metrics)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            max_reset_timeout: Cap of the doubled open time after failed probes
+            clock: Monotonic time source (tests)
+        """
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._open_for = reset_timeout
+        self._opened_at = 0.0
+        self._open_until = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open`` (open time elapsed, probe allowed)."""
+        if self._state == OPEN and self._clock() >= self._open_until:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._open_until - self._clock())
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now.
+
+        In the half-open state only one caller (the probe) is admitted
+        until it reports back.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Report a call that reached a healthy API."""
+        if self._state != CLOSED and not self._probing:
+            # A call started before the circuit opened; wait for the probe
+            return
+        if self._state != CLOSED:
+            logger.info("%s API recovered; circuit closed after %.0fs", self.name, self._clock() - self._opened_at)
+        self._state = CLOSED
+        self._failures = 0
+        self._open_for = self.reset_timeout
+        self._probing = False
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        """
+        Report a failed call.
+
+        Args:
+            retry_after: Seconds the platform asked us to wait (429); opens
+                         the circuit at once for that long
+        """
+        self._failures += 1
+        if self._state == CLOSED:
+            if retry_after is not None:
+                self._open(retry_after)
+            elif self._failures >= self.failure_threshold:
+                self._open(self._open_for)
+        elif self._probing:
+            # Failed probe: stay open for twice as long
+            self._open_for = min(self.max_reset_timeout, self._open_for * 2)
+            self._open(max(self._open_for, retry_after or 0.0))
+        elif retry_after is not None:
+            self._open(max(self.retry_after, retry_after))
+
+    def abandon(self) -> None:
+        """Forget a call that was cancelled before it completed."""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        """State, consecutive failures and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_after_seconds": self.retry_after,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+    def _open(self, seconds: float) -> None:
+        now = self._clock()
+        if self._state == CLOSED:
+            self.trips += 1
+            self._opened_at = now
+            logger.warning(
+                "%s API failing (%d consecutive failures); circuit open, serving cached data",
+                self.name, self._failures,
+            )
+        self._state = OPEN
+        self._probing = False
+        self._open_until = now + seconds
+
+
+class LatencyTracker:
+    """Sliding window of recent call durations."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        """
+        Initialize tracker.
+
+        Args:
+            window: Number of recent durations kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        """Add one call duration."""
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the window.
+
+        Returns:
+            Seconds, or None with fewer than ``min_samples`` samples
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
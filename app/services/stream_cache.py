@@ -0,0 +1,186 @@
+"""Per-user cache of the live stream list behind ``GET /api/streams``.
+
+Lists are cached per (user, platform, category, sort) with
+stale-while-revalidate semantics so reads answer from memory (NFR-002) and
+keep answering with the last good list when the database cannot be reached
+(EDGE-001). Scheduler refreshes invalidate the lists of every user
+following a refreshed channel; with several workers the affected user ids
+are also published to the other workers, whose caches hold the same lists.
+Each load is versioned against the previous one so responses get cheap
+ETags and ``since`` cursors.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.cache import SWRCache
+from app.core.config import get_settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.postgres import get_postgres_pool
+from app.core.versioning import VersionedList, VersionStore
+from app.models.channel import ChannelKey
+from app.models.stream import stream_url
+from app.services.postgres_service import fetch_user_live_stream_items
+from app.services.refresh_scheduler import ChannelSnapshot, RefreshListener, StreamRefreshScheduler
+from app.services.stream_repository import fetch_user_live_streams
+
+logger = logging.getLogger(__name__)
+
+#: (user_id, platform or "all", category, sort)
+StreamListKey = Tuple[str, str, Optional[str], str]
+
+#: Coordination topic carrying lists of user ids to invalidate
+INVALIDATION_TOPIC = "stream_cache.invalidate"
+#: User ids per published message (UUIDs; keeps NOTIFY payloads small)
+INVALIDATION_BATCH_SIZE = 150
+
+Publisher = Callable[[str, Any], Awaitable[Any]]
+
+_stream_cache: Optional[SWRCache[StreamListKey, VersionedList]] = None
+_stream_versions: Optional[VersionStore[StreamListKey]] = None
+
+
+def get_stream_cache() -> SWRCache[StreamListKey, VersionedList]:
+    """Return the process-wide stream list cache, creating it on first use."""
+    global _stream_cache
+    if _stream_cache is None:
+        settings = get_settings()
+        _stream_cache = SWRCache(
+            fresh_ttl=settings.STREAM_CACHE_FRESH_SECONDS,
+            stale_ttl=settings.STREAM_CACHE_STALE_SECONDS,
+            max_weight=settings.STREAM_CACHE_MAX_ITEMS,
+            weigh=len,
+        )
+    return _stream_cache
+
+
+def get_stream_versions() -> VersionStore[StreamListKey]:
+    """Return the process-wide stream list version store, creating it on first use."""
+    global _stream_versions
+    if _stream_versions is None:
+        settings = get_settings()
+        _stream_versions = VersionStore(
+            max_keys=settings.STREAM_CACHE_HISTORY_KEYS,
+            max_tombstones=settings.STREAM_CACHE_HISTORY_TOMBSTONES,
+        )
+    return _stream_versions
+
+
+def to_stream_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a ``streams`` row with its embedded channel to the list format."""
+    channel = row.get("channels") or {}
+    platform = (channel.get("platforms") or {}).get("name", "")
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "channelId": channel.get("id"),
+        "channelName": channel.get("display_name") or channel.get("channel_name", ""),
+        "thumbnailUrl": row.get("thumbnail_url"),
+        "viewerCount": row.get("viewer_count") or 0,
+        "platform": platform,
+        "category": row.get("game_name"),
+        "isLive": row.get("is_live", True),
+        "startedAt": row["started_at"],
+        "url": stream_url(platform, row["platform_stream_id"], channel.get("channel_name", "")),
+    }
+
+
+#: Descending sort key per ``sort`` value; ``id`` breaks ties so keys are unique
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Tuple[Any, str]]] = {
+    "viewers": lambda s: (s["viewerCount"], s["id"]),
+    "recent": lambda s: (s["startedAt"], s["id"]),
+}
+
+
+def sort_items(items: List[Dict[str, Any]], sort: str) -> List[Dict[str, Any]]:
+    """Order stream items by viewers (default) or start time, newest first."""
+    return sorted(items, key=SORT_KEYS.get(sort, SORT_KEYS["viewers"]), reverse=True)
+
+
+def format_duration(started_at: str, now: datetime) -> str:
+    """Elapsed time since ``started_at`` as ``H:MM:SS``."""
+    started = datetime.fromisoformat(started_at.replace("Z", "+00:00"))
+    seconds = max(0, int((now - started).total_seconds()))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+
+
+async def load_stream_list(user_id: str, platform: str, category: Optional[str], sort: str) -> List[Dict[str, Any]]:
+    """
+    Load a user's live stream list from the database.
+
+    Uses the direct Postgres pool when it is enabled and healthy, and
+    PostgREST otherwise or if the pool query fails.
+
+    Raises:
+        ServiceUnavailableException: If the database query fails
+    """
+    platform_name = None if platform == "all" else platform
+    pool = get_postgres_pool()
+    if pool is not None and pool.available:
+        try:
+            return sort_items(await fetch_user_live_stream_items(pool, user_id, platform_name, category), sort)
+        except Exception:
+            logger.warning("Postgres stream list query failed; falling back to PostgREST", exc_info=True)
+    try:
+        rows = await fetch_user_live_streams(user_id, platform_name, category)
+    except Exception as e:
+        raise ServiceUnavailableException("Stream data is temporarily unavailable") from e
+    return sort_items([to_stream_item(row) for row in rows], sort)
+
+
+async def load_versioned_stream_list(key: StreamListKey) -> VersionedList:
+    """
+    Load a user's live stream list and version it against the previous load.
+
+    Args:
+        key: (user_id, platform, category, sort)
+
+    Raises:
+        ServiceUnavailableException: If the database query fails
+    """
+    versions = get_stream_versions()
+    ticket = versions.begin()
+    items = await load_stream_list(*key)
+    return versions.record(key, items, ticket)
+
+
+def invalidate_users(user_ids: Set[str]) -> int:
+    """Force a reload of every cached list belonging to ``user_ids``."""
+    if not user_ids:
+        return 0
+    return get_stream_cache().invalidate(lambda key: key[0] in user_ids)
+
+
+def invalidate_from_peer(user_ids: List[str]) -> None:
+    """Apply an invalidation published by another worker."""
+    invalidate_users(set(user_ids))
+
+
+def stream_cache_listener(scheduler: StreamRefreshScheduler, publish: Optional[Publisher] = None) -> RefreshListener:
+    """
+    Build a scheduler listener invalidating the lists of affected users.
+
+    Args:
+        scheduler: Scheduler whose subscriptions map channels to users
+        publish: Coroutine function sending ``(topic, data)`` to the other
+                 workers (e.g. :meth:`ClusterCoordinator.publish`), which
+                 apply it with :func:`invalidate_from_peer`
+
+    Returns:
+        Coroutine function to pass to ``scheduler.add_listener``
+    """
+    async def invalidate(snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        users = {
+            subscription.user_id
+            for key, snapshot in snapshots.items() if not snapshot.error_code
+            for subscription in scheduler.subscriptions_for(key)
+        }
+        invalidate_users(users)
+        if publish is not None and users:
+            ordered = sorted(users)
+            for start in range(0, len(ordered), INVALIDATION_BATCH_SIZE):
+                await publish(INVALIDATION_TOPIC, ordered[start:start + INVALIDATION_BATCH_SIZE])
+
+    return invalidate
@@ -0,0 +1,418 @@
+"""Live stream change events pushed to connected clients.
+
+The broker is a scheduler listener. Per refresh it compares every channel's
+fresh streams with the previous ones and turns the difference into events:
+``stream.live``, ``stream.ended``, ``stream.viewers`` (only the viewer count
+moved) and ``stream.updated`` (title, category, ... changed). Each event is
+built and serialized once and the same object is handed to every connection
+whose user follows the channel.
+
+Every connection owns a bounded :class:`EventSubscriber` buffer, so a slow
+consumer never holds up the refresh loop or other connections: a newer viewer
+count replaces one still waiting for the same stream, and when the buffer is
+full the oldest viewer update is dropped. If only live/ended events are left
+the buffer is cleared and the client gets a single ``resync`` event telling it
+to reload ``GET /api/streams``.
+
+With several workers (``COORDINATION_ENABLED``) a worker only sees fresh
+snapshots of the channels it owns, while a user's connection may be held by
+any worker. Each broker therefore diffs only its own channels and relays the
+resulting events to its peers over the coordinator's broadcast, and every
+broker delivers relayed events to its local connections. Relaying is best
+effort like the broadcast itself; after an ownership move the new owner
+establishes a baseline first, so changes within that one refresh are only
+seen by reloading the list.
+"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.coordination import MAX_PAYLOAD_BYTES
+from app.core.exceptions import ServiceUnavailableException
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.models.stream import PlatformStream
+from app.services.refresh_scheduler import ChannelSnapshot
+
+logger = logging.getLogger(__name__)
+
+SubscriptionLookup = Callable[[ChannelKey], List[ChannelSubscription]]
+Publisher = Callable[[str, Any], Awaitable[Any]]
+
+#: Coordination topic carrying events of channels the sending worker owns
+EVENTS_TOPIC = "stream_events.relay"
+#: Room left in a ``NOTIFY`` payload for the coordinator's envelope
+_ENVELOPE_BYTES = 100
+
+STREAM_LIVE = "stream.live"
+STREAM_ENDED = "stream.ended"
+STREAM_VIEWERS = "stream.viewers"
+STREAM_UPDATED = "stream.updated"
+
+
+def sse_frame(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Events frame."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def ws_message(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode one WebSocket text message."""
+    return json.dumps({"id": event_id, "type": event_type, "data": data}, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    """One change of one stream, shared by every subscriber that receives it."""
+
+    seq: int
+    type: str
+    key: ChannelKey
+    stream_id: str
+    data: Dict[str, Any] = field(compare=False)
+
+    @property
+    def coalesce_key(self) -> Optional[Hashable]:
+        """Slot a newer event of the same stream may overwrite (viewer counts only)."""
+        if self.type == STREAM_VIEWERS:
+            return (self.key, self.stream_id)
+        return None
+
+    @cached_property
+    def sse(self) -> bytes:
+        """Server-Sent Events frame (serialized on first use, then reused)."""
+        return sse_frame(self.type, self.data, self.seq)
+
+    @cached_property
+    def message(self) -> str:
+        """WebSocket message (serialized on first use, then reused)."""
+        return ws_message(self.type, self.data, self.seq)
+
+
+class EventSubscriber:
+    """Bounded, coalescing event buffer of one connection."""
+
+    def __init__(self, user_id: str, max_pending: int = 256):
+        """
+        Initialize subscriber.
+
+        Args:
+            user_id: Owner of the connection
+            max_pending: Maximum events buffered before dropping
+        """
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Hashable, StreamEvent]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self.overflowed = False
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def offer(self, event: StreamEvent) -> None:
+        """Queue an event without ever blocking the publisher."""
+        if self.closed:
+            return
+        slot = event.coalesce_key
+        if slot is None:
+            slot = event.seq
+            if event.type == STREAM_ENDED:
+                # A pending viewer count of an ended stream is meaningless
+                if self._pending.pop((event.key, event.stream_id), None) is not None:
+                    self.coalesced += 1
+        elif slot in self._pending:
+            del self._pending[slot]
+            self.coalesced += 1
+        if len(self._pending) >= self.max_pending and not self._drop_viewer_update():
+            # Nothing cheap left to drop: the client has to reload its list
+            self.dropped += len(self._pending) + 1
+            self._pending.clear()
+            self.overflowed = True
+            self._wakeup.set()
+            return
+        self._pending[slot] = event
+        self._wakeup.set()
+
+    def _drop_viewer_update(self) -> bool:
+        for slot, pending in self._pending.items():
+            if pending.type == STREAM_VIEWERS:
+                del self._pending[slot]
+                self.dropped += 1
+                return True
+        return False
+
+    async def next_batch(self, timeout: Optional[float] = None) -> Tuple[List[StreamEvent], bool]:
+        """
+        Wait for pending events.
+
+        Args:
+            timeout: Seconds to wait before returning an empty batch
+
+        Returns:
+            Tuple of (events in order, whether the client must resync)
+        """
+        if not self._pending and not self.overflowed and not self.closed:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        events = list(self._pending.values())
+        self._pending.clear()
+        resync, self.overflowed = self.overflowed, False
+        self.delivered += len(events)
+        return events, resync
+
+    def close(self) -> None:
+        """Stop accepting events and wake the consumer."""
+        self.closed = True
+        self._pending.clear()
+        self._wakeup.set()
+
+
+class StreamEventBroker:
+    """Turns scheduler snapshots into per-user live stream events."""
+
+    def __init__(
+        self,
+        subscriptions_for: SubscriptionLookup,
+        max_pending: int = 256,
+        max_connections: int = 10000,
+        owns: Optional[Callable[[ChannelKey], bool]] = None,
+        publish: Optional[Publisher] = None
+    ):
+        """
+        Initialize broker.
+
+        Args:
+            subscriptions_for: Maps a platform channel to its ``channels`` rows
+            max_pending: Per-connection event buffer size
+            max_connections: Maximum concurrently subscribed connections
+            owns: Whether this worker refreshes a channel periodically
+                  (default: every channel); other channels' events come
+                  from their owner through :meth:`receive`
+            publish: Coroutine function sending ``(topic, data)`` to the
+                     other workers (e.g. :meth:`ClusterCoordinator.publish`)
+        """
+        self.subscriptions_for = subscriptions_for
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.owns = owns
+        self.publish_remote = publish
+        self._outbox: List[StreamEvent] = []
+        self._previous: Dict[ChannelKey, Dict[str, PlatformStream]] = {}
+        self._by_user: Dict[str, Set[EventSubscriber]] = defaultdict(set)
+        self._connections = 0
+        self._seq = 0
+        self.events_published = 0
+        self.events_relayed = 0
+        self.events_received = 0
+        self.relay_failures = 0
+        self.deliveries = 0
+        self._closed_coalesced = 0
+        self._closed_dropped = 0
+
+    @property
+    def connections(self) -> int:
+        """Number of subscribed connections."""
+        return self._connections
+
+    async def __call__(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        """Scheduler listener entry point."""
+        self.publish(snapshots)
+        await self.relay()
+
+    def publish(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> int:
+        """
+        Compute and fan out the events contained in a batch of snapshots.
+
+        The first snapshot of a channel only establishes its baseline, and
+        snapshots carrying an error are skipped so a failing platform does
+        not look like every stream ended. Channels owned by another worker
+        are skipped too (their owner relays the events); events of owned
+        channels are queued for :meth:`relay` when ``publish`` is set.
+
+        Args:
+            snapshots: Fresh snapshots from the scheduler
+
+        Returns:
+            Number of events published
+        """
+        published = 0
+        for key, snapshot in snapshots.items():
+            if snapshot.error_code:
+                continue
+            subscriptions = self.subscriptions_for(key)
+            if not subscriptions or (self.owns is not None and not self.owns(key)):
+                self._previous.pop(key, None)
+                continue
+            current = {s.platform_stream_id: s for s in snapshot.streams}
+            previous = self._previous.get(key)
+            self._previous[key] = current
+            if previous is None:
+                continue
+            events = self._diff(key, previous, current)
+            if not events:
+                continue
+            published += len(events)
+            self._deliver(subscriptions, events)
+            if self.publish_remote is not None:
+                self._outbox.extend(events)
+        self.events_published += published
+        return published
+
+    def _deliver(self, subscriptions: List[ChannelSubscription], events: List[StreamEvent]) -> None:
+        for user_id in {s.user_id for s in subscriptions}:
+            for subscriber in self._by_user.get(user_id, ()):
+                for event in events:
+                    subscriber.offer(event)
+                self.deliveries += len(events)
+
+    async def relay(self) -> int:
+        """
+        Send the queued events to the other workers, several per message.
+
+        An event too large for one message is sent without the stream
+        description; if it is still too large it is not relayed.
+
+        Returns:
+            Number of events sent
+        """
+        events, self._outbox = self._outbox, []
+        limit = MAX_PAYLOAD_BYTES - _ENVELOPE_BYTES
+        batch: List[List[Any]] = []
+        size = 2
+        sent = 0
+        for event in events:
+            item = [event.type, event.key.platform, event.key.channel_id, event.stream_id, event.data]
+            item_size = len(json.dumps(item, separators=(",", ":")).encode()) + 1
+            if item_size > limit and "stream" in event.data:
+                data = {**event.data, "stream": {**event.data["stream"], "description": None}}
+                item[4] = data
+                item_size = len(json.dumps(item, separators=(",", ":")).encode()) + 1
+            if item_size > limit:
+                logger.warning("Stream event of %s too large to relay", event.key)
+                self.relay_failures += 1
+                continue
+            if size + item_size > limit:
+                sent += await self._send(batch)
+                batch, size = [], 2
+            batch.append(item)
+            size += item_size
+        if batch:
+            sent += await self._send(batch)
+        self.events_relayed += sent
+        return sent
+
+    async def _send(self, batch: List[List[Any]]) -> int:
+        try:
+            if await self.publish_remote(EVENTS_TOPIC, batch) is False:
+                self.relay_failures += len(batch)
+                return 0
+        except Exception:
+            logger.warning("Could not relay %d stream events", len(batch), exc_info=True)
+            self.relay_failures += len(batch)
+            return 0
+        return len(batch)
+
+    def receive(self, batch: List[List[Any]]) -> None:
+        """Deliver events relayed by the worker owning their channels."""
+        for event_type, platform, channel_id, stream_id, data in batch:
+            key = ChannelKey(platform, channel_id)
+            subscriptions = self.subscriptions_for(key)
+            self.events_received += 1
+            if not subscriptions:
+                continue
+            self._seq += 1
+            event = StreamEvent(seq=self._seq, type=event_type, key=key, stream_id=stream_id, data=data)
+            self._deliver(subscriptions, [event])
+
+    def _diff(
+        self,
+        key: ChannelKey,
+        previous: Dict[str, PlatformStream],
+        current: Dict[str, PlatformStream]
+    ) -> List[StreamEvent]:
+        events = []
+        for stream_id, stream in current.items():
+            before = previous.get(stream_id)
+            if before is None:
+                events.append(self._event(STREAM_LIVE, key, stream_id, stream=stream.model_dump(mode="json")))
+            elif before != stream:
+                if before.model_copy(update={"viewer_count": stream.viewer_count}) == stream:
+                    events.append(self._event(STREAM_VIEWERS, key, stream_id, viewer_count=stream.viewer_count))
+                else:
+                    events.append(self._event(STREAM_UPDATED, key, stream_id, stream=stream.model_dump(mode="json")))
+        for stream_id in previous.keys() - current.keys():
+            events.append(self._event(STREAM_ENDED, key, stream_id))
+        return events
+
+    def _event(self, event_type: str, key: ChannelKey, stream_id: str, **data: Any) -> StreamEvent:
+        self._seq += 1
+        payload = {"platform": key.platform, "platform_channel_id": key.channel_id, "platform_stream_id": stream_id}
+        payload.update(data)
+        return StreamEvent(seq=self._seq, type=event_type, key=key, stream_id=stream_id, data=payload)
+
+    def check_capacity(self) -> None:
+        """
+        Ensure another connection may subscribe.
+
+        Raises:
+            ServiceUnavailableException: If ``max_connections`` are open
+        """
+        if self._connections >= self.max_connections:
+            raise ServiceUnavailableException(
+                "Too many event stream connections",
+                details={"max_connections": self.max_connections},
+            )
+
+    def subscribe(self, user_id: str) -> EventSubscriber:
+        """
+        Register a connection of ``user_id``.
+
+        Raises:
+            ServiceUnavailableException: If ``max_connections`` are open
+        """
+        self.check_capacity()
+        subscriber = EventSubscriber(user_id, self.max_pending)
+        self._by_user[user_id].add(subscriber)
+        self._connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber) -> None:
+        """Remove a connection; safe to call more than once."""
+        subscribers = self._by_user.get(subscriber.user_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._by_user[subscriber.user_id]
+        self._connections -= 1
+        self._closed_coalesced += subscriber.coalesced
+        self._closed_dropped += subscriber.dropped
+        subscriber.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return fan-out counters."""
+        subscribers = [s for group in self._by_user.values() for s in group]
+        return {
+            "connections": self._connections,
+            "users": len(self._by_user),
+            "tracked_channels": len(self._previous),
+            "events_published": self.events_published,
+            "events_relayed": self.events_relayed,
+            "events_received": self.events_received,
+            "relay_failures": self.relay_failures,
+            "deliveries": self.deliveries,
+            "coalesced": self._closed_coalesced + sum(s.coalesced for s in subscribers),
+            "dropped": self._closed_dropped + sum(s.dropped for s in subscribers),
+            "pending": sum(len(s) for s in subscribers),
+        }
@@ -0,0 +1,119 @@
+"""Async stream queries for the request path.
+
+``GET /api/streams`` and ``GET /api/streams/search`` read through the
+async Supabase client, so a slow PostgREST response suspends only the
+request waiting for it. The queries are the ones in
+:mod:`app.services.supabase_service` (same builders), which keeps the
+synchronous versions for background jobs and scripts.
+"""
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.database import get_async_supabase_client
+from app.models.channel import ChannelKey
+from app.services.supabase_service import user_live_streams_query, user_streams_search_query, viewer_samples_query
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+
+async def fetch_user_live_streams(
+    user_id: str,
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    client: Optional["AsyncClient"] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load the live streams of a user's subscribed channels.
+
+    Args:
+        user_id: Owner of the channels
+        platform: Only streams of this platform name
+        category: Only streams with this game/category name
+        client: Async Supabase client (defaults to the admin client; rows
+                are scoped to ``user_id`` explicitly)
+
+    Returns:
+        ``streams`` rows with the embedded channel and platform
+    """
+    client = client or await get_async_supabase_client()
+    response = await user_live_streams_query(client, user_id, platform, category).execute()
+    return response.data or []
+
+
+async def search_user_streams(
+    user_id: str,
+    query: Optional[str] = None,
+    platform: Optional[str] = None,
+    platform_id: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    min_viewers: Optional[int] = None,
+    max_viewers: Optional[int] = None,
+    is_live: Optional[bool] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    client: Optional["AsyncClient"] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Full-text search over a user's ``streams`` rows (live or historical).
+
+    Arguments as :func:`app.services.supabase_service.search_user_streams`,
+    with an async ``client``.
+
+    Returns:
+        Tuple of (rows ordered by viewer count, total match count)
+    """
+    client = client or await get_async_supabase_client()
+    response = await user_streams_search_query(
+        client, user_id, query, platform, platform_id, game_name, tags, min_viewers, max_viewers, is_live,
+        started_after, started_before, limit, offset,
+    ).execute()
+    return response.data or [], response.count or 0
+
+
+async def fetch_viewer_samples(
+    keys: Iterable[ChannelKey],
+    since: str,
+    page_size: int = 1000,
+    client: Optional["AsyncClient"] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load the stored viewer samples of some channels.
+
+    Pages through the rows, so PostgREST's max-rows limit does not cut
+    the history short.
+
+    Args:
+        keys: Platform channels
+        since: ISO timestamp; older samples are ignored
+        page_size: Rows per request
+        client: Async Supabase client (defaults to the admin client)
+
+    Returns:
+        ``stream_viewer_samples`` rows
+    """
+    by_platform: Dict[str, List[str]] = defaultdict(list)
+    for key in keys:
+        by_platform[key.platform].append(key.channel_id)
+    if not by_platform:
+        return []
+    client = client or await get_async_supabase_client()
+    samples: List[Dict[str, Any]] = []
+    for platform, channel_ids in by_platform.items():
+        offset = 0
+        while True:
+            response = await (
+                viewer_samples_query(client, platform, channel_ids, since)
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            rows = response.data or []
+            samples.extend(rows)
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return samples
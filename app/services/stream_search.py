@@ -0,0 +1,383 @@
+"""In-memory inverted index over the live stream set for ``GET /api/streams/search``.
+
+The live set is small and changes every refresh, so instead of a Postgres
+``to_tsvector`` query per keystroke the index is kept in process and updated
+incrementally from scheduler snapshots (streams starting, ending or changing
+title/category/tags/viewers).
+
+* Tokenization is CJK-aware: text is NFKC-normalized and case-folded, Latin
+  and digit runs are words, and Japanese/Chinese/Korean runs are indexed as
+  unigrams plus bigrams, so ``歌`` and ``歌枠`` both match ``歌枠配信``.
+* Each posting list is an ``array('I')`` of document slots sorted by
+  viewer count (descending), so ``min_viewers``/``max_viewers`` cut a
+  contiguous range by binary search and results come out already ranked.
+  Viewer counts move on almost every refresh, so updates only mark the
+  lists holding a changed document; a list is re-sorted when a query
+  reads it, at most once between changes.
+* The last word of a query is matched as a prefix while the user is typing.
+
+Historical or non-live searches still go to Postgres full-text search.
+
+With several workers (``COORDINATION_ENABLED``) a worker only keeps the
+channels it owns current, so only those are indexed; searches over any
+channel owned by another worker go to Postgres.
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.models.channel import ChannelKey
+from app.models.stream import PlatformStream
+from app.services.refresh_scheduler import ChannelSnapshot, RefreshListener, StreamRefreshScheduler
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"(?P<cjk>[{_CJK}]+)|(?P<word>[^\W_{_CJK}]+)")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """Index tokens of a document field (words, CJK unigrams and bigrams)."""
+    tokens: Set[str] = set()
+    if not text:
+        return tokens
+    for match in _TOKEN_RE.finditer(_normalize(text)):
+        run = match.group()
+        if match.lastgroup == "word":
+            tokens.add(run)
+        else:
+            tokens.update(run)
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def parse_query(query: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Split a search query into required tokens and a trailing word prefix.
+
+    CJK runs become their bigrams (a single character stays a unigram). The
+    last Latin word is a prefix unless the query ends with whitespace.
+
+    Returns:
+        Tuple of (tokens every match must contain, prefix or None)
+    """
+    terms: List[str] = []
+    prefix = None
+    normalized = _normalize(query)
+    for match in _TOKEN_RE.finditer(normalized):
+        run = match.group()
+        if match.lastgroup == "word":
+            if match.end() == len(normalized):
+                prefix = run
+            else:
+                terms.append(run)
+        elif len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[j:j + 2] for j in range(len(run) - 1))
+    return list(dict.fromkeys(terms)), prefix
+
+
+@dataclass
+class _Document:
+    key: ChannelKey
+    stream: PlatformStream
+    tokens: FrozenSet[str]
+
+
+def _document_tokens(stream: PlatformStream) -> FrozenSet[str]:
+    tokens = tokenize(stream.title) | tokenize(stream.game_name)
+    for tag in stream.tags or ():
+        tokens |= tokenize(tag)
+    return frozenset(tokens)
+
+
+class StreamSearchIndex:
+    """Incrementally maintained inverted index of live streams."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._docs: List[Optional[_Document]] = []
+        self._free: List[int] = []
+        self._viewers = array("q")
+        self._by_channel: Dict[ChannelKey, Dict[str, int]] = {}
+        self._postings: Dict[str, array] = {}
+        self._order = array("I")
+        self._unsorted: Set[str] = set()
+        self._order_unsorted = False
+        self._vocabulary: Optional[List[str]] = None
+        self._indexed_keys: Set[ChannelKey] = set()
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self._docs) - len(self._free)
+
+    async def __call__(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        """Scheduler listener entry point."""
+        self.apply(snapshots)
+
+    def covers(self, keys: Iterable[ChannelKey]) -> bool:
+        """Whether every channel in ``keys`` has been indexed at least once."""
+        return self._indexed_keys.issuperset(keys)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def apply(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        """
+        Bring the index in line with fresh snapshots.
+
+        Snapshots carrying an error are skipped, so a failing platform keeps
+        its last known streams searchable.
+        """
+        for key, snapshot in snapshots.items():
+            if snapshot.error_code:
+                continue
+            self._indexed_keys.add(key)
+            current = {s.platform_stream_id: s for s in snapshot.streams}
+            indexed = self._by_channel.get(key, {})
+            for stream_id in [s for s in indexed if s not in current]:
+                self._remove(key, stream_id)
+            for stream_id, stream in current.items():
+                slot = indexed.get(stream_id)
+                if slot is None:
+                    self._add(key, stream)
+                else:
+                    self._update(slot, stream)
+
+    def prune(self, is_tracked: Callable[[ChannelKey], bool]) -> int:
+        """
+        Drop the streams of channels nobody follows any more.
+
+        Returns:
+            Number of documents removed
+        """
+        removed = 0
+        for key in [k for k in self._indexed_keys if not is_tracked(k)]:
+            for stream_id in list(self._by_channel.get(key, {})):
+                self._remove(key, stream_id)
+                removed += 1
+            self._indexed_keys.discard(key)
+        return removed
+
+    def _add(self, key: ChannelKey, stream: PlatformStream) -> None:
+        document = _Document(key, stream, _document_tokens(stream))
+        if self._free:
+            slot = self._free.pop()
+            self._docs[slot] = document
+            self._viewers[slot] = stream.viewer_count
+        else:
+            slot = len(self._docs)
+            self._docs.append(document)
+            self._viewers.append(stream.viewer_count)
+        self._by_channel.setdefault(key, {})[stream.platform_stream_id] = slot
+        self._order.append(slot)
+        self._order_unsorted = True
+        self._post(slot, document.tokens)
+        self.updates += 1
+
+    def _remove(self, key: ChannelKey, stream_id: str) -> None:
+        streams = self._by_channel[key]
+        slot = streams.pop(stream_id)
+        if not streams:
+            del self._by_channel[key]
+        document = self._docs[slot]
+        self._unpost(slot, document.tokens)
+        self._order.remove(slot)
+        self._docs[slot] = None
+        self._free.append(slot)
+        self.updates += 1
+
+    def _update(self, slot: int, stream: PlatformStream) -> None:
+        document = self._docs[slot]
+        before = document.stream
+        if before == stream:
+            return
+        tokens = document.tokens
+        if (before.title, before.game_name, before.tags) != (stream.title, stream.game_name, stream.tags):
+            tokens = _document_tokens(stream)
+            self._unpost(slot, document.tokens - tokens)
+            self._post(slot, tokens - document.tokens)
+        if before.viewer_count != stream.viewer_count:
+            self._viewers[slot] = stream.viewer_count
+            self._unsorted.update(tokens)
+            self._order_unsorted = True
+        self._docs[slot] = _Document(document.key, stream, tokens)
+        self.updates += 1
+
+    def _post(self, slot: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                self._postings[token] = array("I", (slot,))
+                self._vocabulary = None
+            else:
+                posting.append(slot)
+                self._unsorted.add(token)
+
+    def _unpost(self, slot: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            posting = self._postings[token]
+            posting.remove(slot)
+            if not posting:
+                del self._postings[token]
+                self._unsorted.discard(token)
+                self._vocabulary = None
+
+    def _posting(self, token: str) -> array:
+        """Posting list of ``token`` in descending viewer order."""
+        posting = self._postings[token]
+        if token in self._unsorted:
+            posting = self._postings[token] = array("I", sorted(posting, key=self._viewers.__getitem__, reverse=True))
+            self._unsorted.discard(token)
+        return posting
+
+    def _ordered(self) -> array:
+        """Every document slot in descending viewer order."""
+        if self._order_unsorted:
+            self._order = array("I", sorted(self._order, key=self._viewers.__getitem__, reverse=True))
+            self._order_unsorted = False
+        return self._order
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str = "",
+        keys: Optional[Set[ChannelKey]] = None,
+        platform: Optional[str] = None,
+        game_name: Optional[str] = None,
+        tags: Optional[Sequence[str]] = None,
+        min_viewers: Optional[int] = None,
+        max_viewers: Optional[int] = None
+    ) -> List[Tuple[ChannelKey, PlatformStream]]:
+        """
+        Find live streams matching ``query`` and the filters.
+
+        Args:
+            query: Free text over title, game name and tags
+            keys: Only streams of these channels (the user's channels)
+            platform: Only streams of this platform
+            game_name: Exact game/category name
+            tags: Tags every match must carry (case-insensitive)
+            min_viewers: Minimum viewer count
+            max_viewers: Maximum viewer count
+
+        Returns:
+            (channel, stream) pairs ordered by viewer count, highest first
+        """
+        terms, prefix = parse_query(query)
+        candidates = self._candidates(terms, prefix)
+        check_prefix = prefix is not None and bool(terms)
+        start, end = self._viewer_range(candidates, min_viewers, max_viewers)
+        if keys is not None:
+            # A user follows few channels: scanning their streams beats
+            # walking a long posting list
+            owned = [slot for key in keys for slot in self._by_channel.get(key, {}).values()]
+            if len(owned) < end - start:
+                candidates = sorted(owned, key=self._viewers.__getitem__, reverse=True)
+                check_prefix = prefix is not None
+                start, end = self._viewer_range(candidates, min_viewers, max_viewers)
+        wanted_tags = {_normalize(t) for t in tags or ()}
+        docs = self._docs
+        results = []
+        for slot in candidates[start:end]:
+            document = docs[slot]
+            if keys is not None and document.key not in keys:
+                continue
+            if platform and document.key.platform != platform:
+                continue
+            stream = document.stream
+            if game_name is not None and stream.game_name != game_name:
+                continue
+            if wanted_tags and not wanted_tags.issubset(_normalize(t) for t in stream.tags or ()):
+                continue
+            if terms and not document.tokens.issuperset(terms):
+                continue
+            if check_prefix and not any(token.startswith(prefix) for token in document.tokens):
+                continue
+            results.append((document.key, stream))
+        return results
+
+    def _candidates(self, terms: List[str], prefix: Optional[str]) -> Sequence[int]:
+        if terms:
+            if any(term not in self._postings for term in terms):
+                return ()
+            return self._posting(min(terms, key=lambda term: len(self._postings[term])))
+        if prefix:
+            vocabulary = self._sorted_vocabulary()
+            slots: Set[int] = set()
+            for i in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+                if not vocabulary[i].startswith(prefix):
+                    break
+                slots.update(self._postings[vocabulary[i]])
+            return sorted(slots, key=self._viewers.__getitem__, reverse=True)
+        return self._ordered()
+
+    def _sorted_vocabulary(self) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        return self._vocabulary
+
+    def _viewer_range(
+        self,
+        slots: Sequence[int],
+        min_viewers: Optional[int],
+        max_viewers: Optional[int]
+    ) -> Tuple[int, int]:
+        def first_below(limit: int) -> int:
+            # slots are in descending viewer order
+            lo, hi = 0, len(slots)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._viewers[slots[mid]] >= limit:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        start = first_below(max_viewers + 1) if max_viewers is not None else 0
+        end = first_below(min_viewers) if min_viewers is not None else len(slots)
+        return start, max(start, end)
+
+    def stats(self) -> Dict[str, int]:
+        """Return index size counters."""
+        return {
+            "documents": len(self),
+            "channels": len(self._indexed_keys),
+            "tokens": len(self._postings),
+            "postings": sum(len(p) for p in self._postings.values()),
+            "updates": self.updates,
+        }
+
+
+def stream_search_listener(scheduler: StreamRefreshScheduler, index: StreamSearchIndex) -> RefreshListener:
+    """
+    Build a scheduler listener keeping ``index`` in line with refreshes.
+
+    Only channels this worker owns are indexed: another worker's channels
+    are refreshed here on demand at best, so their postings would go stale.
+    Channels that moved to another worker are dropped.
+
+    Args:
+        scheduler: Scheduler whose subscriptions and ownership tell which
+                   channels are indexed
+        index: Index to update
+
+    Returns:
+        Coroutine function to pass to ``scheduler.add_listener``
+    """
+    async def update(snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        index.apply({key: snapshot for key, snapshot in snapshots.items() if scheduler.is_owned(key)})
+        index.prune(lambda key: scheduler.is_owned(key) and bool(scheduler.subscriptions_for(key)))
+
+    return update
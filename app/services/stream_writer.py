@@ -0,0 +1,248 @@
+"""Incremental writer persisting scheduler snapshots to the ``streams`` table.
+
+The writer remembers the last row it wrote for every live stream and, per
+refresh, only sends what changed: new streams, ended streams
+(``is_live=false`` plus ``ended_at``) and streams whose fields changed. All
+of it goes out as bulk upserts of at most ``batch_size`` rows. Changes that
+touch nothing but ``viewer_count`` can be throttled per stream so viewer
+churn does not rewrite (and re-index) the same rows every cycle; the latest
+count is written once the throttle window has passed.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.blocking import run_blocking
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.models.stream import PlatformStream
+from app.services.batch_planner import chunked
+from app.services.refresh_scheduler import ChannelSnapshot
+from app.services.supabase_service import fetch_live_stream_rows, upsert_streams
+
+logger = logging.getLogger(__name__)
+
+#: (channels.id, platform_stream_id)
+StreamRowKey = Tuple[str, str]
+
+RowsWriter = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+RowsLoader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+SubscriptionLookup = Callable[[ChannelKey], List[ChannelSubscription]]
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def stream_row(subscription: ChannelSubscription, stream: PlatformStream) -> Dict[str, Any]:
+    """Build the ``streams`` row of a live stream for one channel row."""
+    return {
+        "channel_id": subscription.id,
+        "platform_stream_id": stream.platform_stream_id,
+        "title": stream.title,
+        "description": stream.description,
+        "thumbnail_url": stream.thumbnail_url,
+        "viewer_count": stream.viewer_count,
+        "game_name": stream.game_name,
+        "tags": stream.tags,
+        "started_at": stream.started_at.isoformat(),
+        "is_live": True,
+        "ended_at": None,
+    }
+
+
+class StreamStateWriter:
+    """Writes minimal per-cycle diffs of stream state."""
+
+    def __init__(
+        self,
+        subscriptions_for: SubscriptionLookup,
+        write_rows: RowsWriter,
+        load_live_rows: Optional[RowsLoader] = None,
+        viewer_update_interval: float = 0.0,
+        batch_size: int = 500,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize writer.
+
+        Args:
+            subscriptions_for: Maps a platform channel to its ``channels`` rows
+            write_rows: Coroutine upserting a batch of complete rows
+            load_live_rows: Coroutine returning the rows currently live in the
+                            table, used once to seed the written state
+            viewer_update_interval: Minimum seconds between viewer-count-only
+                                    writes of one stream (0 = every change)
+            batch_size: Maximum rows per upsert request
+            clock: Wall-clock time source (injectable for tests)
+        """
+        self.subscriptions_for = subscriptions_for
+        self.write_rows = write_rows
+        self.load_live_rows = load_live_rows
+        self.viewer_update_interval = viewer_update_interval
+        self.batch_size = batch_size
+        self._clock = clock
+        self._written: Dict[StreamRowKey, Dict[str, Any]] = {}
+        self._written_at: Dict[StreamRowKey, float] = {}
+        self._by_channel: Dict[str, Set[StreamRowKey]] = defaultdict(set)
+        self._seeded = load_live_rows is None
+        self._lock = asyncio.Lock()
+        self.cycles = 0
+        self.rows_written = 0
+        self.write_requests = 0
+        self.rows_unchanged = 0
+        self.viewer_updates_deferred = 0
+
+    async def __call__(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        """Scheduler listener entry point."""
+        await self.write(snapshots)
+
+    async def write(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> int:
+        """
+        Persist the changes contained in a batch of snapshots.
+
+        Snapshots carrying an error are skipped so streams of a failing
+        platform are neither rewritten nor marked ended.
+
+        Args:
+            snapshots: Fresh snapshots from the scheduler
+
+        Returns:
+            Number of rows written
+        """
+        async with self._lock:
+            await self._seed()
+            self.cycles += 1
+            now = self._clock()
+            changes = self.diff(snapshots, now)
+            written = 0
+            for batch in chunked(list(changes.items()), self.batch_size):
+                rows = [row for _, row in batch]
+                await self.write_rows(rows)
+                self.write_requests += 1
+                written += len(rows)
+                for key, row in batch:
+                    if row["is_live"]:
+                        self._remember(key, row, now)
+                    else:
+                        self._forget(key)
+            self.rows_written += written
+            return written
+
+    def diff(self, snapshots: Dict[ChannelKey, ChannelSnapshot], now: float) -> Dict[StreamRowKey, Dict[str, Any]]:
+        """
+        Compute the rows that must be written for ``snapshots``.
+
+        Args:
+            snapshots: Fresh snapshots from the scheduler
+            now: Current time
+
+        Returns:
+            Row per stream key that is new, ended or changed
+        """
+        changes: Dict[StreamRowKey, Dict[str, Any]] = {}
+        for key, snapshot in snapshots.items():
+            if snapshot.error_code:
+                continue
+            for subscription in self.subscriptions_for(key):
+                current = {
+                    (subscription.id, s.platform_stream_id): stream_row(subscription, s)
+                    for s in snapshot.streams
+                }
+                for row_key, row in current.items():
+                    if self._needs_write(row_key, row, now):
+                        changes[row_key] = row
+                for row_key, row in self._live_rows_of(subscription.id):
+                    if row_key not in current:
+                        changes[row_key] = {**row, "is_live": False, "ended_at": _iso(now)}
+        return changes
+
+    def _needs_write(self, key: StreamRowKey, row: Dict[str, Any], now: float) -> bool:
+        previous = self._written.get(key)
+        if previous is None:
+            return True
+        if previous == row:
+            self.rows_unchanged += 1
+            return False
+        if {**previous, "viewer_count": row["viewer_count"]} == row:
+            # Only the viewer count moved: coalesce within the throttle window
+            if now - self._written_at.get(key, 0.0) < self.viewer_update_interval:
+                self.viewer_updates_deferred += 1
+                return False
+        return True
+
+    def _live_rows_of(self, channel_row_id: str) -> List[Tuple[StreamRowKey, Dict[str, Any]]]:
+        return [(key, self._written[key]) for key in self._by_channel.get(channel_row_id, ())]
+
+    def _remember(self, key: StreamRowKey, row: Dict[str, Any], written_at: float) -> None:
+        self._written[key] = row
+        self._written_at[key] = written_at
+        self._by_channel[key[0]].add(key)
+
+    def _forget(self, key: StreamRowKey) -> None:
+        self._written.pop(key, None)
+        self._written_at.pop(key, None)
+        keys = self._by_channel.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_channel[key[0]]
+
+    async def _seed(self) -> None:
+        if self._seeded:
+            return
+        try:
+            rows = await self.load_live_rows()
+        except Exception:
+            logger.exception("Could not load live streams; every live stream will be rewritten once")
+            rows = []
+        for row in rows:
+            key = (row["channel_id"], row["platform_stream_id"])
+            self._remember(key, {**row, "is_live": True, "ended_at": None}, 0.0)
+        self._seeded = True
+
+    def stats(self) -> Dict[str, int]:
+        """Return write counters."""
+        return {
+            "cycles": self.cycles,
+            "tracked_streams": len(self._written),
+            "rows_written": self.rows_written,
+            "write_requests": self.write_requests,
+            "rows_unchanged": self.rows_unchanged,
+            "viewer_updates_deferred": self.viewer_updates_deferred,
+        }
+
+
+def create_stream_writer(
+    subscriptions_for: SubscriptionLookup,
+    viewer_update_interval: float = 0.0,
+    batch_size: int = 500
+) -> StreamStateWriter:
+    """
+    Build a writer persisting through the admin Supabase client.
+
+    Args:
+        subscriptions_for: Maps a platform channel to its ``channels`` rows
+        viewer_update_interval: Throttle for viewer-count-only writes
+        batch_size: Maximum rows per upsert request
+
+    Returns:
+        Writer to register with ``scheduler.add_listener``
+    """
+    async def write_rows(rows: List[Dict[str, Any]]) -> None:
+        # Supabase SDKは同期クライアントのためスレッドで実行
+        await run_blocking(upsert_streams, rows)
+
+    async def load_live_rows() -> List[Dict[str, Any]]:
+        return await run_blocking(fetch_live_stream_rows)
+
+    return StreamStateWriter(
+        subscriptions_for=subscriptions_for,
+        write_rows=write_rows,
+        load_live_rows=load_live_rows,
+        viewer_update_interval=viewer_update_interval,
+        batch_size=batch_size,
+    )
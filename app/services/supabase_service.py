@@ -0,0 +1,535 @@
+"""Database operations used by the services layer."""
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.core.database import get_supabase_admin_client
+from app.models.channel import ChannelKey, ChannelSubscription
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def _to_subscription(row: Dict[str, Any]) -> Optional[ChannelSubscription]:
+    platform = (row.get("platforms") or {}).get("name")
+    if not platform:
+        return None
+    return ChannelSubscription(
+        id=row["id"],
+        user_id=row["user_id"],
+        key=ChannelKey(platform, row["channel_id"]),
+    )
+
+
+def fetch_tracked_channels(page_size: int = 1000, client: Optional["Client"] = None) -> List[ChannelSubscription]:
+    """
+    Load every active, subscribed channel row across all users.
+    
+    Pages through the rows, so PostgREST's max-rows limit does not leave
+    subscriptions unpolled.
+    
+    Args:
+        page_size: Rows per request
+        client: Supabase client (defaults to the admin client, bypassing RLS)
+        
+    Returns:
+        One ChannelSubscription per ``channels`` row
+    """
+    client = client or get_supabase_admin_client()
+    subscriptions = []
+    offset = 0
+    while True:
+        response = (
+            client.table("channels")
+            .select("id,user_id,channel_id,platforms(name)")
+            .eq("is_active", True)
+            .eq("is_subscribed", True)
+            .order("id")
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        rows = response.data or []
+        for row in rows:
+            subscription = _to_subscription(row)
+            if subscription is not None:
+                subscriptions.append(subscription)
+        if len(rows) < page_size:
+            return subscriptions
+        offset += page_size
+
+
+def fetch_platforms(client: Optional["Client"] = None) -> List[Dict[str, Any]]:
+    """
+    Load the ``platforms`` master table.
+    
+    Args:
+        client: Supabase client (defaults to the admin client)
+        
+    Returns:
+        Every platform row
+    """
+    client = client or get_supabase_admin_client()
+    response = (
+        client.table("platforms")
+        .select("id,name,display_name,api_base_url,oauth_url,required_scopes,is_active,created_at")
+        .execute()
+    )
+    return response.data or []
+
+
+def fetch_system_settings(client: Optional["Client"] = None) -> Dict[str, str]:
+    """
+    Load the ``system_settings`` key/value table.
+    
+    Args:
+        client: Supabase client (defaults to the admin client; table is admin-only)
+        
+    Returns:
+        Mapping of setting key to value
+    """
+    client = client or get_supabase_admin_client()
+    response = client.table("system_settings").select("key,value").execute()
+    return {row["key"]: row["value"] for row in response.data or []}
+
+
+def user_live_streams_query(
+    client: Any,
+    user_id: str,
+    platform: Optional[str] = None,
+    category: Optional[str] = None
+) -> Any:
+    """
+    Build the live stream list query of a user's subscribed channels.
+    
+    The builder API is the same on the sync and async SDK clients; the
+    caller runs ``execute()`` (awaited for an async client).
+    
+    Args:
+        client: Sync or async Supabase client
+        user_id: Owner of the channels
+        platform: Only streams of this platform name
+        category: Only streams with this game/category name
+        
+    Returns:
+        PostgREST request builder
+    """
+    query = (
+        client.table("streams")
+        .select(
+            "id,platform_stream_id,title,thumbnail_url,viewer_count,game_name,started_at,is_live,"
+            "channels!inner(id,channel_id,channel_name,display_name,user_id,is_subscribed,platforms!inner(name))"
+        )
+        .eq("is_live", True)
+        .eq("channels.user_id", user_id)
+        .eq("channels.is_subscribed", True)
+    )
+    if platform:
+        query = query.eq("channels.platforms.name", platform)
+    if category:
+        query = query.eq("game_name", category)
+    return query
+
+
+def fetch_user_live_streams(
+    user_id: str,
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    client: Optional["Client"] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load the live streams of a user's subscribed channels.
+    
+    Args:
+        user_id: Owner of the channels
+        platform: Only streams of this platform name
+        category: Only streams with this game/category name
+        client: Supabase client (defaults to the admin client; rows are
+                scoped to ``user_id`` explicitly)
+        
+    Returns:
+        ``streams`` rows with the embedded channel and platform
+    """
+    client = client or get_supabase_admin_client()
+    return user_live_streams_query(client, user_id, platform, category).execute().data or []
+
+
+#: ``user_api_keys`` columns used by the OAuth token manager
+API_KEY_COLUMNS = "id,user_id,access_token,refresh_token,token_expires_at,is_active,updated_at,platforms!inner(name)"
+
+
+def fetch_expiring_api_keys(
+    expires_before: str,
+    updated_before: str,
+    platforms: List[str],
+    limit: int,
+    client: Optional["Client"] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load active, refreshable OAuth tokens that expire soon, soonest first.
+    
+    Rows updated after ``updated_before`` are skipped: another worker holds
+    their refresh lease (see :func:`claim_api_key`).
+    
+    Args:
+        expires_before: ISO timestamp; only tokens expiring earlier
+        updated_before: ISO timestamp; lease cut-off
+        platforms: Platform names with a configured OAuth client
+        limit: Maximum rows returned
+        client: Supabase client (defaults to the admin client; tokens are secret)
+        
+    Returns:
+        ``user_api_keys`` rows with the embedded platform name
+    """
+    client = client or get_supabase_admin_client()
+    response = (
+        client.table("user_api_keys")
+        .select(API_KEY_COLUMNS)
+        .eq("is_active", True)
+        .not_.is_("refresh_token", "null")
+        .lt("token_expires_at", expires_before)
+        .lt("updated_at", updated_before)
+        .in_("platforms.name", platforms)
+        .order("token_expires_at")
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+def fetch_api_key(user_id: str, platform: str, client: Optional["Client"] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load a user's OAuth token row for one platform.
+    
+    Args:
+        user_id: Owner of the token
+        platform: Platform name
+        client: Supabase client (defaults to the admin client; tokens are secret)
+        
+    Returns:
+        The ``user_api_keys`` row, or None if the user has not connected the platform
+    """
+    client = client or get_supabase_admin_client()
+    response = (
+        client.table("user_api_keys")
+        .select(API_KEY_COLUMNS)
+        .eq("user_id", user_id)
+        .eq("platforms.name", platform)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def claim_api_key(key_id: str, seen_updated_at: str, claimed_at: str, client: Optional["Client"] = None) -> bool:
+    """
+    Take the refresh lease of a token row (compare-and-set on ``updated_at``).
+    
+    Only one of several workers that read the same row version succeeds.
+    
+    Args:
+        key_id: ``user_api_keys.id``
+        seen_updated_at: ``updated_at`` as read with the row
+        claimed_at: New ``updated_at`` marking the lease
+        client: Supabase client (defaults to the admin client)
+        
+    Returns:
+        Whether this caller now holds the lease
+    """
+    client = client or get_supabase_admin_client()
+    response = (
+        client.table("user_api_keys")
+        .update({"updated_at": claimed_at})
+        .eq("id", key_id)
+        .eq("updated_at", seen_updated_at)
+        .execute()
+    )
+    return bool(response.data)
+
+
+def update_api_key(key_id: str, fields: Dict[str, Any], client: Optional["Client"] = None) -> None:
+    """
+    Update one ``user_api_keys`` row.
+    
+    Args:
+        key_id: ``user_api_keys.id``
+        fields: Columns to set
+        client: Supabase client (defaults to the admin client)
+    """
+    client = client or get_supabase_admin_client()
+    client.table("user_api_keys").update(fields).eq("id", key_id).execute()
+
+
+#: ``streams`` columns maintained by the stream writer
+STREAM_STATE_COLUMNS = (
+    "channel_id,platform_stream_id,title,description,thumbnail_url,"
+    "viewer_count,game_name,tags,started_at,is_live,ended_at"
+)
+
+
+def fetch_live_stream_rows(page_size: int = 1000, client: Optional["Client"] = None) -> List[Dict[str, Any]]:
+    """
+    Load every ``streams`` row currently marked live.
+    
+    Pages through the rows, so PostgREST's max-rows limit does not leave
+    live rows unseeded (and never marked ended).
+    
+    Args:
+        page_size: Rows per request
+        client: Supabase client (defaults to the admin client, bypassing RLS)
+        
+    Returns:
+        Rows with the columns maintained by the stream writer
+    """
+    client = client or get_supabase_admin_client()
+    live: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        response = (
+            client.table("streams")
+            .select(STREAM_STATE_COLUMNS)
+            .eq("is_live", True)
+            .order("channel_id")
+            .order("platform_stream_id")
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        rows = response.data or []
+        live.extend(rows)
+        if len(rows) < page_size:
+            return live
+        offset += page_size
+
+
+def fetch_stream_start_history(
+    since: str,
+    page_size: int = 1000,
+    client: Optional["Client"] = None
+) -> List[Tuple[ChannelKey, float]]:
+    """
+    Load the start times of every stream since a point in time.
+    
+    Pages through the rows, so PostgREST's max-rows limit does not cut the
+    history short.
+    
+    Args:
+        since: ISO timestamp; older streams are ignored
+        page_size: Rows per request
+        client: Supabase client (defaults to the admin client, bypassing RLS)
+        
+    Returns:
+        (platform channel, started_at as Unix time) per ``streams`` row
+    """
+    client = client or get_supabase_admin_client()
+    starts: List[Tuple[ChannelKey, float]] = []
+    offset = 0
+    while True:
+        response = (
+            client.table("streams")
+            .select("started_at,channels!inner(channel_id,platforms!inner(name))")
+            .gte("started_at", since)
+            .order("started_at")
+            .order("id")
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        rows = response.data or []
+        for row in rows:
+            channel = row.get("channels") or {}
+            platform = (channel.get("platforms") or {}).get("name")
+            if platform and row.get("started_at"):
+                started_at = datetime.fromisoformat(row["started_at"].replace("Z", "+00:00"))
+                starts.append((ChannelKey(platform, channel["channel_id"]), started_at.timestamp()))
+        if len(rows) < page_size:
+            return starts
+        offset += page_size
+
+
+def upsert_streams(rows: List[Dict[str, Any]], client: Optional["Client"] = None) -> None:
+    """
+    Insert or update ``streams`` rows in one request.
+    
+    Rows are matched on (channel_id, platform_stream_id); every row must
+    carry the same columns.
+    
+    Args:
+        rows: Complete stream rows
+        client: Supabase client (defaults to the admin client, bypassing RLS)
+    """
+    if not rows:
+        return
+    client = client or get_supabase_admin_client()
+    client.table("streams").upsert(rows, on_conflict="channel_id,platform_stream_id").execute()
+
+
+def insert_viewer_samples(rows: List[Dict[str, Any]], client: Optional["Client"] = None) -> None:
+    """
+    Insert ``stream_viewer_samples`` rows in one request.
+    
+    Samples already stored (same stream and time, e.g. a retried flush)
+    are skipped.
+    
+    Args:
+        rows: Sample rows (platform, platform_channel_id, platform_stream_id,
+              sampled_at, viewer_count)
+        client: Supabase client (defaults to the admin client, bypassing RLS)
+    """
+    if not rows:
+        return
+    client = client or get_supabase_admin_client()
+    client.table("stream_viewer_samples").upsert(
+        rows, on_conflict="platform,platform_stream_id,sampled_at", ignore_duplicates=True,
+    ).execute()
+
+
+def viewer_samples_query(client: Any, platform: str, channel_ids: List[str], since: str) -> Any:
+    """
+    Build the ``stream_viewer_samples`` query of some channels of one platform.
+    
+    Ordered by (platform_stream_id, sampled_at), the table's key within a
+    platform, so the caller can page with ``range()``.
+    
+    Args:
+        client: Sync or async Supabase client
+        platform: Platform name
+        channel_ids: Platform channel ids
+        since: ISO timestamp; older samples are ignored
+        
+    Returns:
+        PostgREST request builder
+    """
+    return (
+        client.table("stream_viewer_samples")
+        .select("platform,platform_channel_id,platform_stream_id,sampled_at,viewer_count")
+        .eq("platform", platform)
+        .in_("platform_channel_id", channel_ids)
+        .gte("sampled_at", since)
+        .order("platform_stream_id")
+        .order("sampled_at")
+    )
+
+
+def user_streams_search_query(
+    client: Any,
+    user_id: str,
+    query: Optional[str] = None,
+    platform: Optional[str] = None,
+    platform_id: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    min_viewers: Optional[int] = None,
+    max_viewers: Optional[int] = None,
+    is_live: Optional[bool] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Any:
+    """
+    Build the full-text search query over a user's ``streams`` rows.
+    
+    The builder API is the same on the sync and async SDK clients; the
+    caller runs ``execute()`` (awaited for an async client).
+    
+    Args:
+        client: Sync or async Supabase client
+        user_id: Owner of the channels
+        query: Websearch-style query over the stream title
+        platform: Platform name filter
+        platform_id: ``platforms.id`` filter
+        game_name: Exact game/category name
+        tags: Tags every row must carry
+        min_viewers: Minimum viewer count
+        max_viewers: Maximum viewer count
+        is_live: Live state filter
+        started_after: Lower bound of ``started_at`` (ISO datetime)
+        started_before: Upper bound of ``started_at`` (ISO datetime)
+        limit: Page size
+        offset: Page offset
+        
+    Returns:
+        PostgREST request builder (rows ordered by viewer count, with exact count)
+    """
+    builder = (
+        client.table("streams")
+        .select(
+            "id,platform_stream_id,title,description,thumbnail_url,viewer_count,game_name,tags,started_at,is_live,"
+            "channels!inner(id,channel_id,user_id,platform_id,is_subscribed,platforms!inner(name))",
+            count="exact",
+        )
+        .eq("channels.user_id", user_id)
+        # Same rows the streams RLS policy exposes to the user
+        .eq("channels.is_subscribed", True)
+    )
+    if query:
+        # text_search() returns a builder without order()/range(); same wfts filter
+        builder = builder.filter("title", "wfts", query)
+    if platform:
+        builder = builder.eq("channels.platforms.name", platform)
+    if platform_id:
+        builder = builder.eq("channels.platform_id", platform_id)
+    if game_name:
+        builder = builder.eq("game_name", game_name)
+    if tags:
+        builder = builder.contains("tags", tags)
+    if min_viewers is not None:
+        builder = builder.gte("viewer_count", min_viewers)
+    if max_viewers is not None:
+        builder = builder.lte("viewer_count", max_viewers)
+    if is_live is not None:
+        builder = builder.eq("is_live", is_live)
+    if started_after:
+        builder = builder.gte("started_at", started_after)
+    if started_before:
+        builder = builder.lte("started_at", started_before)
+    return (
+        builder.order("viewer_count", desc=True)
+        .order("id", desc=True)
+        .range(offset, offset + limit - 1)
+    )
+
+
+def search_user_streams(
+    user_id: str,
+    query: Optional[str] = None,
+    platform: Optional[str] = None,
+    platform_id: Optional[str] = None,
+    game_name: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    min_viewers: Optional[int] = None,
+    max_viewers: Optional[int] = None,
+    is_live: Optional[bool] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    client: Optional["Client"] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Full-text search over a user's ``streams`` rows (live or historical).
+    
+    Args:
+        user_id: Owner of the channels
+        query: Websearch-style query over the stream title
+        platform: Platform name filter
+        platform_id: ``platforms.id`` filter
+        game_name: Exact game/category name
+        tags: Tags every row must carry
+        min_viewers: Minimum viewer count
+        max_viewers: Maximum viewer count
+        is_live: Live state filter
+        started_after: Lower bound of ``started_at`` (ISO datetime)
+        started_before: Upper bound of ``started_at`` (ISO datetime)
+        limit: Page size
+        offset: Page offset
+        client: Supabase client (defaults to the admin client; rows are
+                scoped to ``user_id`` explicitly)
+        
+    Returns:
+        Tuple of (rows ordered by viewer count, total match count)
+    """
+    client = client or get_supabase_admin_client()
+    response = user_streams_search_query(
+        client, user_id, query, platform, platform_id, game_name, tags, min_viewers, max_viewers, is_live,
+        started_after, started_before, limit, offset,
+    ).execute()
+    return response.data or [], response.count or 0
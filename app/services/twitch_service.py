@@ -0,0 +1,146 @@
+"""Twitch Helix API service."""
+
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.exceptions import ExternalAPIException
+from app.models.stream import PlatformStream
+from app.services.base import HttpPlatformService
+from app.services.batch_planner import BatchPlanner
+from app.services.resilience import CircuitBreaker
+
+TWITCH_API_BASE_URL = "https://api.twitch.tv/helix"
+TWITCH_TOKEN_URL = "https://id.twitch.tv/oauth2/token"
+
+# Helix GET /streams accepts up to 100 user_id parameters per call
+STREAMS_BATCH_SIZE = 100
+
+
+class TwitchService(HttpPlatformService):
+    """Fetches live streams from Twitch Helix with an app access token."""
+
+    platform = "twitch"
+    fetch_chunk_size = STREAMS_BATCH_SIZE
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str = TWITCH_API_BASE_URL,
+        token_url: str = TWITCH_TOKEN_URL,
+        max_concurrency: int = 8,
+        timeout: float = 20.0,
+        http_client: Optional[httpx.AsyncClient] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False
+    ):
+        """
+        Initialize Twitch service.
+
+        Args:
+            client_id: Twitch application client id
+            client_secret: Twitch application client secret
+            base_url: Helix API base URL
+            token_url: OAuth token endpoint for the client-credentials grant
+            max_concurrency: Maximum concurrent batch calls
+            timeout: Per-request timeout in seconds
+            http_client: Optional preconfigured client
+            breaker: Circuit breaker for Twitch API calls
+            hedge: Hedge slow ``GET /streams`` batch calls
+        """
+        super().__init__(
+            base_url, timeout=timeout, max_connections=max_concurrency, http_client=http_client,
+            breaker=breaker, hedge=hedge,
+        )
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self.streams_planner: BatchPlanner[List[PlatformStream]] = BatchPlanner(
+            self._fetch_streams_batch,
+            batch_size=STREAMS_BATCH_SIZE,
+            max_concurrency=max_concurrency,
+            default=list,
+        )
+
+    async def fetch_live_streams(self, channel_ids: Sequence[str]) -> Dict[str, List[PlatformStream]]:
+        """Fetch live streams for Twitch user ids, 100 ids per Helix call."""
+        return await self.streams_planner.fetch(channel_ids)
+
+    async def health_check(self) -> None:
+        """Fetch one stream page (validates the app token, no quota cost)."""
+        await self._helix_get("/streams", [("first", "1")])
+
+    async def _fetch_streams_batch(self, user_ids: List[str]) -> Dict[str, List[PlatformStream]]:
+        params = [("user_id", user_id) for user_id in user_ids]
+        params.append(("first", str(STREAMS_BATCH_SIZE)))
+        body = await self._helix_get("/streams", params, hedge=True)
+
+        streams: Dict[str, List[PlatformStream]] = defaultdict(list)
+        for item in body.get("data", []):
+            if item.get("type") != "live":
+                continue
+            streams[item["user_id"]].append(self._to_stream(item))
+        return streams
+
+    async def _helix_get(self, path: str, params: List[Any], hedge: bool = False) -> Dict[str, Any]:
+        for attempt in range(2):
+            token = await self._app_token(force=attempt > 0)
+            try:
+                return await self._request(
+                    "GET",
+                    f"{self.base_url}{path}",
+                    hedge=hedge,
+                    params=params,
+                    headers={"Client-Id": self.client_id, "Authorization": f"Bearer {token}"},
+                )
+            except ExternalAPIException as e:
+                # 401: app token revoked or expired early, fetch a new one once
+                if e.details.get("status_code") != 401 or attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    async def _app_token(self, force: bool = False) -> str:
+        """Return a cached app access token (client-credentials grant)."""
+        if not force and self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        async with self._token_lock:
+            if not force and self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            body = await self._request(
+                "POST",
+                self.token_url,
+                data={
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "grant_type": "client_credentials",
+                },
+            )
+            self._token = body["access_token"]
+            # Renew a minute before Twitch expires the token
+            self._token_expires_at = time.monotonic() + float(body.get("expires_in", 3600)) - 60
+            return self._token
+
+    @staticmethod
+    def _to_stream(item: Dict[str, Any]) -> PlatformStream:
+        thumbnail = item.get("thumbnail_url") or None
+        if thumbnail:
+            thumbnail = thumbnail.replace("{width}", "640").replace("{height}", "360")
+        return PlatformStream(
+            platform="twitch",
+            platform_channel_id=item["user_id"],
+            platform_stream_id=item["id"],
+            title=(item.get("title") or "")[:1000],  # EDGE-103
+            thumbnail_url=thumbnail,
+            viewer_count=item.get("viewer_count", 0),
+            game_name=item.get("game_name") or None,
+            tags=item.get("tags") or None,
+            started_at=datetime.fromisoformat(item["started_at"].replace("Z", "+00:00")),
+        )
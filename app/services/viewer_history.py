@@ -0,0 +1,604 @@
+"""In-memory viewer-count time series of live streams.
+
+Every refresh appends each live stream's viewer count to fixed-width ring
+buffers, one per resolution tier (by default 1-minute slots for an hour,
+10-minute slots for six hours and hourly slots for two days). A coarser
+slot is filled with the mean of the finer slots once its period has passed,
+so older history is downsampled automatically.
+
+All per-stream state lives in preallocated ``array`` slabs indexed by a
+stream's slot number instead of per-sample objects: a tracked stream costs
+a few hundred bytes however many samples it has seen. Exact whole-stream
+aggregates (peak, time-weighted viewer-seconds, observed duration) are
+kept next to the rings, so stats read a handful of array cells per stream
+and aggregate them with C-level builtins over the gathered cells.
+
+Raw samples are queued in the same compact form and written to the
+``stream_viewer_samples`` table in bulk by a background flush loop.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from datetime import datetime, timezone
+from itertools import compress
+from operator import itemgetter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.blocking import run_blocking
+from app.models.channel import ChannelKey
+from app.models.stream import PlatformStream
+from app.services.refresh_scheduler import ChannelSnapshot
+from app.services.supabase_service import insert_viewer_samples
+
+logger = logging.getLogger(__name__)
+
+#: (seconds per slot, slots kept) from finest to coarsest
+DEFAULT_TIERS: Tuple[Tuple[int, int], ...] = ((60, 60), (600, 36), (3600, 48))
+#: Ring cell without a sample
+NO_SAMPLE = -1
+
+#: (platform channel, platform_stream_id)
+StreamKey = Tuple[ChannelKey, str]
+SampleWriter = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _gather(values: Sequence, slots: Sequence[int]) -> Tuple:
+    """Cells ``slots`` of an array as a tuple (one C-level pass)."""
+    if not slots:
+        return ()
+    if len(slots) == 1:
+        return (values[slots[0]],)
+    return itemgetter(*slots)(values)
+
+
+class _Tier:
+    """One resolution: a ring of ``size`` cells per stream slot."""
+
+    def __init__(self, resolution: int, size: int):
+        self.resolution = resolution
+        self.size = size
+        self.values = array("i")
+        #: Absolute bucket number (time // resolution) of each slot's newest cell
+        self.heads = array("q")
+
+    def grow(self, slots: int) -> None:
+        self.values.extend(array("i", [NO_SAMPLE]) * (slots * self.size))
+        self.heads.extend(array("q", [-1]) * slots)
+
+    def clear(self, slot: int) -> None:
+        base = slot * self.size
+        self.values[base:base + self.size] = array("i", [NO_SAMPLE]) * self.size
+        self.heads[slot] = -1
+
+    def cells(self, slot: int, first: int, last: int) -> List[Tuple[int, int]]:
+        """(bucket, value) of the retained cells with samples in ``[first, last]``."""
+        head = self.heads[slot]
+        base = slot * self.size
+        first = max(first, head - self.size + 1)
+        return [
+            (bucket, self.values[base + bucket % self.size])
+            for bucket in range(first, min(last, head) + 1)
+            if self.values[base + bucket % self.size] != NO_SAMPLE
+        ]
+
+
+class ViewerHistory:
+    """Per-stream viewer rings, whole-stream aggregates and a sample queue."""
+
+    def __init__(
+        self,
+        tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS,
+        max_gap: float = 900.0,
+        retention: float = 86400.0,
+        write_samples: Optional[SampleWriter] = None,
+        flush_interval: float = 60.0,
+        flush_batch_size: int = 1000,
+        max_pending: int = 1_000_000,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize history.
+
+        Args:
+            tiers: ``(seconds per slot, slots kept)`` from finest to coarsest;
+                   each resolution must be a multiple of the previous one and
+                   a ring must cover at least one slot of the next tier
+            max_gap: Longest gap between samples counted as watched at the
+                     earlier sample's viewer count (longer gaps: outages)
+            retention: Seconds an ended stream is kept for stats
+            write_samples: Coroutine inserting sample rows (none: not persisted)
+            flush_interval: Seconds between background flushes
+            flush_batch_size: Maximum rows per insert request
+            max_pending: Queued samples kept when flushing fails; the oldest
+                         are dropped beyond that
+            clock: Wall-clock time source (tests)
+        """
+        for (fine, size), (coarse, _) in zip(tiers, tiers[1:]):
+            if coarse % fine or size * fine < coarse:
+                raise ValueError(f"tier of {fine}s x {size} cannot be downsampled into {coarse}s slots")
+        self.tiers = [_Tier(resolution, size) for resolution, size in tiers]
+        self.max_gap = max_gap
+        self.retention = retention
+        self.write_samples = write_samples
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.max_pending = max_pending
+        self._clock = clock
+
+        self._slots: Dict[StreamKey, int] = {}
+        self._keys: List[Optional[StreamKey]] = []
+        self._by_channel: Dict[ChannelKey, Set[int]] = {}
+        self._free: List[int] = []
+        self._capacity = 0
+        # Whole-stream aggregates, one cell per slot
+        self._peak = array("i")
+        self._current = array("i")
+        self._samples = array("I")
+        self._viewer_seconds = array("d")
+        self._first_at = array("d")
+        self._last_at = array("d")
+        self._live = array("b")
+        # Samples not yet written: slot, time, viewers
+        self._pending_slot = array("I")
+        self._pending_at = array("d")
+        self._pending_viewers = array("i")
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.samples_recorded = 0
+        self.samples_flushed = 0
+        self.samples_dropped = 0
+        self.flush_failures = 0
+
+    def now(self) -> float:
+        """Current wall-clock time of this history."""
+        return self._clock()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    async def __call__(self, snapshots: Dict[ChannelKey, ChannelSnapshot]) -> None:
+        """Scheduler listener entry point."""
+        self.record_snapshots(snapshots)
+
+    def record_snapshots(self, snapshots: Dict[ChannelKey, ChannelSnapshot], now: Optional[float] = None) -> int:
+        """
+        Append one sample per live stream and close streams that ended.
+
+        Snapshots carrying an error are skipped: a failing platform says
+        nothing about its streams.
+
+        Returns:
+            Number of samples recorded
+        """
+        now = self._clock() if now is None else now
+        recorded = 0
+        for key, snapshot in snapshots.items():
+            if snapshot.error_code:
+                continue
+            at = snapshot.fetched_at or now
+            current = set()
+            for stream in snapshot.streams:
+                current.add(self.record(key, stream, at))
+            for slot in self._by_channel.get(key, ()):
+                if slot not in current:
+                    self._live[slot] = 0
+            recorded += len(current)
+        return recorded
+
+    def record(self, key: ChannelKey, stream: PlatformStream, at: float) -> int:
+        """
+        Append one viewer sample of a live stream.
+
+        Returns:
+            Slot of the stream
+        """
+        viewers = max(0, min(stream.viewer_count, 2 ** 31 - 1))
+        slot = self._slot(key, stream.platform_stream_id)
+        if not self._append(slot, viewers, at):
+            return slot
+
+        if len(self._pending_slot) >= self.max_pending:
+            # Writes keep failing: drop the oldest tenth at once
+            drop = max(1, self.max_pending // 10)
+            for queue in (self._pending_slot, self._pending_at, self._pending_viewers):
+                del queue[:drop]
+            self.samples_dropped += drop
+        self._pending_slot.append(slot)
+        self._pending_at.append(at)
+        self._pending_viewers.append(viewers)
+        self.samples_recorded += 1
+        return slot
+
+    def _append(self, slot: int, viewers: int, at: float) -> bool:
+        if self._samples[slot]:
+            gap = at - self._last_at[slot]
+            if gap < 0:
+                # Older than what we have (late fetch result)
+                return False
+            self._viewer_seconds[slot] += self._current[slot] * min(gap, self.max_gap)
+        else:
+            self._first_at[slot] = at
+        self._samples[slot] += 1
+        self._last_at[slot] = at
+        self._current[slot] = viewers
+        self._live[slot] = 1
+        if viewers > self._peak[slot]:
+            self._peak[slot] = viewers
+        self._write(0, slot, int(at // self.tiers[0].resolution), viewers)
+        return True
+
+    def replica(self, rows: Iterable[Dict[str, Any]], live_within: float, now: Optional[float] = None) -> "ViewerHistory":
+        """
+        Build a read-only history from stored ``stream_viewer_samples`` rows.
+
+        Used for channels another worker records. Nothing is queued for
+        writing. A stream counts as live if its newest sample is at most
+        ``live_within`` seconds old (stored samples lag by up to a flush).
+
+        Args:
+            rows: Sample rows (``sampled_at`` as ISO timestamp), any order
+            live_within: Seconds since the newest sample of a live stream
+            now: Current time (default: the clock)
+
+        Returns:
+            History with the same tiers, gap cap and retention
+        """
+        now = self._clock() if now is None else now
+        replica = ViewerHistory(
+            tiers=[(tier.resolution, tier.size) for tier in self.tiers],
+            max_gap=self.max_gap,
+            retention=self.retention,
+            clock=self._clock,
+        )
+        samples = sorted(
+            (
+                datetime.fromisoformat(row["sampled_at"].replace("Z", "+00:00")).timestamp(),
+                ChannelKey(row["platform"], row["platform_channel_id"]),
+                row["platform_stream_id"],
+                row["viewer_count"],
+            )
+            for row in rows
+        )
+        for at, key, stream_id, viewers in samples:
+            replica._append(replica._slot(key, stream_id), viewers, at)
+        for slot in replica._slots.values():
+            if now - replica._last_at[slot] > live_within:
+                replica._live[slot] = 0
+        return replica
+
+    def _write(self, level: int, slot: int, bucket: int, value: int) -> None:
+        tier = self.tiers[level]
+        head = tier.heads[slot]
+        if bucket < head:
+            return
+        base = slot * tier.size
+        if bucket > head:
+            if head >= 0 and level + 1 < len(self.tiers):
+                ratio = self.tiers[level + 1].resolution // tier.resolution
+                if bucket // ratio > head // ratio:
+                    # The coarser slot holding ``head`` is complete: downsample it
+                    coarse = head // ratio
+                    cells = tier.cells(slot, coarse * ratio, coarse * ratio + ratio - 1)
+                    mean = round(sum(v for _, v in cells) / len(cells))
+                    self._write(level + 1, slot, coarse, mean)
+            for skipped in range(max(head + 1, bucket - tier.size + 1), bucket):
+                tier.values[base + skipped % tier.size] = NO_SAMPLE
+            tier.heads[slot] = bucket
+        tier.values[base + bucket % tier.size] = value
+
+    def _slot(self, key: ChannelKey, stream_id: str) -> int:
+        stream_key = (key, stream_id)
+        slot = self._slots.get(stream_key)
+        if slot is not None:
+            return slot
+        if not self._free:
+            self._grow(max(1024, self._capacity))
+        slot = self._free.pop()
+        self._slots[stream_key] = slot
+        self._keys[slot] = stream_key
+        self._by_channel.setdefault(key, set()).add(slot)
+        return slot
+
+    def _grow(self, slots: int) -> None:
+        for values, width in (
+            (self._peak, 0), (self._current, 0), (self._samples, 0), (self._viewer_seconds, 0.0),
+            (self._first_at, 0.0), (self._last_at, 0.0), (self._live, 0),
+        ):
+            values.extend(array(values.typecode, [width]) * slots)
+        for tier in self.tiers:
+            tier.grow(slots)
+        self._keys.extend([None] * slots)
+        self._free.extend(range(self._capacity + slots - 1, self._capacity - 1, -1))
+        self._capacity += slots
+
+    def _release(self, slot: int) -> None:
+        key, _ = self._keys[slot]
+        del self._slots[self._keys[slot]]
+        self._keys[slot] = None
+        slots = self._by_channel[key]
+        slots.discard(slot)
+        if not slots:
+            del self._by_channel[key]
+        for values in (self._peak, self._current, self._samples, self._live):
+            values[slot] = 0
+        for values in (self._viewer_seconds, self._first_at, self._last_at):
+            values[slot] = 0.0
+        for tier in self.tiers:
+            tier.clear(slot)
+        self._free.append(slot)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Free the slots of streams that ended more than ``retention`` ago.
+
+        Streams with unflushed samples are kept until the next flush.
+
+        Returns:
+            Number of streams dropped
+        """
+        now = self._clock() if now is None else now
+        queued = set(self._pending_slot)
+        expired = [
+            slot for slot in self._slots.values()
+            if not self._live[slot] and now - self._last_at[slot] > self.retention and slot not in queued
+        ]
+        for slot in expired:
+            self._release(slot)
+        return len(expired)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    def slots_for(self, keys: Iterable[ChannelKey]) -> List[int]:
+        """Slots of every retained stream of the given channels."""
+        slots: List[int] = []
+        for key in keys:
+            slots.extend(self._by_channel.get(key, ()))
+        return slots
+
+    def aggregate(self, slots: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+        """
+        Peak, average and watch time over a set of streams.
+
+        ``average_viewers`` is time-weighted over the observed time of the
+        streams; ``watch_time_hours`` is viewer-hours (viewers x hours).
+
+        Args:
+            slots: Stream slots (default: every retained stream)
+        """
+        if slots is None:
+            slots = list(self._slots.values())
+        return combined_aggregate([(self, slots)])
+
+    def _totals(self, slots: Sequence[int]) -> Tuple[int, int, int, int, float, float, int, int]:
+        """Raw sums of :meth:`aggregate` (mergeable across histories)."""
+        if not slots:
+            return 0, 0, 0, 0, 0.0, 0.0, 0, 0
+        live = _gather(self._live, slots)
+        current = _gather(self._current, slots)
+        return (
+            len(slots),
+            sum(live),
+            sum(compress(current, live)),
+            max(_gather(self._peak, slots)),
+            sum(_gather(self._viewer_seconds, slots)),
+            sum(_gather(self._last_at, slots)) - sum(_gather(self._first_at, slots)),
+            sum(_gather(self._samples, slots)),
+            max(current),
+        )
+
+    def series(self, slots: Sequence[int], resolution: int, since: Optional[float] = None) -> List[Tuple[float, int]]:
+        """
+        Summed viewers of the given streams per slot of one tier.
+
+        Coarse slots not downsampled yet (the current one, or every slot
+        of a stream too young to have filled one) are computed from the
+        finer tier.
+
+        Args:
+            slots: Stream slots
+            resolution: Seconds per point; must be one of the tiers
+            since: Earliest point time (default: everything retained)
+
+        Returns:
+            ``(slot start time, viewers)`` in time order
+
+        Raises:
+            ValueError: If no tier has that resolution
+        """
+        level = next((i for i, tier in enumerate(self.tiers) if tier.resolution == resolution), None)
+        if level is None:
+            raise ValueError(f"no {resolution}s tier (have {[t.resolution for t in self.tiers]})")
+        tier = self.tiers[level]
+        first = 0 if since is None else int(since // resolution)
+        totals: Dict[int, int] = {}
+        for slot in slots:
+            for bucket, value in self._cells(level, slot, first):
+                totals[bucket] = totals.get(bucket, 0) + value
+        return [(bucket * tier.resolution, totals[bucket]) for bucket in sorted(totals)]
+
+    def _cells(self, level: int, slot: int, first: int) -> List[Tuple[int, int]]:
+        tier = self.tiers[level]
+        cells = tier.cells(slot, first, tier.heads[slot])
+        if level == 0:
+            return cells
+        # Coarse slots after the head are not downsampled yet: average the finer tier
+        ratio = tier.resolution // self.tiers[level - 1].resolution
+        pending: Dict[int, List[int]] = {}
+        for bucket, value in self._cells(level - 1, slot, max(first, tier.heads[slot] + 1) * ratio):
+            pending.setdefault(bucket // ratio, []).append(value)
+        cells.extend((bucket, round(sum(values) / len(values))) for bucket, values in sorted(pending.items()))
+        return cells
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    async def flush(self) -> int:
+        """
+        Write the queued samples in bulk, then expire old streams.
+
+        Samples stay queued when a write fails and are retried next time.
+
+        Returns:
+            Number of samples written
+        """
+        async with self._flush_lock:
+            written = 0
+            if self.write_samples is not None:
+                while self._pending_slot:
+                    count = min(self.flush_batch_size, len(self._pending_slot))
+                    rows = self._rows(count)
+                    try:
+                        await self.write_samples(rows)
+                    except Exception:
+                        self.flush_failures += 1
+                        logger.exception("Could not write %d viewer samples; retrying at the next flush", count)
+                        break
+                    for queue in (self._pending_slot, self._pending_at, self._pending_viewers):
+                        del queue[:count]
+                    written += count
+            else:
+                # Nothing persists the samples: keep memory bounded
+                for queue in (self._pending_slot, self._pending_at, self._pending_viewers):
+                    del queue[:]
+            self.samples_flushed += written
+            self.expire()
+            return written
+
+    def _rows(self, count: int) -> List[Dict[str, Any]]:
+        rows = []
+        for slot, at, viewers in zip(self._pending_slot[:count], self._pending_at[:count], self._pending_viewers[:count]):
+            key, stream_id = self._keys[slot]
+            rows.append({
+                "platform": key.platform,
+                "platform_channel_id": key.channel_id,
+                "platform_stream_id": stream_id,
+                "sampled_at": _iso(at),
+                "viewer_count": viewers,
+            })
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        """Tracked streams, slab size and sample counters."""
+        return {
+            "streams": len(self._slots),
+            "live_streams": sum(self._live),
+            "capacity": self._capacity,
+            "memory_bytes": self.memory_bytes(),
+            "pending_samples": len(self._pending_slot),
+            "samples_recorded": self.samples_recorded,
+            "samples_flushed": self.samples_flushed,
+            "samples_dropped": self.samples_dropped,
+            "flush_failures": self.flush_failures,
+        }
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the fixed-width slabs and the sample queue."""
+        slabs = [
+            self._peak, self._current, self._samples, self._viewer_seconds, self._first_at,
+            self._last_at, self._live, self._pending_slot, self._pending_at, self._pending_viewers,
+        ]
+        for tier in self.tiers:
+            slabs.extend((tier.values, tier.heads))
+        return sum(len(values) * values.itemsize for values in slabs)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flush loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="viewer-history-flush")
+
+    async def stop(self) -> None:
+        """Stop the loop and write what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Viewer history flush failed")
+
+
+def combined_aggregate(parts: Iterable[Tuple[ViewerHistory, Sequence[int]]]) -> Dict[str, Any]:
+    """
+    :meth:`ViewerHistory.aggregate` over streams held by several histories.
+
+    Args:
+        parts: ``(history, slots)`` pairs, e.g. this worker's history and a
+               :meth:`~ViewerHistory.replica` of other workers' samples
+    """
+    streams = live = current = peak = samples = latest = 0
+    viewer_seconds = observed = 0.0
+    for history, slots in parts:
+        totals = history._totals(slots)
+        streams += totals[0]
+        live += totals[1]
+        current += totals[2]
+        peak = max(peak, totals[3])
+        viewer_seconds += totals[4]
+        observed += totals[5]
+        samples += totals[6]
+        latest = max(latest, totals[7])
+    return {
+        "streams": streams,
+        "live_streams": live,
+        "current_viewers": current,
+        "peak_viewers": peak,
+        "average_viewers": round(viewer_seconds / observed, 1) if observed > 0 else float(latest),
+        "watch_time_hours": round(viewer_seconds / 3600, 2),
+        "samples": samples,
+    }
+
+
+def create_viewer_history(
+    tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS,
+    retention: float = 86400.0,
+    flush_interval: float = 60.0,
+    flush_batch_size: int = 1000
+) -> ViewerHistory:
+    """
+    Build a history persisting samples through the admin Supabase client.
+
+    Args:
+        tiers: ``(seconds per slot, slots kept)`` from finest to coarsest
+        retention: Seconds an ended stream is kept for stats
+        flush_interval: Seconds between bulk writes
+        flush_batch_size: Maximum rows per insert request
+
+    Returns:
+        History to register with ``scheduler.add_listener`` and start
+    """
+    async def write_samples(rows: List[Dict[str, Any]]) -> None:
+        # Supabase SDKは同期クライアントのためスレッドで実行
+        await run_blocking(insert_viewer_samples, rows)
+
+    return ViewerHistory(
+        tiers=tiers,
+        retention=retention,
+        write_samples=write_samples,
+        flush_interval=flush_interval,
+        flush_batch_size=flush_batch_size,
+    )
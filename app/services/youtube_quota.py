@@ -0,0 +1,334 @@
+"""YouTube Data API quota accounting.
+
+Every Data API call is charged against a daily budget (10,000 units by
+default) that resets at midnight Pacific time. ``search.list`` costs 100
+units while ``channels.list``, ``playlistItems.list`` and ``videos.list``
+cost 1 unit each, so live detection goes through the uploads playlist plus
+a batched ``videos.list`` check and never through ``search?eventType=live``
+unless a channel has no uploads playlist.
+
+Spending is paced over the day: at any moment only the share of the budget
+proportional to the elapsed part of the day (plus a small burst allowance)
+may be used, so a busy morning cannot starve the evening.
+
+Several workers or replicas using one API key share its quota: each
+broadcasts its usage (:func:`quota_usage_listener`) and counts what the
+others reported. Between two reports a worker spends at most its share
+(1/N of the live workers) of the paced allowance that was unused at the
+last report, so the workers together stay within the limit however late
+the reports arrive. Until its first report a worker in a cluster assumes
+the others already spent all the pace allowed.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from zoneinfo import ZoneInfo
+
+from app.core.metrics import YOUTUBE_QUOTA_UNITS
+
+#: Quota units per call, from the YouTube Data API quota calculator
+OPERATION_COSTS: Dict[str, int] = {
+    "search": 100,
+    "channels": 1,
+    "playlistItems": 1,
+    "videos": 1,
+}
+
+#: Quota days start at midnight in this zone
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+#: Ids per channels.list / videos.list call
+ID_BATCH_SIZE = 50
+
+#: Broadcast topic of the workers' quota usage
+QUOTA_TOPIC = "youtube_quota"
+
+UPLOADS_STRATEGY = "uploads"
+SEARCH_STRATEGY = "search"
+
+
+def estimate_cost(
+    strategy: str,
+    channels: int,
+    unresolved: int = 0,
+    recent_uploads: int = 5
+) -> int:
+    """
+    Estimate the quota units needed to check ``channels`` channels.
+
+    Args:
+        strategy: ``"uploads"`` (playlistItems + videos.list) or ``"search"``
+        channels: Number of channels checked with this strategy
+        unresolved: Channels whose uploads playlist still needs channels.list
+        recent_uploads: Latest uploads inspected per channel
+
+    Returns:
+        Estimated quota units
+    """
+    if channels <= 0:
+        return 0
+    if strategy == SEARCH_STRATEGY:
+        # One search per channel; assume one live video each to confirm
+        return channels * OPERATION_COSTS["search"] + math.ceil(channels / ID_BATCH_SIZE) * OPERATION_COSTS["videos"]
+    return (
+        math.ceil(unresolved / ID_BATCH_SIZE) * OPERATION_COSTS["channels"]
+        + channels * OPERATION_COSTS["playlistItems"]
+        + math.ceil(channels * recent_uploads / ID_BATCH_SIZE) * OPERATION_COSTS["videos"]
+    )
+
+
+def cheapest_strategy(has_uploads_playlist: bool, recent_uploads: int = 5) -> str:
+    """
+    Return the cheapest strategy able to detect a channel's live streams.
+
+    Args:
+        has_uploads_playlist: Whether the channel exposes an uploads playlist
+        recent_uploads: Latest uploads inspected per channel
+
+    Returns:
+        Strategy name; search is the only option without an uploads playlist
+    """
+    costs = {SEARCH_STRATEGY: estimate_cost(SEARCH_STRATEGY, 1)}
+    if has_uploads_playlist:
+        costs[UPLOADS_STRATEGY] = estimate_cost(UPLOADS_STRATEGY, 1, recent_uploads=recent_uploads)
+    return min(costs, key=costs.get)
+
+
+class YouTubeQuota:
+    """
+    Daily YouTube quota ledger with pacing.
+
+    Thread-safe; one instance is shared by every caller using the same API
+    key in this process. Usage other workers reported (:meth:`merge`)
+    counts against the same daily limit.
+    """
+
+    def __init__(
+        self,
+        daily_limit: int = 10000,
+        burst_fraction: float = 0.05,
+        clock: Callable[[], float] = time.time,
+        workers: Callable[[], int] = lambda: 1
+    ):
+        """
+        Initialize quota ledger.
+
+        Args:
+            daily_limit: Quota units available per Pacific-time day
+            burst_fraction: Share of the daily limit usable ahead of pace
+            clock: Wall-clock time source (injectable for tests)
+            workers: Number of live workers sharing the quota
+        """
+        self.daily_limit = daily_limit
+        self.burst_fraction = burst_fraction
+        self.workers = workers
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._day_start, self._day_end = self._day_bounds(clock())
+        self._used = 0
+        self._exhausted = False
+        self._by_operation: Counter = Counter()
+        self._peers: Dict[str, int] = {}
+        self._heard = False
+        # Own and cluster usage as of the last peer report
+        self._report_used = 0
+        self._report_cluster_used = 0
+
+    @staticmethod
+    def _day_bounds(now: float) -> Tuple[float, float]:
+        """Return (start, end) timestamps of the quota day containing ``now``."""
+        local = datetime.fromtimestamp(now, QUOTA_TIMEZONE)
+        start = datetime(local.year, local.month, local.day, tzinfo=QUOTA_TIMEZONE)
+        end = datetime.combine(start.date() + timedelta(days=1), start.time(), tzinfo=QUOTA_TIMEZONE)
+        return start.timestamp(), end.timestamp()
+
+    def _roll(self, now: float) -> None:
+        """Start a new quota day if the previous one has ended."""
+        if now >= self._day_end:
+            self._day_start, self._day_end = self._day_bounds(now)
+            self._used = 0
+            self._exhausted = False
+            self._by_operation.clear()
+            self._peers.clear()
+            self._report_used = self._report_cluster_used = 0
+
+    def _cluster_used(self) -> int:
+        return self._used + sum(self._peers.values())
+
+    @property
+    def used(self) -> int:
+        """Units charged by this worker so far today."""
+        with self._lock:
+            self._roll(self._clock())
+            return self._used
+
+    @property
+    def remaining(self) -> int:
+        """Units left today for all workers (0 once the API reported the quota exhausted)."""
+        with self._lock:
+            self._roll(self._clock())
+            return 0 if self._exhausted else max(0, self.daily_limit - self._cluster_used())
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether no further calls can be made today."""
+        return self.remaining <= 0
+
+    def seconds_until_reset(self) -> float:
+        """Seconds until the next Pacific midnight."""
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            return self._day_end - now
+
+    def spendable(self) -> int:
+        """
+        Units that may be spent right now without running ahead of pace.
+
+        Returns:
+            The day's budget pro-rated to the elapsed part of the day, plus
+            the burst allowance, minus what all workers had used at the last
+            peer report; of that, this worker's share minus what it spent
+            since
+        """
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            if self._exhausted:
+                return 0
+            elapsed = (now - self._day_start) / (self._day_end - self._day_start)
+            allowance = min(self.daily_limit, math.floor(self.daily_limit * (elapsed + self.burst_fraction)))
+            workers = max(1, self.workers())
+            if workers > 1 and not self._heard:
+                # In a cluster without a report yet: assume the others spent all the pace allowed
+                self._heard = True
+                self._report_used = self._used
+                self._report_cluster_used = max(self._cluster_used(), allowance)
+            share = (allowance - self._report_cluster_used) // workers
+            return max(0, share - (self._used - self._report_used))
+
+    def charge(self, operation: str, calls: int = 1) -> int:
+        """
+        Record API calls.
+
+        Args:
+            operation: Data API resource name (``"videos"``, ``"search"``, ...)
+            calls: Number of calls made
+
+        Returns:
+            Units charged
+        """
+        units = OPERATION_COSTS.get(operation, 1) * calls
+        with self._lock:
+            self._roll(self._clock())
+            self._used += units
+            self._by_operation[operation] += units
+        YOUTUBE_QUOTA_UNITS.labels(operation).inc(units)
+        return units
+
+    def mark_exhausted(self) -> None:
+        """Treat the rest of the day as exhausted (the API said so)."""
+        with self._lock:
+            self._roll(self._clock())
+            self._exhausted = True
+
+    def usage(self, worker_id: str) -> Dict[str, Any]:
+        """
+        Return today's usage known here, to broadcast to the other workers.
+
+        Args:
+            worker_id: This worker's identity
+
+        Returns:
+            Quota day, units used per worker (departed ones included) and
+            whether the API reported the quota exhausted
+        """
+        with self._lock:
+            self._roll(self._clock())
+            return {
+                "day": self._day_start,
+                "used": {**self._peers, worker_id: self._used},
+                "exhausted": self._exhausted,
+            }
+
+    def merge(self, worker_id: str, usage: Dict[str, Any]) -> None:
+        """
+        Count usage another worker broadcast.
+
+        Reports of other quota days are ignored; per worker the highest
+        count wins, so reports may arrive late or twice. A report with news
+        starts a new share for this worker.
+
+        Args:
+            worker_id: This worker's identity (its own count is not taken)
+            usage: A peer's :meth:`usage`
+        """
+        with self._lock:
+            self._roll(self._clock())
+            if usage.get("day") != self._day_start:
+                return
+            peers = dict(self._peers)
+            for worker, used in usage.get("used", {}).items():
+                if worker != worker_id:
+                    self._peers[worker] = max(self._peers.get(worker, 0), int(used))
+            self._exhausted = self._exhausted or bool(usage.get("exhausted"))
+            if self._heard and self._peers == peers:
+                # Nothing new: what this worker spent since the last report still counts
+                return
+            self._heard = True
+            self._report_used = self._used
+            self._report_cluster_used = self._cluster_used()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return ledger counters for monitoring."""
+        with self._lock:
+            now = self._clock()
+            self._roll(now)
+            return {
+                "daily_limit": self.daily_limit,
+                "used": self._used,
+                "peers_used": sum(self._peers.values()),
+                "workers": max(1, self.workers()),
+                "remaining": 0 if self._exhausted else max(0, self.daily_limit - self._cluster_used()),
+                "exhausted": self._exhausted,
+                "resets_in_seconds": round(self._day_end - now),
+                "by_operation": dict(self._by_operation),
+            }
+
+
+def quota_usage_listener(
+    quota: YouTubeQuota,
+    worker_id: Callable[[], str],
+    publish: Callable[[str, Any], Awaitable[bool]]
+):
+    """
+    Build a scheduler listener broadcasting this worker's quota usage.
+
+    After each applied refresh the usage known here is published on
+    :data:`QUOTA_TOPIC` if it changed, or if the membership did (so a
+    joining worker learns the day's spend so far).
+
+    Args:
+        quota: This worker's ledger
+        worker_id: Current identity of this worker
+        publish: Broadcast coroutine, e.g. ``ClusterCoordinator.publish``
+
+    Returns:
+        Async listener taking the refreshed snapshots
+    """
+    last: Dict[str, Any] = {}
+
+    async def listener(_snapshots) -> None:
+        usage = quota.usage(worker_id())
+        state = {**usage, "workers": quota.workers()}
+        if state == last:
+            return
+        if await publish(QUOTA_TOPIC, usage):
+            last.clear()
+            last.update(state)
+
+    return listener
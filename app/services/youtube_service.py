@@ -0,0 +1,324 @@
+"""YouTube Data API v3 service."""
+
+import asyncio
+import itertools
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.exceptions import QuotaExceededException
+from app.models.stream import PlatformStream
+from app.services.base import HttpPlatformService
+from app.services.batch_planner import BatchPlanner, PartialBatchError
+from app.services.resilience import CircuitBreaker
+from app.services.youtube_quota import (
+    ID_BATCH_SIZE,
+    SEARCH_STRATEGY,
+    UPLOADS_STRATEGY,
+    YouTubeQuota,
+    cheapest_strategy,
+    estimate_cost,
+)
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Error reasons meaning the daily quota is gone (rateLimitExceeded is per-second)
+DAILY_QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+
+
+class YouTubeService(HttpPlatformService):
+    """
+    Detects live broadcasts via uploads playlists and batched video lookups.
+
+    Per refresh: ``channels.list`` (cached uploads playlist id, 50 channels
+    per call, only for channels not seen before), one ``playlistItems.list``
+    per channel for its most recent uploads, then ``videos.list`` (50 videos
+    per call) to find the ones currently live.
+
+    With a ``YouTubeQuota`` every call is charged against the daily budget.
+    Channels are checked least-recently-checked first and only as many as
+    the paced budget allows; the rest are reported as deferred so the
+    scheduler keeps serving their cached streams (EDGE-001).
+    """
+
+    platform = "youtube"
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = YOUTUBE_API_BASE_URL,
+        max_concurrency: int = 8,
+        recent_uploads: int = 5,
+        timeout: float = 20.0,
+        http_client: Optional[httpx.AsyncClient] = None,
+        quota: Optional[YouTubeQuota] = None,
+        search_fallback: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False
+    ):
+        """
+        Initialize YouTube service.
+
+        Args:
+            api_key: YouTube Data API key
+            base_url: Data API base URL
+            max_concurrency: Maximum concurrent API calls
+            recent_uploads: Number of latest uploads checked per channel
+            timeout: Per-request timeout in seconds
+            http_client: Optional preconfigured client
+            quota: Daily quota ledger; unlimited if None
+            search_fallback: Use search.list (100 units) for channels
+                             without an uploads playlist
+            breaker: Circuit breaker for Data API calls
+            hedge: Hedge slow ``channels.list``/``videos.list`` batch calls
+                   (a hedged call is charged twice)
+        """
+        super().__init__(
+            base_url, timeout=timeout, max_connections=max_concurrency, http_client=http_client,
+            breaker=breaker, hedge=hedge,
+        )
+        self.api_key = api_key
+        self.recent_uploads = recent_uploads
+        self.quota = quota
+        self.search_fallback = search_fallback
+        self._check_order = itertools.count()
+        self._last_checked: Dict[str, int] = {}
+        self._quota_warned = False
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._uploads_playlists: Dict[str, Optional[str]] = {}
+        self.channels_planner: BatchPlanner[Optional[str]] = BatchPlanner(
+            self._fetch_uploads_batch, batch_size=ID_BATCH_SIZE, max_concurrency=max_concurrency,
+        )
+        self.videos_planner: BatchPlanner[Optional[Dict[str, Any]]] = BatchPlanner(
+            self._fetch_videos_batch, batch_size=ID_BATCH_SIZE, max_concurrency=max_concurrency,
+        )
+
+    async def fetch_live_streams(self, channel_ids: Sequence[str]) -> Dict[str, List[PlatformStream]]:
+        """Fetch live streams for YouTube channel ids."""
+        errors: Dict[str, BaseException] = {}
+        selected = self._plan(channel_ids, errors)
+        search_ids = [c for c in selected if self._strategy(c) == SEARCH_STRATEGY]
+
+        playlists = await self._uploads_for([c for c in selected if c not in search_ids], errors)
+        lookups = [self._recent_video_ids(playlist) for playlist in playlists.values()]
+        lookups += [self._search_live_video_ids(channel_id) for channel_id in search_ids]
+        recent = await asyncio.gather(*lookups, return_exceptions=True)
+        video_owner: Dict[str, str] = {}
+        for channel_id, videos in zip([*playlists, *search_ids], recent):
+            if isinstance(videos, Exception):
+                errors[channel_id] = videos
+                continue
+            for video_id in videos:
+                video_owner[video_id] = channel_id
+
+        try:
+            videos = await self.videos_planner.fetch(list(video_owner))
+        except PartialBatchError as e:
+            videos = e.results
+            for video_id, error in e.errors.items():
+                errors.setdefault(video_owner[video_id], error)
+
+        results: Dict[str, List[PlatformStream]] = {
+            channel_id: [] for channel_id in channel_ids if channel_id not in errors
+        }
+        for video_id, video in videos.items():
+            channel_id = video_owner[video_id]
+            if video is not None and channel_id in results and self._is_live(video):
+                results[channel_id].append(self._to_stream(channel_id, video))
+
+        if errors:
+            raise PartialBatchError(results, errors)
+        return results
+
+    async def health_check(self) -> None:
+        """
+        Look up no videos (1 quota unit).
+
+        Raises:
+            QuotaExceededException: If today's quota is exhausted (no call is made)
+            ExternalAPIException: If the API is unreachable or rejects the key
+        """
+        if self.quota is not None and self.quota.exhausted:
+            raise QuotaExceededException("youtube daily quota exhausted", platform=self.platform)
+        await self._api_get("videos", {"part": "id", "id": ""})
+
+    def _strategy(self, channel_id: str) -> Optional[str]:
+        """Detection strategy for a channel, or None if it cannot be checked."""
+        # Unresolved channels are assumed to have an uploads playlist
+        has_uploads = self._uploads_playlists.get(channel_id, "") is not None
+        strategy = cheapest_strategy(has_uploads, self.recent_uploads)
+        if strategy == SEARCH_STRATEGY and not self.search_fallback:
+            return None
+        return strategy
+
+    def _plan(self, channel_ids: Sequence[str], errors: Dict[str, BaseException]) -> List[str]:
+        """
+        Select the channels to check now within the quota budget.
+
+        Channels that do not fit are added to ``errors`` as deferred.
+
+        Returns:
+            Channel ids to check, least recently checked first
+        """
+        if self.quota is None:
+            selected = list(channel_ids)
+        elif self.quota.exhausted:
+            self._warn_quota_exhausted()
+            error = QuotaExceededException(
+                "YouTube API quota exhausted; serving cached data",
+                platform=self.platform,
+                retry_after=int(self.quota.seconds_until_reset()),
+            )
+            errors.update((c, error) for c in channel_ids)
+            return []
+        else:
+            self._quota_warned = False
+            selected = self._affordable(channel_ids, self.quota.spendable())
+            chosen = set(selected)
+            deferred = [c for c in channel_ids if c not in chosen]
+            if deferred:
+                logger.info("YouTube quota pacing: deferring %d of %d channels", len(deferred), len(channel_ids))
+                error = QuotaExceededException(
+                    "YouTube refresh deferred to stay within the daily quota",
+                    platform=self.platform,
+                )
+                errors.update((c, error) for c in deferred)
+
+        for channel_id in selected:
+            self._last_checked[channel_id] = next(self._check_order)
+        return selected
+
+    def _affordable(self, channel_ids: Sequence[str], budget: int) -> List[str]:
+        """Return the longest least-recently-checked prefix costing at most ``budget``."""
+        ordered = sorted(dict.fromkeys(channel_ids), key=lambda c: self._last_checked.get(c, -1))
+        counts = {UPLOADS_STRATEGY: 0, SEARCH_STRATEGY: 0}
+        unresolved = 0
+        selected: List[str] = []
+        for channel_id in ordered:
+            strategy = self._strategy(channel_id)
+            if strategy is None:
+                # Nothing to spend on it; it is reported as not live
+                selected.append(channel_id)
+                continue
+            counts[strategy] += 1
+            pending_unresolved = unresolved + (channel_id not in self._uploads_playlists)
+            cost = (
+                estimate_cost(UPLOADS_STRATEGY, counts[UPLOADS_STRATEGY], pending_unresolved, self.recent_uploads)
+                + estimate_cost(SEARCH_STRATEGY, counts[SEARCH_STRATEGY])
+            )
+            if cost > budget:
+                break
+            unresolved = pending_unresolved
+            selected.append(channel_id)
+        return selected
+
+    def _warn_quota_exhausted(self) -> None:
+        # EDGE-001: log once per exhaustion, cached data keeps being served
+        if not self._quota_warned:
+            self._quota_warned = True
+            logger.warning(
+                "YouTube API quota exhausted; serving cached data for %.0f seconds until the quota resets",
+                self.quota.seconds_until_reset(),
+            )
+
+    async def _uploads_for(
+        self,
+        channel_ids: Sequence[str],
+        errors: Dict[str, BaseException]
+    ) -> Dict[str, str]:
+        """Return uploads playlist per channel, resolving unknown ones in batches."""
+        missing = [c for c in channel_ids if c not in self._uploads_playlists]
+        if missing:
+            try:
+                found = await self.channels_planner.fetch(missing)
+            except PartialBatchError as e:
+                found = e.results
+                errors.update(e.errors)
+            self._uploads_playlists.update(found)
+        return {
+            c: self._uploads_playlists[c] for c in channel_ids
+            if self._uploads_playlists.get(c)
+        }
+
+    async def _fetch_uploads_batch(self, channel_ids: List[str]) -> Dict[str, Optional[str]]:
+        body = await self._api_get("channels", {"part": "contentDetails", "id": ",".join(channel_ids), "maxResults": ID_BATCH_SIZE}, hedge=True)
+        return {
+            item["id"]: item.get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads")
+            for item in body.get("items", [])
+        }
+
+    async def _recent_video_ids(self, playlist_id: str) -> List[str]:
+        async with self._semaphore:
+            body = await self._api_get("playlistItems", {"part": "contentDetails", "playlistId": playlist_id, "maxResults": self.recent_uploads})
+        return [item["contentDetails"]["videoId"] for item in body.get("items", [])]
+
+    async def _search_live_video_ids(self, channel_id: str) -> List[str]:
+        async with self._semaphore:
+            body = await self._api_get("search", {
+                "part": "id",
+                "channelId": channel_id,
+                "eventType": "live",
+                "type": "video",
+            })
+        return [item["id"]["videoId"] for item in body.get("items", []) if item.get("id", {}).get("videoId")]
+
+    async def _fetch_videos_batch(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        body = await self._api_get("videos", {
+            "part": "snippet,liveStreamingDetails",
+            "id": ",".join(video_ids),
+            "maxResults": ID_BATCH_SIZE,
+        }, hedge=True)
+        return {item["id"]: item for item in body.get("items", [])}
+
+    async def _api_get(self, resource: str, params: Dict[str, Any], hedge: bool = False) -> Dict[str, Any]:
+        return await self._request("GET", f"{self.base_url}/{resource}", hedge=hedge, params={**params, "key": self.api_key})
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        if self.quota is not None:
+            # Google charges failed calls too, and both calls of a hedged pair
+            self.quota.charge(url.rsplit("/", 1)[-1])
+        return await super()._send(method, url, **kwargs)
+
+    def _is_quota_error(self, response: httpx.Response) -> bool:
+        if response.status_code != 403:
+            return False
+        try:
+            errors = response.json().get("error", {}).get("errors", [])
+        except ValueError:
+            return False
+        reasons = {e.get("reason") for e in errors}
+        if self.quota is not None and reasons.intersection(DAILY_QUOTA_REASONS):
+            self.quota.mark_exhausted()
+            self._warn_quota_exhausted()
+        return bool(reasons.intersection(DAILY_QUOTA_REASONS + ("rateLimitExceeded",)))
+
+    @staticmethod
+    def _is_live(video: Dict[str, Any]) -> bool:
+        details = video.get("liveStreamingDetails") or {}
+        return (
+            video.get("snippet", {}).get("liveBroadcastContent") == "live"
+            and "actualStartTime" in details
+            and "actualEndTime" not in details
+        )
+
+    @staticmethod
+    def _to_stream(channel_id: str, video: Dict[str, Any]) -> PlatformStream:
+        snippet = video.get("snippet", {})
+        details = video.get("liveStreamingDetails", {})
+        thumbnails = snippet.get("thumbnails", {})
+        thumbnail = (thumbnails.get("maxres") or thumbnails.get("high") or thumbnails.get("default") or {}).get("url")
+        return PlatformStream(
+            platform="youtube",
+            platform_channel_id=channel_id,
+            platform_stream_id=video["id"],
+            title=(snippet.get("title") or "")[:1000],  # EDGE-103
+            description=snippet.get("description") or None,
+            thumbnail_url=thumbnail,
+            viewer_count=int(details.get("concurrentViewers", 0)),
+            tags=snippet.get("tags") or None,
+            started_at=datetime.fromisoformat(details["actualStartTime"].replace("Z", "+00:00")),
+        )
@@ -0,0 +1,5 @@
+"""Performance benchmarks run against local service stand-ins.
+
+Each module is runnable with ``python -m benchmarks.<name>`` and prints a
+JSON report to stdout.
+"""
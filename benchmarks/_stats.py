@@ -0,0 +1,30 @@
+"""Shared helpers for benchmark reports."""
+
+import json
+import statistics
+from typing import Any, Dict, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_s: Sequence[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) as milliseconds."""
+    return {
+        "count": len(latencies_s),
+        "mean_ms": round(statistics.fmean(latencies_s) * 1000, 3) if latencies_s else 0.0,
+        "p50_ms": round(percentile(latencies_s, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies_s, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies_s, 99) * 1000, 3),
+    }
+
+
+def emit(report: Dict[str, Any]) -> None:
+    """Print a machine-readable report."""
+    print(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,90 @@
+"""Batched platform fetch benchmark.
+
+Fetches live streams for N Twitch and N YouTube channels from the local fake
+Helix/YouTube server, once one id per call (sequential round-trips) and once
+through the batch planner (100/50 ids per call, concurrent chunks). Reports
+upstream call counts and wall-clock time.
+
+    python -m benchmarks.bench_batch_fetch --sizes 10,100,1000,10000 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+import httpx
+
+from app.services.batch_planner import BatchPlanner
+from app.services.twitch_service import TwitchService
+from app.services.youtube_service import YouTubeService
+from benchmarks._stats import emit
+from tests.fakes.platforms import FakePlatformAPIs
+from tests.fakes.server import serve_in_thread
+
+
+def _unbatched(planner: BatchPlanner) -> None:
+    """Force a planner to one id per call, one call at a time."""
+    planner.batch_size = 1
+    planner._semaphore = asyncio.Semaphore(1)
+
+
+async def _measure(fake: FakePlatformAPIs, service, ids) -> Dict[str, Any]:
+    fake.reset_counters()
+    started = time.perf_counter()
+    streams = await service.fetch_live_streams(ids)
+    elapsed = time.perf_counter() - started
+    await service.aclose()
+    return {
+        "upstream_calls": sum(fake.calls.values()),
+        "calls_by_endpoint": dict(fake.calls),
+        "wall_clock_s": round(elapsed, 3),
+        "live_found": sum(1 for s in streams.values() if s),
+    }
+
+
+async def _run_size(base_url: str, fake: FakePlatformAPIs, size: int, naive: bool, concurrency: int) -> Dict[str, Any]:
+    twitch_ids = [str(i) for i in range(size)]
+    youtube_ids = [f"UC{i}" for i in range(size)]
+    fake.add_twitch_channels(twitch_ids[: max(1, size // 10)], live=True)
+    fake.add_youtube_channels(youtube_ids)
+    fake.add_youtube_channels(youtube_ids[: max(1, size // 10)], live=True)
+
+    def http():
+        return httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency * 2))
+
+    twitch = TwitchService("id", "secret", base_url=f"{base_url}/helix", token_url=f"{base_url}/oauth2/token",
+                           max_concurrency=concurrency, http_client=http())
+    youtube = YouTubeService("key", base_url=f"{base_url}/youtube/v3", max_concurrency=concurrency, http_client=http())
+    if naive:
+        _unbatched(twitch.streams_planner)
+        _unbatched(youtube.channels_planner)
+        _unbatched(youtube.videos_planner)
+        youtube._semaphore = asyncio.Semaphore(1)
+    return {
+        "twitch": await _measure(fake, twitch, twitch_ids),
+        "youtube": await _measure(fake, youtube, youtube_ids),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--latency", type=float, default=0.005, help="fake server latency per call (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--naive-max", type=int, default=1000, help="largest size run one id per call")
+    args = parser.parse_args()
+
+    fake = FakePlatformAPIs(latency=args.latency)
+    report: Dict[str, Any] = {"benchmark": "batch_fetch", "latency_s": args.latency, "results": {}}
+    with serve_in_thread(fake.app) as base_url:
+        for size in (int(s) for s in args.sizes.split(",")):
+            entry = {"batched": asyncio.run(_run_size(base_url, fake, size, False, args.concurrency))}
+            if size <= args.naive_max:
+                entry["one_id_per_call"] = asyncio.run(_run_size(base_url, fake, size, True, args.concurrency))
+            report["results"][str(size)] = entry
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""End-to-end load test for NFR-001 (refresh < 30 s) and NFR-002 (list < 3 s).
+
+Runs three processes:
+
+* fakes: the PostgREST stand-in (``tests/fakes/postgrest.py``) and the
+  YouTube/Twitch stand-ins (``tests/fakes/platforms.py``) on one port,
+  seeded with ``--users`` x ``--channels-per-user`` subscriptions drawn
+  from ``--distinct-channels`` channels, with injectable latency, 503 error
+  rates and 429 throttle rates;
+* app: ``main:app`` under uvicorn with its lifespan (scheduler, writer,
+  caches, search index, push broker) pointed at the fakes;
+* load: this process, one virtual user per ``--users`` polling
+  ``GET /api/streams`` once a minute, occasionally refreshing and searching.
+
+Supabase Auth issues HS256 JWTs that the API verifies locally, so the
+virtual users sign their own tokens with the shared secret instead of
+talking to an Auth server.
+
+``--time-scale`` compresses time: at 10 the users poll every 6 s and the
+scheduler refreshes every 6 s, so a minute of wall clock covers ten
+minutes of traffic. The JSON report has throughput, latency percentiles
+and status counts per endpoint, the NFR verdicts, app-side refresh
+metrics and upstream call counts (excluding ``--warmup``); ``--baseline``
+adds the p99 ratio against an earlier report.
+
+    python -m benchmarks.bench_end_to_end --users 200 --channels-per-user 30 \\
+        --duration 60 --time-scale 10 --upstream-latency 0.05 --output e2e.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import jwt
+
+from benchmarks._stats import emit, summarize
+from benchmarks.bench_stream_events import _raise_fd_limit, _wait_for_port
+
+JWT_SECRET = "bench-end-to-end-secret"
+NFR = {
+    "NFR-001": ("POST /api/streams/refresh", 30.0),
+    "NFR-002": ("GET /api/streams", 3.0),
+}
+SEARCH_TERMS = ["live", "stream", "tw1", "UC2", "live stream", "-stream", "zzz"]
+
+
+def _channel_ids(distinct: int) -> List[str]:
+    # Even: YouTube channel ids, odd: Twitch user ids
+    return [f"UC{i}" if i % 2 == 0 else f"tw{i}" for i in range(distinct)]
+
+
+def _serve_fakes(args: argparse.Namespace) -> None:
+    """Child process: seeded PostgREST and platform stand-ins on one port."""
+    import uvicorn
+    from fastapi.responses import JSONResponse
+
+    from tests.fakes.platforms import FakePlatformAPIs
+    from tests.fakes.postgrest import FakePostgrest, seed
+
+    rng = random.Random(args.seed)
+    postgrest = FakePostgrest(latency=args.db_latency, error_rate=args.db_error_rate, seed=args.seed)
+    platforms = FakePlatformAPIs(latency=args.upstream_latency, seed=args.seed)
+
+    channel_ids = _channel_ids(args.distinct_channels)
+    platform_rows = [{"id": "p-youtube", "name": "youtube"}, {"id": "p-twitch", "name": "twitch"}]
+    seed(postgrest, "platforms", platform_rows)
+    seed(postgrest, "system_settings", [])
+    seed(postgrest, "streams", [])
+    rows = []
+    for user in range(args.users):
+        for channel_id in rng.sample(channel_ids, min(args.channels_per_user, len(channel_ids))):
+            rows.append({
+                "id": f"row-{user}-{channel_id}",
+                "user_id": f"user-{user}",
+                "channel_id": channel_id,
+                "channel_name": f"{channel_id} channel",
+                "display_name": f"{channel_id} channel",
+                "platform_id": "p-youtube" if channel_id.startswith("UC") else "p-twitch",
+                "is_active": True,
+                "is_subscribed": True,
+            })
+    seed(postgrest, "channels", rows)
+
+    live = [c for c in channel_ids if rng.random() < args.live_fraction]
+    platforms.add_youtube_channels([c for c in channel_ids if c.startswith("UC")])
+    platforms.add_youtube_channels([c for c in live if c.startswith("UC")], live=True)
+    platforms.add_twitch_channels([c for c in live if c.startswith("tw")], live=True)
+    for channel_id in live:
+        platforms.viewers[channel_id] = rng.randint(1, 50000)
+    for endpoint in ("twitch.streams", "youtube.channels", "youtube.playlistItems", "youtube.videos"):
+        platforms.error_rates[endpoint] = args.upstream_error_rate
+        platforms.throttle_rates[endpoint] = args.upstream_throttle_rate
+
+    def stats() -> Dict[str, Any]:
+        return {
+            "postgrest": {
+                "requests": postgrest.requests,
+                "by_table": {f"{method} {table}": n for (method, table), n in sorted(postgrest.requests_by_table.items())},
+                "errors_injected": postgrest.errors_injected,
+                "rows_written": postgrest.rows_written,
+                "connections": len(postgrest.connections),
+            },
+            "platforms": {
+                "calls": dict(sorted(platforms.calls.items())),
+                "ids_requested": dict(sorted(platforms.ids_requested.items())),
+            },
+            "live_channels": len(live),
+        }
+
+    async def app(scope, receive, send) -> None:
+        path = scope.get("path", "")
+        if path == "/_bench/stats":
+            await JSONResponse(stats())(scope, receive, send)
+        elif path == "/_bench/reset":
+            postgrest.reset_counters()
+            platforms.reset_counters()
+            await JSONResponse({})(scope, receive, send)
+        elif path.startswith(("/rest/", "/auth/")):
+            await postgrest.app(scope, receive, send)
+        else:
+            await platforms.app(scope, receive, send)
+
+    uvicorn.run(app, host="127.0.0.1", port=args.fakes_port, log_level="warning",
+                lifespan="off", access_log=False, backlog=4096)
+
+
+def _app_env(args: argparse.Namespace) -> Dict[str, str]:
+    fakes = f"http://127.0.0.1:{args.fakes_port}"
+    scale = args.time_scale
+    return {
+        **os.environ,
+        "SUPABASE_URL": fakes,
+        "SUPABASE_ANON_KEY": "bench-anon",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "YOUTUBE_API_KEY": "bench",
+        "TWITCH_CLIENT_ID": "bench",
+        "TWITCH_CLIENT_SECRET": "bench",
+        "YOUTUBE_API_BASE_URL": f"{fakes}/youtube/v3",
+        "TWITCH_API_BASE_URL": f"{fakes}/helix",
+        "TWITCH_TOKEN_URL": f"{fakes}/oauth2/token",
+        "YOUTUBE_DAILY_QUOTA_UNITS": str(args.youtube_quota),
+        "STREAM_REFRESH_INTERVAL_SECONDS": str(60.0 / scale),
+        "STREAM_REFRESH_MAX_AGE_SECONDS": str(90.0 / scale),
+        "STREAM_REFRESH_MIN_INTERVAL_SECONDS": str(15.0 / scale),
+        "STREAM_CHANNEL_RELOAD_SECONDS": str(300.0 / scale),
+        "STREAM_POLL_TICK_SECONDS": str(15.0 / scale),
+        "STREAM_POLL_MAX_INTERVAL_SECONDS": str(900.0 / scale),
+        "STREAM_VIEWER_UPDATE_INTERVAL_SECONDS": str(120.0 / scale),
+        "STREAM_CACHE_FRESH_SECONDS": str(15.0 / scale),
+        "STREAM_CACHE_STALE_SECONDS": str(300.0 / scale),
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+    }
+
+
+def _token(user_id: str) -> str:
+    claims = {"sub": user_id, "role": "authenticated", "exp": int(time.time()) + 24 * 3600}
+    return jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+
+
+class _Recorder:
+    """Latencies and statuses per endpoint, ignoring the warm-up period."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.monotonic()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            response, status = None, type(exc).__name__
+        if started >= self.measure_from:
+            self.latencies[name].append(time.monotonic() - started)
+            self.statuses[name][status] += 1
+        return response
+
+
+async def _virtual_user(
+    client: httpx.AsyncClient,
+    recorder: _Recorder,
+    user_id: str,
+    args: argparse.Namespace,
+    deadline: float,
+    rng: random.Random
+) -> None:
+    headers = {"Authorization": f"Bearer {_token(user_id)}"}
+    poll_interval = 60.0 / args.time_scale
+    etag = None
+    # Users open the app at random points of the polling period
+    await asyncio.sleep(rng.uniform(0, poll_interval))
+    while time.monotonic() < deadline:
+        conditional = {"If-None-Match": etag} if etag and args.conditional else {}
+        response = await recorder.request(client, "GET /api/streams", "GET", "/api/streams",
+                                          headers={**headers, **conditional})
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get("etag")
+        if rng.random() < args.search_probability:
+            await recorder.request(client, "GET /api/streams/search", "GET", "/api/streams/search",
+                                   headers=headers, params={"query": rng.choice(SEARCH_TERMS)})
+        if rng.random() < args.refresh_probability:
+            await recorder.request(client, "POST /api/streams/refresh", "POST", "/api/streams/refresh",
+                                   headers=headers)
+        await asyncio.sleep(poll_interval * rng.uniform(0.9, 1.1))
+
+
+def _refresh_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled ``stream_refresh_*`` samples from the app's /api/metrics."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("stream_refresh_") and "{" not in line:
+            name, _, value = line.partition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+async def _run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    app_url = f"http://127.0.0.1:{args.port}"
+    fakes_url = f"http://127.0.0.1:{args.fakes_port}"
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    recorder = _Recorder(started + args.warmup)
+    deadline = started + args.warmup + args.duration
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async def reset_upstream_counts() -> None:
+        await asyncio.sleep(args.warmup)
+        async with httpx.AsyncClient(base_url=fakes_url) as fakes:
+            await fakes.post("/_bench/reset")
+
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60.0) as client:
+        await asyncio.gather(reset_upstream_counts(), *(
+            _virtual_user(client, recorder, f"user-{u}", args, deadline, random.Random(rng.random()))
+            for u in range(args.users)
+        ))
+        elapsed = time.monotonic() - recorder.measure_from
+        metrics = (await client.get("/api/metrics")).text
+    async with httpx.AsyncClient(base_url=fakes_url) as client:
+        upstream = (await client.get("/_bench/stats")).json()
+
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        endpoints[name] = {
+            **summarize(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "status": dict(recorder.statuses[name]),
+        }
+    nfr = {}
+    for requirement, (name, limit) in NFR.items():
+        p99 = endpoints.get(name, {}).get("p99_ms")
+        nfr[requirement] = {
+            "endpoint": name,
+            "limit_ms": limit * 1000,
+            "p99_ms": p99,
+            "pass": p99 is not None and p99 < limit * 1000,
+        }
+    total = sum(len(v) for v in recorder.latencies.values())
+    return {
+        "measured_seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+        "nfr": nfr,
+        "refresh": _refresh_metrics(metrics),
+        "upstream": upstream,
+    }
+
+
+def _compare(report: Dict[str, Any], baseline_path: str) -> Dict[str, Any]:
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    ratios = {}
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before and before.get("p99_ms"):
+            ratios[name] = round(current["p99_ms"] / before["p99_ms"], 3)
+    return {"commit": baseline.get("commit"), "p99_ratio": ratios}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--channels-per-user", type=int, default=30)
+    parser.add_argument("--distinct-channels", type=int, default=2000)
+    parser.add_argument("--live-fraction", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=60.0, help="measured wall-clock seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="unmeasured seconds before --duration")
+    parser.add_argument("--time-scale", type=float, default=10.0, help="1 = real minute polling")
+    parser.add_argument("--search-probability", type=float, default=0.1, help="per poll")
+    parser.add_argument("--refresh-probability", type=float, default=0.02, help="per poll")
+    parser.add_argument("--conditional", action="store_true", help="poll with If-None-Match")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the API rate limiter on")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="seconds per platform call")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="share of platform calls answered 503")
+    parser.add_argument("--upstream-throttle-rate", type=float, default=0.0, help="share of platform calls answered 429")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds per PostgREST call")
+    parser.add_argument("--db-error-rate", type=float, default=0.0, help="share of PostgREST calls answered 503")
+    parser.add_argument("--youtube-quota", type=int, default=10 ** 7, help="daily units (10000 in production)")
+    parser.add_argument("--max-connections", type=int, default=200, help="client connection pool size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fakes-port", type=int, default=8767)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare p99 latencies against")
+    parser.add_argument("--serve-fakes", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_fakes:
+        _serve_fakes(args)
+        return
+
+    _raise_fd_limit(args.max_connections * 4 + 256)
+    fakes = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_end_to_end", "--serve-fakes", *sys.argv[1:]])
+    app = None
+    try:
+        _wait_for_port(args.fakes_port)
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+             "--log-level", "warning", "--no-access-log", "--backlog", "4096"],
+            env=_app_env(args),
+        )
+        _wait_for_port(args.port)
+        report = asyncio.run(_run_load(args))
+    finally:
+        for process in (app, fakes):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {
+        "benchmark": "end_to_end",
+        "commit": _git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("serve_fakes", "output", "baseline")},
+        **report,
+    }
+    if args.baseline:
+        report["baseline"] = _compare(report, args.baseline)
+    emit(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Offset versus keyset pagination at increasing page depth.
+
+Builds a synthetic ``streams`` table of ``--rows`` live streams in SQLite
+(standing in for Postgres) with the partial keyset indexes from the schema
+design, then times fetching one page at several depths with ``OFFSET`` and
+with a ``(viewer_count, id) < (?, ?)`` keyset predicate. The same comparison
+is run on the in-memory sorted list behind ``GET /api/streams``.
+
+    python -m benchmarks.bench_keyset_pagination --rows 1000000 --limit 20
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List
+
+from app.core.pagination import encode_page_cursor, keyset_page
+from app.services.stream_cache import SORT_KEYS, sort_items
+from benchmarks._stats import emit, summarize
+
+DEPTH_FRACTIONS = (0.0, 0.01, 0.1, 0.5, 0.9)
+
+
+def _build_table(rows: int) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute(
+        "CREATE TABLE streams (id TEXT PRIMARY KEY, viewer_count INTEGER, started_at TEXT, is_live INTEGER)"
+    )
+    rng = random.Random(1)
+    db.executemany(
+        "INSERT INTO streams VALUES (?, ?, ?, 1)",
+        (
+            (f"{i:08d}", rng.randint(0, 100000), f"2025-08-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00+00:00")
+            for i in range(rows)
+        ),
+    )
+    db.execute("CREATE INDEX idx_streams_live_viewers_keyset ON streams(viewer_count DESC, id DESC) WHERE is_live = 1")
+    return db
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def _bench_sql(db: sqlite3.Connection, rows: int, limit: int, repeat: int) -> List[Dict[str, Any]]:
+    offset_sql = (
+        "SELECT id, viewer_count FROM streams WHERE is_live = 1 "
+        "ORDER BY viewer_count DESC, id DESC LIMIT ? OFFSET ?"
+    )
+    keyset_sql = (
+        "SELECT id, viewer_count FROM streams WHERE is_live = 1 AND (viewer_count, id) < (?, ?) "
+        "ORDER BY viewer_count DESC, id DESC LIMIT ?"
+    )
+    plan = db.execute("EXPLAIN QUERY PLAN " + keyset_sql, (0, "", limit)).fetchall()
+    results = []
+    for fraction in DEPTH_FRACTIONS:
+        depth = int(rows * fraction)
+        # Last row of the previous page = the cursor a client would send
+        last = db.execute(offset_sql, (1, max(0, depth - 1))).fetchone()
+        cursor = (last[1], last[0]) if depth else (10 ** 9, "")
+        results.append({
+            "depth": depth,
+            "offset": _time(lambda: db.execute(offset_sql, (limit, depth)).fetchall(), repeat),
+            "keyset": _time(lambda: db.execute(keyset_sql, (*cursor, limit)).fetchall(), repeat),
+        })
+    results.append({"keyset_plan": " | ".join(row[-1] for row in plan)})
+    return results
+
+
+def _bench_memory(rows: int, limit: int, repeat: int) -> List[Dict[str, Any]]:
+    rng = random.Random(2)
+    items = sort_items(
+        [{"id": f"{i:08d}", "viewerCount": rng.randint(0, 100000), "startedAt": ""} for i in range(rows)],
+        "viewers",
+    )
+    key = SORT_KEYS["viewers"]
+    results = []
+    for fraction in DEPTH_FRACTIONS:
+        depth = int(rows * fraction)
+        cursor = encode_page_cursor("viewers", key(items[depth - 1])) if depth else None
+        results.append({
+            "depth": depth,
+            "offset": _time(lambda: items[depth:depth + limit], repeat),
+            "keyset": _time(lambda: keyset_page(items, "viewers", key, limit, cursor), repeat),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = _build_table(args.rows)
+    build_seconds = time.perf_counter() - started
+    emit({
+        "benchmark": "keyset_pagination",
+        "rows": args.rows,
+        "limit": args.limit,
+        "table_build_seconds": round(build_seconds, 1),
+        "sql": _bench_sql(db, args.rows, args.limit, args.repeat),
+        "in_memory_list": _bench_memory(args.rows, args.limit, args.repeat),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Metrics recording overhead.
+
+Times ``Histogram.labels(...).observe`` and one ASGI call through
+``MetricsMiddleware`` in front of a no-op app versus the no-op app alone,
+plus the cost of rendering ``/api/metrics`` with ``--series`` label sets.
+
+    python -m benchmarks.bench_metrics --calls 200000 --series 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.core.metrics import Histogram, MetricsRegistry
+from app.middleware.metrics import MetricsMiddleware
+from benchmarks._stats import emit
+
+
+class _Route:
+    path = "/api/streams"
+
+
+async def _noop_app(scope, receive, send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+
+
+async def _noop_send(message) -> None:
+    return None
+
+
+def _per_call_us(seconds: float, calls: int) -> float:
+    return round(seconds / calls * 1e6, 3)
+
+
+def _bench_observe(calls: int) -> float:
+    histogram = Histogram("bench_seconds", "bench", ("method", "route", "status"))
+    started = time.perf_counter()
+    for i in range(calls):
+        histogram.labels("GET", "/api/streams", "200").observe((i % 1000) / 1000)
+    return _per_call_us(time.perf_counter() - started, calls)
+
+
+async def _bench_middleware(calls: int) -> float:
+    middleware = MetricsMiddleware(_noop_app)
+    scope = {"type": "http", "method": "GET", "path": "/api/streams"}
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        await _noop_app(scope, None, _noop_send)
+    baseline = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        await middleware(scope, None, _noop_send)
+    return _per_call_us(time.perf_counter() - started - baseline, calls)
+
+
+def _bench_render(series: int) -> float:
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("bench_seconds", "bench", ("route", "status")))
+    for i in range(series):
+        histogram.labels(f"/api/route{i}", "200").observe(0.01)
+    started = time.perf_counter()
+    registry.render()
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--series", type=int, default=200)
+    args = parser.parse_args()
+
+    emit({
+        "benchmark": "metrics",
+        "calls": args.calls,
+        "observe_us": _bench_observe(args.calls),
+        "middleware_overhead_us": asyncio.run(_bench_middleware(args.calls)),
+        "series": args.series,
+        "render_ms": _bench_render(args.series),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Adaptive polling cadence simulation.
+
+Generates synthetic streaming schedules for N channels. Routine channels
+go live in 2-4 fixed weekly slots, with jitter and skipped weeks.
+Irregular channels go live at random times about twice a week. Dormant
+channels go live about once every five weeks. The first ``--history-weeks``
+weeks seed the start-window model, as ``streams.started_at`` does in
+production. The next ``--weeks`` weeks are then polled in 15 s scheduler
+ticks with:
+
+* ``fixed``: every channel every interval (the previous scheduler)
+* ``backoff``: the adaptive cadence without learned windows
+* ``adaptive``: the adaptive cadence with windows learned from the history
+
+For each strategy the report gives the channel checks (upstream work; each
+YouTube check costs quota units) and the go-live detection delay: the time
+from a stream's start to the first check that sees it live.
+
+    python -m benchmarks.bench_polling_cadence --channels 1000 --weeks 2
+"""
+
+import argparse
+import random
+from bisect import bisect_right
+from typing import Any, Dict, List, Tuple
+
+from app.models.channel import ChannelKey
+from app.services.polling_cadence import HOUR, WEEK, PollingCadence, StartWindows
+from benchmarks._stats import emit, percentile
+
+DAY = 24 * HOUR
+TICK = 15.0
+
+Sessions = Dict[ChannelKey, Tuple[List[float], List[float]]]
+
+
+def _sessions(rng: random.Random, channels: int, weeks: int) -> Tuple[Sessions, Dict[str, List[ChannelKey]]]:
+    """(starts, ends) per channel over ``weeks`` weeks, and channels per kind."""
+    sessions: Sessions = {}
+    kinds: Dict[str, List[ChannelKey]] = {"routine": [], "irregular": [], "dormant": []}
+    for i in range(channels):
+        key = ChannelKey("youtube", f"UC{i:06d}")
+        draw = rng.random()
+        starts: List[float] = []
+        if draw < 0.4:
+            kinds["routine"].append(key)
+            slots = [rng.randrange(7) * DAY + rng.randrange(12, 24) * HOUR for _ in range(rng.randint(2, 4))]
+            for week in range(weeks):
+                for slot in slots:
+                    if rng.random() > 0.15:
+                        starts.append(week * WEEK + slot + rng.gauss(0, 600))
+            durations = (1.5 * HOUR, 4 * HOUR)
+        else:
+            kind = "irregular" if draw < 0.7 else "dormant"
+            kinds[kind].append(key)
+            rate = 2 / WEEK if kind == "irregular" else 0.2 / WEEK
+            t = rng.expovariate(rate)
+            while t < weeks * WEEK:
+                starts.append(t)
+                t += rng.expovariate(rate)
+            durations = (1 * HOUR, 3 * HOUR)
+        starts.sort()
+        ends = []
+        for n, start in enumerate(starts):
+            end = start + rng.uniform(*durations)
+            if n + 1 < len(starts):
+                end = min(end, starts[n + 1] - 60)
+            ends.append(end)
+        sessions[key] = (starts, ends)
+    return sessions, kinds
+
+
+def _session_at(sessions: Sessions, key: ChannelKey, t: float) -> int:
+    """Index of the session live at ``t``, or -1."""
+    starts, ends = sessions[key]
+    index = bisect_right(starts, t) - 1
+    return index if index >= 0 and t < ends[index] else -1
+
+
+def _evaluated(sessions: Sessions, begin: float, end: float) -> Dict[Tuple[ChannelKey, int], float]:
+    return {
+        (key, n): start
+        for key, (starts, _) in sessions.items()
+        for n, start in enumerate(starts) if begin <= start < end
+    }
+
+
+def _report(checks: int, delays: List[float], events: int, fixed_checks: int) -> Dict[str, Any]:
+    return {
+        "checks": checks,
+        "checks_saved_pct": round(100 * (1 - checks / fixed_checks), 1) if fixed_checks else 0.0,
+        "go_live_events": events,
+        "missed_events": events - len(delays),
+        "detection_delay_p50_s": round(percentile(delays, 50), 1),
+        "detection_delay_p95_s": round(percentile(delays, 95), 1),
+        "detection_delay_max_s": round(max(delays, default=0.0), 1),
+    }
+
+
+def _simulate_fixed(rng: random.Random, sessions: Sessions, begin: float, end: float, interval: float):
+    events = _evaluated(sessions, begin, end)
+    phases = {key: rng.uniform(0, interval) for key in sessions}
+    delays = []
+    for (key, n), start in events.items():
+        phase = begin + phases[key]
+        check = phase + max(0, -(-(start - phase) // interval)) * interval
+        if check < sessions[key][1][n]:
+            delays.append(check - start)
+    checks = sum(int((end - begin - phase) // interval) + 1 for phase in phases.values())
+    return checks, delays, len(events)
+
+
+def _simulate_cadence(sessions: Sessions, begin: float, end: float, cadence: PollingCadence):
+    events = _evaluated(sessions, begin, end)
+    detected: Dict[Tuple[ChannelKey, int], float] = {}
+    cadence.sync(sessions, begin)
+    checks = 0
+    now = begin
+    while now < end:
+        for key in cadence.due(now):
+            checks += 1
+            n = _session_at(sessions, key, now)
+            if n >= 0 and (key, n) in events and (key, n) not in detected:
+                detected[(key, n)] = now - events[(key, n)]
+            started_at = sessions[key][0][n] if n >= 0 else None
+            cadence.record(key, live=n >= 0, started_at=started_at, now=now)
+        now += TICK
+    return checks, list(detected.values()), len(events)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=1000)
+    parser.add_argument("--history-weeks", type=int, default=8)
+    parser.add_argument("--weeks", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=60.0)
+    parser.add_argument("--max-interval", type=float, default=900.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions, kinds = _sessions(rng, args.channels, args.history_weeks + args.weeks)
+    begin = args.history_weeks * WEEK
+    end = begin + args.weeks * WEEK
+
+    fixed_checks, fixed_delays, events = _simulate_fixed(rng, sessions, begin, end, args.interval)
+    results = {"fixed": _report(fixed_checks, fixed_delays, events, fixed_checks)}
+
+    history = [
+        (key, start)
+        for key, (starts, _) in sessions.items()
+        for start in starts if start < begin
+    ]
+    for name, min_weeks in (("backoff", 10 ** 6), ("adaptive", 2)):
+        windows = StartWindows(min_weeks=min_weeks)
+        windows.load(history)
+        cadence = PollingCadence(args.interval, args.max_interval, windows=windows)
+        checks, delays, events = _simulate_cadence(sessions, begin, end, cadence)
+        results[name] = _report(checks, delays, events, fixed_checks)
+        if name == "adaptive":
+            # Detection delay of routine channels alone: the case windows are for
+            routine = set(kinds["routine"])
+            subset = {key: value for key, value in sessions.items() if key in routine}
+            cadence = PollingCadence(args.interval, args.max_interval, windows=windows)
+            _, delays, events = _simulate_cadence(subset, begin, end, cadence)
+            results["adaptive"]["routine_detection_delay_p95_s"] = round(percentile(delays, 95), 1)
+            cadence = PollingCadence(args.interval, args.max_interval)
+            _, delays, _ = _simulate_cadence(subset, begin, end, cadence)
+            results["backoff"]["routine_detection_delay_p95_s"] = round(percentile(delays, 95), 1)
+
+    emit({
+        "benchmark": "polling_cadence",
+        "channels": {kind: len(keys) for kind, keys in kinds.items()},
+        "weeks": args.weeks,
+        "history_weeks": args.history_weeks,
+        "interval_s": args.interval,
+        "max_interval_s": args.max_interval,
+        "strategies": results,
+    })
+
+
+if __name__ == "__main__":
+    main()
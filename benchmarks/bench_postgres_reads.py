@@ -0,0 +1,211 @@
+"""Direct Postgres read path benchmark.
+
+Loads users' live stream lists (the ``GET /api/streams`` query) from a
+local Postgres two ways, with the same SQL shape and the production RLS
+policies installed:
+
+* ``pool``: the asyncpg read path (per-transaction claims, prepared
+  statements, binary rows decoded straight into list items);
+* ``postgrest``: ``fetch_user_live_streams`` through the Supabase client in a
+  worker thread, exactly as the fallback path runs it.
+
+The PostgREST side is a small stand-in that answers the embedded-resource
+request with the same join, built into JSON by Postgres (``json_agg``) as
+PostgREST does, so it omits PostgREST's own request parsing and JWT work.
+
+    python -m benchmarks.bench_postgres_reads --dsn postgresql://postgres@127.0.0.1:5432/postgres
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+import asyncpg
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from supabase import create_client
+
+from app.core.postgres import PostgresPool
+from app.services.postgres_service import fetch_user_live_stream_items
+from app.services.stream_cache import sort_items, to_stream_item
+from app.services.supabase_service import fetch_user_live_streams
+from benchmarks._stats import emit, summarize
+from tests.fakes.server import serve_in_thread
+from tests.fakes.supabase_schema import install_schema
+
+POSTGREST_STREAMS_SQL = """
+SELECT coalesce(json_agg(row_to_json(r)), '[]')::text FROM (
+    SELECT s.id, s.platform_stream_id, s.title, s.thumbnail_url, s.viewer_count, s.game_name, s.started_at,
+           s.is_live,
+           json_build_object(
+               'id', c.id, 'channel_id', c.channel_id, 'channel_name', c.channel_name,
+               'display_name', c.display_name, 'user_id', c.user_id, 'is_subscribed', c.is_subscribed,
+               'platforms', json_build_object('name', p.name)
+           ) AS channels
+    FROM streams s
+    JOIN channels c ON c.id = s.channel_id
+    JOIN platforms p ON p.id = c.platform_id
+    WHERE s.is_live AND c.user_id = $1::uuid AND c.is_subscribed
+) r
+"""
+
+
+def postgrest_stand_in(dsn: str) -> Starlette:
+    """``GET /rest/v1/streams`` answered from Postgres, JSON built server side."""
+    state: Dict[str, Any] = {}
+
+    async def streams(request: Request) -> Response:
+        if "pool" not in state:
+            state["pool"] = await asyncpg.create_pool(dsn, min_size=4, max_size=16)
+        user_id = request.query_params["channels.user_id"].removeprefix("eq.")
+        async with state["pool"].acquire() as connection:
+            body = await connection.fetchval(POSTGREST_STREAMS_SQL, user_id)
+        return Response(body, media_type="application/json")
+
+    return Starlette(routes=[Route("/rest/v1/streams", streams)])
+
+
+async def _prepare(admin_dsn: str, name: str, users: int, channels: int, live: float) -> List[str]:
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await admin.close()
+    connection = await asyncpg.connect(_database_dsn(admin_dsn, name))
+    rng = random.Random(7)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    try:
+        await install_schema(connection)
+        await connection.executemany(
+            "INSERT INTO users (id, email, username) VALUES ($1, $2, $2)",
+            [(uuid.UUID(u), f"user{i}@example.com") for i, u in enumerate(user_ids)],
+        )
+        platform_ids = [r["id"] for r in await connection.fetch("SELECT id FROM platforms ORDER BY name")]
+        channel_rows = [
+            (uuid.uuid4(), uuid.UUID(u), platform_ids[c % 2], f"ch{c}", f"channel_{c}", f"Channel {c}")
+            for u in user_ids for c in range(channels)
+        ]
+        await connection.executemany(
+            "INSERT INTO channels (id, user_id, platform_id, channel_id, channel_name, display_name) "
+            "VALUES ($1, $2, $3, $4, $5, $6)",
+            channel_rows,
+        )
+        await connection.executemany(
+            "INSERT INTO streams (channel_id, platform_stream_id, title, viewer_count, game_name, is_live, started_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6, now() - make_interval(mins => $4 % 600))",
+            [
+                (row[0], f"v{i}", f"Stream {i}", rng.randint(0, 50_000), f"Game {i % 25}", rng.random() < live)
+                for i, row in enumerate(channel_rows)
+            ],
+        )
+        await connection.execute("ANALYZE")
+    finally:
+        await connection.close()
+    return user_ids
+
+
+async def _drop(admin_dsn: str, name: str) -> None:
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await admin.close()
+
+
+def _database_dsn(admin_dsn: str, name: str) -> str:
+    return admin_dsn.rsplit("/", 1)[0] + f"/{name}"
+
+
+async def _run(
+    load: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+    user_ids: List[str],
+    requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    items = 0
+    remaining = iter(range(requests))
+
+    async def worker(seed: int) -> None:
+        nonlocal items
+        rng = random.Random(seed)
+        for _ in remaining:
+            started = time.perf_counter()
+            result = await load(rng.choice(user_ids))
+            latencies.append(time.perf_counter() - started)
+            items += len(result)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_s": round(requests / elapsed, 1),
+        "items_per_request": round(items / requests, 1),
+        **summarize(latencies),
+    }
+
+
+async def _bench(args: argparse.Namespace) -> Dict[str, Any]:
+    name = f"bench_postgres_reads_{uuid.uuid4().hex[:8]}"
+    user_ids = await _prepare(args.dsn, name, args.users, args.channels, args.live)
+    dsn = _database_dsn(args.dsn, name)
+    try:
+        pool = PostgresPool(dsn, min_size=args.pool_size, max_size=args.pool_size)
+        await pool.open()
+
+        async def via_pool(user_id: str) -> List[Dict[str, Any]]:
+            return sort_items(await fetch_user_live_stream_items(pool, user_id), "viewers")
+
+        # Warm every connection's prepared statements, as a running worker would have
+        await _run(via_pool, user_ids, args.pool_size * 4, args.pool_size)
+        pool_report = await _run(via_pool, user_ids, args.requests, args.concurrency)
+        pool_report["pool"] = pool.stats()
+        await pool.close()
+
+        with serve_in_thread(postgrest_stand_in(dsn)) as base_url:
+            client = create_client(base_url, "service-key")
+
+            async def via_postgrest(user_id: str) -> List[Dict[str, Any]]:
+                rows = await asyncio.to_thread(fetch_user_live_streams, user_id, client=client)
+                return sort_items([to_stream_item(row) for row in rows], "viewers")
+
+            await _run(via_postgrest, user_ids, args.pool_size * 4, args.pool_size)
+            postgrest = await _run(via_postgrest, user_ids, args.requests, args.concurrency)
+    finally:
+        await _drop(args.dsn, name)
+
+    return {
+        "benchmark": "postgres_reads",
+        "users": args.users,
+        "channels_per_user": args.channels,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        # Client, app and server share these; latency at high concurrency is mostly CPU queueing
+        "cpus": os.cpu_count(),
+        "pool": pool_report,
+        "postgrest": postgrest,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("POSTGRES_TEST_URL", "postgresql://postgres@127.0.0.1:5432/postgres"),
+                        help="superuser DSN; a scratch database is created and dropped")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=40, help="channels per user")
+    parser.add_argument("--live", type=float, default=0.5, help="share of channels that are live")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=5)
+    args = parser.parse_args()
+    emit(asyncio.run(_bench(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Rate limit hot-path overhead.
+
+Times ``MemoryRateLimitBackend.acquire_nowait`` alone, then one ASGI call
+through ``RateLimitMiddleware`` in front of a no-op app versus the no-op app
+called directly, for an authenticated request (token verification served by
+the claims cache) and an anonymous one. ``--clients`` distinct keys are
+cycled so the LRU bookkeeping is exercised.
+
+    python -m benchmarks.bench_rate_limit --calls 200000 --clients 10000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import jwt
+
+from app.core.config import get_settings
+from app.middleware.rate_limit import MemoryRateLimitBackend, RateLimit, RateLimitMiddleware
+from benchmarks._stats import emit
+
+settings = get_settings()
+
+
+async def _noop_app(scope, receive, send) -> None:
+    return None
+
+
+def _scope(client: int, token: str = "") -> Dict[str, Any]:
+    headers = [(b"host", b"api")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/streams",
+        "headers": headers,
+        "client": (f"10.0.{client // 256 % 256}.{client % 256}", 50000),
+    }
+
+
+def _per_call_us(seconds: float, calls: int) -> float:
+    return round(seconds / calls * 1e6, 3)
+
+
+def _bench_backend(calls: int, clients: int) -> float:
+    backend = MemoryRateLimitBackend(max_keys=clients * 2)
+    rate = RateLimit(calls, 60.0)
+    keys = [f"api:user:{i}" for i in range(clients)]
+    started = time.perf_counter()
+    for i in range(calls):
+        backend.acquire_nowait(keys[i % clients], rate)
+    return _per_call_us(time.perf_counter() - started, calls)
+
+
+async def _time_asgi(app, scopes: List[Dict[str, Any]], calls: int) -> float:
+    count = len(scopes)
+    started = time.perf_counter()
+    for i in range(calls):
+        await app(scopes[i % count], None, None)
+    return time.perf_counter() - started
+
+
+async def _bench_middleware(calls: int, clients: int) -> Dict[str, Any]:
+    backend = MemoryRateLimitBackend(max_keys=clients * 2)
+    middleware = RateLimitMiddleware(_noop_app, backend=backend)
+    # Budget above the call count so every call takes the allow path
+    middleware.route_classes = tuple(c._replace(rate=RateLimit(calls * 2, 60.0)) for c in middleware.route_classes)
+    tokens = [
+        jwt.encode({"sub": f"user-{i}", "exp": int(time.time()) + 3600}, settings.SUPABASE_JWT_SECRET, algorithm="HS256")
+        for i in range(min(clients, 1000))
+    ]
+    authenticated = [_scope(i, tokens[i % len(tokens)]) for i in range(clients)]
+    anonymous = [_scope(i) for i in range(clients)]
+
+    # Warm the claims cache, then measure
+    await _time_asgi(middleware, authenticated, clients)
+    baseline = await _time_asgi(_noop_app, anonymous, calls)
+    results = {}
+    for name, scopes in (("authenticated", authenticated), ("anonymous", anonymous)):
+        elapsed = await _time_asgi(middleware, scopes, calls)
+        results[name] = {
+            "per_request_us": _per_call_us(elapsed, calls),
+            "overhead_us": _per_call_us(elapsed - baseline, calls),
+        }
+    results["keys"] = len(backend)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=10000)
+    args = parser.parse_args()
+
+    emit({
+        "benchmark": "rate_limit",
+        "calls": args.calls,
+        "clients": args.clients,
+        "backend_acquire_us": _bench_backend(args.calls, args.clients),
+        "middleware": asyncio.run(_bench_middleware(args.calls, args.clients)),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cold start benchmark.
+
+Starts a fresh ``uvicorn main:app`` process repeatedly and measures, from
+the ``Popen`` call, how long it takes until ``GET /`` first answers. This
+is what a scale-to-zero wake-up or restart costs the first caller.
+
+Supabase is not configured, so the lifespan hook skips client warm-up and
+background services; the number covers interpreter start, imports, app
+construction and uvicorn startup. ``import`` is ``import main`` alone,
+measured in a separate interpreter.
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks._stats import emit, summarize
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env() -> Dict[str, str]:
+    return {
+        "PATH": os.environ.get("PATH", ""),
+        "PYTHONPATH": os.getcwd(),
+        "HEALTH_CHECK_ENABLED": "false",
+        "OAUTH_TOKEN_REFRESH_ENABLED": "false",
+    }
+
+
+def _time_to_first_request(timeout: float) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=_env(),
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    time.sleep(0.005)
+        raise TimeoutError(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _import_time() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], env=_env(), capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    first_request: List[float] = [_time_to_first_request(args.timeout) for _ in range(args.runs)]
+    imports: List[float] = [_import_time() for _ in range(args.runs)]
+    emit({
+        "benchmark": "startup",
+        "runs": args.runs,
+        "cpus": os.cpu_count(),
+        "time_to_first_request": summarize(first_request),
+        "import": summarize(imports),
+    })
+
+
+if __name__ == "__main__":
+    main()
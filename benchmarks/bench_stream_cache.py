@@ -0,0 +1,106 @@
+"""Stream list cache hit-path benchmark.
+
+Measures ``SWRCache.get`` on a fresh entry, and ``GET /api/streams`` end to
+end (in-process ASGI) with the cache warm versus a load on every request
+against a database stand-in with the given latency.
+
+    python -m benchmarks.bench_stream_cache --lookups 100000 --requests 500 --db-latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from app.core.auth import get_current_user_async
+from app.core.cache import SWRCache
+from app.services import stream_cache
+from benchmarks._stats import emit, summarize
+from main import app
+
+
+def _rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": f"s{i}",
+            "platform_stream_id": f"v{i}",
+            "title": f"stream {i}",
+            "thumbnail_url": None,
+            "viewer_count": i,
+            "game_name": "Apex Legends",
+            "started_at": "2025-08-07T10:00:00+00:00",
+            "is_live": True,
+            "channels": {"id": f"c{i}", "channel_name": f"chan{i}", "platforms": {"name": "youtube"}},
+        }
+        for i in range(count)
+    ]
+
+
+async def _bench_lookups(lookups: int) -> Dict[str, Any]:
+    cache: SWRCache = SWRCache(fresh_ttl=3600, stale_ttl=0, max_weight=10 ** 6, weigh=len)
+
+    async def load():
+        return _rows(100)
+
+    await cache.get("key", load)
+    latencies = []
+    for _ in range(lookups):
+        started = time.perf_counter()
+        await cache.get("key", load)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+async def _bench_endpoint(requests: int, db_latency: float, streams: int, cached: bool) -> Dict[str, Any]:
+    rows = _rows(streams)
+    loads = 0
+
+    async def fetch(user_id, platform=None, category=None, client=None):
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(db_latency)
+        return rows
+
+    stream_cache._stream_cache = SWRCache(
+        fresh_ttl=3600 if cached else 0, stale_ttl=0, max_weight=10 ** 6, weigh=len,
+    )
+    original = stream_cache.fetch_user_live_streams
+    stream_cache.fetch_user_live_streams = fetch
+    app.dependency_overrides[get_current_user_async] = lambda: {"sub": "bench-user"}
+    latencies = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get("/api/streams", params={"limit": 100})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+    finally:
+        stream_cache.fetch_user_live_streams = original
+        stream_cache._stream_cache = None
+        app.dependency_overrides.clear()
+    return {"database_loads": loads, **summarize(latencies)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--streams", type=int, default=200, help="live streams in the user's list")
+    parser.add_argument("--db-latency", type=float, default=0.05, help="database round-trip (s)")
+    args = parser.parse_args()
+
+    emit({
+        "benchmark": "stream_cache",
+        "db_latency_s": args.db_latency,
+        "swr_cache_get_hit": asyncio.run(_bench_lookups(args.lookups)),
+        "endpoint_cached": asyncio.run(_bench_endpoint(args.requests, args.db_latency, args.streams, True)),
+        "endpoint_uncached": asyncio.run(_bench_endpoint(args.requests, args.db_latency, args.streams, False)),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Idle push connection load test.
+
+Starts the API in a child process (one uvicorn worker, real JWT auth) with a
+synthetic publisher, opens ``--connections`` SSE connections from this
+process and reports the worker's resident memory before and after, the
+memory per idle connection, and how many events the connections received
+while the publisher changed viewer counts.
+
+    python -m benchmarks.bench_stream_events --connections 5000 --users 500
+"""
+
+import argparse
+import asyncio
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import jwt
+
+from app.core.config import get_settings
+from benchmarks._stats import emit
+
+CHANNELS = 100
+
+
+def _raise_fd_limit(wanted: int) -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, wanted)
+    target = max(soft, min(target, wanted))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+
+def _rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _token(user_id: str) -> str:
+    claims = {"sub": user_id, "role": "authenticated", "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, get_settings().SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+def _serve(port: int, users: int, publish_interval: float) -> None:
+    """Child process: the real app plus a broker fed by synthetic snapshots."""
+    import uvicorn
+
+    from app.models.channel import ChannelKey, ChannelSubscription
+    from app.models.stream import PlatformStream
+    from app.services.refresh_scheduler import ChannelSnapshot
+    from app.services.stream_events import StreamEventBroker
+    from main import app
+
+    keys = [ChannelKey("twitch", f"c{i}") for i in range(CHANNELS)]
+    # user-N follows channel N % CHANNELS
+    followers = {key: [ChannelSubscription(f"row-{u}", f"user-{u}", key) for u in range(i, users, CHANNELS)]
+                 for i, key in enumerate(keys)}
+    broker = StreamEventBroker(lambda key: followers.get(key, []), max_connections=10 ** 6)
+    app.state.stream_events = broker
+
+    def snapshots(viewers: int) -> Dict[ChannelKey, ChannelSnapshot]:
+        return {
+            key: ChannelSnapshot(key=key, streams=[PlatformStream(
+                platform="twitch", platform_channel_id=key.channel_id, platform_stream_id=f"{key.channel_id}-live",
+                title="bench", viewer_count=viewers, started_at="2025-08-07T10:00:00+00:00",
+            )])
+            for key in keys
+        }
+
+    async def publisher(publishing: asyncio.Event) -> None:
+        viewers = 0
+        while True:
+            await publishing.wait()
+            viewers += 1
+            broker.publish(snapshots(viewers))
+            await asyncio.sleep(publish_interval)
+
+    async def main() -> None:
+        # SIGUSR1 starts the viewer count changes, SIGUSR2 stops them
+        publishing = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, publishing.set)
+        loop.add_signal_handler(signal.SIGUSR2, publishing.clear)
+        broker.publish(snapshots(0))
+        task = asyncio.create_task(publisher(publishing))
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                lifespan="off", backlog=4096)
+        await uvicorn.Server(config).serve()
+        task.cancel()
+
+    asyncio.run(main())
+
+
+async def _open(port: int, user_id: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/streams/events HTTP/1.1\r\nHost: bench\r\n"
+        f"Authorization: Bearer {_token(user_id)}\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    await reader.readuntil(b"event: ready")
+    return reader, writer
+
+
+async def _count_events(reader: asyncio.StreamReader, counts: List[int], index: int) -> None:
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            return
+        counts[index] += chunk.count(b"event: stream.")
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def _bench(server: subprocess.Popen, port: int, connections: int, users: int, publish_seconds: float) -> Dict[str, Any]:
+    await asyncio.sleep(1.0)
+    baseline = _rss_kib(server.pid)
+    opened = []
+    started = time.perf_counter()
+    for offset in range(0, connections, 200):
+        opened += await asyncio.gather(*(
+            _open(port, f"user-{i % users}") for i in range(offset, min(offset + 200, connections))
+        ))
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(1.0)
+    idle = _rss_kib(server.pid)
+
+    counts = [0] * len(opened)
+    readers = [asyncio.create_task(_count_events(r, counts, i)) for i, (r, _) in enumerate(opened)]
+    server.send_signal(signal.SIGUSR1)
+    await asyncio.sleep(publish_seconds)
+    server.send_signal(signal.SIGUSR2)
+    await asyncio.sleep(0.5)
+    publishing = _rss_kib(server.pid)
+
+    for task in readers:
+        task.cancel()
+    for _, writer in opened:
+        writer.close()
+    return {
+        "connections": len(opened),
+        "connect_seconds": round(connect_seconds, 2),
+        "server_rss_baseline_mib": round(baseline / 1024, 1),
+        "server_rss_idle_mib": round(idle / 1024, 1),
+        "server_rss_after_publishing_mib": round(publishing / 1024, 1),
+        "kib_per_idle_connection": round((idle - baseline) / max(1, len(opened)), 1),
+        "events_received": sum(counts),
+        "connections_without_events": sum(1 for c in counts if c == 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500, help="distinct users among the connections")
+    parser.add_argument("--publish-interval", type=float, default=1.0, help="seconds between viewer changes")
+    parser.add_argument("--publish-seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    _raise_fd_limit(args.connections * 2 + 256)
+    if args.serve:
+        _serve(args.port, args.users, args.publish_interval)
+        return
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.bench_stream_events", "--serve", "--port", str(args.port),
+        "--users", str(args.users), "--publish-interval", str(args.publish_interval),
+        "--connections", str(args.connections),
+    ])
+    try:
+        _wait_for_port(args.port)
+        report = asyncio.run(_bench(server, args.port, args.connections, args.users, args.publish_seconds))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    emit({"benchmark": "stream_events", **report})
+
+
+if __name__ == "__main__":
+    main()
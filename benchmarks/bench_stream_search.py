@@ -0,0 +1,175 @@
+"""In-memory search index versus a database full-text query.
+
+Builds a synthetic live set of ``--streams`` streams with mixed Japanese and
+English titles, indexes it with ``StreamSearchIndex`` and times a query mix
+(single kanji, kana words, English words, prefixes, viewer bounds) over the
+whole set and restricted to one user's ``--followed`` channels, which is
+what ``GET /api/streams/search`` runs. The same queries run against SQLite
+FTS5 with the trigram tokenizer as a stand-in for the Postgres
+``text_search`` fallback; a real database adds a network round trip on top
+of the numbers reported for it. Incremental update cost (one
+refresh cycle changing viewers on every stream and replacing ``--churn``
+streams, applied in scheduler chunks of ``--chunk`` channels) is reported
+as well, with the latency of the queries right after it, which re-sort the
+posting lists they read.
+
+    python -m benchmarks.bench_stream_search --streams 20000 --queries 2000
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from app.models.channel import ChannelKey
+from app.models.stream import PlatformStream
+from app.services.refresh_scheduler import ChannelSnapshot
+from app.services.stream_search import StreamSearchIndex
+from benchmarks._stats import emit, summarize
+
+JA_WORDS = ["歌枠", "雑談", "配信", "ゲーム実況", "初見歓迎", "耐久", "作業用", "ランクマ", "参加型", "朝活", "ホラー", "縦型"]
+EN_WORDS = ["apex", "valorant", "minecraft", "chill", "ranked", "speedrun", "english", "collab", "karaoke", "live"]
+GAMES = ["Apex Legends", "VALORANT", "Minecraft", "Just Chatting", "Music", "Pokémon"]
+QUERIES = [
+    ("歌", {}), ("歌枠", {}), ("雑談 配信", {}), ("ランクマ", {"min_viewers": 1000}), ("初見歓迎", {}),
+    ("apex", {}), ("ap", {}), ("minecraft 建", {}), ("chill", {"max_viewers": 500}), ("", {"min_viewers": 5000}),
+]
+
+
+def _streams(count: int, rng: random.Random) -> List[Tuple[ChannelKey, PlatformStream]]:
+    started_at = datetime(2025, 8, 7, tzinfo=timezone.utc)
+    streams = []
+    for i in range(count):
+        words = rng.sample(JA_WORDS, 2) + rng.sample(EN_WORDS, 1)
+        key = ChannelKey(rng.choice(["twitch", "youtube"]), f"ch{i}")
+        streams.append((key, PlatformStream(
+            platform=key.platform,
+            platform_channel_id=key.channel_id,
+            platform_stream_id=f"s{i}",
+            title="【{}】{} {}".format(*words),
+            viewer_count=int(rng.paretovariate(1.2) * 50),
+            started_at=started_at,
+            game_name=rng.choice(GAMES),
+            tags=rng.sample(["日本語", "English", "FPS", "Vtuber"], 2),
+        )))
+    return streams
+
+
+def _snapshots(streams) -> Dict[ChannelKey, ChannelSnapshot]:
+    return {key: ChannelSnapshot(key=key, streams=[stream]) for key, stream in streams}
+
+
+def _fts_query(query: str, bounds: Dict[str, int]) -> Tuple[str, List[Any]]:
+    sql = "SELECT id FROM streams WHERE 1"
+    params: List[Any] = []
+    for word in query.split():
+        # trigram needs 3+ characters; shorter terms fall back to LIKE
+        if len(word) >= 3:
+            sql += " AND id IN (SELECT rowid FROM streams_fts WHERE streams_fts MATCH ?)"
+            params.append('"{}"'.format(word))
+        else:
+            sql += " AND title LIKE ?"
+            params.append(f"%{word}%")
+    if "min_viewers" in bounds:
+        sql += " AND viewer_count >= ?"
+        params.append(bounds["min_viewers"])
+    if "max_viewers" in bounds:
+        sql += " AND viewer_count <= ?"
+        params.append(bounds["max_viewers"])
+    return sql + " ORDER BY viewer_count DESC LIMIT 20", params
+
+
+def _build_fts(streams) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE streams (id INTEGER PRIMARY KEY, title TEXT, viewer_count INTEGER)")
+    db.execute("CREATE VIRTUAL TABLE streams_fts USING fts5(title, content='streams', content_rowid='id', tokenize='trigram')")
+    db.executemany(
+        "INSERT INTO streams VALUES (?, ?, ?)",
+        ((i, s.title, s.viewer_count) for i, (_, s) in enumerate(streams)),
+    )
+    db.execute("INSERT INTO streams_fts(streams_fts) VALUES ('rebuild')")
+    db.execute("CREATE INDEX idx_streams_viewers ON streams(viewer_count DESC)")
+    return db
+
+
+def _time_queries(run, count: int, rng: random.Random) -> Dict[str, Any]:
+    latencies = []
+    for _ in range(count):
+        query, bounds = rng.choice(QUERIES)
+        started = time.perf_counter()
+        run(query, bounds)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--churn", type=int, default=200)
+    parser.add_argument("--followed", type=int, default=300)
+    parser.add_argument("--chunk", type=int, default=100, help="channels per applied refresh chunk")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    streams = _streams(args.streams, rng)
+
+    index = StreamSearchIndex()
+    started = time.perf_counter()
+    index.apply(_snapshots(streams))
+    build_seconds = time.perf_counter() - started
+
+    db = _build_fts(streams)
+
+    followed = {key for key, _ in rng.sample(streams, min(args.followed, len(streams)))}
+
+    def search_index(query, bounds):
+        return index.search(query, **bounds)[:20]
+
+    def search_index_user(query, bounds):
+        return index.search(query, keys=followed, **bounds)[:20]
+
+    def search_db(query, bounds):
+        return db.execute(*_fts_query(query, bounds)).fetchall()
+
+    index_latency = _time_queries(search_index, args.queries, random.Random(2))
+    user_latency = _time_queries(search_index_user, args.queries, random.Random(2))
+    db_latency = _time_queries(search_db, args.queries, random.Random(2))
+
+    # One refresh cycle: every viewer count moves, ``churn`` streams are replaced
+    refreshed = [(key, s.model_copy(update={"viewer_count": max(0, s.viewer_count + rng.randint(-20, 20))}))
+                 for key, s in streams]
+    replaced = _streams(args.churn, random.Random(3))
+    for i, (_, stream) in enumerate(replaced):
+        key = refreshed[i][0]
+        refreshed[i] = (key, stream.model_copy(update={"platform_stream_id": f"new{i}"}))
+    chunk_latencies = []
+    for i in range(0, len(refreshed), args.chunk):
+        snapshots = _snapshots(refreshed[i:i + args.chunk])
+        started = time.perf_counter()
+        index.apply(snapshots)
+        chunk_latencies.append(time.perf_counter() - started)
+    after_refresh_latency = _time_queries(search_index, len(QUERIES), random.Random(4))
+
+    emit({
+        "benchmark": "stream_search",
+        "streams": args.streams,
+        "queries": args.queries,
+        "index": {
+            "build_seconds": round(build_seconds, 3),
+            "refresh_update_seconds": round(sum(chunk_latencies), 3),
+            "refresh_chunk": summarize(chunk_latencies),
+            "latency_after_refresh": after_refresh_latency,
+            **index.stats(),
+            "latency": index_latency,
+            "followed_channels": args.followed,
+            "user_latency": user_latency,
+        },
+        "sqlite_fts5_trigram": {"latency": db_latency, "note": "excludes network round trip"},
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Supabase client reuse benchmark.
+
+Compares creating a new Supabase client per call (the previous behaviour of
+``get_supabase_client``) against ``SupabaseClientRegistry`` while issuing the
+same PostgREST queries to a local stand-in. Reports the number of TCP
+connections the stand-in accepted and per-call latency percentiles.
+
+    python -m benchmarks.bench_supabase_clients --requests 500 --users 20
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+import jwt
+from supabase import Client, create_client
+
+from app.core.database import SupabaseClientRegistry
+from benchmarks._stats import emit, summarize
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+
+
+def _tokens(users: int) -> List[str]:
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode({"sub": f"user-{i}", "role": "authenticated", "exp": exp}, "bench-secret", algorithm="HS256")
+        for i in range(users)
+    ]
+
+
+def _run(fake: FakePostgrest, get_client: Callable[[str], Client], tokens: List[str], requests: int):
+    fake.reset_counters()
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        get_client(tokens[i % len(tokens)]).table("channels").select("*").eq("is_active", "true").execute()
+        latencies.append(time.perf_counter() - started)
+    return {"connections": len(fake.connections), "requests": fake.requests, **summarize(latencies)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    fake = FakePostgrest()
+    seed(fake, "channels", [{"channel_id": f"ch-{i}", "is_active": True} for i in range(20)])
+    tokens = _tokens(args.users)
+
+    with serve_in_thread(fake.app) as base_url:
+        before = _run(fake, lambda token: create_client(base_url, "anon-key"), tokens, args.requests)
+
+        registry = SupabaseClientRegistry(base_url, "anon-key", "service-key")
+        after = _run(fake, registry.for_user, tokens, args.requests)
+        after["clients_created"] = registry.stats()["clients_created"]
+        registry.close()
+
+    emit({
+        "benchmark": "supabase_clients",
+        "requests": args.requests,
+        "users": args.users,
+        "per_call_client": before,
+        "registry": after,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Viewer history memory and aggregation benchmark.
+
+Records ``--minutes`` one-minute samples for ``--streams`` live streams into
+:class:`~app.services.viewer_history.ViewerHistory` and into a baseline
+keeping every sample as a dict in a per-stream list (the shape of the
+``stream_viewer_samples`` rows). Reports memory per stream (tracemalloc),
+record throughput, and the latency of whole-fleet and per-user aggregates
+and of an hourly series.
+
+    python -m benchmarks.bench_viewer_history --streams 100000 --minutes 60
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.models.channel import ChannelKey
+from app.models.stream import PlatformStream
+from app.services.viewer_history import ViewerHistory
+from benchmarks._stats import emit, summarize
+
+T0 = 3600.0 * 500_000
+
+
+def _streams(count: int) -> List[Tuple[ChannelKey, PlatformStream]]:
+    started = datetime.fromtimestamp(T0, timezone.utc)
+    return [
+        (
+            ChannelKey("twitch", f"c{i}"),
+            PlatformStream(
+                platform="twitch", platform_channel_id=f"c{i}", platform_stream_id=f"s{i}",
+                title=f"stream {i}", viewer_count=0, started_at=started,
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def _record_minute(history: ViewerHistory, streams, counts: List[int], at: float) -> None:
+    for (key, stream), count in zip(streams, counts):
+        stream.viewer_count = count
+        history.record(key, stream, at)
+    asyncio.run(history.flush())
+
+
+def _baseline_aggregate(samples: Dict[Tuple[ChannelKey, str], List[Dict[str, Any]]], keys) -> Dict[str, Any]:
+    peak = viewer_seconds = observed = 0.0
+    for key in keys:
+        rows = samples[key]
+        peak = max(peak, max(row["viewer_count"] for row in rows))
+        for previous, row in zip(rows, rows[1:]):
+            viewer_seconds += previous["viewer_count"] * (row["sampled_at"] - previous["sampled_at"])
+        observed += rows[-1]["sampled_at"] - rows[0]["sampled_at"]
+    return {"peak_viewers": peak, "average_viewers": viewer_seconds / observed if observed else 0.0}
+
+
+def _time(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=100000)
+    parser.add_argument("--minutes", type=int, default=60, help="samples per stream")
+    parser.add_argument("--user-channels", type=int, default=200, help="channels in one user's aggregate")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    streams = _streams(args.streams)
+    viewers = [[rng.randint(0, 5000) for _ in streams] for _ in range(args.minutes)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # No writer: each flush drops the queued raw samples, as after a database write
+    history = ViewerHistory(clock=lambda: T0)
+    for minute, counts in enumerate(viewers):
+        _record_minute(history, streams, counts, T0 + 60 * minute)
+    history_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Throughput untraced, one more refresh round
+    started = time.perf_counter()
+    _record_minute(history, streams, viewers[0], T0 + 60 * args.minutes)
+    record_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    baseline: Dict[Tuple[ChannelKey, str], List[Dict[str, Any]]] = {
+        (key, stream.platform_stream_id): [] for key, stream in streams
+    }
+    for minute, counts in enumerate(viewers):
+        at = T0 + 60 * minute
+        for (key, stream), count in zip(streams, counts):
+            baseline[(key, stream.platform_stream_id)].append({"sampled_at": at, "viewer_count": count})
+    baseline_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    user_keys = [key for key, _ in rng.sample(streams, min(args.user_channels, len(streams)))]
+    user_slots = history.slots_for(user_keys)
+    baseline_user = [(key, f"s{key.channel_id[1:]}") for key in user_keys]
+
+    emit({
+        "benchmark": "viewer_history",
+        "streams": args.streams,
+        "samples_per_stream": args.minutes,
+        "memory_bytes_per_stream": {
+            "ring_slabs": round(history_bytes / args.streams, 1),
+            "ring_slabs_arrays_only": round(history.memory_bytes() / args.streams, 1),
+            "list_of_dicts": round(baseline_bytes / args.streams, 1),
+        },
+        "record_samples_per_second": round(args.streams / record_seconds),
+        "aggregate_all_streams": _time(history.aggregate, args.repeats),
+        "aggregate_all_streams_baseline": _time(lambda: _baseline_aggregate(baseline, baseline), args.repeats),
+        "aggregate_user": _time(lambda: history.aggregate(history.slots_for(user_keys)), args.repeats * 10),
+        "aggregate_user_baseline": _time(lambda: _baseline_aggregate(baseline, baseline_user), args.repeats * 10),
+        "series_user_1h": _time(lambda: history.series(user_slots, 3600), args.repeats * 10),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_api_keys ENABLE ROW LEVEL SECURITY;
 ALTER TABLE channels ENABLE ROW LEVEL SECURITY;
 ALTER TABLE streams ENABLE ROW LEVEL SECURITY;
+-- 視聴者数履歴はサーバー(service_role)のみ読み書き、ポリシーなし
+ALTER TABLE stream_viewer_samples ENABLE ROW LEVEL SECURITY;
 
 -- platforms, system_settingsは管理者のみなのでRLS不要
 
@@ -66,26 +68,29 @@ CREATE POLICY "Users can manage streams from own channels" ON streams
 ALTER TABLE users ADD COLUMN is_admin BOOLEAN DEFAULT false;
 
 -- 管理者は全てのデータにアクセス可能なポリシーを追加
-CREATE POLICY "Admins can view all users" ON users
-    FOR SELECT USING (
-        EXISTS (
-            SELECT 1 FROM users admin_user 
-            WHERE admin_user.id = auth.uid() 
-            AND admin_user.is_admin = true
-        )
+-- 管理者判定はRLSを経由しない関数で行う（ポリシー内でusersを直接参照すると無限再帰になる）
+CREATE OR REPLACE FUNCTION is_admin()
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM users
+        WHERE users.id = auth.uid()
+        AND users.is_admin = true
     );
+$$;
+
+CREATE POLICY "Admins can view all users" ON users
+    FOR SELECT USING (is_admin());
 
 -- system_settingsは管理者のみアクセス可能
 ALTER TABLE system_settings ENABLE ROW LEVEL SECURITY;
 
 CREATE POLICY "Only admins can manage system settings" ON system_settings
-    FOR ALL USING (
-        EXISTS (
-            SELECT 1 FROM users 
-            WHERE users.id = auth.uid() 
-            AND users.is_admin = true
-        )
-    );
+    FOR ALL USING (is_admin());
 
 -- platformsテーブルは全ユーザーが読み取り可能、管理者のみ変更可能
 ALTER TABLE platforms ENABLE ROW LEVEL SECURITY;
@@ -94,10 +99,4 @@ CREATE POLICY "Everyone can view platforms" ON platforms
     FOR SELECT TO authenticated USING (true);
 
 CREATE POLICY "Only admins can manage platforms" ON platforms
-    FOR ALL USING (
-        EXISTS (
-            SELECT 1 FROM users 
-            WHERE users.id = auth.uid() 
-            AND users.is_admin = true
-        )
-    );
\ No newline at end of file
+    FOR ALL USING (is_admin());
\ No newline at end of file
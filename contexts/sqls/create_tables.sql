@@ -81,11 +81,24 @@ CREATE TABLE streams (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- 7. 視聴者数履歴 (配信ごとのサンプル、viewer_historyがbulk insert)
+CREATE TABLE stream_viewer_samples (
+    platform VARCHAR(50) NOT NULL,
+    platform_channel_id VARCHAR(100) NOT NULL,
+    platform_stream_id VARCHAR(100) NOT NULL,
+    sampled_at TIMESTAMPTZ NOT NULL,
+    viewer_count INTEGER NOT NULL,
+    PRIMARY KEY (platform, platform_stream_id, sampled_at)
+);
+
 -- インデックス作成
 CREATE INDEX idx_user_api_keys_user_platform ON user_api_keys(user_id, platform_id);
+CREATE INDEX idx_user_api_keys_expiry ON user_api_keys(token_expires_at, is_active)
+WHERE token_expires_at IS NOT NULL;
 CREATE INDEX idx_channels_user_platform ON channels(user_id, platform_id);
 CREATE INDEX idx_streams_search ON streams USING gin(to_tsvector('english', title || ' ' || COALESCE(description, '') || ' ' || COALESCE(game_name, '')));
 CREATE INDEX idx_streams_live ON streams(is_live, started_at DESC);
+CREATE INDEX idx_viewer_samples_channel ON stream_viewer_samples(platform, platform_channel_id, sampled_at DESC);
 
 -- 初期データ投入: プラットフォーム
 INSERT INTO platforms (name, display_name, api_base_url, oauth_url, required_scopes) VALUES
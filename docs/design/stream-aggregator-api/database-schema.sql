@@ -185,17 +185,39 @@ CREATE TABLE streams (
     tags TEXT[],                               -- タグ配列
     started_at TIMESTAMPTZ NOT NULL,           -- 配信開始時刻
     is_live BOOLEAN DEFAULT true,               -- ライブ状態
+    ended_at TIMESTAMPTZ,                       -- 配信終了検知時刻
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ DEFAULT NOW()
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(channel_id, platform_stream_id)      -- 差分upsertの競合キー
 );
 
 【FastAPI実装での注意点】
 - platform_stream_id はプラットフォーム固有の配信ID
+- (channel_id, platform_stream_id) をキーに差分のみbulk upsertする (stream_writer)
 - tags TEXT[] の配列操作（SQLAlchemy/Pydantic対応）
 - is_live = false で終了した配信
 - viewer_count はリアルタイム更新対象
 */
 
+-- 3.7 Stream Viewer Samples Table
+/*
+CREATE TABLE stream_viewer_samples (
+    platform VARCHAR(50) NOT NULL,              -- 'youtube', 'twitch' など
+    platform_channel_id VARCHAR(100) NOT NULL,  -- プラットフォーム固有のチャンネルID
+    platform_stream_id VARCHAR(100) NOT NULL,   -- 配信固有ID
+    sampled_at TIMESTAMPTZ NOT NULL,            -- 取得時刻
+    viewer_count INTEGER NOT NULL,              -- 視聴者数
+    PRIMARY KEY (platform, platform_stream_id, sampled_at)
+);
+CREATE INDEX idx_viewer_samples_channel ON stream_viewer_samples(platform, platform_channel_id, sampled_at DESC);
+
+【FastAPI実装での注意点】
+- ユーザーの channels 行ではなくプラットフォーム配信単位で1件 (同じ配信を登録する全ユーザーで共有)
+- viewer_history がメモリ上のリングバッファに追記し、バックグラウンドでbulk insert
+- 再送時の重複は主キーで無視 (ignore_duplicates)
+- /api/stats/* はメモリ上の集計から応答し、このテーブルは読まない
+*/
+
 -- ----------------------------------------------------------------------------
 -- 4. インデックス設計 (パフォーマンス最適化)
 -- ----------------------------------------------------------------------------
@@ -243,6 +265,13 @@ WHERE is_active = true AND is_subscribed = true;
 CREATE INDEX idx_streams_live_only ON streams(started_at DESC, viewer_count DESC) 
 WHERE is_live = true;
 
+-- キーセットページネーション用 (ORDER BY ... DESC, id DESC の範囲スキャン)
+-- WHERE is_live AND (viewer_count, id) < ($1, $2) ORDER BY viewer_count DESC, id DESC LIMIT n
+CREATE INDEX idx_streams_live_viewers_keyset ON streams(viewer_count DESC, id DESC) 
+WHERE is_live = true;
+CREATE INDEX idx_streams_live_recent_keyset ON streams(started_at DESC, id DESC) 
+WHERE is_live = true;
+
 -- 最近の配信（30日以内）
 CREATE INDEX idx_streams_recent ON streams(channel_id, started_at DESC) 
 WHERE started_at > (NOW() - INTERVAL '30 days');
@@ -5,40 +5,189 @@ FastAPI-based REST API for aggregating live streams from multiple platforms.
 Integrates with Supabase for data persistence and authentication.
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 import os
 
-from app.core.config import get_settings
-from app.core.exceptions import AppException
-from app.routers import health
-
-# Get application settings
-settings = get_settings()
-
-# Create FastAPI application instance
-app = FastAPI(
-    title=settings.APP_NAME,
-    description="REST API for aggregating live streams from YouTube, Twitch, and other platforms",
-    version=settings.APP_VERSION,
-    docs_url="/docs",
-    redoc_url="/redoc"
+from app.core.config import Settings, get_settings
+from app.core.blocking import run_blocking, shutdown_blocking_executor
+from app.core.coordination import start_coordinator, stop_coordinator
+from app.core.database import (
+    close_async_client_registry,
+    close_client_registry,
+    get_async_supabase_client,
+    get_client_registry,
 )
+from app.core.exceptions import AppException
+from app.core.loop_monitor import EventLoopBlockDetector
+from app.core.postgres import close_postgres_pool, open_postgres_pool
+from app.core.startup import StartupProfile
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.startup_profile import StartupProfileMiddleware
+from app.routers import events, health, metrics, platforms, stats, streams
+from app.services.health_monitor import create_health_monitor
+from app.services.master_data import create_master_data_store
+from app.services.oauth_tokens import create_token_manager
+from app.services.platforms import build_platform_services
+from app.services.refresh_scheduler import create_stream_scheduler
+from app.services.stream_cache import INVALIDATION_TOPIC, invalidate_from_peer, stream_cache_listener
+from app.services.stream_events import EVENTS_TOPIC, StreamEventBroker
+from app.services.stream_search import StreamSearchIndex, stream_search_listener
+from app.services.stream_writer import create_stream_writer
+from app.services.viewer_history import create_viewer_history
+from app.services.youtube_quota import QUOTA_TOPIC, quota_usage_listener
 
-# Configure CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+logger = logging.getLogger(__name__)
+
+_IMPORTED = time.perf_counter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hook."""
+    settings: Settings = app.state.settings
+    scheduler = None
+    writer = None
+    broker = None
+    search_index = None
+    viewer_history = None
+    health_monitor = None
+    token_manager = None
+    master_data = None
+    system_settings = None
+    loop_monitor = None
+    try:
+        if settings.EVENT_LOOP_BLOCK_THRESHOLD_MS > 0:
+            loop_monitor = EventLoopBlockDetector(settings.EVENT_LOOP_BLOCK_THRESHOLD_MS / 1000)
+            loop_monitor.start()
+        app.state.loop_monitor = loop_monitor
+        postgres_pool = await open_postgres_pool()
+        # Several workers/replicas: one leader, channels split across live workers
+        coordinator = await start_coordinator()
+        if coordinator is not None:
+            coordinator.subscribe(INVALIDATION_TOPIC, invalidate_from_peer)
+        app.state.coordinator = coordinator
+        if settings.SUPABASE_URL:
+            # Load the Supabase SDK and build the admin clients now, not on the first request
+            await run_blocking(get_client_registry().admin)
+            await get_async_supabase_client()
+            # platforms/system_settings are read once here, then served from memory
+            master_data = create_master_data_store()
+            try:
+                system_settings = (await master_data.reload()).system_settings
+            except Exception:
+                logger.exception("Could not load master data; retrying every %gs", master_data.ttl)
+            if settings.MASTER_DATA_REALTIME_ENABLED:
+                master_data.start(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+            else:
+                master_data.start()
+        app.state.master_data = master_data
+        if settings.STREAM_SCHEDULER_ENABLED and settings.SUPABASE_URL:
+            # One server-side refresh loop instead of per-tab upstream fan-out
+            services = await run_blocking(build_platform_services, system_settings)
+            owns = None
+            if coordinator is not None:
+                def owns(key):
+                    return coordinator.owns(f"{key.platform}:{key.channel_id}")
+            scheduler = create_stream_scheduler(services, owns=owns)
+            quota = getattr(services.get("youtube"), "quota", None)
+            if coordinator is not None and quota is not None:
+                # The API key's daily quota is the cluster's: workers report their usage to each other
+                def worker_id():
+                    return str(coordinator.worker_id)
+                quota.workers = lambda: len(coordinator.members)
+                coordinator.subscribe(QUOTA_TOPIC, lambda usage: quota.merge(worker_id(), usage))
+                scheduler.add_listener(quota_usage_listener(quota, worker_id, coordinator.publish))
+            # Listeners run in order: persist, drop cached lists, index, then push
+            writer = create_stream_writer(
+                scheduler.subscriptions_for,
+                viewer_update_interval=settings.STREAM_VIEWER_UPDATE_INTERVAL_SECONDS,
+                batch_size=settings.STREAM_WRITE_BATCH_SIZE,
+            )
+            scheduler.add_listener(writer)
+            scheduler.add_listener(stream_cache_listener(
+                scheduler, coordinator.publish if coordinator is not None else None,
+            ))
+            search_index = StreamSearchIndex()
+            scheduler.add_listener(stream_search_listener(scheduler, search_index))
+            broker = StreamEventBroker(
+                scheduler.subscriptions_for,
+                max_pending=settings.STREAM_EVENTS_MAX_PENDING,
+                max_connections=settings.STREAM_EVENTS_MAX_CONNECTIONS,
+                owns=owns,
+                publish=coordinator.publish if coordinator is not None else None,
+            )
+            if coordinator is not None:
+                # Events of channels other workers own arrive from them
+                coordinator.subscribe(EVENTS_TOPIC, broker.receive)
+            scheduler.add_listener(broker)
+            if settings.VIEWER_HISTORY_ENABLED:
+                # Viewer samples go to memory on the refresh path, to the database in the background
+                viewer_history = create_viewer_history(
+                    retention=settings.VIEWER_HISTORY_RETENTION_SECONDS,
+                    flush_interval=settings.VIEWER_HISTORY_FLUSH_INTERVAL_SECONDS,
+                    flush_batch_size=settings.VIEWER_HISTORY_FLUSH_BATCH_SIZE,
+                )
+                scheduler.add_listener(viewer_history)
+                viewer_history.start()
+            scheduler.start()
+        app.state.stream_scheduler = scheduler
+        app.state.stream_writer = writer
+        app.state.stream_events = broker
+        app.state.stream_search = search_index
+        app.state.viewer_history = viewer_history
+        if settings.OAUTH_TOKEN_REFRESH_ENABLED and settings.SUPABASE_URL:
+            # Users' OAuth tokens are refreshed before they expire, never on the request path
+            token_manager = await run_blocking(
+                create_token_manager, None, system_settings,
+                (lambda: coordinator.is_leader) if coordinator is not None else None,
+            )
+            token_manager.start()
+        app.state.token_manager = token_manager
+        if settings.HEALTH_CHECK_ENABLED and settings.SUPABASE_URL:
+            # Probes run in the background; health endpoints only read the snapshot
+            health_monitor = create_health_monitor(
+                scheduler.services if scheduler is not None else None, postgres=postgres_pool,
+            )
+            health_monitor.start()
+        app.state.health_monitor = health_monitor
+        if app.state.startup_profile is not None:
+            app.state.startup_profile.mark("ready")
+        yield
+    finally:
+        # Also runs when startup failed part-way: whatever was started is stopped
+        if health_monitor is not None:
+            await health_monitor.stop()
+        if token_manager is not None:
+            await token_manager.stop()
+        if scheduler is not None:
+            await scheduler.stop()
+        if viewer_history is not None:
+            # After the scheduler: its last samples are written too
+            await viewer_history.stop()
+        if master_data is not None:
+            await master_data.stop()
+        await stop_coordinator()
+        await close_postgres_pool()
+        # Close the shared Supabase connection pools
+        await close_async_client_registry()
+        close_client_registry()
+        shutdown_blocking_executor()
+        if loop_monitor is not None:
+            await loop_monitor.stop()
 
 
-# Global exception handler
-@app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
     """Handle custom application exceptions."""
     return JSONResponse(
@@ -54,25 +203,99 @@ async def app_exception_handler(request: Request, exc: AppException):
     )
 
 
-# Include routers
-app.include_router(health.router, prefix=settings.API_V1_STR, tags=["health"])
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the FastAPI application.
+
+    Nothing is connected here: Supabase clients, the Postgres pool and the
+    background services are created by the lifespan hook.
+
+    Args:
+        settings: Application settings (default: from the environment)
+
+    Returns:
+        Configured application
+    """
+    settings = settings or get_settings()
+    profile = StartupProfile(_IMPORT_STARTED) if settings.STARTUP_PROFILE_ENABLED else None
+    if profile is not None:
+        profile.phases["imported"] = round(_IMPORTED - _IMPORT_STARTED, 6)
+
+    app = FastAPI(
+        title=settings.APP_NAME,
+        description="REST API for aggregating live streams from YouTube, Twitch, and other platforms",
+        version=settings.APP_VERSION,
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+    app.state.settings = settings
+    app.state.startup_profile = profile
+
+    # Rate limits (EDGE-102); added before CORS so 429 responses carry CORS headers
+    app.add_middleware(
+        RateLimitMiddleware,
+        exempt_prefixes=(f"{settings.API_V1_STR}/health", f"{settings.API_V1_STR}/metrics"),
+        enabled=settings.RATE_LIMIT_ENABLED,
+    )
+
+    # Configure CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Retry-After"],
+    )
+
+    # Outermost, so rejected and preflight requests are measured too
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    if profile is not None:
+        app.add_middleware(StartupProfileMiddleware, profile=profile)
+
+    # Global exception handler
+    app.add_exception_handler(AppException, app_exception_handler)
+
+    # Include routers
+    app.include_router(health.router, prefix=settings.API_V1_STR, tags=["health"])
+    app.include_router(streams.router, prefix=settings.API_V1_STR, tags=["streams"])
+    app.include_router(events.router, prefix=settings.API_V1_STR, tags=["streams"])
+    app.include_router(platforms.router, prefix=settings.API_V1_STR, tags=["platforms"])
+    app.include_router(stats.router, prefix=settings.API_V1_STR, tags=["stats"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics.router, prefix=settings.API_V1_STR, tags=["health"])
+
+    @app.get("/")
+    async def root():
+        """Root endpoint with basic API information."""
+        return {
+            "message": settings.APP_NAME,
+            "version": settings.APP_VERSION,
+            "status": "running",
+            "docs": "/docs",
+            "health": f"{settings.API_V1_STR}/health"
+        }
+
+    if profile is not None:
+        profile.mark("app_created")
+    return app
 
 
-@app.get("/")
-async def root():
-    """Root endpoint with basic API information."""
-    return {
-        "message": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "status": "running",
-        "docs": "/docs",
-        "health": f"{settings.API_V1_STR}/health"
-    }
+def __getattr__(name: str):
+    """Build ``main.app`` on first access (``uvicorn main:app``, ``from main import app``)."""
+    if name == "app":
+        globals()["app"] = application = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
+    settings = get_settings()
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host=settings.HOST,
         port=int(os.getenv("PORT", settings.PORT)),
         reload=settings.DEBUG
@@ -0,0 +1,46 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from app.core.auth import clear_token_cache
+from app.middleware import rate_limit
+from app.middleware.rate_limit import RateLimitBackend
+from app.services import stream_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_token_cache():
+    """Isolate tests from the process-wide verified-token cache."""
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+
+@pytest.fixture(autouse=True)
+def reset_stream_cache():
+    """Isolate tests from the process-wide stream list cache and versions."""
+    stream_cache._stream_cache = None
+    stream_cache._stream_versions = None
+    yield
+    stream_cache._stream_cache = None
+    stream_cache._stream_versions = None
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Give every test fresh rate limit counters."""
+    rate_limit._rate_limit_backend = None
+    yield
+    rate_limit._rate_limit_backend = None
+
+
+class _UnlimitedBackend(RateLimitBackend):
+    async def acquire(self, key, rate):
+        return 0.0
+
+
+@pytest.fixture
+def no_rate_limit():
+    """Lift API rate limits for load-style tests that poll from one client."""
+    rate_limit._rate_limit_backend = _UnlimitedBackend()
+    yield
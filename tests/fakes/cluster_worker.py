@@ -0,0 +1,84 @@
+"""One worker of a coordinated cluster, run as a separate process by the tests.
+
+Runs the refresh scheduler over ``--channels`` fake Twitch channels with
+the channel assignment of a :class:`ClusterCoordinator`. Every upstream
+fetch and a status line (leadership, cluster size) every 50 ms are
+appended to ``--log`` as JSON lines stamped with wall-clock time.
+
+    python -m tests.fakes.cluster_worker --dsn postgresql://... --namespace 42 --log /tmp/w1.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Sequence
+
+from app.core.coordination import ClusterCoordinator
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.models.stream import PlatformStream
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from tests.fakes.services import FakePlatformService
+
+
+class Log:
+    """Append-only JSON lines file."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", buffering=1)
+
+    def write(self, **fields: Any) -> None:
+        self.file.write(json.dumps({"t": time.time(), **fields}) + "\n")
+
+
+class LoggingService(FakePlatformService):
+    """Fake Twitch service logging the channels of every upstream call."""
+
+    def __init__(self, log: Log, coordinator: ClusterCoordinator):
+        super().__init__("twitch")
+        self.log = log
+        self.coordinator = coordinator
+
+    async def fetch_live_streams(self, channel_ids: Sequence[str]) -> Dict[str, List[PlatformStream]]:
+        self.log.write(worker=self.coordinator.worker_id, fetch=list(channel_ids))
+        return await super().fetch_live_streams(channel_ids)
+
+
+async def run(args: argparse.Namespace) -> None:
+    log = Log(args.log)
+    coordinator = ClusterCoordinator(
+        args.dsn, namespace=args.namespace, poll_interval=args.poll_interval, lease=args.lease,
+    )
+    rows = [
+        ChannelSubscription(id=f"row-{i}", user_id=f"user-{i}", key=ChannelKey("twitch", f"c{i}"))
+        for i in range(args.channels)
+    ]
+
+    async def loader():
+        return rows
+
+    await coordinator.start()
+    scheduler = StreamRefreshScheduler(
+        {"twitch": LoggingService(log, coordinator)}, loader, interval=args.interval,
+        owns=lambda key: coordinator.owns(f"{key.platform}:{key.channel_id}"),
+    )
+    scheduler.start()
+    while True:
+        log.write(worker=coordinator.worker_id, leader=coordinator.is_leader, members=len(coordinator.members))
+        await asyncio.sleep(0.05)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--namespace", type=int, required=True)
+    parser.add_argument("--log", required=True)
+    parser.add_argument("--channels", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--lease", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Fake Twitch Helix and YouTube Data API servers.
+
+One ASGI app serves both platforms:
+
+* ``POST /oauth2/token`` (client-credentials and refresh-token grants) and
+  ``GET /helix/streams`` (Twitch)
+* ``GET /youtube/v3/{channels,playlistItems,videos,search}`` (YouTube)
+
+Batch limits are enforced like the real APIs (100 Twitch ``user_id``s,
+50 YouTube ids). Calls are counted per endpoint, and latency (constant or one-off spikes) and faults (status
+codes, 503 error rates or 429 throttle rates) can be injected per endpoint.
+"""
+
+import asyncio
+import random
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+STARTED_AT = "2025-08-07T10:00:00Z"
+
+
+class FakePlatformAPIs:
+    """In-memory Twitch/YouTube world with call accounting."""
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        """
+        Initialize fake.
+
+        Args:
+            latency: Base delay in seconds for every call
+            seed: Random seed for error-rate injection
+        """
+        self.latency = latency
+        self.endpoint_latency: Dict[str, float] = {}
+        self.twitch_live: Set[str] = set()
+        self.youtube_channels: Set[str] = set()
+        self.youtube_live: Dict[str, str] = {}  # channel id -> live video id
+        self.viewers: Dict[str, int] = {}
+        self.calls: Counter = Counter()
+        self.ids_requested: Counter = Counter()
+        self.faults: Dict[str, Deque[int]] = defaultdict(deque)
+        self.spikes: Dict[str, Deque[float]] = defaultdict(deque)
+        self.error_rates: Dict[str, float] = {}
+        self.throttle_rates: Dict[str, float] = {}
+        self.revoked_refresh_tokens: Set[str] = set()
+        self._random = random.Random(seed)
+        self.app = self._build_app()
+
+    # -- world setup ------------------------------------------------------
+
+    def add_twitch_channels(self, user_ids: List[str], live: bool = False) -> None:
+        if live:
+            self.twitch_live.update(user_ids)
+
+    def add_youtube_channels(self, channel_ids: List[str], live: bool = False) -> None:
+        self.youtube_channels.update(channel_ids)
+        if live:
+            for channel_id in channel_ids:
+                self.youtube_live[channel_id] = f"live-{channel_id}"
+
+    def inject(self, endpoint: str, *status_codes: int) -> None:
+        """Make the next calls to ``endpoint`` fail with the given status codes."""
+        self.faults[endpoint].extend(status_codes)
+
+    def inject_latency(self, endpoint: str, *delays: float) -> None:
+        """Delay the next calls to ``endpoint`` by the given seconds each."""
+        self.spikes[endpoint].extend(delays)
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.ids_requested.clear()
+
+    # -- helpers ------------------------------------------------------------
+
+    async def _enter(self, endpoint: str, ids: int = 0) -> Optional[JSONResponse]:
+        self.calls[endpoint] += 1
+        self.ids_requested[endpoint] += ids
+        delay = self.endpoint_latency.get(endpoint, self.latency)
+        if self.spikes[endpoint]:
+            delay += self.spikes[endpoint].popleft()
+        if delay:
+            await asyncio.sleep(delay)
+        status = None
+        if self.faults[endpoint]:
+            status = self.faults[endpoint].popleft()
+        elif self._random.random() < self.error_rates.get(endpoint, 0.0):
+            status = 503
+        elif self._random.random() < self.throttle_rates.get(endpoint, 0.0):
+            status = 429
+        if status is None:
+            return None
+        if status == 403 and endpoint.startswith("youtube"):
+            body = {"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}}
+        else:
+            body = {"error": "injected", "status": status}
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    def _youtube_video(self, video_id: str, channel_id: str, live: bool) -> dict:
+        return {
+            "id": video_id,
+            "snippet": {
+                "channelId": channel_id,
+                "title": f"{channel_id} stream",
+                "description": "",
+                "liveBroadcastContent": "live" if live else "none",
+                "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hq.jpg"}},
+            },
+            "liveStreamingDetails": (
+                {"actualStartTime": STARTED_AT, "concurrentViewers": str(self.viewers.get(channel_id, 100))}
+                if live else {"actualStartTime": STARTED_AT, "actualEndTime": STARTED_AT}
+            ),
+        }
+
+    # -- app ----------------------------------------------------------------
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+        fake = self
+
+        @app.post("/oauth2/token")
+        async def token(request: Request):
+            form = await request.form()
+            if form.get("grant_type") == "refresh_token":
+                if (fault := await fake._enter("twitch.refresh")) is not None:
+                    return fault
+                refresh_token = form.get("refresh_token")
+                if refresh_token in fake.revoked_refresh_tokens:
+                    return JSONResponse({"status": 400, "message": "Invalid refresh token"}, status_code=400)
+                return {
+                    "access_token": f"access-{refresh_token}-{fake.calls['twitch.refresh']}",
+                    "refresh_token": refresh_token,
+                    "expires_in": 14400,
+                    "token_type": "bearer",
+                }
+            if (fault := await fake._enter("twitch.token")) is not None:
+                return fault
+            return {"access_token": "fake-app-token", "expires_in": 3600, "token_type": "bearer"}
+
+        @app.get("/helix/streams")
+        async def helix_streams(request: Request):
+            user_ids = request.query_params.getlist("user_id")
+            if (fault := await fake._enter("twitch.streams", len(user_ids))) is not None:
+                return fault
+            if len(user_ids) > 100:
+                return JSONResponse({"error": "Bad Request", "message": "too many user_id"}, status_code=400)
+            data = [
+                {
+                    "id": f"stream-{uid}",
+                    "user_id": uid,
+                    "user_login": f"user{uid}",
+                    "user_name": f"User {uid}",
+                    "game_name": "Just Chatting",
+                    "type": "live",
+                    "title": f"{uid} is live",
+                    "viewer_count": fake.viewers.get(uid, 100),
+                    "started_at": STARTED_AT,
+                    "thumbnail_url": f"https://static-cdn.jtvnw.net/previews-ttv/{uid}-{{width}}x{{height}}.jpg",
+                    "tags": ["日本語"],
+                }
+                for uid in user_ids if uid in fake.twitch_live
+            ]
+            return {"data": data, "pagination": {}}
+
+        def ids_param(request: Request) -> List[str]:
+            return [i for i in request.query_params.get("id", "").split(",") if i]
+
+        @app.get("/youtube/v3/channels")
+        async def youtube_channels(request: Request):
+            ids = ids_param(request)
+            if (fault := await fake._enter("youtube.channels", len(ids))) is not None:
+                return fault
+            if len(ids) > 50:
+                return JSONResponse({"error": {"code": 400}}, status_code=400)
+            return {"items": [
+                {"id": cid, "contentDetails": {"relatedPlaylists": {"uploads": f"UU{cid}"}}}
+                for cid in ids if cid in fake.youtube_channels
+            ]}
+
+        @app.get("/youtube/v3/playlistItems")
+        async def youtube_playlist_items(request: Request):
+            if (fault := await fake._enter("youtube.playlistItems", 1)) is not None:
+                return fault
+            channel_id = request.query_params["playlistId"][2:]
+            videos = [f"vod-{channel_id}"]
+            if channel_id in fake.youtube_live:
+                videos.insert(0, fake.youtube_live[channel_id])
+            return {"items": [{"contentDetails": {"videoId": v}} for v in videos]}
+
+        @app.get("/youtube/v3/videos")
+        async def youtube_videos(request: Request):
+            ids = ids_param(request)
+            if (fault := await fake._enter("youtube.videos", len(ids))) is not None:
+                return fault
+            if len(ids) > 50:
+                return JSONResponse({"error": {"code": 400}}, status_code=400)
+            items = []
+            for video_id in ids:
+                kind, _, channel_id = video_id.partition("-")
+                items.append(fake._youtube_video(video_id, channel_id, live=kind == "live" and channel_id in fake.youtube_live))
+            return {"items": items}
+
+        @app.get("/youtube/v3/search")
+        async def youtube_search(request: Request):
+            if (fault := await fake._enter("youtube.search", 1)) is not None:
+                return fault
+            channel_id = request.query_params.get("channelId", "")
+            items = []
+            if channel_id in fake.youtube_live:
+                items.append({"id": {"kind": "youtube#video", "videoId": fake.youtube_live[channel_id]}})
+            return {"items": items}
+
+        return app
@@ -0,0 +1,334 @@
+"""In-memory PostgREST stand-in.
+
+Implements the small subset of the PostgREST HTTP interface the API uses:
+``GET``/``POST``/``PATCH``/``DELETE`` on ``/rest/v1/{table}`` with
+``eq``/``neq``/``in``/``is``/comparison filters (optionally negated with
+``not``), ``cs`` (array contains) and ``fts``/``wfts`` (all words
+present) filters, resource embedding along the
+foreign keys in :data:`DEFAULT_RELATIONS` (``channels!inner(...)``) with
+filters on embedded columns (``channels.user_id=eq.x``), ``order``,
+``limit``/``offset``, ``Prefer: count=exact`` and upserts via
+``on_conflict``, plus the Supabase Auth ``/auth/v1/health`` probe. It also
+records request, connection and written-row counts, and can inject latency
+and errors, so benchmarks can report them.
+It is a functional stand-in, not a performance model of Postgres.
+"""
+
+import asyncio
+import json
+import random
+import uuid
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import FastAPI, Request, Response
+
+#: (table, embedded table) -> (foreign key column, referenced column)
+DEFAULT_RELATIONS: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ("streams", "channels"): ("channel_id", "id"),
+    ("channels", "platforms"): ("platform_id", "id"),
+    ("user_api_keys", "platforms"): ("platform_id", "id"),
+}
+
+
+class _Embed(NamedTuple):
+    table: str
+    inner: bool
+    fields: List[Any]
+
+
+def _coerce(value: str) -> Any:
+    # postgrest-py sends Python booleans as True/False; Postgres accepts any case
+    lowered = value.lower()
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    if lowered == "null":
+        return None
+    return value
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current.append(char)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _parse_select(select: str) -> List[Any]:
+    """Columns as strings, embedded resources as ``_Embed``."""
+    fields: List[Any] = []
+    for part in _split_top_level(select or "*"):
+        name, paren, rest = part.partition("(")
+        if not paren:
+            fields.append(part)
+            continue
+        table, _, hint = name.partition("!")
+        fields.append(_Embed(table, hint == "inner", _parse_select(rest[:-1])))
+    return fields
+
+
+def _matches(row: Dict[str, Any], column: str, expr: str) -> bool:
+    op, _, raw = expr.partition(".")
+    op = op.split("(")[0]  # fts(english) -> fts
+    current = row.get(column)
+    if op == "not":
+        return not _matches(row, column, raw)
+    if op == "eq":
+        if isinstance(current, bool):
+            return current is _coerce(raw)
+        return str(current) == raw
+    if op == "neq":
+        return str(current) != raw
+    if op == "in":
+        values = [v.strip('"') for v in raw.strip("()").split(",") if v]
+        return str(current) in values
+    if op == "is":
+        return current is _coerce(raw)
+    if op == "cs":
+        wanted = [v.strip('"') for v in raw.strip("{}").split(",") if v]
+        return set(wanted).issubset(current or ())
+    if op in ("fts", "plfts", "wfts", "phfts"):
+        text = str(current or "").casefold()
+        return all(word in text for word in raw.replace('"', " ").casefold().split())
+    if op in ("gt", "gte", "lt", "lte"):
+        if current is None:
+            return False
+        try:
+            left, right = float(current), float(raw)
+        except (TypeError, ValueError):
+            left, right = str(current), raw
+        return {
+            "gt": left > right, "gte": left >= right,
+            "lt": left < right, "lte": left <= right,
+        }[op]
+    return True
+
+
+class FakePostgrest:
+    """PostgREST stand-in backed by Python dicts."""
+
+    RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        relations: Optional[Dict[Tuple[str, str], Tuple[str, str]]] = None,
+        seed: int = 0,
+        max_rows: Optional[int] = None
+    ):
+        """
+        Initialize fake.
+
+        Args:
+            latency: Artificial delay in seconds added to every request
+            error_rate: Probability of answering a request with 503
+            relations: Embeddable foreign keys (default: :data:`DEFAULT_RELATIONS`)
+            seed: Random seed for error-rate injection
+            max_rows: Rows returned per read at most, like PostgREST's
+                      ``db-max-rows`` (1000 on Supabase); the rest is cut silently
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.relations = DEFAULT_RELATIONS if relations is None else relations
+        self.max_rows = max_rows
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.connections: Set[Tuple[str, int]] = set()
+        self.requests = 0
+        self.requests_by_table: Counter = Counter()
+        self.errors_injected = 0
+        self.rows_written = 0
+        self.write_requests = 0
+        self.faults: Deque[int] = deque()
+        self._indexes: Dict[Tuple[str, str], Tuple[List[Dict[str, Any]], int, Dict[Any, Dict[str, Any]]]] = {}
+        self._random = random.Random(seed)
+        self.app = self._build_app()
+
+    def reset_counters(self) -> None:
+        """Reset request/connection/write counters (table data is kept)."""
+        self.connections.clear()
+        self.requests = 0
+        self.requests_by_table.clear()
+        self.errors_injected = 0
+        self.rows_written = 0
+        self.write_requests = 0
+
+    def inject(self, *status_codes: int) -> None:
+        """Make the next requests fail with the given status codes."""
+        self.faults.extend(status_codes)
+
+    def _filters(self, request: Request) -> List[Tuple[str, str]]:
+        return [
+            (key, value) for key, value in request.query_params.multi_items()
+            if key not in self.RESERVED and not key.endswith((".limit", ".offset", ".order"))
+        ]
+
+    def _lookup(self, table: str, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        rows = self.tables.get(table, [])
+        cached = self._indexes.get((table, column))
+        # Rebuilt when rows were added or removed (referenced keys never change)
+        if cached is None or cached[0] is not rows or cached[1] != len(rows):
+            cached = (rows, len(rows), {row.get(column): row for row in rows})
+            self._indexes[(table, column)] = cached
+        return cached[2].get(value)
+
+    def _project(
+        self,
+        table: str,
+        row: Dict[str, Any],
+        fields: List[Any],
+        filters: List[Tuple[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Row with its embedded resources, or None if an inner embed fails."""
+        own = [(c, e) for c, e in filters if "." not in c]
+        if not all(_matches(row, c, e) for c, e in own):
+            return None
+        result: Dict[str, Any] = {}
+        for field in fields:
+            if isinstance(field, str):
+                if field == "*":
+                    result.update(row)
+                else:
+                    result[field] = row.get(field)
+                continue
+            foreign_key, referenced = self.relations[(table, field.table)]
+            target = self._lookup(field.table, referenced, row.get(foreign_key))
+            prefix = field.table + "."
+            nested = [(c[len(prefix):], e) for c, e in filters if c.startswith(prefix)]
+            embedded = self._project(field.table, target, field.fields, nested) if target is not None else None
+            if embedded is None and field.inner:
+                return None
+            result[field.table] = embedded
+        return result
+
+    def _select(self, table: str, request: Request) -> Tuple[List[Dict[str, Any]], int]:
+        fields = _parse_select(request.query_params.get("select", "*"))
+        filters = self._filters(request)
+        rows = []
+        for row in self.tables.get(table, []):
+            projected = self._project(table, row, fields, filters)
+            if projected is not None:
+                rows.append((row, projected))
+        order = request.query_params.get("order")
+        if order:
+            for part in reversed(order.split(",")):
+                column, _, direction = part.partition(".")
+                rows.sort(
+                    key=lambda r: (r[0].get(column) is None, r[0].get(column)),
+                    reverse=direction.startswith("desc"),
+                )
+        total = len(rows)
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:int(limit)]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        return [projected for _, projected in rows], total
+
+    def _matching(self, table: str, request: Request) -> List[Dict[str, Any]]:
+        """Stored rows matching the top-level filters (for writes)."""
+        filters = self._filters(request)
+        return [
+            row for row in self.tables.get(table, [])
+            if all(_matches(row, c, e) for c, e in filters)
+        ]
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+        fake = self
+
+        @app.middleware("http")
+        async def track(request: Request, call_next):
+            fake.requests += 1
+            fake.requests_by_table[(request.method, request.url.path.rsplit("/", 1)[-1])] += 1
+            client = request.scope.get("client")
+            if client:
+                fake.connections.add(tuple(client))
+            if fake.latency:
+                await asyncio.sleep(fake.latency)
+            status = fake.faults.popleft() if fake.faults else None
+            if status is None and fake.error_rate and fake._random.random() < fake.error_rate:
+                status = 503
+            if status is not None:
+                fake.errors_injected += 1
+                body = json.dumps({"message": "injected", "code": str(status), "details": None, "hint": None})
+                return Response(body, status_code=status, media_type="application/json")
+            return await call_next(request)
+
+        @app.get("/auth/v1/health")
+        async def auth_health():
+            return {"name": "GoTrue", "description": "fake"}
+
+        @app.get("/rest/v1/{table}")
+        async def select(table: str, request: Request):
+            rows, total = fake._select(table, request)
+            headers = {}
+            if "count=" in request.headers.get("prefer", ""):
+                offset = int(request.query_params.get("offset", 0))
+                end = offset + len(rows) - 1
+                headers["Content-Range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+            return Response(json.dumps(rows, default=str), media_type="application/json", headers=headers)
+
+        @app.post("/rest/v1/{table}")
+        async def insert(table: str, request: Request):
+            payload = json.loads(await request.body() or b"[]")
+            rows = payload if isinstance(payload, list) else [payload]
+            conflict = request.query_params.get("on_conflict")
+            keys = conflict.split(",") if conflict else ["id"]
+            merge = "merge-duplicates" in request.headers.get("prefer", "")
+            stored = fake.tables.setdefault(table, [])
+            index = {tuple(r.get(k) for k in keys): r for r in stored}
+            written = []
+            for row in rows:
+                existing = index.get(tuple(row.get(k) for k in keys))
+                if existing is not None and merge:
+                    existing.update(row)
+                    written.append(existing)
+                else:
+                    row = {"id": str(uuid.uuid4()), **row}
+                    stored.append(row)
+                    index[tuple(row.get(k) for k in keys)] = row
+                    written.append(row)
+            fake.rows_written += len(written)
+            fake.write_requests += 1
+            return Response(json.dumps(written, default=str), status_code=201, media_type="application/json")
+
+        @app.patch("/rest/v1/{table}")
+        async def update(table: str, request: Request):
+            changes = json.loads(await request.body() or b"{}")
+            rows = fake._matching(table, request)
+            for row in rows:
+                row.update(changes)
+            fake.rows_written += len(rows)
+            fake.write_requests += 1
+            return Response(json.dumps(rows, default=str), media_type="application/json")
+
+        @app.delete("/rest/v1/{table}")
+        async def delete(table: str, request: Request):
+            rows = fake._matching(table, request)
+            ids = {id(r) for r in rows}
+            fake.tables[table] = [r for r in fake.tables.get(table, []) if id(r) not in ids]
+            fake.write_requests += 1
+            return Response(json.dumps(rows, default=str), media_type="application/json")
+
+        return app
+
+
+def seed(fake: FakePostgrest, table: str, rows: List[Dict[str, Any]], id_field: Optional[str] = "id") -> None:
+    """Insert rows directly into a fake table, generating ids when missing."""
+    stored = fake.tables.setdefault(table, [])
+    for row in rows:
+        if id_field and id_field not in row:
+            row = {id_field: str(uuid.uuid4()), **row}
+        stored.append(row)
@@ -0,0 +1,69 @@
+"""Run an ASGI app on a real local socket (background thread or current loop)."""
+
+import asyncio
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+import uvicorn
+
+
+def _bind(host: str) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    return sock
+
+
+@contextmanager
+def serve_in_thread(app, host: str = "127.0.0.1") -> Iterator[str]:
+    """
+    Serve ``app`` with uvicorn on an ephemeral port.
+
+    Yields:
+        Base URL of the running server (e.g. ``http://127.0.0.1:54321``)
+    """
+    sock = _bind(host)
+    port = sock.getsockname()[1]
+
+    config = uvicorn.Config(app, log_level="warning", lifespan="off", timeout_keep_alive=60)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+        sock.close()
+
+
+@asynccontextmanager
+async def serve_in_loop(app, host: str = "127.0.0.1") -> AsyncIterator[str]:
+    """
+    Serve ``app`` with uvicorn on the running event loop.
+
+    Unlike :func:`serve_in_thread` the app shares the test's loop, so tests
+    can drive app-side objects (e.g. publish events) directly.
+
+    Yields:
+        Base URL of the running server
+    """
+    sock = _bind(host)
+    port = sock.getsockname()[1]
+
+    config = uvicorn.Config(app, log_level="warning", lifespan="off", timeout_graceful_shutdown=1)
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        await task
+        sock.close()
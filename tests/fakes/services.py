@@ -0,0 +1,54 @@
+"""In-process fake platform services."""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set
+
+from app.core.exceptions import ExternalAPIException
+from app.models.stream import PlatformStream
+from app.services.base import StreamPlatformService
+
+
+def make_stream(platform: str, channel_id: str, viewer_count: int = 100, **overrides) -> PlatformStream:
+    """Build a PlatformStream for a fake channel."""
+    fields = {
+        "platform": platform,
+        "platform_channel_id": channel_id,
+        "platform_stream_id": f"{channel_id}-live",
+        "title": f"{channel_id} live",
+        "viewer_count": viewer_count,
+        "started_at": datetime(2025, 8, 7, 10, 0, tzinfo=timezone.utc),
+    }
+    fields.update(overrides)
+    return PlatformStream(**fields)
+
+
+class FakePlatformService(StreamPlatformService):
+    """Platform service that records every upstream call."""
+
+    def __init__(self, platform: str, live: Optional[Set[str]] = None, latency: float = 0.0):
+        """
+        Initialize fake.
+
+        Args:
+            platform: Platform name
+            live: Channel ids that report a live stream
+            latency: Seconds each call takes
+        """
+        self.platform = platform
+        self.live = set(live or ())
+        self.latency = latency
+        self.calls: List[List[str]] = []
+        self.fail_with: Optional[str] = None
+        self.viewers: Dict[str, int] = {}
+
+    async def fetch_live_streams(self, channel_ids: Sequence[str]) -> Dict[str, List[PlatformStream]]:
+        self.calls.append(list(channel_ids))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_with:
+            raise ExternalAPIException(self.fail_with, platform=self.platform)
+        return {
+            cid: [make_stream(self.platform, cid, self.viewers.get(cid, 100))] if cid in self.live else []
+            for cid in channel_ids
+        }
@@ -0,0 +1,52 @@
+"""
+The application schema on a plain Postgres server, Supabase style.
+
+Creates what Supabase provides out of the box (``anon``/``authenticated``/
+``service_role`` roles, ``auth.uid()`` reading ``request.jwt.claims``) and
+then runs ``contexts/sqls`` so RLS policies behave as in production.
+"""
+
+from pathlib import Path
+from typing import Any
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "contexts" / "sqls"
+
+SUPABASE_PRELUDE = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        CREATE ROLE anon NOLOGIN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+        CREATE ROLE authenticated NOLOGIN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        CREATE ROLE service_role NOLOGIN BYPASSRLS;
+    END IF;
+END
+$$;
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS uuid
+LANGUAGE sql STABLE
+AS $$ SELECT nullif(current_setting('request.jwt.claims', true)::json->>'sub', '')::uuid $$;
+GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
+"""
+
+GRANTS = """
+GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role;
+GRANT SELECT ON ALL TABLES IN SCHEMA public TO authenticated;
+GRANT ALL ON ALL TABLES IN SCHEMA public TO service_role;
+"""
+
+
+async def install_schema(connection: Any) -> None:
+    """
+    Create roles, ``auth.uid()``, tables, policies and grants.
+
+    Args:
+        connection: asyncpg connection to an empty database, as a superuser
+    """
+    await connection.execute(SUPABASE_PRELUDE)
+    for name in ("create_tables.sql", "RLS_implementation.sql"):
+        await connection.execute((SQL_DIR / name).read_text(encoding="utf-8"))
+    await connection.execute(GRANTS)
@@ -0,0 +1,179 @@
+"""Async data access, bounded blocking pool and event loop stall detection tests."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from supabase import create_client
+
+from main import app
+from app.core import database
+from app.core.auth import get_current_user_async
+from app.core.blocking import BlockingExecutor
+from app.core.database import AsyncSupabaseClientRegistry, set_async_client_registry
+from app.core.loop_monitor import EventLoopBlockDetector
+from app.services import stream_repository, supabase_service
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+
+
+@pytest.fixture
+def postgrest():
+    """PostgREST stand-in with one user's live streams."""
+    fake = FakePostgrest()
+    seed(fake, "platforms", [{"id": "p-tw", "name": "twitch"}, {"id": "p-yt", "name": "youtube"}])
+    seed(fake, "channels", [
+        {"id": f"ch-{i}", "user_id": "user-1", "channel_id": f"c{i}", "platform_id": ("p-tw", "p-yt")[i % 2],
+         "channel_name": f"chan{i}", "display_name": f"Chan {i}", "is_active": True, "is_subscribed": True}
+        for i in range(6)
+    ])
+    seed(fake, "streams", [
+        {"id": f"s-{i}", "channel_id": f"ch-{i}", "platform_stream_id": f"v{i}", "title": f"Speedrun {i}",
+         "viewer_count": i * 10, "game_name": ("Celeste", "Tetris")[i % 2], "tags": ["en"], "is_live": i < 4,
+         "started_at": "2025-08-07T10:00:00+00:00"}
+        for i in range(6)
+    ])
+    with serve_in_thread(fake.app) as base_url:
+        yield fake, base_url
+
+
+@pytest_asyncio.fixture
+async def async_registry(postgrest):
+    """Async client registry pointed at the stand-in, used by the request path."""
+    registry = AsyncSupabaseClientRegistry(postgrest[1], "anon-key", "service-key")
+    set_async_client_registry(registry)
+    yield registry
+    set_async_client_registry(None)
+    await registry.aclose()
+
+
+class TestAsyncRepository:
+    """Test that the async queries match the synchronous ones."""
+
+    @pytest.mark.asyncio
+    async def test_live_streams_match_sync_query(self, postgrest, async_registry):
+        """Test the live stream list through both clients."""
+        sync_client = create_client(postgrest[1], "service-key")
+
+        for platform, category in ((None, None), ("twitch", None), (None, "Tetris")):
+            rows = await stream_repository.fetch_user_live_streams("user-1", platform, category)
+            expected = await asyncio.to_thread(
+                supabase_service.fetch_user_live_streams, "user-1", platform, category, sync_client,
+            )
+            assert rows == expected
+        assert sorted(r["id"] for r in rows) == ["s-1", "s-3"]
+
+    @pytest.mark.asyncio
+    async def test_search_matches_sync_query(self, postgrest, async_registry):
+        """Test search ordering, paging and counts through both clients."""
+        sync_client = create_client(postgrest[1], "service-key")
+
+        result = await stream_repository.search_user_streams("user-1", "speedrun", is_live=None, limit=2, offset=1)
+        expected = await asyncio.to_thread(
+            supabase_service.search_user_streams, "user-1", "speedrun", None, None, None, None, None, None,
+            None, None, None, 2, 1, sync_client,
+        )
+
+        assert result == expected
+        assert [r["id"] for r in result[0]] == ["s-4", "s-3"] and result[1] == 6
+
+    @pytest.mark.asyncio
+    async def test_user_clients_are_cached_per_token(self, postgrest, async_registry):
+        """Test that the admin client and per-user clients are reused."""
+        first = await database.get_async_supabase_client()
+        user = await database.get_async_supabase_client("not-a-jwt")
+
+        assert await database.get_async_supabase_client() is first
+        assert user is not first
+        assert async_registry.stats()["clients_created"] == 2
+
+
+class TestEventLoopStaysResponsive:
+    """Test /api/health latency while slow database calls are in flight."""
+
+    @pytest_asyncio.fixture
+    async def client(self, postgrest, async_registry, no_rate_limit):
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            yield client
+        app.dependency_overrides.clear()
+
+    @staticmethod
+    async def health_latencies(client, until: asyncio.Future) -> list:
+        latencies = []
+        while not until.done():
+            started = time.perf_counter()
+            assert (await client.get("/api/health")).status_code == 200
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+        return latencies
+
+    @pytest.mark.asyncio
+    async def test_health_unaffected_by_slow_postgrest(self, client, postgrest):
+        """Test that 10 in-flight 0.5 s stream list loads do not delay /api/health."""
+        postgrest[0].latency = 0.5
+        started = time.perf_counter()
+        # Distinct categories, so every request is its own database load
+        lists = asyncio.gather(*(client.get("/api/streams", params={"category": f"g{i}"}) for i in range(10)))
+
+        latencies = await self.health_latencies(client, lists)
+
+        assert all(response.status_code == 200 for response in lists.result())
+        assert time.perf_counter() - started >= 0.5
+        assert len(latencies) >= 10
+        assert max(latencies) < 0.1
+
+    @pytest.mark.asyncio
+    async def test_health_unaffected_by_saturated_thread_pool(self, client):
+        """Test that queued blocking calls wait for a pool thread, not the loop."""
+        executor = BlockingExecutor(max_workers=2)
+        calls = asyncio.gather(*(executor.run(time.sleep, 0.2) for _ in range(6)))
+        await asyncio.sleep(0)
+
+        assert executor.stats()["running"] == 2 and executor.stats()["queued"] == 4
+        latencies = await self.health_latencies(client, calls)
+
+        executor.shutdown()
+        assert max(latencies) < 0.1
+        assert executor.stats() == {"max_workers": 2, "running": 0, "queued": 0, "calls": 6}
+
+
+class TestLoopBlockDetector:
+    """Test event loop stall reports."""
+
+    @staticmethod
+    def blocking_call():
+        time.sleep(0.15)
+
+    @pytest.mark.asyncio
+    async def test_reports_the_blocking_call_site(self):
+        """Test that a synchronous sleep on the loop is reported with its caller."""
+        detector = EventLoopBlockDetector(threshold=0.05)
+        detector.start()
+        try:
+            await asyncio.sleep(0.05)
+            self.blocking_call()
+            await asyncio.sleep(0.05)
+        finally:
+            await detector.stop()
+
+        assert detector.blocks == 1
+        report = detector.reports[0]
+        assert report.duration >= 0.1
+        assert report.call_site.endswith("in blocking_call")
+        assert "test_async_data_access.py" in report.call_site
+
+    @pytest.mark.asyncio
+    async def test_awaiting_is_not_a_stall(self):
+        """Test that awaiting slow I/O produces no report."""
+        detector = EventLoopBlockDetector(threshold=0.05)
+        detector.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            await detector.stop()
+
+        assert detector.blocks == 0
@@ -1,12 +1,26 @@
 """Authentication functionality tests."""
 
+import asyncio
+import time
+
+import jwt
 import pytest
 from unittest.mock import Mock, patch
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
 
 from main import app
-from app.core.auth import verify_jwt_token, get_current_user
+from app.core import auth
+from app.core.auth import (
+    verify_jwt_token,
+    verify_raw_token,
+    get_current_user,
+    get_current_user_dependency,
+    get_current_user_async,
+    get_token_cache_stats,
+)
+from app.core.config import get_settings
 from app.core.database import get_supabase_client
 from app.core.exceptions import AuthenticationException
 
@@ -138,6 +152,91 @@ class TestSupabaseConnection:
         # Verify service role is used (implementation dependent)
 
 
+class TestVerifiedTokenCache:
+    """Test the verified-token cache used by verify_jwt_token."""
+
+    SECRET = "test-jwt-secret-with-at-least-32-bytes"
+
+    @pytest.fixture(autouse=True)
+    def jwt_secret(self, monkeypatch):
+        """Sign and verify test tokens with a known secret."""
+        monkeypatch.setattr(get_settings(), "SUPABASE_JWT_SECRET", self.SECRET)
+
+    def make_token(self, exp_in: int = 3600) -> str:
+        return jwt.encode(
+            {"sub": "user-uuid-123", "role": "authenticated", "exp": int(time.time()) + exp_in},
+            self.SECRET,
+            algorithm="HS256"
+        )
+
+    def test_repeated_token_decoded_once(self):
+        """Test that a repeated token is served from the cache."""
+        token = self.make_token()
+
+        with patch('app.core.auth.jwt.decode', wraps=jwt.decode) as mock_decode:
+            first = verify_jwt_token(f"Bearer {token}")
+            second = verify_raw_token(token)
+
+        assert first == second
+        assert mock_decode.call_count == 1
+        stats = get_token_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_cached_claims_expire_with_token(self, monkeypatch):
+        """Test that cached claims are not served past the token's exp."""
+        now = [1000.0]
+        monkeypatch.setattr(auth._get_token_cache(), "_clock", lambda: now[0])
+        token = self.make_token(exp_in=60)
+
+        with patch('app.core.auth.jwt.decode', wraps=jwt.decode) as mock_decode:
+            verify_raw_token(token)
+            now[0] += 30
+            verify_raw_token(token)
+            now[0] += 31
+            verify_raw_token(token)
+
+        assert mock_decode.call_count == 2
+
+    def test_invalid_token_is_negatively_cached(self):
+        """Test that rejected tokens are remembered for the negative TTL."""
+        with patch('app.core.auth.jwt.decode', wraps=jwt.decode) as mock_decode:
+            for _ in range(3):
+                with pytest.raises(AuthenticationException):
+                    verify_raw_token("invalid.jwt.token")
+
+        assert mock_decode.call_count == 1
+        assert get_token_cache_stats()["negative_hits"] == 2
+
+    def test_unexpected_errors_are_not_cached(self):
+        """Test that non-JWT failures are retried on the next request."""
+        with patch('app.core.auth.jwt.decode') as mock_decode:
+            mock_decode.side_effect = Exception("boom")
+            for _ in range(2):
+                with pytest.raises(AuthenticationException):
+                    verify_raw_token("some.jwt.token")
+
+        assert mock_decode.call_count == 2
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """Test that the cache never grows beyond its configured size."""
+        monkeypatch.setattr(auth._get_token_cache(), "max_size", 2)
+        for i in range(5):
+            verify_raw_token(self.make_token(exp_in=3600 + i))
+
+        assert get_token_cache_stats()["size"] == 2
+
+    def test_dependency_uses_cache(self):
+        """Test that the FastAPI dependency goes through the cache."""
+        token = self.make_token()
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        get_current_user_dependency(credentials)
+        asyncio.run(get_current_user_async(credentials))
+
+        assert get_token_cache_stats()["hits"] == 1
+
+
 class TestAuthenticationEndpoints:
     """Test authentication-related API endpoints."""
 
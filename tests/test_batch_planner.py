@@ -0,0 +1,252 @@
+"""Batched platform fetch tests."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.exceptions import PlatformRateLimitException
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.batch_planner import BatchPlanner, PartialBatchError
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.twitch_service import TwitchService
+from app.services.youtube_service import YouTubeService
+from tests.fakes.platforms import FakePlatformAPIs
+
+
+class RecordingFetcher:
+    """Batch fetcher that records calls and peak concurrency."""
+
+    def __init__(self, delay: float = 0.01, fail_on: str = None):
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self.delay = delay
+        self.fail_on = fail_on
+
+    async def __call__(self, ids):
+        self.batches.append(ids)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if self.fail_on in ids:
+            raise RuntimeError("batch failed")
+        return {i: i.upper() for i in ids if not i.startswith("missing")}
+
+
+class TestBatchPlanner:
+    """Test chunking, coalescing and result splitting."""
+
+    @pytest.mark.asyncio
+    async def test_ids_are_chunked_to_batch_size(self):
+        """Test that 250 ids become three calls at batch size 100."""
+        fetcher = RecordingFetcher()
+        planner = BatchPlanner(fetcher, batch_size=100)
+
+        results = await planner.fetch([f"id{i}" for i in range(250)])
+
+        assert [len(b) for b in fetcher.batches] == [100, 100, 50]
+        assert results["id7"] == "ID7"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_batches(self):
+        """Test that concurrent callers are coalesced and get their own ids back."""
+        fetcher = RecordingFetcher()
+        planner = BatchPlanner(fetcher, batch_size=100)
+
+        first, second = await asyncio.gather(
+            planner.fetch(["a", "b", "shared"]),
+            planner.fetch(["c", "shared"]),
+        )
+
+        assert len(fetcher.batches) == 1
+        assert sorted(fetcher.batches[0]) == ["a", "b", "c", "shared"]
+        assert first == {"a": "A", "b": "B", "shared": "SHARED"}
+        assert second == {"c": "C", "shared": "SHARED"}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_limited(self):
+        """Test that at most max_concurrency batches run at once."""
+        fetcher = RecordingFetcher()
+        planner = BatchPlanner(fetcher, batch_size=10, max_concurrency=3)
+
+        await planner.fetch([f"id{i}" for i in range(100)])
+
+        assert len(fetcher.batches) == 10
+        assert fetcher.peak == 3
+
+    @pytest.mark.asyncio
+    async def test_missing_ids_get_default(self):
+        """Test that ids absent from the response resolve to the default."""
+        planner = BatchPlanner(RecordingFetcher(), batch_size=10, default=list)
+
+        results = await planner.fetch(["missing-1", "x"])
+
+        assert results == {"missing-1": [], "x": "X"}
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_keeps_successful_ones(self):
+        """Test that one failing batch does not discard the others."""
+        planner = BatchPlanner(RecordingFetcher(fail_on="id0"), batch_size=2)
+
+        with pytest.raises(PartialBatchError) as exc_info:
+            await planner.fetch(["id0", "id1", "id2", "id3"])
+
+        assert set(exc_info.value.errors) == {"id0", "id1"}
+        assert exc_info.value.results == {"id2": "ID2", "id3": "ID3"}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_chunk_wakes_waiting_callers(self):
+        """Test that callers of a cancelled chunk get an error instead of hanging."""
+        started = asyncio.Event()
+
+        async def hang(ids):
+            started.set()
+            await asyncio.Event().wait()
+
+        planner = BatchPlanner(hang, batch_size=100)
+        callers = [asyncio.create_task(planner.fetch(["a", "b"])), asyncio.create_task(planner.fetch(["b"]))]
+        await started.wait()
+        assert len(planner._chunks) == 1
+        for task in list(planner._chunks):
+            task.cancel()
+
+        results = await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), timeout=1)
+
+        assert all(isinstance(r, PartialBatchError) for r in results)
+        assert set(results[0].errors) == {"a", "b"}
+        assert isinstance(results[1].errors["b"], asyncio.CancelledError)
+        assert not planner._chunks
+
+
+@pytest.fixture
+def fake():
+    """Fake Helix/YouTube world."""
+    return FakePlatformAPIs()
+
+
+def asgi_client(fake: FakePlatformAPIs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+
+
+class TestTwitchService:
+    """Test the Twitch Helix client against the fake server."""
+
+    def make_service(self, fake):
+        return TwitchService(
+            client_id="client-id",
+            client_secret="secret",
+            base_url="http://fake/helix",
+            token_url="http://fake/oauth2/token",
+            http_client=asgi_client(fake),
+        )
+
+    @pytest.mark.asyncio
+    async def test_streams_fetched_100_ids_per_call(self, fake):
+        """Test that 250 channels need three Helix calls."""
+        ids = [str(i) for i in range(250)]
+        fake.add_twitch_channels(ids[:10], live=True)
+        service = self.make_service(fake)
+
+        streams = await service.fetch_live_streams(ids)
+
+        assert fake.calls["twitch.streams"] == 3
+        assert fake.calls["twitch.token"] == 1
+        assert sum(1 for s in streams.values() if s) == 10
+        assert streams["0"][0].thumbnail_url.endswith("0-640x360.jpg")
+        assert streams["200"] == []
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_is_reported(self, fake):
+        """Test that a 429 surfaces as a rate-limit error per channel."""
+        fake.inject("twitch.streams", 429)
+        service = self.make_service(fake)
+
+        with pytest.raises(PartialBatchError) as exc_info:
+            await service.fetch_live_streams(["1", "2"])
+
+        assert isinstance(exc_info.value.errors["1"], PlatformRateLimitException)
+
+    @pytest.mark.asyncio
+    async def test_expired_app_token_is_renewed(self, fake):
+        """Test that a 401 triggers one token renewal and a retry."""
+        fake.inject("twitch.streams", 401)
+        service = self.make_service(fake)
+
+        await service.fetch_live_streams(["1"])
+
+        assert fake.calls["twitch.token"] == 2
+        assert fake.calls["twitch.streams"] == 2
+
+
+class TestYouTubeService:
+    """Test the YouTube Data API client against the fake server."""
+
+    def make_service(self, fake):
+        return YouTubeService(api_key="key", base_url="http://fake/youtube/v3", http_client=asgi_client(fake))
+
+    @pytest.mark.asyncio
+    async def test_ids_batched_50_per_call(self, fake):
+        """Test channels.list and videos.list batching for 120 channels."""
+        ids = [f"UC{i}" for i in range(120)]
+        fake.add_youtube_channels(ids)
+        fake.add_youtube_channels(ids[:5], live=True)
+        service = self.make_service(fake)
+
+        streams = await service.fetch_live_streams(ids)
+
+        assert fake.calls["youtube.channels"] == 3
+        assert fake.calls["youtube.playlistItems"] == 120
+        # 125 candidate videos (120 VODs + 5 live) -> 3 videos.list calls
+        assert fake.calls["youtube.videos"] == 3
+        assert sum(1 for s in streams.values() if s) == 5
+        assert streams["UC0"][0].platform_stream_id == "live-UC0"
+
+    @pytest.mark.asyncio
+    async def test_uploads_playlists_are_cached(self, fake):
+        """Test that channels.list is only called for unseen channels."""
+        ids = [f"UC{i}" for i in range(10)]
+        fake.add_youtube_channels(ids)
+        service = self.make_service(fake)
+
+        await service.fetch_live_streams(ids)
+        await service.fetch_live_streams(ids)
+
+        assert fake.calls["youtube.channels"] == 1
+
+    @pytest.mark.asyncio
+    async def test_quota_error_is_rate_limit(self, fake):
+        """Test that a 403 quotaExceeded maps to a rate-limit error."""
+        fake.add_youtube_channels(["UC1"])
+        fake.inject("youtube.channels", 403)
+        service = self.make_service(fake)
+
+        with pytest.raises(PartialBatchError) as exc_info:
+            await service.fetch_live_streams(["UC1"])
+
+        assert exc_info.value.errors["UC1"].error_code == "RATE_LIMITED"
+
+
+class TestSchedulerWithBatches:
+    """Test that partial batch failures become per-channel errors."""
+
+    @pytest.mark.asyncio
+    async def test_partial_failure_reported_per_channel(self, fake):
+        """Test that only channels in the failed batch carry an error."""
+        ids = [str(i) for i in range(150)]
+        fake.add_twitch_channels(ids, live=True)
+        fake.inject("twitch.streams", 503)
+        service = TestTwitchService().make_service(fake)
+        rows = [ChannelSubscription(f"row-{i}", "user-1", ChannelKey("twitch", i)) for i in ids]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({"twitch": service}, loader)
+        snapshots = await scheduler.refresh_all()
+
+        failed = [s for s in snapshots.values() if s.error_code]
+        live = [s for s in snapshots.values() if s.streams]
+        assert len(failed) + len(live) == 150
+        assert {len(failed), len(live)} == {100, 50}
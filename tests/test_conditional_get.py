@@ -0,0 +1,275 @@
+"""Data versions, ETag / 304 and since-cursor tests."""
+
+import asyncio
+import copy
+import random
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.cache import SWRCache
+from app.core.exceptions import ValidationException
+from app.core.versioning import VersionStore, decode_cursor, encode_cursor, etag_matches, make_etag
+from app.services import stream_cache
+
+
+def row(row_id: str, viewers: int = 10) -> dict:
+    return {"id": row_id, "viewerCount": viewers}
+
+
+class TestVersionStore:
+    """Test version assignment and deltas."""
+
+    def test_unchanged_reload_keeps_the_version(self):
+        """Test that identical data does not bump the version."""
+        store = VersionStore()
+        first = store.record("k", [row("a"), row("b")], store.begin())
+        second = store.record("k", [row("a"), row("b")], store.begin())
+
+        assert second is first
+
+    def test_changes_since_a_version(self):
+        """Test that only changed, added and removed rows are reported."""
+        store = VersionStore()
+        v1 = store.record("k", [row("a"), row("b"), row("c")], store.begin())
+        v2 = store.record("k", [row("a", 99), row("b"), row("d")], store.begin())
+        v3 = store.record("k", [row("a", 99), row("d")], store.begin())
+
+        assert v3.changes_since(v1.version) == ([row("a", 99), row("d")], ["c", "b"])
+        assert v3.changes_since(v2.version) == ([], ["b"])
+        assert v3.changes_since(v3.version) == ([], [])
+
+    def test_readded_row_is_not_reported_removed(self):
+        """Test that a row removed and added again is only an upsert."""
+        store = VersionStore()
+        v1 = store.record("k", [row("a")], store.begin())
+        store.record("k", [], store.begin())
+        v3 = store.record("k", [row("a", 5)], store.begin())
+
+        assert v3.changes_since(v1.version) == ([row("a", 5)], [])
+
+    def test_older_load_never_overwrites_newer_data(self):
+        """Test that a load started earlier but finished later is discarded."""
+        store = VersionStore()
+        slow, fast = store.begin(), store.begin()
+        newer = store.record("k", [row("a", 2)], fast)
+
+        assert store.record("k", [row("a", 1)], slow) is newer
+
+    def test_pruned_tombstones_move_the_horizon(self):
+        """Test that cursors older than the kept tombstones get no delta."""
+        store = VersionStore(max_tombstones=1)
+        v1 = store.record("k", [row("a"), row("b")], store.begin())
+        v2 = store.record("k", [row("b")], store.begin())
+        v3 = store.record("k", [], store.begin())
+
+        assert v3.changes_since(v1.version) is None
+        assert v3.changes_since(v2.version) == ([], ["b"])
+
+    def test_history_is_bounded(self):
+        """Test that the least recently used keys are forgotten."""
+        store = VersionStore(max_keys=2)
+        for key in ("a", "b", "c"):
+            store.record(key, [row("x")], store.begin())
+
+        assert len(store) == 2
+        assert store.latest("a") is None
+
+
+class TestTokens:
+    """Test ETag matching and cursor encoding."""
+
+    def test_etag_matching(self):
+        """Test If-None-Match lists, weak tags and wildcards."""
+        etag = make_etag(7, 20, 0)
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(make_etag(8, 20, 0), etag)
+        assert not etag_matches(make_etag(7, 20, 20), etag)
+        assert not etag_matches(None, etag)
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor only decodes for the list it was issued for."""
+        cursor = encode_cursor(("user-1", "all"), 42)
+
+        assert decode_cursor(cursor, ("user-1", "all")) == 42
+        assert decode_cursor(cursor, ("user-2", "all")) is None
+        with pytest.raises(ValidationException):
+            decode_cursor("%%%", ("user-1", "all"))
+
+
+def db_row(row_id: str, viewers: int) -> dict:
+    return {
+        "id": row_id,
+        "platform_stream_id": f"vid-{row_id}",
+        "title": f"stream {row_id}",
+        "thumbnail_url": None,
+        "viewer_count": viewers,
+        "game_name": "Apex Legends",
+        "started_at": "2025-08-07T10:00:00+00:00",
+        "is_live": True,
+        "channels": {"id": f"ch-{row_id}", "channel_name": f"chan{row_id}", "platforms": {"name": "twitch"}},
+    }
+
+
+class FakeDatabase:
+    """Mutable ``streams`` table read with a random delay."""
+
+    def __init__(self, max_delay: float = 0.0):
+        self.rows = {"1": db_row("1", 10), "2": db_row("2", 20)}
+        self.max_delay = max_delay
+        self.reads = 0
+
+    async def __call__(self, user_id, platform=None, category=None, client=None):
+        self.reads += 1
+        # The read sees the table as of its start
+        rows = copy.deepcopy(list(self.rows.values()))
+        await asyncio.sleep(random.uniform(0, self.max_delay))
+        return rows
+
+
+class TestListStreamsConditional:
+    """Test ETags, 304 and since mode on GET /api/streams."""
+
+    @pytest.fixture
+    def database(self, monkeypatch):
+        database = FakeDatabase()
+        monkeypatch.setattr(stream_cache, "fetch_user_live_streams", database)
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield database
+        app.dependency_overrides.clear()
+
+    @pytest_asyncio.fixture
+    async def client(self, database):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_unchanged_list_is_not_modified(self, client, database):
+        """Test that an unchanged list answers 304 without a body."""
+        first = await client.get("/api/streams")
+        stream_cache.invalidate_users({"user-1"})
+
+        second = await client.get("/api/streams", headers={"If-None-Match": first.headers["ETag"]})
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert database.reads == 2
+
+    @pytest.mark.asyncio
+    async def test_changed_list_gets_a_new_etag(self, client, database):
+        """Test that a data change invalidates the ETag."""
+        first = await client.get("/api/streams")
+        database.rows["1"]["viewer_count"] = 500
+        stream_cache.invalidate_users({"user-1"})
+
+        second = await client.get("/api/streams", headers={"If-None-Match": first.headers["ETag"]})
+
+        assert second.status_code == 200
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert second.json()["meta"]["version"] > first.json()["meta"]["version"]
+
+    @pytest.mark.asyncio
+    async def test_since_returns_only_changes(self, client, database):
+        """Test the delta of added, changed and removed streams."""
+        first = await client.get("/api/streams")
+        cursor = first.json()["meta"]["cursor"]
+        database.rows["2"]["viewer_count"] = 99
+        del database.rows["1"]
+        database.rows["3"] = db_row("3", 5)
+        stream_cache.invalidate_users({"user-1"})
+
+        delta = (await client.get("/api/streams", params={"since": cursor})).json()
+
+        changes = delta["data"]["changes"]
+        assert [s["id"] for s in changes["upserted"]] == ["2", "3"]
+        assert changes["upserted"][0]["viewerCount"] == 99
+        assert changes["removed"] == ["1"]
+        assert delta["data"]["total"] == 2
+
+        again = await client.get("/api/streams", params={"since": delta["meta"]["cursor"]})
+        assert again.json()["data"]["changes"] == {"upserted": [], "removed": []}
+
+    @pytest.mark.asyncio
+    async def test_unknown_cursor_returns_full_list(self, client, database):
+        """Test that a cursor for another list resets to the full list."""
+        other = encode_cursor(("user-2", "all", None, "viewers"), 1)
+
+        response = (await client.get("/api/streams", params={"since": other})).json()
+
+        assert response["meta"]["reset"] is True
+        assert len(response["data"]["streams"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_malformed_cursor_is_rejected(self, client, database):
+        """Test that a garbage cursor is a validation error."""
+        response = await client.get("/api/streams", params={"since": "!!"})
+
+        assert response.status_code == 400
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    @pytest.mark.asyncio
+    async def test_cursors_stay_correct_across_concurrent_refreshes(self, client, database, monkeypatch):
+        """Test that clients applying deltas always hold exactly the served version."""
+        random.seed(10)
+        database.max_delay = 0.003
+        monkeypatch.setattr(stream_cache, "_stream_cache", SWRCache(
+            fresh_ttl=0.002, stale_ttl=0.01, max_weight=10 ** 6, weigh=len,
+        ))
+        served = {}
+        versions = stream_cache.get_stream_versions()
+        record = versions.record
+
+        def recording(key, items, ticket):
+            snapshot = record(key, items, ticket)
+            served[snapshot.version] = {item["id"]: item["viewerCount"] for item in snapshot.items}
+            return snapshot
+
+        monkeypatch.setattr(versions, "record", recording)
+        stop = asyncio.Event()
+
+        async def mutate():
+            next_id = 10
+            while not stop.is_set():
+                action = random.random()
+                if action < 0.5 and database.rows:
+                    database.rows[random.choice(list(database.rows))]["viewer_count"] += 1
+                elif action < 0.75 and len(database.rows) > 1:
+                    del database.rows[random.choice(list(database.rows))]
+                else:
+                    next_id += 1
+                    database.rows[str(next_id)] = db_row(str(next_id), next_id)
+                stream_cache.invalidate_users({"user-1"})
+                await asyncio.sleep(random.uniform(0, 0.004))
+
+        async def poll(polls: int):
+            state, cursor, deltas = {}, None, 0
+            for _ in range(polls):
+                params = {"since": cursor, "limit": 100} if cursor else {"limit": 100}
+                body = (await client.get("/api/streams", params=params)).json()
+                if "changes" in body["data"]:
+                    deltas += 1
+                    for row_id in body["data"]["changes"]["removed"]:
+                        state.pop(row_id, None)
+                    state.update({s["id"]: s["viewerCount"] for s in body["data"]["changes"]["upserted"]})
+                else:
+                    state = {s["id"]: s["viewerCount"] for s in body["data"]["streams"]}
+                assert state == served[body["meta"]["version"]]
+                cursor = body["meta"]["cursor"]
+                await asyncio.sleep(random.uniform(0, 0.003))
+            return deltas
+
+        mutator = asyncio.ensure_future(mutate())
+        deltas = await asyncio.gather(*(poll(60) for _ in range(5)))
+        stop.set()
+        await mutator
+
+        assert all(count > 0 for count in deltas)
+        assert len(served) > 10
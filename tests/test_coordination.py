@@ -0,0 +1,440 @@
+"""Multi-worker coordination tests.
+
+Hash ring, channel ownership and leader gating run in-process. The cluster
+tests need a real server: set ``POSTGRES_TEST_URL`` to a Postgres DSN
+(advisory locks and NOTIFY only; nothing is created there). They start
+separate worker processes (``tests.fakes.cluster_worker``) and read what
+each one fetched from its log.
+"""
+
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.coordination import ClusterCoordinator, HashRing
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.routers import streams as streams_router
+from app.services import stream_cache
+from app.services.oauth_tokens import OAuthTokenManager
+from app.services.refresh_scheduler import ChannelSnapshot, StreamRefreshScheduler
+from app.services.stream_events import EVENTS_TOPIC, StreamEventBroker
+from app.services.stream_search import StreamSearchIndex, stream_search_listener
+from tests.fakes.services import FakePlatformService
+
+POSTGRES_TEST_URL = os.environ.get("POSTGRES_TEST_URL", "")
+CHANNELS = 60
+REFRESH_INTERVAL = 0.5
+POLL_INTERVAL = 0.2
+
+needs_postgres = pytest.mark.skipif(not POSTGRES_TEST_URL, reason="POSTGRES_TEST_URL is not set")
+
+
+def channel_rows(count: int) -> list:
+    return [
+        ChannelSubscription(id=f"row-{i}", user_id=f"user-{i}", key=ChannelKey("twitch", f"c{i}"))
+        for i in range(count)
+    ]
+
+
+class TestHashRing:
+    """Test the consistent channel assignment."""
+
+    def test_every_key_has_one_owner_with_even_shares(self):
+        """Test that 3 workers get roughly a third of 3000 keys each."""
+        ring = HashRing([11, 22, 33])
+        shares = Counter(ring.owner(f"twitch:c{i}") for i in range(3000))
+
+        assert set(shares) == {11, 22, 33}
+        assert all(700 < share < 1300 for share in shares.values())
+
+    def test_leaving_worker_only_moves_its_own_keys(self):
+        """Test that keys of the remaining workers keep their owner."""
+        keys = [f"youtube:UC{i}" for i in range(1000)]
+        before = HashRing([1, 2, 3, 4])
+        after = HashRing([1, 2, 4])
+
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+
+        assert moved and all(before.owner(key) == 3 for key in moved)
+
+    def test_empty_ring(self):
+        """Test that an empty ring owns nothing."""
+        assert HashRing([]).owner("twitch:c1") is None
+
+
+class TestPartitionedScheduler:
+    """Test the scheduler's periodic cycle with an ownership filter."""
+
+    @pytest.mark.asyncio
+    async def test_cycle_fetches_owned_channels_only(self):
+        """Test that only owned channels go upstream and stats cover them."""
+        service = FakePlatformService("twitch")
+        rows = channel_rows(10)
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler(
+            {"twitch": service}, loader, owns=lambda key: int(key.channel_id[1:]) % 2 == 0,
+        )
+        await scheduler.refresh_all()
+
+        assert sorted(service.calls[0]) == ["c0", "c2", "c4", "c6", "c8"]
+        stats = scheduler.stats()
+        assert stats["tracked_channels"] == 10 and stats["owned_channels"] == 5
+        assert stats["never_fetched"] == 0
+
+    @pytest.mark.asyncio
+    async def test_on_demand_refresh_is_not_filtered(self):
+        """Test that a user's refresh of a channel owned elsewhere still fetches it."""
+        service = FakePlatformService("twitch")
+
+        async def loader():
+            return channel_rows(2)
+
+        scheduler = StreamRefreshScheduler({"twitch": service}, loader, owns=lambda key: False)
+        await scheduler.refresh([ChannelKey("twitch", "c1")])
+
+        assert service.calls == [["c1"]]
+
+
+class TestLeaderOnlyTokenScan:
+    """Test that the token refresh scan runs on the leader only."""
+
+    class Store:
+        def __init__(self):
+            self.scans = 0
+
+        async def expiring(self, *args):
+            self.scans += 1
+            return []
+
+    @pytest.mark.asyncio
+    async def test_followers_skip_the_scan(self):
+        """Test the scan loop with a leadership predicate."""
+        leader = {"value": False}
+        store = self.Store()
+        manager = OAuthTokenManager({"twitch": object()}, store=store, interval=0.01,
+                                    is_leader=lambda: leader["value"])
+        manager.start()
+        await asyncio.sleep(0.05)
+        assert store.scans == 0
+
+        leader["value"] = True
+        await asyncio.sleep(0.05)
+        manager._task.cancel()
+        await asyncio.gather(manager._task, return_exceptions=True)
+
+        assert store.scans > 0
+
+
+class TestInvalidationBroadcast:
+    """Test that refreshed users' lists are invalidated on peers too."""
+
+    @pytest.mark.asyncio
+    async def test_listener_publishes_affected_users_in_batches(self):
+        """Test batching of published user ids."""
+        rows = channel_rows(stream_cache.INVALIDATION_BATCH_SIZE + 5)
+        published = []
+
+        async def loader():
+            return rows
+
+        async def publish(topic, data):
+            published.append((topic, data))
+
+        scheduler = StreamRefreshScheduler({}, loader)
+        await scheduler.reload_channels()
+        listener = stream_cache.stream_cache_listener(scheduler, publish)
+        await listener({row.key: ChannelSnapshot(row.key) for row in rows})
+
+        assert [topic for topic, _ in published] == [stream_cache.INVALIDATION_TOPIC] * 2
+        assert sorted(user for _, users in published for user in users) == sorted(row.user_id for row in rows)
+
+
+class TestPartitionedReadPaths:
+    """Test search and push for channels another worker owns (two in-process workers)."""
+
+    CHANNEL = ChannelKey("twitch", "c1")
+
+    @pytest_asyncio.fixture
+    async def workers(self):
+        """Worker A owns c1, worker B owns nothing; their brokers share a bus."""
+        service = FakePlatformService("twitch", live={"c1"})
+        clock = {"now": 1_000_000.0}
+
+        async def loader():
+            return [ChannelSubscription("row-1", "user-1", self.CHANNEL)]
+
+        workers = {}
+        for name, owned in (("a", True), ("b", False)):
+            scheduler = StreamRefreshScheduler(
+                {"twitch": service}, loader, owns=lambda key, owned=owned: owned, clock=lambda: clock["now"],
+            )
+            await scheduler.reload_channels()
+            index = StreamSearchIndex()
+            scheduler.add_listener(stream_search_listener(scheduler, index))
+            workers[name] = {"scheduler": scheduler, "index": index}
+
+        async def publish_from(sender, topic, data):
+            for name, worker in workers.items():
+                if name != sender and topic == EVENTS_TOPIC:
+                    worker["broker"].receive(data)
+            return True
+
+        for name, worker in workers.items():
+            worker["broker"] = StreamEventBroker(
+                worker["scheduler"].subscriptions_for, owns=worker["scheduler"].is_owned,
+                publish=lambda topic, data, name=name: publish_from(name, topic, data),
+            )
+            worker["scheduler"].add_listener(worker["broker"])
+        async def cycle():
+            # One refresh interval later: A's periodic cycle
+            clock["now"] += 60
+            await workers["a"]["scheduler"].refresh_all()
+
+        return service, cycle, workers["a"], workers["b"]
+
+    @pytest.mark.asyncio
+    async def test_ended_stream_of_non_owned_channel_leaves_search(self, workers, monkeypatch):
+        """Test that B stops returning a stream A saw end, though B indexed it on demand."""
+        service, cycle, a, b = workers
+        await cycle()
+        # A user's refresh on B fetches c1 while it is live
+        await b["scheduler"].refresh([self.CHANNEL])
+        assert len(a["index"]) == 1
+        service.live.clear()
+        await cycle()
+
+        async def search_user_streams(*args):
+            return [], 0
+
+        monkeypatch.setattr(streams_router, "search_user_streams", search_user_streams)
+        app.state.stream_scheduler = b["scheduler"]
+        app.state.stream_search = b["index"]
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                body = (await client.get("/api/streams/search", params={"query": "live"})).json()
+        finally:
+            app.dependency_overrides.clear()
+            del app.state.stream_scheduler, app.state.stream_search
+
+        assert len(b["index"]) == 0
+        assert body["data"]["streams"] == []
+        assert body["data"]["search_meta"]["source"] == "database"
+        assert len(a["index"]) == 0
+
+    @pytest.mark.asyncio
+    async def test_push_events_of_non_owned_channel_come_from_its_owner(self, workers):
+        """Test that B's connection gets A's events once, and B's own refresh adds none."""
+        service, cycle, a, b = workers
+        subscriber = b["broker"].subscribe("user-1")
+        await cycle()
+        service.viewers["c1"] = 250
+        await b["scheduler"].refresh([self.CHANNEL])
+        await cycle()
+        viewers, _ = await subscriber.next_batch(timeout=0)
+        service.live.clear()
+        await cycle()
+        ended, resync = await subscriber.next_batch(timeout=0)
+
+        assert not resync
+        assert [(e.type, e.data["viewer_count"]) for e in viewers] == [("stream.viewers", 250)]
+        assert [(e.type, e.data["platform_stream_id"]) for e in ended] == [("stream.ended", "c1-live")]
+        assert a["broker"].stats()["events_relayed"] == 2
+        assert b["broker"].stats()["events_received"] == 2
+
+
+@pytest_asyncio.fixture
+async def pair():
+    """Two coordinators of a fresh cluster on the test server."""
+    if not POSTGRES_TEST_URL:
+        pytest.skip("POSTGRES_TEST_URL is not set")
+    namespace = random.randint(1, 2 ** 31 - 1)
+    first, second = (ClusterCoordinator(POSTGRES_TEST_URL, namespace, poll_interval=POLL_INTERVAL) for _ in range(2))
+    try:
+        await asyncio.gather(first.start(), second.start())
+    except OSError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    yield first, second
+    await asyncio.gather(first.stop(), second.stop())
+
+
+class TestClusterCoordinator:
+    """Test membership, leadership and messages against a real server."""
+
+    @pytest.mark.asyncio
+    async def test_one_leader_and_a_shared_view(self, pair):
+        """Test that both workers agree on members, leader and key owners."""
+        first, second = pair
+        await asyncio.sleep(POLL_INTERVAL * 2)
+
+        assert [first.is_leader, second.is_leader].count(True) == 1
+        assert first.members == second.members == tuple(sorted((first.worker_id, second.worker_id)))
+        assert first.leader_id == second.leader_id
+        keys = [f"twitch:c{i}" for i in range(100)]
+        assert all(first.owns(key) != second.owns(key) for key in keys)
+
+    @pytest.mark.asyncio
+    async def test_messages_reach_peers_only(self, pair):
+        """Test publish/subscribe between workers."""
+        first, second = pair
+        received = {"first": [], "second": []}
+        first.subscribe("topic", received["first"].append)
+        second.subscribe("topic", received["second"].append)
+
+        assert await first.publish("topic", ["user-1"])
+        await asyncio.sleep(0.2)
+
+        assert received == {"first": [], "second": [["user-1"]]}
+
+    @pytest.mark.asyncio
+    async def test_graceful_leave_hands_over_at_once(self, pair):
+        """Test that the follower takes over when the leader stops."""
+        leader, follower = sorted(pair, key=lambda c: not c.is_leader)
+        await leader.stop()
+        await asyncio.sleep(POLL_INTERVAL * 2)
+
+        assert follower.is_leader and follower.members == (follower.worker_id,)
+        assert all(follower.owns(f"twitch:c{i}") for i in range(100))
+
+
+def read_log(path: str) -> list:
+    entries = []
+    with open(path) as log:
+        for line in log:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Line still being written
+                pass
+    return entries
+
+
+def wait_until(condition, timeout: float = 15.0) -> None:
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.05)
+
+
+class Cluster:
+    """Worker processes sharing one coordination namespace."""
+
+    def __init__(self, tmp_path, size: int):
+        self.namespace = random.randint(1, 2 ** 31 - 1)
+        self.logs = [str(tmp_path / f"worker-{i}.jsonl") for i in range(size)]
+        self.processes = [
+            subprocess.Popen(
+                [sys.executable, "-m", "tests.fakes.cluster_worker", "--dsn", POSTGRES_TEST_URL,
+                 "--namespace", str(self.namespace), "--log", log, "--channels", str(CHANNELS),
+                 "--interval", str(REFRESH_INTERVAL), "--poll-interval", str(POLL_INTERVAL)],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+            for log in self.logs
+        ]
+        for log in self.logs:
+            open(log, "a").close()
+
+    def alive(self) -> list:
+        return [i for i, process in enumerate(self.processes) if process.poll() is None]
+
+    def statuses(self, since: float = 0.0) -> list:
+        return [
+            entry for i in self.alive() for entry in read_log(self.logs[i])
+            if "leader" in entry and entry["t"] >= since
+        ]
+
+    def latest_status(self, i: int) -> dict:
+        statuses = [entry for entry in read_log(self.logs[i]) if "leader" in entry]
+        return statuses[-1] if statuses else {}
+
+    def wait_for_members(self, count: int) -> None:
+        wait_until(lambda: all(self.latest_status(i).get("members") == count for i in self.alive()))
+        # Cycles started before the last membership change have finished by now
+        time.sleep(REFRESH_INTERVAL * 2)
+
+    def fetchers(self, start: float, end: float) -> dict:
+        """Channel id to the workers that fetched it in [start, end]."""
+        workers = defaultdict(set)
+        for log in self.logs:
+            for entry in read_log(log):
+                if "fetch" in entry and start <= entry["t"] <= end:
+                    for channel_id in entry["fetch"]:
+                        workers[channel_id].add(entry["worker"])
+        return workers
+
+    def observe(self, seconds: float = 2.0) -> dict:
+        start = time.time()
+        time.sleep(seconds)
+        return self.fetchers(start, time.time())
+
+    def stop(self) -> None:
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            process.wait(timeout=10)
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    """Three worker processes."""
+    if not POSTGRES_TEST_URL:
+        pytest.skip("POSTGRES_TEST_URL is not set")
+    cluster = Cluster(tmp_path, 3)
+    yield cluster
+    cluster.stop()
+
+
+@needs_postgres
+class TestWorkerCluster:
+    """Test separate worker processes against a real server."""
+
+    def test_no_duplicate_fetches_and_leader_failover(self, cluster):
+        """Test partitioned fetches, then SIGKILL of the leader."""
+        cluster.wait_for_members(3)
+        started = time.time()
+        fetchers = cluster.observe()
+
+        # Every channel is fetched, each by exactly one worker
+        assert sorted(fetchers) == sorted(f"c{i}" for i in range(CHANNELS))
+        assert all(len(workers) == 1 for workers in fetchers.values())
+        assert len(set.union(*fetchers.values())) == 3
+        leaders = {entry["worker"] for entry in cluster.statuses(since=started) if entry["leader"]}
+        assert len(leaders) == 1
+        leader = leaders.pop()
+
+        index = next(i for i in cluster.alive() if cluster.latest_status(i)["worker"] == leader)
+        killed_at = time.time()
+        cluster.processes[index].send_signal(signal.SIGKILL)
+        cluster.processes[index].wait()
+
+        wait_until(lambda: any(entry["leader"] for entry in cluster.statuses(since=killed_at)), timeout=5.0)
+        failover = min(entry["t"] for entry in cluster.statuses(since=killed_at) if entry["leader"]) - killed_at
+        assert failover < POLL_INTERVAL * 5
+
+        cluster.wait_for_members(2)
+        started = time.time()
+        fetchers = cluster.observe()
+
+        # The dead worker's channels moved to the survivors, still without duplicates
+        assert sorted(fetchers) == sorted(f"c{i}" for i in range(CHANNELS))
+        assert all(len(workers) == 1 for workers in fetchers.values())
+        assert leader not in set.union(*fetchers.values())
+        leaders = {entry["worker"] for entry in cluster.statuses(since=started) if entry["leader"]}
+        assert len(leaders) == 1 and leader not in leaders
@@ -0,0 +1,110 @@
+"""Supabase client registry tests."""
+
+import time
+
+import httpx
+import jwt
+import pytest
+
+from app.core.database import SupabaseClientRegistry
+
+
+def make_token(sub: str, exp_in: int = 3600) -> str:
+    """Create a signed test JWT."""
+    return jwt.encode(
+        {"sub": sub, "role": "authenticated", "exp": int(time.time()) + exp_in},
+        "test-secret",
+        algorithm="HS256"
+    )
+
+
+@pytest.fixture
+def captured():
+    """Requests seen by the mock transport."""
+    return []
+
+
+@pytest.fixture
+def registry(captured):
+    """Registry wired to a mock PostgREST transport."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        captured.append(request)
+        return httpx.Response(200, json=[])
+
+    registry = SupabaseClientRegistry(
+        supabase_url="https://test.supabase.co",
+        anon_key="anon-key",
+        service_role_key="service-role-key",
+        max_user_clients=2,
+        transport=httpx.MockTransport(handler),
+    )
+    yield registry
+    registry.close()
+
+
+class TestClientReuse:
+    """Test that clients are created once and reused."""
+
+    def test_admin_client_is_singleton(self, registry):
+        """Test that the admin client is only created once."""
+        assert registry.admin() is registry.admin()
+        assert registry.stats()["clients_created"] == 1
+
+    def test_user_client_cached_per_token(self, registry):
+        """Test that the same JWT returns the same client."""
+        token = make_token("user-1")
+
+        assert registry.for_user(token) is registry.for_user(token)
+        assert registry.stats()["user_clients"]["hits"] == 1
+
+    def test_different_tokens_get_different_clients(self, registry):
+        """Test that users never share a client."""
+        assert registry.for_user(make_token("user-1")) is not registry.for_user(make_token("user-2"))
+
+    def test_user_cache_is_bounded(self, registry):
+        """Test LRU eviction once max_user_clients is exceeded."""
+        for i in range(5):
+            registry.for_user(make_token(f"user-{i}"))
+
+        assert registry.stats()["user_clients"]["size"] == 2
+
+    def test_expired_token_is_not_cached(self, registry):
+        """Test that a client is never cached past the token's exp."""
+        token = make_token("user-1", exp_in=-10)
+
+        assert registry.for_user(token) is not registry.for_user(token)
+        assert registry.stats()["user_clients"]["size"] == 0
+
+    def test_malformed_token_is_not_cached(self, registry):
+        """Test that tokens without a readable payload are not cached."""
+        registry.for_user("not.a.jwt")
+
+        assert registry.stats()["user_clients"]["size"] == 0
+
+
+class TestSharedTransport:
+    """Test that all clients share one connection pool without sharing auth."""
+
+    def test_requests_carry_their_own_authorization(self, registry, captured):
+        """Test that per-user headers stay isolated on the shared transport."""
+        token_a, token_b = make_token("user-a"), make_token("user-b")
+
+        registry.for_user(token_a).table("channels").select("*").execute()
+        registry.for_user(token_b).table("channels").select("*").execute()
+        registry.admin().table("channels").select("*").execute()
+
+        auth_headers = [r.headers["Authorization"] for r in captured]
+        assert auth_headers == [
+            f"Bearer {token_a}",
+            f"Bearer {token_b}",
+            "Bearer service-role-key",
+        ]
+        assert captured[0].headers["apikey"] == "anon-key"
+        assert captured[2].headers["apikey"] == "service-role-key"
+
+    def test_clients_use_the_registry_transport(self, registry):
+        """Test that every client's HTTP session uses the shared transport."""
+        user_client = registry.for_user(make_token("user-1"))
+
+        assert user_client.postgrest.session._transport is registry.transport
+        assert registry.admin().postgrest.session._transport is registry.transport
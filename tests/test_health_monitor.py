@@ -0,0 +1,183 @@
+"""Background health monitor and readiness tests."""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.services.health_monitor import HealthCheck, HealthMonitor
+from app.services.twitch_service import TwitchService
+from app.services.youtube_quota import YouTubeQuota
+from app.services.youtube_service import YouTubeService
+from tests.fakes.platforms import FakePlatformAPIs
+
+
+class FlakyProbe:
+    """Probe whose outcome is set by the test."""
+
+    def __init__(self, ok: bool = True, delay: float = 0.0):
+        self.ok = ok
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> None:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if not self.ok:
+            raise ConnectionError("connection refused")
+
+
+def make_monitor(database: FlakyProbe, youtube: FlakyProbe, **kwargs) -> HealthMonitor:
+    return HealthMonitor([
+        HealthCheck("database", database, interval=10, timeout=0.05, critical=True),
+        HealthCheck("youtube_api", youtube, interval=10, timeout=0.05),
+    ], rise=2, fall=3, clock=lambda: 0.0, **kwargs)
+
+
+class TestHysteresis:
+    """Test status transitions and readiness."""
+
+    @pytest.mark.asyncio
+    async def test_not_ready_until_first_check(self):
+        """Test that unchecked critical dependencies keep the pod out of rotation."""
+        monitor = make_monitor(FlakyProbe(), FlakyProbe())
+
+        assert monitor.ready is False
+        assert monitor.snapshot()["checks"]["database"]["status"] == "unknown"
+
+        await monitor.check_all()
+
+        assert monitor.ready is True
+        assert monitor.snapshot()["status"] == "healthy"
+
+    @pytest.mark.asyncio
+    async def test_fall_and_rise_thresholds(self):
+        """Test that status flips only after consecutive failures/successes."""
+        database = FlakyProbe()
+        monitor = make_monitor(database, FlakyProbe())
+        await monitor.check("database")
+
+        database.ok = False
+        for _ in range(2):
+            await monitor.check("database")
+            assert monitor.ready is True
+        await monitor.check("database")
+        assert monitor.ready is False
+        assert monitor.snapshot()["checks"]["database"]["error"] == "connection refused"
+
+        database.ok = True
+        await monitor.check("database")
+        assert monitor.ready is False
+        await monitor.check("database")
+        assert monitor.ready is True
+
+    @pytest.mark.asyncio
+    async def test_timeout_counts_as_failure(self):
+        """Test that a hanging probe is cut off at its timeout."""
+        monitor = make_monitor(FlakyProbe(delay=1.0), FlakyProbe())
+
+        status = await monitor.check("database")
+
+        assert status.status == "down"
+        assert status.error == "timed out after 0.05s"
+        assert status.response_time_ms < 500
+
+    @pytest.mark.asyncio
+    async def test_non_critical_outage_degrades_only(self):
+        """Test that a platform outage does not affect readiness."""
+        monitor = make_monitor(FlakyProbe(), FlakyProbe(ok=False))
+
+        await monitor.check_all()
+
+        assert monitor.ready is True
+        assert monitor.snapshot()["status"] == "degraded"
+
+    @pytest.mark.asyncio
+    async def test_background_loops_probe_on_schedule(self):
+        """Test that start() probes without any request and stop() cancels."""
+        database = FlakyProbe()
+        monitor = HealthMonitor([HealthCheck("database", database, interval=0.01, timeout=1, critical=True)])
+
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        calls = database.calls
+        await asyncio.sleep(0.05)
+
+        assert calls >= 3
+        assert database.calls == calls
+        assert monitor.ready is True
+
+
+class TestPlatformProbes:
+    """Test the platform health_check calls."""
+
+    @pytest.mark.asyncio
+    async def test_twitch_and_youtube_probes(self):
+        """Test one cheap call per probe and no YouTube call once the quota is gone."""
+        fake = FakePlatformAPIs()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+        quota = YouTubeQuota(daily_limit=1)
+        youtube = YouTubeService(api_key="key", base_url="http://fake/youtube/v3", http_client=client, quota=quota)
+        twitch = TwitchService(
+            client_id="id", client_secret="secret", base_url="http://fake/helix",
+            token_url="http://fake/oauth2/token", http_client=client,
+        )
+
+        await twitch.health_check()
+        await youtube.health_check()
+        with pytest.raises(Exception):
+            await youtube.health_check()
+
+        assert fake.calls["twitch.streams"] == 1
+        assert fake.calls["youtube.videos"] == 1
+        await client.aclose()
+
+
+class TestHealthEndpoints:
+    """Test that the endpoints serve the snapshot without probing."""
+
+    @pytest_asyncio.fixture
+    async def client(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+        app.state.health_monitor = None
+
+    @pytest.mark.asyncio
+    async def test_ready_follows_critical_checks(self, client):
+        """Test 200/503 readiness and the dependency breakdown in /api/health."""
+        database, youtube = FlakyProbe(), FlakyProbe(ok=False)
+        monitor = make_monitor(database, youtube)
+        app.state.health_monitor = monitor
+
+        assert (await client.get("/api/health/ready")).status_code == 503
+        await monitor.check_all()
+        ready = await client.get("/api/health/ready")
+        health = await client.get("/api/health")
+
+        assert ready.status_code == 200
+        data = health.json()["data"]
+        assert data["status"] == "degraded"
+        assert data["checks"]["database"]["status"] == "up"
+        assert data["checks"]["youtube_api"]["status"] == "down"
+        assert data["checks"]["application"]["status"] == "up"
+        # Endpoints never call the probes themselves
+        assert database.calls == 1 and youtube.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_not_ready_response_lists_critical_checks(self, client):
+        """Test the 503 error envelope."""
+        monitor = make_monitor(FlakyProbe(ok=False), FlakyProbe())
+        app.state.health_monitor = monitor
+        await monitor.check_all()
+
+        response = await client.get("/api/health/ready")
+
+        body = response.json()
+        assert response.status_code == 503
+        assert body["error"]["code"] == "SERVICE_UNAVAILABLE"
+        assert list(body["error"]["details"]["checks"]) == ["database"]
@@ -0,0 +1,167 @@
+"""Master data snapshot and /api/platforms, /api/config tests."""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from supabase import create_client
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.services.master_data import MasterDataStore
+from app.services.supabase_service import fetch_platforms, fetch_system_settings
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+
+PLATFORMS = [
+    {
+        "id": "p-tw", "name": "twitch", "display_name": "Twitch",
+        "api_base_url": "https://api.twitch.tv/helix", "oauth_url": "https://id.twitch.tv/oauth2/authorize",
+        "required_scopes": ["user:read:follows"], "is_active": True, "created_at": "2025-08-07T10:00:00Z",
+    },
+    {
+        "id": "p-yt", "name": "youtube", "display_name": "YouTube",
+        "api_base_url": "https://www.googleapis.com/youtube/v3", "oauth_url": "https://accounts.google.com/o/oauth2/auth",
+        "required_scopes": ["https://www.googleapis.com/auth/youtube.readonly"], "is_active": True,
+        "created_at": "2025-08-07T10:00:00Z",
+    },
+]
+
+
+@pytest.fixture
+def database():
+    """PostgREST stand-in holding both master tables, and a store loading from it."""
+    fake = FakePostgrest()
+    seed(fake, "platforms", [dict(row) for row in PLATFORMS])
+    seed(fake, "system_settings", [{"key": "twitch_client_id", "value": "tw-id"}])
+    with serve_in_thread(fake.app) as base_url:
+        client = create_client(base_url, "service-key")
+
+        async def load():
+            return await asyncio.gather(
+                asyncio.to_thread(fetch_platforms, client), asyncio.to_thread(fetch_system_settings, client),
+            )
+
+        yield fake, MasterDataStore(load, ttl=300)
+
+
+def reads(fake) -> int:
+    return fake.requests_by_table[("GET", "platforms")] + fake.requests_by_table[("GET", "system_settings")]
+
+
+class TestSnapshot:
+    """Test snapshot contents and reloads."""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_immutable(self, database):
+        """Test that readers cannot modify the shared snapshot."""
+        _, store = database
+        snapshot = await store.reload()
+
+        with pytest.raises(TypeError):
+            snapshot.system_settings["twitch_client_id"] = "x"
+        with pytest.raises(TypeError):
+            snapshot.platform("twitch")["is_active"] = False
+        assert snapshot.platform("twitch")["required_scopes"] == ("user:read:follows",)
+        assert snapshot.platform("kick") is None
+
+    @pytest.mark.asyncio
+    async def test_etag_follows_the_data(self, database):
+        """Test that an unchanged reload keeps the ETags and a change replaces them."""
+        fake, store = database
+        first = await store.reload()
+        same = await store.reload()
+        fake.tables["platforms"][1]["is_active"] = False
+        changed = await store.reload()
+
+        assert (same.platforms_etag, same.config_etag) == (first.platforms_etag, first.config_etag)
+        assert changed.platforms_etag != first.platforms_etag
+        assert changed.config_etag != first.config_etag
+        assert store.snapshot is changed
+
+    @pytest.mark.asyncio
+    async def test_failed_reload_keeps_the_snapshot(self, database):
+        """Test that a loader error leaves the previous snapshot in place."""
+        _, store = database
+        snapshot = await store.reload()
+
+        async def broken():
+            raise RuntimeError("database down")
+
+        store.loader = broken
+        with pytest.raises(RuntimeError):
+            await store.reload()
+
+        assert store.snapshot is snapshot
+        assert store.failures == 1
+
+    @pytest.mark.asyncio
+    async def test_change_notification_reloads_before_ttl(self, database):
+        """Test that invalidate() swaps in new data without waiting for the TTL."""
+        fake, store = database
+        await store.reload()
+        store.start()
+        try:
+            fake.tables["system_settings"].append({"key": "twitch_client_secret", "value": "tw-secret"})
+            store.invalidate()
+            async with asyncio.timeout(2):
+                while "twitch_client_secret" not in store.snapshot.system_settings:
+                    await asyncio.sleep(0.01)
+        finally:
+            await store.stop()
+
+        assert store.reloads == 2
+
+
+class TestMasterDataEndpoints:
+    """Test GET /api/platforms and GET /api/config."""
+
+    @pytest_asyncio.fixture
+    async def client(self, database):
+        _, store = database
+        await store.reload()
+        app.state.master_data = store
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+        app.dependency_overrides.clear()
+        app.state.master_data = None
+
+    @pytest.mark.asyncio
+    async def test_served_from_memory(self, client, database):
+        """Test that both endpoints answer without database reads."""
+        fake, _ = database
+        before = reads(fake)
+
+        platforms = await client.get("/api/platforms")
+        config = await client.get("/api/config")
+
+        assert platforms.status_code == 200 and config.status_code == 200
+        assert [p["name"] for p in platforms.json()["data"]["platforms"]] == ["twitch", "youtube"]
+        assert platforms.json()["data"]["platforms"][1] == PLATFORMS[1]
+        assert config.json()["data"]["supported_platforms"] == ["twitch", "youtube"]
+        assert config.json()["data"]["pagination"] == {"default_per_page": 20, "max_per_page": 100}
+        assert reads(fake) == before
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self, client):
+        """Test that the current ETag answers 304 without a body."""
+        for path in ("/api/platforms", "/api/config"):
+            first = await client.get(path)
+            second = await client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+
+            assert second.status_code == 304
+            assert second.content == b""
+            assert second.headers["ETag"] == first.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_unavailable_before_first_load(self, client):
+        """Test that a store without a snapshot answers 503."""
+        app.state.master_data = MasterDataStore(lambda: None)
+
+        response = await client.get("/api/platforms")
+
+        assert response.status_code == 503
+        assert response.json()["success"] is False
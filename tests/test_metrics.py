@@ -0,0 +1,162 @@
+"""Metrics instrumentation and /api/metrics tests."""
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.database import SupabaseClientRegistry
+from app.core.metrics import REGISTRY, Counter, Histogram, MetricsRegistry
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.twitch_service import TwitchService
+from app.services.youtube_quota import YouTubeQuota
+from app.services.youtube_service import YouTubeService
+from tests.fakes.platforms import FakePlatformAPIs
+from tests.fakes.services import FakePlatformService
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start every test from empty instruments."""
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def fake_client(fake: FakePlatformAPIs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+
+
+class TestInstruments:
+    """Test recording and text exposition."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test le buckets, sum and count of a labelled histogram."""
+        registry = MetricsRegistry()
+        latency = registry.register(Histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0)))
+
+        for value in (0.05, 0.1, 0.5, 2.0):
+            latency.labels("read").observe(value)
+
+        text = registry.render()
+        assert 'op_seconds_bucket{op="read",le="0.1"} 2' in text
+        assert 'op_seconds_bucket{op="read",le="1"} 3' in text
+        assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+        assert 'op_seconds_sum{op="read"} 2.65' in text
+        assert 'op_seconds_count{op="read"} 4' in text
+        assert "# TYPE op_seconds histogram" in text
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes and newlines cannot break the exposition format."""
+        registry = MetricsRegistry()
+        calls = registry.register(Counter("calls_total", "Calls", ("path",)))
+
+        calls.labels('a"b\nc').inc(2)
+
+        assert 'calls_total{path="a\\"b\\nc"} 2' in registry.render()
+
+    def test_wrong_label_count_is_rejected(self):
+        """Test that a label mismatch fails loudly instead of mislabelling."""
+        calls = Counter("calls_total", "Calls", ("a", "b"))
+
+        with pytest.raises(ValueError):
+            calls.labels("x")
+
+
+class TestDataLayerHooks:
+    """Test Supabase and platform call instrumentation."""
+
+    def test_supabase_calls_by_table(self):
+        """Test that PostgREST calls are recorded per table and status."""
+        registry = SupabaseClientRegistry(
+            supabase_url="https://test.supabase.co",
+            anon_key="anon",
+            service_role_key="service",
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[])),
+        )
+        registry.admin().table("streams").select("*").execute()
+        registry.admin().table("streams").select("*").execute()
+        registry.admin().rpc("refresh_views", {}).execute()
+        registry.close()
+
+        text = REGISTRY.render()
+        assert 'supabase_request_duration_seconds_count{table="streams",method="GET",status="200"} 2' in text
+        assert 'supabase_request_duration_seconds_count{table="rpc/refresh_views",method="POST",status="200"} 1' in text
+
+    @pytest.mark.asyncio
+    async def test_platform_calls_errors_and_quota(self):
+        """Test platform latency by outcome and YouTube quota units."""
+        fake = FakePlatformAPIs()
+        fake.add_youtube_channels(["UC1"], live=True)
+        fake.add_twitch_channels(["t1"], live=True)
+        fake.inject("twitch.streams", 503)
+        youtube = YouTubeService(
+            api_key="key", base_url="http://fake/youtube/v3", http_client=fake_client(fake), quota=YouTubeQuota(),
+        )
+        twitch = TwitchService(
+            client_id="id", client_secret="secret", base_url="http://fake/helix",
+            token_url="http://fake/oauth2/token", http_client=fake_client(fake),
+        )
+
+        await youtube.fetch_live_streams(["UC1"])
+        with pytest.raises(Exception):
+            await twitch.fetch_live_streams(["t1"])
+        await twitch.fetch_live_streams(["t1"])
+
+        text = REGISTRY.render()
+        assert 'platform_request_duration_seconds_count{platform="youtube",operation="videos",outcome="ok"} 1' in text
+        assert 'platform_request_duration_seconds_count{platform="twitch",operation="streams",outcome="http_503"} 1' in text
+        assert 'platform_request_duration_seconds_count{platform="twitch",operation="streams",outcome="ok"} 1' in text
+        assert 'youtube_quota_units_total{operation="videos"} 1' in text
+
+    @pytest.mark.asyncio
+    async def test_scheduler_cycle_and_lag(self):
+        """Test refresh cycle duration and data age reporting."""
+        now = [1000.0]
+        rows = [ChannelSubscription("row-1", "user-1", ChannelKey("twitch", "c1"))]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler(
+            {"twitch": FakePlatformService("twitch", live={"c1"})}, loader, clock=lambda: now[0],
+        )
+        await scheduler.refresh_all()
+        now[0] += 45
+
+        stats = scheduler.stats()
+        assert stats["max_data_age_seconds"] == 45
+        assert stats["tracked_channels"] == 1 and stats["never_fetched"] == 0
+        assert "stream_refresh_cycle_duration_seconds_count 1" in REGISTRY.render()
+
+
+class TestMetricsEndpoint:
+    """Test the request middleware and GET /api/metrics."""
+
+    @pytest_asyncio.fixture
+    async def client(self):
+        app.state.stream_scheduler = None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_routes_are_labelled_by_template(self, client):
+        """Test request latency by route template and status, and cache counters."""
+        await client.get("/api/health")
+        await client.get("/api/health")
+        await client.get("/api/does-not-exist")
+        await client.get("/api/streams")
+
+        response = await client.get("/api/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"} 2' in text
+        assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/streams",status="403",le="3"} 1' in text
+        # The scrape itself is still in flight
+        assert "http_requests_in_flight 1" in text
+        assert 'cache_requests_total{cache="stream_list",result="hits"} 0' in text
@@ -0,0 +1,188 @@
+"""Proactive OAuth token refresh tests."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from supabase import create_client
+
+from app.services.oauth_tokens import OAuthClient, OAuthTokenManager, TokenStore, _iso
+from tests.fakes.platforms import FakePlatformAPIs
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+
+NOW = time.time()
+
+
+def key_row(key_id: str, user_id: str, expires_in: float, **overrides):
+    row = {
+        "id": key_id,
+        "user_id": user_id,
+        "platform_id": "p-tw",
+        "access_token": f"old-{key_id}",
+        "refresh_token": f"refresh-{key_id}",
+        "token_expires_at": _iso(NOW + expires_in),
+        "is_active": True,
+        "updated_at": _iso(NOW - 3600),
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def database():
+    """PostgREST stand-in holding Twitch tokens, and a Supabase client for it."""
+    fake = FakePostgrest()
+    seed(fake, "platforms", [{"id": "p-tw", "name": "twitch"}, {"id": "p-yt", "name": "youtube"}])
+    seed(fake, "user_api_keys", [
+        key_row("k-1", "user-1", expires_in=120),
+        key_row("k-2", "user-2", expires_in=300),
+        key_row("k-3", "user-3", expires_in=7200),
+        key_row("k-4", "user-4", expires_in=-60),
+        key_row("k-5", "user-5", expires_in=60, refresh_token=None, access_token="no-refresh"),
+        key_row("k-6", "user-6", expires_in=60, platform_id="p-yt"),
+    ])
+    with serve_in_thread(fake.app) as base_url:
+        yield fake, create_client(base_url, "service-key")
+
+
+@pytest_asyncio.fixture
+async def platforms():
+    """Twitch token endpoint stand-in and an OAuth client for it."""
+    fake = FakePlatformAPIs()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+    yield fake, OAuthClient("twitch", "http://fake/oauth2/token", "id", "secret", http_client=http)
+    await http.aclose()
+
+
+def make_manager(database, platforms, **kwargs) -> OAuthTokenManager:
+    return OAuthTokenManager(
+        {"twitch": platforms[1]}, store=TokenStore(database[1]), refresh_window=600, **kwargs,
+    )
+
+
+def stored(database, key_id):
+    return next(row for row in database[0].tables["user_api_keys"] if row["id"] == key_id)
+
+
+class TestRefreshScan:
+    """Test the background scan for expiring tokens."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_tokens_in_window(self, database, platforms):
+        """Test that only refreshable tokens expiring within the window are refreshed and saved."""
+        manager = make_manager(database, platforms)
+
+        refreshed = await manager.refresh_expiring()
+
+        assert refreshed == 3
+        assert platforms[0].calls["twitch.refresh"] == 3
+        for key_id in ("k-1", "k-2", "k-4"):
+            row = stored(database, key_id)
+            assert row["access_token"].startswith(f"access-refresh-{key_id}")
+            assert row["token_expires_at"] > _iso(NOW + 14000)
+        assert stored(database, "k-3")["access_token"] == "old-k-3"
+        assert stored(database, "k-5")["access_token"] == "no-refresh"
+        assert stored(database, "k-6")["access_token"] == "old-k-6"  # no YouTube client
+
+    @pytest.mark.asyncio
+    async def test_refreshed_tokens_served_from_cache(self, database, platforms):
+        """Test that a refreshed token needs no database read or token call."""
+        manager = make_manager(database, platforms)
+        await manager.refresh_expiring()
+        reads = database[0].requests_by_table[("GET", "user_api_keys")]
+
+        token = await manager.get_access_token("user-1", "twitch")
+
+        assert token == stored(database, "k-1")["access_token"]
+        assert database[0].requests_by_table[("GET", "user_api_keys")] == reads
+        assert manager.stats()["cache"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_two_workers_never_refresh_the_same_token(self, database, platforms):
+        """Test that the updated_at lease splits expiring tokens between workers."""
+        first = make_manager(database, platforms, batch_size=1)
+        second = make_manager(database, platforms, batch_size=1)
+
+        counts = await asyncio.gather(first.refresh_expiring(), second.refresh_expiring())
+
+        assert sum(counts) == 3
+        assert platforms[0].calls["twitch.refresh"] == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, database, platforms):
+        """Test that at most max_concurrency token calls run at once."""
+        fake, client = platforms
+        fake.endpoint_latency["twitch.refresh"] = 0.05
+        running = peak = 0
+        refresh = client.refresh
+
+        async def tracked(refresh_token):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            try:
+                return await refresh(refresh_token)
+            finally:
+                running -= 1
+
+        client.refresh = tracked
+        manager = make_manager(database, platforms, max_concurrency=2)
+
+        assert await manager.refresh_expiring() == 3
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_revoked_and_failed_refreshes(self, database, platforms):
+        """Test that revoked grants deactivate the key and failures wait out the lease."""
+        fake, _ = platforms
+        fake.revoked_refresh_tokens.add("refresh-k-1")
+        fake.inject("twitch.refresh", 503)
+        clock = [NOW]
+        manager = make_manager(database, platforms, max_concurrency=1, lease=60, clock=lambda: clock[0])
+
+        assert await manager.refresh_expiring() == 1
+        assert manager.stats()["revoked"] == 1 and manager.stats()["failed"] == 1
+        assert stored(database, "k-1")["is_active"] is False
+        assert await manager.refresh_expiring() == 0
+
+        clock[0] += 61
+        assert await manager.refresh_expiring() == 1
+        assert fake.calls["twitch.refresh"] == 4
+
+
+class TestOnDemandTokens:
+    """Test get_access_token for cache misses."""
+
+    @pytest.mark.asyncio
+    async def test_valid_token_loaded_once(self, database, platforms):
+        """Test that a valid token is read once and then cached."""
+        manager = make_manager(database, platforms)
+
+        tokens = [await manager.get_access_token("user-3", "twitch") for _ in range(3)]
+
+        assert tokens == ["old-k-3"] * 3
+        assert database[0].requests_by_table[("GET", "user_api_keys")] == 1
+        assert platforms[0].calls["twitch.refresh"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_refresh(self, database, platforms):
+        """Test single-flight refresh of an expired token."""
+        platforms[0].endpoint_latency["twitch.refresh"] = 0.05
+        manager = make_manager(database, platforms)
+
+        tokens = await asyncio.gather(*(manager.get_access_token("user-4", "twitch") for _ in range(10)))
+
+        assert len(set(tokens)) == 1 and tokens[0].startswith("access-refresh-k-4")
+        assert platforms[0].calls["twitch.refresh"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unusable_tokens(self, database, platforms):
+        """Test missing keys and expired tokens without a refresh token."""
+        manager = make_manager(database, platforms)
+        stored(database, "k-5")["token_expires_at"] = _iso(NOW - 10)
+
+        assert await manager.get_access_token("nobody", "twitch") is None
+        assert await manager.get_access_token("user-5", "twitch") is None
@@ -0,0 +1,146 @@
+"""Keyset pagination tests."""
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.exceptions import ValidationException
+from app.core.pagination import decode_page_cursor, encode_page_cursor, keyset_page
+from app.services import stream_cache
+from app.services.stream_cache import SORT_KEYS, sort_items
+
+
+def item(row_id: str, viewers: int, started_at: str = "2025-08-07T10:00:00+00:00") -> dict:
+    return {"id": row_id, "viewerCount": viewers, "startedAt": started_at}
+
+
+def walk(items, sort: str, limit: int):
+    pages, cursor = [], None
+    while True:
+        page, cursor = keyset_page(items, sort, SORT_KEYS[sort], limit, cursor)
+        pages.append([i["id"] for i in page])
+        if cursor is None:
+            return pages
+
+
+class TestKeysetPage:
+    """Test page boundaries and cursor handling."""
+
+    def test_walk_returns_every_item_once(self):
+        """Test that following cursors visits the whole list in order."""
+        items = sort_items([item(f"s{i:02d}", i % 4) for i in range(11)], "viewers")
+
+        pages = walk(items, "viewers", 3)
+
+        assert [len(p) for p in pages] == [3, 3, 3, 2]
+        assert [i for p in pages for i in p] == [i["id"] for i in items]
+
+    def test_reordering_between_pages_does_not_repeat_rows(self):
+        """Test that a row moving down past the cursor is not served twice."""
+        items = sort_items([item(f"s{i}", 100 - i) for i in range(6)], "viewers")
+        first, cursor = keyset_page(items, "viewers", SORT_KEYS["viewers"], 3, None)
+
+        # s0 drops to the bottom after the first page was served
+        items = sort_items([item("s0", 1)] + items[1:], "viewers")
+        second, _ = keyset_page(items, "viewers", SORT_KEYS["viewers"], 3, cursor)
+        offset_second = items[3:6]
+
+        assert [i["id"] for i in first] == ["s0", "s1", "s2"]
+        assert [i["id"] for i in second] == ["s3", "s4", "s5"]
+        # The offset page would have repeated s3 only because s0 moved
+        assert [i["id"] for i in offset_second] == ["s4", "s5", "s0"]
+
+    def test_recent_sort_uses_start_time(self):
+        """Test keyset paging on (startedAt, id)."""
+        items = sort_items([
+            item("a", 1, "2025-08-07T09:00:00+00:00"),
+            item("b", 1, "2025-08-07T11:00:00+00:00"),
+            item("c", 1, "2025-08-07T10:00:00+00:00"),
+        ], "recent")
+
+        assert walk(items, "recent", 2) == [["b", "c"], ["a"]]
+
+    def test_cursor_is_bound_to_the_sort_order(self):
+        """Test that a cursor from one sort cannot be used with another."""
+        cursor = encode_page_cursor("viewers", (10, "s1"))
+
+        assert decode_page_cursor(cursor, "viewers") == (10, "s1")
+        with pytest.raises(ValidationException):
+            decode_page_cursor(cursor, "recent")
+        with pytest.raises(ValidationException):
+            decode_page_cursor("not a cursor", "viewers")
+
+    def test_cursor_value_of_wrong_type_is_rejected(self):
+        """Test that a tampered cursor does not raise a server error."""
+        items = sort_items([item("s1", 10)], "viewers")
+
+        with pytest.raises(ValidationException):
+            keyset_page(items, "viewers", SORT_KEYS["viewers"], 5, encode_page_cursor("viewers", ("x", "s1")))
+
+
+class FakeDatabase:
+    """Returns ``count`` live streams."""
+
+    def __init__(self, count: int):
+        self.rows = [
+            {
+                "id": f"s{i:03d}",
+                "platform_stream_id": f"v{i}",
+                "title": f"stream {i}",
+                "thumbnail_url": None,
+                "viewer_count": i * 7 % 50,
+                "game_name": None,
+                "started_at": "2025-08-07T10:00:00+00:00",
+                "is_live": True,
+                "channels": {"id": f"c{i}", "channel_name": f"chan{i}", "platforms": {"name": "twitch"}},
+            }
+            for i in range(count)
+        ]
+
+    async def __call__(self, user_id, platform=None, category=None, client=None):
+        return self.rows
+
+
+class TestListStreamsCursor:
+    """Test cursor mode of GET /api/streams."""
+
+    @pytest_asyncio.fixture
+    async def client(self, monkeypatch):
+        monkeypatch.setattr(stream_cache, "fetch_user_live_streams", FakeDatabase(25))
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_cursor_walk_matches_offset_walk(self, client):
+        """Test that both modes return the same pages for a stable list."""
+        by_cursor, cursor = [], None
+        while True:
+            params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+            data = (await client.get("/api/streams", params=params)).json()["data"]
+            by_cursor.append([s["id"] for s in data["streams"]])
+            cursor = data["pagination"]["nextCursor"]
+            if cursor is None:
+                assert data["pagination"]["hasMore"] is False
+                break
+        by_offset = [
+            [s["id"] for s in (await client.get("/api/streams", params={"limit": 10, "offset": o})).json()["data"]["streams"]]
+            for o in (0, 10, 20)
+        ]
+
+        assert by_cursor == by_offset
+
+    @pytest.mark.asyncio
+    async def test_cursor_and_offset_together_are_rejected(self, client):
+        """Test that the two pagination modes cannot be mixed."""
+        first = (await client.get("/api/streams", params={"limit": 5})).json()["data"]
+
+        response = await client.get(
+            "/api/streams", params={"offset": 5, "cursor": first["pagination"]["nextCursor"]}
+        )
+
+        assert response.status_code == 400
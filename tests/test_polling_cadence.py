@@ -0,0 +1,252 @@
+"""Adaptive polling cadence tests."""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.polling_cadence import HOUR, WEEK, PollingCadence, StartWindows, hour_of_week
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from tests.fakes.services import FakePlatformService
+
+#: Monday 2025-08-04 00:00 UTC
+MONDAY = datetime(2025, 8, 4, tzinfo=timezone.utc).timestamp()
+KEY = ChannelKey("twitch", "weekly")
+
+
+class Clock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now: float = MONDAY):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStartWindows:
+    """Test the hour-of-week start model."""
+
+    def test_hour_of_week(self):
+        """Test slot numbering from Monday 00:00 UTC."""
+        assert hour_of_week(MONDAY) == 0
+        assert hour_of_week(MONDAY + 20 * HOUR + 59 * 60) == 20
+        assert hour_of_week(MONDAY + 6 * 24 * HOUR + 23 * HOUR) == 167
+        assert hour_of_week(MONDAY + WEEK) == 0
+
+    def test_slot_needs_starts_in_distinct_weeks(self):
+        """Test that two starts in one week do not make a window."""
+        windows = StartWindows(min_weeks=2)
+        windows.record(KEY, MONDAY + 20 * HOUR)
+        windows.record(KEY, MONDAY + 20 * HOUR + 600)
+        assert windows.slots(KEY) == set()
+
+        windows.record(KEY, MONDAY - WEEK + 20 * HOUR + 1200)
+        assert windows.slots(KEY) == {20}
+
+    def test_window_opens_lead_seconds_early(self):
+        """Test in_window and next_opening around a Monday 20:00 window."""
+        windows = StartWindows(min_weeks=1, lead=900)
+        windows.load([(KEY, MONDAY - WEEK + 20 * HOUR + 300)])
+
+        assert not windows.in_window(KEY, MONDAY + 19 * HOUR + 44 * 60)
+        assert windows.in_window(KEY, MONDAY + 19 * HOUR + 46 * 60)
+        assert windows.in_window(KEY, MONDAY + 20 * HOUR + 59 * 60)
+        assert not windows.in_window(KEY, MONDAY + 21 * HOUR)
+        assert windows.next_opening(KEY, MONDAY + 18 * HOUR, horizon=2 * HOUR) == MONDAY + 19 * HOUR + 45 * 60
+        assert windows.next_opening(KEY, MONDAY + 18 * HOUR, horizon=HOUR) is None
+
+
+class TestPollingCadence:
+    """Test per-channel scheduling."""
+
+    def test_dormant_channel_backs_off_to_the_cap(self):
+        """Test exponential back-off of offline checks."""
+        cadence = PollingCadence(interval=60, max_interval=900, backoff=2)
+        cadence.sync([KEY], MONDAY)
+        now, gaps = MONDAY, []
+        for _ in range(7):
+            assert cadence.due(now) == [KEY]
+            at = cadence.record(KEY, live=False, now=now)
+            gaps.append(at - now)
+            now = at
+
+        assert gaps == [60, 120, 240, 480, 900, 900, 900]
+
+    def test_live_and_failed_checks_stay_frequent(self):
+        """Test that live channels and failed checks are retried every interval."""
+        cadence = PollingCadence(interval=60, max_interval=900)
+        cadence.sync([KEY], MONDAY)
+        for i in range(4):
+            cadence.record(KEY, live=False, now=MONDAY + i)
+
+        assert cadence.record(KEY, live=False, failed=True, now=MONDAY) == MONDAY + 60
+        assert cadence.record(KEY, live=True, now=MONDAY) == MONDAY + 60
+        assert cadence.record(KEY, live=True, now=MONDAY + 60) == MONDAY + 120
+        assert cadence.stats()["live"] == 1
+
+    def test_back_off_never_skips_a_start_window(self):
+        """Test that the next check lands on the window opening."""
+        windows = StartWindows(min_weeks=1, lead=600)
+        windows.record(KEY, MONDAY - WEEK + 20 * HOUR)
+        cadence = PollingCadence(interval=60, max_interval=3600, windows=windows)
+        cadence.sync([KEY], MONDAY)
+        now = MONDAY + 19 * HOUR
+        for _ in range(6):
+            cadence.record(KEY, live=False, now=now)
+
+        assert cadence.record(KEY, live=False, now=now) == MONDAY + 19 * HOUR + 50 * 60
+        # Inside the window: every interval although still offline
+        assert cadence.record(KEY, live=False, now=MONDAY + 19 * HOUR + 50 * 60) == MONDAY + 19 * HOUR + 51 * 60
+
+    def test_go_live_is_learned_as_a_window(self):
+        """Test that an observed start feeds the window model."""
+        cadence = PollingCadence(windows=StartWindows(min_weeks=2))
+        cadence.sync([KEY], MONDAY)
+        for week in range(2):
+            started = MONDAY + week * WEEK + 20 * HOUR
+            cadence.record(KEY, live=False, now=started - 60)
+            cadence.record(KEY, live=True, started_at=started, now=started + 30)
+            cadence.record(KEY, live=True, started_at=started, now=started + 90)
+
+        assert cadence.windows.slots(KEY) == {20}
+
+    def test_reset_and_sync(self):
+        """Test on-demand reset and dropping untracked channels."""
+        other = ChannelKey("youtube", "UC1")
+        cadence = PollingCadence(interval=60, max_interval=900)
+        cadence.sync([KEY, other], MONDAY)
+        for i in range(6):
+            cadence.record(KEY, live=False, now=MONDAY)
+        assert cadence.due(MONDAY + 100) == [other]
+
+        cadence.reset(KEY, MONDAY + 100)
+        assert KEY in cadence.due(MONDAY + 160)
+        assert cadence.record(KEY, live=False, now=MONDAY + 160) == MONDAY + 220
+
+        cadence.sync([other], MONDAY + 200)
+        assert cadence.stats()["scheduled"] == 1
+        assert cadence.due(MONDAY + 10 ** 6) == [other]
+
+
+class TestAdaptiveScheduler:
+    """Test the scheduler cycle with a cadence."""
+
+    @staticmethod
+    def make_scheduler(clock, service, history=()):
+        rows = [
+            ChannelSubscription(id=f"row-{cid}", user_id="user-1", key=ChannelKey("twitch", cid))
+            for cid in ("live", "weekly", "dormant")
+        ]
+
+        async def loader():
+            return rows
+
+        async def history_loader():
+            return list(history)
+
+        return StreamRefreshScheduler(
+            {"twitch": service}, loader, interval=60, channel_reload_interval=10 ** 9,
+            cadence=PollingCadence(interval=60, max_interval=900, windows=StartWindows(min_weeks=2), clock=clock),
+            tick=15, history_loader=history_loader, clock=clock,
+        )
+
+    @pytest.mark.asyncio
+    async def test_checks_follow_channel_state(self):
+        """Test two simulated hours of 15 s ticks."""
+        clock = Clock(MONDAY + 18 * HOUR)
+        service = FakePlatformService("twitch", live={"live"})
+        history = [(ChannelKey("twitch", "weekly"), MONDAY - week * WEEK + 19 * HOUR + 120) for week in (1, 2)]
+        scheduler = self.make_scheduler(clock, service, history)
+        checks = {"live": 0, "weekly": 0, "dormant": 0}
+
+        while clock.now < MONDAY + 20 * HOUR:
+            await scheduler.refresh_all()
+            for channel_id in service.calls[-1] if service.calls else ():
+                checks[channel_id] += 1
+            service.calls.clear()
+            clock.now += 15
+
+        # Live: every minute; weekly: backed off, then every minute from 18:45;
+        # dormant: backed off to 15 minutes
+        assert checks["live"] == 120
+        assert 80 <= checks["weekly"] <= 83
+        assert checks["dormant"] <= 12
+        assert scheduler.stats()["cadence"]["windows"] == 1
+
+    @pytest.mark.asyncio
+    async def test_go_live_detected_within_the_window(self):
+        """Test that a start inside a learned window is seen within an interval."""
+        clock = Clock(MONDAY + 12 * HOUR)
+        service = FakePlatformService("twitch")
+        history = [(ChannelKey("twitch", "weekly"), MONDAY - week * WEEK + 19 * HOUR) for week in (1, 2)]
+        scheduler = self.make_scheduler(clock, service, history)
+        started = MONDAY + 19 * HOUR + 5 * 60
+
+        while not scheduler.get_snapshot(ChannelKey("twitch", "weekly")) or \
+                not scheduler.get_snapshot(ChannelKey("twitch", "weekly")).streams:
+            if clock.now >= started:
+                service.live.add("weekly")
+            await scheduler.refresh_all()
+            clock.now += 15
+
+        assert clock.now - started <= 60 + 15
+
+
+class TestRefreshEndpointResetsSchedule:
+    """Test how on-demand refreshes interact with the back-off."""
+
+    @pytest.fixture
+    def scheduler(self):
+        clock = Clock()
+        service = FakePlatformService("twitch")
+        scheduler = TestAdaptiveScheduler.make_scheduler(clock, service)
+        app.state.stream_scheduler = scheduler
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield scheduler, clock
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_channel_refresh_resets_back_off(self, scheduler):
+        """Test the next background check of a refreshed channel."""
+        scheduler, clock = scheduler
+        key = ChannelKey("twitch", "dormant")
+        scheduler.cadence.sync([key], clock.now)
+        for _ in range(6):
+            scheduler.cadence.record(key, live=False, now=clock.now)
+        assert scheduler.cadence.delay(key, clock.now) == 900
+
+        response = TestClient(app).post("/api/streams/refresh", json={"channel_ids": ["row-dormant"]})
+
+        assert response.status_code == 200
+        assert scheduler.cadence.delay(key, clock.now) == 60
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_plain_refresh_keeps_back_off(self, scheduler):
+        """Test that refreshing all the user's channels skips a backed-off one."""
+        scheduler, clock = scheduler
+        service = scheduler.services["twitch"]
+        key = ChannelKey("twitch", "dormant")
+        asyncio.run(scheduler.refresh_all())
+        for _ in range(6):
+            scheduler.cadence.record(key, live=False, now=clock.now)
+        next_check = scheduler.cadence.next_check(key)
+        clock.now += 300
+        service.calls.clear()
+
+        response = TestClient(app).post("/api/streams/refresh", json={})
+
+        assert response.status_code == 200
+        assert response.json()["data"]["total_channels_checked"] == 3
+        fetched = {channel_id for call in service.calls for channel_id in call}
+        assert fetched == {"live", "weekly"}
+        assert scheduler.cadence.next_check(key) == next_check
+
+        service.calls.clear()
+        TestClient(app).post("/api/streams/refresh", json={"force_refresh": True})
+        assert "dormant" in {channel_id for call in service.calls for channel_id in call}
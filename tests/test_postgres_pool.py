@@ -0,0 +1,317 @@
+"""Direct Postgres read path tests.
+
+The pool and fallback tests run against an in-memory asyncpg stand-in. The
+RLS tests need a real server: set ``POSTGRES_TEST_URL`` to a superuser DSN
+(a scratch database is created and dropped there).
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.core import postgres
+from app.core.postgres import SET_REQUEST_CONTEXT, PostgresPool
+from app.services import stream_cache
+from app.services.postgres_service import (
+    LIVE_STREAMS_SQL,
+    fetch_user_live_stream_items,
+    search_user_stream_payloads,
+)
+
+POSTGRES_TEST_URL = os.environ.get("POSTGRES_TEST_URL", "")
+
+
+class FakeConnection:
+    """Records statements and transactions; returns canned rows."""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.fail = False
+        self.log = []
+
+    @asynccontextmanager
+    async def _transaction(self, readonly):
+        self.log.append(("begin", readonly))
+        yield
+        self.log.append(("commit",))
+
+    def transaction(self, readonly=False):
+        return self._transaction(readonly)
+
+    async def execute(self, query, *args):
+        self.log.append(("execute", query, args))
+
+    async def fetch(self, query, *args):
+        if self.fail:
+            raise ConnectionResetError("connection was closed in the middle of operation")
+        self.log.append(("fetch", query, args))
+        return self.rows
+
+    async def fetchval(self, query):
+        if self.fail:
+            raise ConnectionRefusedError("connection refused")
+        return 1
+
+
+class FakeAsyncpgPool:
+    """The asyncpg.Pool surface PostgresPool uses."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return 1
+
+    async def close(self):
+        pass
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(connection, clock=None) -> PostgresPool:
+    pool = PostgresPool("postgresql://test", retry_after=30.0, clock=clock or Clock())
+    pool._pool = FakeAsyncpgPool(connection)
+    return pool
+
+
+def live_row(**overrides):
+    row = {
+        "id": "s-1", "title": "Speedrun", "thumbnail_url": "https://img/1.jpg", "viewer_count": 42,
+        "game_name": "Celeste", "started_at": datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc),
+        "is_live": True, "platform_stream_id": "v1", "channel_row_id": "ch-1",
+        "channel_name": "runner", "display_name": "Runner", "platform": "twitch",
+    }
+    row.update(overrides)
+    return row
+
+
+class TestPostgresPool:
+    """Test per-transaction RLS context and failure back-off."""
+
+    @pytest.mark.asyncio
+    async def test_claims_set_inside_readonly_transaction(self):
+        """Test that role and claims are set transaction-locally before the query."""
+        connection = FakeConnection()
+        pool = make_pool(connection)
+
+        await pool.fetch({"sub": "user-1", "role": "authenticated"}, "SELECT 1")
+
+        begin, set_context, query, commit = connection.log
+        assert begin == ("begin", True)
+        assert set_context[1] == SET_REQUEST_CONTEXT
+        assert set_context[2][0] == "authenticated"
+        assert json.loads(set_context[2][1]) == {"sub": "user-1", "role": "authenticated"}
+        assert query[1] == "SELECT 1"
+        assert commit == ("commit",)
+
+    @pytest.mark.asyncio
+    async def test_failure_backs_off_until_health_check(self):
+        """Test that a failed query bypasses the pool until retry_after or a passing probe."""
+        connection = FakeConnection()
+        clock = Clock()
+        pool = make_pool(connection, clock)
+        connection.fail = True
+
+        with pytest.raises(ConnectionResetError):
+            await pool.fetch({"sub": "user-1"}, "SELECT 1")
+        assert pool.available is False
+        with pytest.raises(ConnectionRefusedError):
+            await pool.health_check()
+        clock.now = 29.0
+        assert pool.available is False
+
+        connection.fail = False
+        await pool.health_check()
+        assert pool.available is True
+        assert pool.stats()["failures"] == 1
+
+        connection.fail = True
+        with pytest.raises(ConnectionResetError):
+            await pool.fetch({"sub": "user-1"}, "SELECT 1")
+        clock.now = 60.0
+        assert pool.available is True
+
+
+class TestReadPathFallback:
+    """Test that the stream list prefers the pool and falls back to PostgREST."""
+
+    @pytest.fixture
+    def postgrest_rows(self, monkeypatch):
+        calls = []
+
+        async def fetch_user_live_streams(user_id, platform=None, category=None):
+            calls.append(user_id)
+            row = live_row()
+            return [{
+                "id": row["id"], "title": row["title"], "thumbnail_url": row["thumbnail_url"],
+                "viewer_count": row["viewer_count"], "game_name": row["game_name"],
+                "started_at": row["started_at"].isoformat(), "is_live": True, "platform_stream_id": "v1",
+                "channels": {"id": "ch-1", "channel_name": "runner", "display_name": "Runner",
+                             "platforms": {"name": "twitch"}},
+            }]
+
+        monkeypatch.setattr(stream_cache, "fetch_user_live_streams", fetch_user_live_streams)
+        yield calls
+        postgres._postgres_pool = None
+
+    @pytest.mark.asyncio
+    async def test_pool_items_match_postgrest_items(self, postgrest_rows):
+        """Test that both paths build identical list items."""
+        via_postgrest = await stream_cache.load_stream_list("user-1", "all", None, "viewers")
+        connection = FakeConnection([live_row(), live_row(id="s-2", viewer_count=None, display_name=None)])
+        postgres._postgres_pool = make_pool(connection)
+
+        via_pool = await stream_cache.load_stream_list("user-1", "twitch", "Celeste", "viewers")
+
+        assert postgrest_rows == ["user-1"]
+        assert via_pool[0] == via_postgrest[0]
+        assert via_pool[1]["viewerCount"] == 0 and via_pool[1]["channelName"] == "runner"
+        assert connection.log[2][2] == ("user-1", "twitch", "Celeste")
+
+    @pytest.mark.asyncio
+    async def test_pool_failure_falls_back(self, postgrest_rows):
+        """Test that a pool error is served from PostgREST and later requests skip the pool."""
+        connection = FakeConnection()
+        connection.fail = True
+        postgres._postgres_pool = make_pool(connection)
+
+        first = await stream_cache.load_stream_list("user-1", "all", None, "viewers")
+        queries = postgres._postgres_pool.queries
+        second = await stream_cache.load_stream_list("user-1", "all", None, "viewers")
+
+        assert [item["id"] for item in first] == [item["id"] for item in second] == ["s-1"]
+        assert postgrest_rows == ["user-1", "user-1"]
+        assert postgres._postgres_pool.queries == queries == 1
+
+
+# ----------------------------------------------------------------------
+# Real server
+# ----------------------------------------------------------------------
+
+USER_A = str(uuid.uuid4())
+USER_B = str(uuid.uuid4())
+
+
+async def _create_database(admin_dsn: str, name: str) -> str:
+    import asyncpg
+
+    from tests.fakes.supabase_schema import install_schema
+
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await admin.close()
+    dsn = admin_dsn.rsplit("/", 1)[0] + f"/{name}"
+    connection = await asyncpg.connect(dsn)
+    try:
+        await install_schema(connection)
+        await connection.execute(
+            "INSERT INTO users (id, email, username) VALUES ($1, 'a@example.com', 'a'), ($2, 'b@example.com', 'b')",
+            uuid.UUID(USER_A), uuid.UUID(USER_B),
+        )
+        channels = {}
+        for user, channel_id, platform, subscribed in [
+            (USER_A, "tw1", "twitch", True), (USER_A, "UC2", "youtube", True),
+            (USER_A, "tw3", "twitch", False), (USER_B, "tw1", "twitch", True),
+        ]:
+            channels[(user, channel_id)] = await connection.fetchval(
+                "INSERT INTO channels (user_id, platform_id, channel_id, channel_name, is_subscribed) "
+                "SELECT $1, id, $2, $2, $4 FROM platforms WHERE name = $3 RETURNING id",
+                uuid.UUID(user), channel_id, platform, subscribed,
+            )
+        for (user, channel_id), title, viewers, live in [
+            ((USER_A, "tw1"), "Speedrun live", 10, True),
+            ((USER_A, "UC2"), "Late night speedrun", 50, True),
+            ((USER_A, "UC2"), "Old speedrun", 5, False),
+            ((USER_A, "tw3"), "Unsubscribed speedrun", 70, True),
+            ((USER_B, "tw1"), "Speedrun live", 10, True),
+        ]:
+            await connection.execute(
+                "INSERT INTO streams (channel_id, platform_stream_id, title, viewer_count, is_live, started_at) "
+                "VALUES ($1, $2, $3, $4, $5, now())",
+                channels[(user, channel_id)], f"{channel_id}-{viewers}", title, viewers, live,
+            )
+    finally:
+        await connection.close()
+    return dsn
+
+
+async def _drop_database(admin_dsn: str, name: str) -> None:
+    import asyncpg
+
+    admin = await asyncpg.connect(admin_dsn)
+    try:
+        await admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await admin.close()
+
+
+@pytest.fixture(scope="module")
+def database_dsn():
+    """Scratch database with the application schema and two users' data."""
+    if not POSTGRES_TEST_URL:
+        pytest.skip("POSTGRES_TEST_URL is not set")
+    name = f"stream_aggregator_test_{uuid.uuid4().hex[:8]}"
+    try:
+        dsn = asyncio.run(_create_database(POSTGRES_TEST_URL, name))
+    except OSError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    yield dsn
+    asyncio.run(_drop_database(POSTGRES_TEST_URL, name))
+
+
+@pytest_asyncio.fixture
+async def live_pool(database_dsn):
+    pool = PostgresPool(database_dsn)
+    await pool.open()
+    yield pool
+    await pool.close()
+
+
+class TestRowLevelSecurity:
+    """Test the read path on a real server with the production policies."""
+
+    @pytest.mark.asyncio
+    async def test_claims_limit_rows_to_their_user(self, live_pool):
+        """Test that RLS, not the user_id filter, decides which rows are visible."""
+        own = await live_pool.fetch({"sub": USER_A, "role": "authenticated"}, LIVE_STREAMS_SQL, USER_A, None, None)
+        other = await live_pool.fetch({"sub": USER_B, "role": "authenticated"}, LIVE_STREAMS_SQL, USER_A, None, None)
+
+        assert sorted(r["title"] for r in own) == ["Late night speedrun", "Speedrun live"]
+        assert other == []
+
+    @pytest.mark.asyncio
+    async def test_live_items_and_search(self, live_pool):
+        """Test the list item shape and search ordering, paging and totals."""
+        items = await fetch_user_live_stream_items(live_pool, USER_A, platform="youtube")
+        page, total = await search_user_stream_payloads(live_pool, USER_A, query="speedrun", limit=1)
+        _, past_end_total = await search_user_stream_payloads(live_pool, USER_A, query="speedrun", offset=10)
+
+        assert [(i["platform"], i["viewerCount"], i["url"]) for i in items] == [
+            ("youtube", 50, "https://www.youtube.com/watch?v=UC2-50"),
+        ]
+        # The unsubscribed channel's stream is hidden by the streams policy
+        assert total == past_end_total == 3
+        assert [p["title"] for p in page] == ["Late night speedrun"]
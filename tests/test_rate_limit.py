@@ -0,0 +1,169 @@
+"""API rate limiting tests."""
+
+import time
+
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.config import get_settings
+from app.middleware.rate_limit import MemoryRateLimitBackend, RateLimit
+
+settings = get_settings()
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def token(user_id: str) -> str:
+    return jwt.encode(
+        {"sub": user_id, "role": "authenticated", "exp": int(time.time()) + 3600},
+        settings.SUPABASE_JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+class TestMemoryBackend:
+    """Test GCRA accounting and key eviction."""
+
+    def test_burst_then_steady_rate(self):
+        """Test that a full burst is allowed and then one request per interval."""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        rate = RateLimit(limit=6, period=60)
+
+        assert [backend.acquire_nowait("k", rate) for _ in range(6)] == [0.0] * 6
+        assert backend.acquire_nowait("k", rate) == pytest.approx(10.0)
+
+        clock.now += 9.9
+        assert backend.acquire_nowait("k", rate) == pytest.approx(0.1)
+        clock.now += 0.1
+        assert backend.acquire_nowait("k", rate) == 0.0
+        assert backend.acquire_nowait("k", rate) > 0
+
+    def test_rejected_requests_do_not_extend_the_wait(self):
+        """Test that hammering while limited does not push the window out."""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        rate = RateLimit(limit=2, period=10)
+        backend.acquire_nowait("k", rate)
+        backend.acquire_nowait("k", rate)
+
+        waits = [backend.acquire_nowait("k", rate) for _ in range(50)]
+
+        assert waits == [pytest.approx(5.0)] * 50
+        assert backend.stats() == {"keys": 1, "allowed": 2, "limited": 50}
+
+    def test_keys_are_independent(self):
+        """Test that one client's limit does not affect another."""
+        backend = MemoryRateLimitBackend(clock=FakeClock())
+        rate = RateLimit(limit=1, period=60)
+
+        assert backend.acquire_nowait("a", rate) == 0.0
+        assert backend.acquire_nowait("a", rate) > 0
+        assert backend.acquire_nowait("b", rate) == 0.0
+
+    def test_idle_keys_are_evicted(self):
+        """Test that keys whose window has passed are dropped."""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        rate = RateLimit(limit=10, period=60)
+        for i in range(100):
+            backend.acquire_nowait(f"k{i}", rate)
+
+        clock.now += 7
+        backend.acquire_nowait("fresh", rate)
+
+        assert len(backend) == 1
+
+    def test_key_count_is_bounded(self):
+        """Test that the least recently seen key goes beyond max_keys."""
+        backend = MemoryRateLimitBackend(max_keys=3, clock=FakeClock())
+        rate = RateLimit(limit=1, period=60)
+        for key in "abcd":
+            backend.acquire_nowait(key, rate)
+
+        assert len(backend) == 3
+        assert backend.acquire_nowait("a", rate) == 0.0
+        assert backend.acquire_nowait("d", rate) > 0
+
+
+class TestRateLimitMiddleware:
+    """Test route classes, client identity and 429 responses."""
+
+    @pytest_asyncio.fixture
+    async def client(self):
+        app.state.stream_scheduler = None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_refresh_is_limited_per_user(self, client):
+        """Test the stricter refresh class with Retry-After and the error envelope."""
+        alice = {"Authorization": f"Bearer {token('alice')}"}
+        bob = {"Authorization": f"Bearer {token('bob')}"}
+        limit = settings.RATE_LIMIT_REFRESH_PER_MINUTE
+
+        statuses = [(await client.post("/api/streams/refresh", headers=alice)).status_code for _ in range(limit)]
+        limited = await client.post("/api/streams/refresh", headers=alice)
+
+        assert 429 not in statuses
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) == 60 // limit
+        assert limited.json()["error"]["code"] == "RATE_LIMITED"
+        assert limited.json()["error"]["details"]["retry_after_seconds"] == 60 // limit
+        assert (await client.post("/api/streams/refresh", headers=bob)).status_code != 429
+
+    @pytest.mark.asyncio
+    async def test_route_classes_have_separate_budgets(self, client):
+        """Test that exhausting refresh leaves the general API budget intact."""
+        alice = {"Authorization": f"Bearer {token('alice')}"}
+        for _ in range(settings.RATE_LIMIT_REFRESH_PER_MINUTE + 1):
+            await client.post("/api/streams/refresh", headers=alice)
+
+        response = await client.get("/api/streams/search", headers=alice)
+
+        assert response.status_code != 429
+
+    @pytest.mark.asyncio
+    async def test_anonymous_requests_are_limited_per_ip(self, client):
+        """Test that requests without a valid token share the client IP budget."""
+        statuses = [
+            (await client.get("/api/streams", headers={"Authorization": "Bearer not-a-jwt"})).status_code
+            for _ in range(settings.RATE_LIMIT_PER_MINUTE)
+        ]
+        limited = await client.get("/api/streams")
+
+        assert set(statuses) == {401}
+        assert limited.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_event_streams_are_limited_per_query_token_user(self, client):
+        """Test that EventSource clients behind one IP get a budget each."""
+        limit = settings.RATE_LIMIT_EVENTS_PER_MINUTE
+        for _ in range(limit):
+            await client.get("/api/streams/events", params={"access_token": token("alice")})
+
+        limited = await client.get("/api/streams/events", params={"access_token": token("alice")})
+        other = await client.get("/api/streams/events", params={"access_token": token("bob")})
+
+        assert limited.status_code == 429
+        assert other.status_code != 429
+
+    @pytest.mark.asyncio
+    async def test_health_probes_are_exempt(self, client):
+        """Test that health checks are never limited."""
+        for _ in range(settings.RATE_LIMIT_PER_MINUTE + 5):
+            response = await client.get("/api/health/live")
+
+        assert response.status_code == 200
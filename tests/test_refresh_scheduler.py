@@ -0,0 +1,177 @@
+"""Stream refresh scheduler tests."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from tests.fakes.services import FakePlatformService
+
+
+def subscriptions(users: int, platform: str = "twitch", channel_id: str = "shared") -> list:
+    """N users subscribed to the same platform channel."""
+    return [
+        ChannelSubscription(id=f"row-{i}", user_id=f"user-{i}", key=ChannelKey(platform, channel_id))
+        for i in range(users)
+    ]
+
+
+class Clock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scheduler(rows, services, clock=None) -> StreamRefreshScheduler:
+    async def loader():
+        return rows
+
+    return StreamRefreshScheduler(
+        services={s.platform: s for s in services},
+        channel_loader=loader,
+        interval=60,
+        clock=clock or Clock(),
+    )
+
+
+class TestDeduplication:
+    """Test that upstream load scales with distinct channels, not users."""
+
+    @pytest.mark.asyncio
+    async def test_many_users_one_channel_one_upstream_call(self):
+        """Test that N subscribers of one channel produce one upstream call."""
+        twitch = FakePlatformService("twitch", live={"shared"})
+        scheduler = make_scheduler(subscriptions(500), [twitch])
+
+        await scheduler.refresh_all()
+
+        assert twitch.calls == [["shared"]]
+        assert scheduler.tracked_keys == [ChannelKey("twitch", "shared")]
+
+    @pytest.mark.asyncio
+    async def test_platforms_fetched_once_per_cycle(self):
+        """Test that each platform gets a single call with all its channels."""
+        twitch = FakePlatformService("twitch")
+        youtube = FakePlatformService("youtube")
+        rows = (
+            subscriptions(3, "twitch", "a") + subscriptions(3, "twitch", "b")
+            + subscriptions(2, "youtube", "c")
+        )
+        scheduler = make_scheduler(rows, [twitch, youtube])
+
+        await scheduler.refresh_all()
+
+        assert sorted(twitch.calls[0]) == ["a", "b"]
+        assert youtube.calls == [["c"]]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_in_flight_fetch(self):
+        """Test that concurrent on-demand refreshes do not duplicate calls."""
+        twitch = FakePlatformService("twitch", live={"shared"}, latency=0.05)
+        scheduler = make_scheduler(subscriptions(50), [twitch])
+        await scheduler.reload_channels()
+        key = ChannelKey("twitch", "shared")
+
+        results = await asyncio.gather(*(scheduler.refresh([key]) for _ in range(50)))
+
+        assert len(twitch.calls) == 1
+        assert all(r[key].streams for r in results)
+
+    @pytest.mark.asyncio
+    async def test_fresh_snapshot_is_served_without_upstream_call(self):
+        """Test that data younger than max_age is served from memory."""
+        clock = Clock()
+        twitch = FakePlatformService("twitch")
+        scheduler = make_scheduler(subscriptions(1), [twitch], clock)
+        await scheduler.refresh_all()
+        key = ChannelKey("twitch", "shared")
+
+        clock.now += 30
+        await scheduler.refresh([key], max_age=90)
+        clock.now += 61
+        await scheduler.refresh([key], max_age=90)
+
+        assert len(twitch.calls) == 2
+
+
+class TestFailures:
+    """Test refresh failure handling."""
+
+    @pytest.mark.asyncio
+    async def test_failure_keeps_previous_streams(self):
+        """Test that a failed refresh keeps serving the last good data."""
+        clock = Clock()
+        twitch = FakePlatformService("twitch", live={"shared"})
+        scheduler = make_scheduler(subscriptions(1), [twitch], clock)
+        await scheduler.refresh_all()
+
+        twitch.fail_with = "Twitch API unavailable"
+        clock.now += 120
+        snapshot = (await scheduler.refresh_all())[ChannelKey("twitch", "shared")]
+
+        assert snapshot.error_code == "API_UNAVAILABLE"
+        assert len(snapshot.streams) == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_platform_reports_error(self):
+        """Test that channels without a platform service are reported."""
+        scheduler = make_scheduler(subscriptions(1, "kick"), [])
+
+        snapshot = (await scheduler.refresh_all())[ChannelKey("kick", "shared")]
+
+        assert snapshot.error_code == "PLATFORM_UNSUPPORTED"
+
+
+class TestRefreshEndpoint:
+    """Test POST /api/streams/refresh served from the scheduler."""
+
+    @pytest.fixture
+    def client(self):
+        """Client with a fake scheduler and an authenticated user."""
+        twitch = FakePlatformService("twitch", live={"shared"})
+        scheduler = make_scheduler(subscriptions(20), [twitch])
+        app.state.stream_scheduler = scheduler
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-3"}
+        yield TestClient(app), twitch
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_many_users_polling_share_one_upstream_call(self, client):
+        """Test that polling users are served from one shared fetch."""
+        test_client, twitch = client
+        for _ in range(20):
+            response = test_client.post("/api/streams/refresh")
+            assert response.status_code == 200
+
+        data = response.json()["data"]
+        assert data["total_channels_checked"] == 1
+        assert data["streams"][0]["channel_id"] == "row-3"
+        assert len(twitch.calls) == 1
+
+    def test_unknown_channel_returns_404(self, client):
+        """Test that channels the user does not own are rejected."""
+        test_client, _ = client
+
+        response = test_client.post("/api/streams/refresh", json={"channel_ids": ["row-1"]})
+
+        assert response.status_code == 404
+
+    def test_scheduler_not_running_returns_503(self):
+        """Test that the endpoint reports unavailability without a scheduler."""
+        app.state.stream_scheduler = None
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        try:
+            response = TestClient(app).post("/api/streams/refresh")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 503
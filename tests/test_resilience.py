@@ -0,0 +1,336 @@
+"""Deadline-bound refresh, circuit breaker and hedging tests.
+
+Faults are injected into the fake Twitch/YouTube servers: latency spikes,
+5xx bursts and 429s with ``Retry-After``.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.config import get_settings
+from app.core.exceptions import CircuitOpenException, ExternalAPIException
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker
+from app.services.twitch_service import TwitchService
+from app.services.youtube_service import YouTubeService
+from tests.fakes.platforms import FakePlatformAPIs
+from tests.fakes.services import FakePlatformService
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def asgi_client(fake: FakePlatformAPIs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+
+
+def twitch(fake: FakePlatformAPIs, **kwargs) -> TwitchService:
+    return TwitchService(
+        client_id="id", client_secret="secret",
+        base_url="http://fake/helix", token_url="http://fake/oauth2/token",
+        http_client=asgi_client(fake), **kwargs,
+    )
+
+
+def youtube(fake: FakePlatformAPIs, **kwargs) -> YouTubeService:
+    return YouTubeService(api_key="key", base_url="http://fake/youtube/v3", http_client=asgi_client(fake), **kwargs)
+
+
+def scheduler_for(services, rows):
+    async def loader():
+        return rows
+
+    return StreamRefreshScheduler(services, loader)
+
+
+def rows_for(platform: str, channel_ids) -> list:
+    return [
+        ChannelSubscription(id=f"row-{cid}", user_id="user-1", key=ChannelKey(platform, cid))
+        for cid in channel_ids
+    ]
+
+
+class TestCircuitBreaker:
+    """Test the breaker state machine."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that only an unbroken run of failures opens the circuit."""
+        breaker = CircuitBreaker("twitch", failure_threshold=3, clock=Clock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED and breaker.allow()
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN and not breaker.allow()
+        assert breaker.stats()["trips"] == 1 and breaker.stats()["rejected"] == 1
+
+    def test_single_probe_after_reset_timeout(self):
+        """Test half-open probing, doubling on a failed probe and closing on success."""
+        clock = Clock()
+        breaker = CircuitBreaker("twitch", failure_threshold=1, reset_timeout=10, max_reset_timeout=15, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() and not breaker.allow()
+        breaker.record_failure()
+        assert breaker.retry_after == 15
+
+        clock.now += 15
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_rate_limit_opens_for_retry_after(self):
+        """Test that a 429 opens the circuit at once for Retry-After seconds."""
+        clock = Clock()
+        breaker = CircuitBreaker("twitch", failure_threshold=5, reset_timeout=30, clock=clock)
+        breaker.record_failure(retry_after=2)
+
+        assert breaker.state == OPEN and breaker.retry_after == 2
+        # A call that started before the circuit opened does not close it
+        breaker.record_success()
+        assert breaker.state == OPEN
+        clock.now += 2
+        assert breaker.state == HALF_OPEN
+
+    def test_cancelled_probe_frees_the_slot(self):
+        """Test that an abandoned probe lets the next caller probe."""
+        clock = Clock()
+        breaker = CircuitBreaker("twitch", failure_threshold=1, reset_timeout=1, clock=clock)
+        breaker.record_failure()
+        clock.now += 1
+        assert breaker.allow()
+
+        breaker.abandon()
+
+        assert breaker.allow()
+
+
+class TestLatencyTracker:
+    """Test the sliding latency window."""
+
+    def test_percentile_needs_min_samples(self):
+        """Test nearest-rank p95 over the last window."""
+        tracker = LatencyTracker(window=100, min_samples=10)
+        for i in range(9):
+            tracker.observe(i)
+        assert tracker.percentile(95) is None
+
+        for i in range(9, 200):
+            tracker.observe(i / 1000 if i < 195 else 5.0)
+
+        assert tracker.percentile(95) == pytest.approx(0.194)
+        assert tracker.percentile(100) == 5.0
+
+
+@pytest.fixture
+def fake():
+    fake = FakePlatformAPIs()
+    fake.add_twitch_channels(["live1"], live=True)
+    return fake
+
+
+class TestFiveHundredBurst:
+    """Test a 5xx burst against the Twitch fake."""
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_serves_cached_streams(self, fake):
+        """Test that calls stop during the burst and resume after a probe."""
+        clock = Clock()
+        breaker = CircuitBreaker("twitch", failure_threshold=3, reset_timeout=30, clock=clock)
+        scheduler = scheduler_for({"twitch": twitch(fake, breaker=breaker)}, rows_for("twitch", ["live1", "off1"]))
+        keys = [ChannelKey("twitch", "live1"), ChannelKey("twitch", "off1")]
+        await scheduler.refresh(keys)
+        fake.reset_counters()
+
+        fake.inject("twitch.streams", 503, 502, 500)
+        codes = [(await scheduler.refresh(keys))[keys[0]].error_code for _ in range(5)]
+
+        assert codes == ["API_UNAVAILABLE"] * 3 + ["CIRCUIT_OPEN"] * 2
+        assert fake.calls["twitch.streams"] == 3
+        snapshot = scheduler.get_snapshot(keys[0])
+        assert snapshot.streams and snapshot.streams[0].platform_stream_id == "stream-live1"
+
+        clock.now += 30
+        fresh = await scheduler.refresh(keys)
+
+        assert fresh[keys[0]].error_code is None and fresh[keys[0]].streams
+        assert breaker.state == CLOSED
+        assert fake.calls["twitch.streams"] == 4
+
+    @pytest.mark.asyncio
+    async def test_health_check_fails_fast_while_open(self, fake):
+        """Test that no request is made while the circuit is open."""
+        breaker = CircuitBreaker("twitch", failure_threshold=1, clock=Clock())
+        service = twitch(fake, breaker=breaker)
+        fake.inject("twitch.streams", 500)
+        with pytest.raises(ExternalAPIException):
+            await service.health_check()
+        calls = sum(fake.calls.values())
+
+        with pytest.raises(CircuitOpenException) as e:
+            await service.health_check()
+
+        assert sum(fake.calls.values()) == calls
+        assert e.value.details["retry_after_seconds"] == 30
+
+
+class TestRateLimitBurst:
+    """Test 429 answers with Retry-After."""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honoured(self, fake):
+        """Test that one 429 stops Twitch calls for its Retry-After."""
+        clock = Clock()
+        breaker = CircuitBreaker("twitch", failure_threshold=5, clock=clock)
+        scheduler = scheduler_for({"twitch": twitch(fake, breaker=breaker)}, rows_for("twitch", ["live1"]))
+        key = ChannelKey("twitch", "live1")
+        await scheduler.refresh([key])
+        fake.reset_counters()
+
+        fake.inject("twitch.streams", 429)
+        first = (await scheduler.refresh([key]))[key]
+        second = (await scheduler.refresh([key]))[key]
+
+        assert first.error_code == "RATE_LIMITED" and second.error_code == "CIRCUIT_OPEN"
+        assert second.streams
+        assert fake.calls["twitch.streams"] == 1
+
+        clock.now += 1
+        assert (await scheduler.refresh([key]))[key].error_code is None
+
+    @pytest.mark.asyncio
+    async def test_youtube_throttling_trips_the_circuit(self):
+        """Test sustained YouTube 429s: the circuit opens and calls stop."""
+        fake = FakePlatformAPIs()
+        fake.add_youtube_channels(["UC1", "UC2"], live=True)
+        breaker = CircuitBreaker("youtube", failure_threshold=2, clock=Clock())
+        service = youtube(fake, breaker=breaker)
+        scheduler = scheduler_for({"youtube": service}, rows_for("youtube", ["UC1", "UC2"]))
+        keys = [ChannelKey("youtube", "UC1"), ChannelKey("youtube", "UC2")]
+        await scheduler.refresh(keys)
+        fake.reset_counters()
+        fake.throttle_rates["youtube.playlistItems"] = 1.0
+
+        for _ in range(3):
+            snapshots = await scheduler.refresh(keys)
+
+        assert breaker.state == OPEN
+        assert {s.error_code for s in snapshots.values()} == {"CIRCUIT_OPEN"}
+        assert all(s.streams for s in snapshots.values())
+        assert fake.calls["youtube.playlistItems"] == 1
+
+
+class TestLatencySpike:
+    """Test deadline-bound refreshes and hedging under latency spikes."""
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_finished_platforms_and_batches(self, fake):
+        """Test that a slow batch and a slow platform do not hold back the rest."""
+        twitch_ids = [f"t{i}" for i in range(150)]
+        fake.add_twitch_channels(twitch_ids[:5] + twitch_ids[100:105], live=True)
+        fake.add_youtube_channels(["UC1"], live=True)
+        services = {"twitch": twitch(fake), "youtube": youtube(fake)}
+        rows = rows_for("twitch", twitch_ids) + rows_for("youtube", ["UC1"])
+        scheduler = scheduler_for(services, rows)
+        keys = [row.key for row in rows]
+        await scheduler.refresh(keys)
+
+        # Second Twitch batch (ids 100-149) and YouTube's video lookup spike
+        fake.inject_latency("twitch.streams", 0.0, 1.0)
+        fake.inject_latency("youtube.videos", 1.0)
+        started = time.perf_counter()
+        snapshots = await scheduler.refresh(keys, timeout=0.3)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.8
+        late = {key for key, s in snapshots.items() if s.error_code == "DEADLINE_EXCEEDED"}
+        assert late == {ChannelKey("twitch", cid) for cid in twitch_ids[100:]} | {ChannelKey("youtube", "UC1")}
+        assert all(s.error_code is None for key, s in snapshots.items() if key not in late)
+        # Late channels are served from cache
+        assert snapshots[ChannelKey("twitch", "t100")].streams
+        assert snapshots[ChannelKey("youtube", "UC1")].streams
+        assert scheduler.stats()["deadline_exceeded"] == 51
+
+        # The fetch went on in the background and landed
+        await asyncio.sleep(1.0)
+        assert not scheduler.stats()["in_flight"]
+        assert scheduler.get_snapshot(ChannelKey("twitch", "t100")).error_code is None
+
+    @pytest.mark.asyncio
+    async def test_slow_batch_is_hedged(self, fake):
+        """Test that a duplicate request answers a batch stuck in a spike."""
+        service = twitch(fake, hedge=True)
+        for _ in range(20):
+            await service.fetch_live_streams(["live1"])
+        fake.reset_counters()
+
+        fake.inject_latency("twitch.streams", 2.0)
+        started = time.perf_counter()
+        streams = await service.fetch_live_streams(["live1"])
+
+        assert time.perf_counter() - started < 1.0
+        assert streams["live1"][0].platform_stream_id == "stream-live1"
+        assert fake.calls["twitch.streams"] == 2
+        assert service.stats()["hedged_requests"] == 1 and service.stats()["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_calls_are_not_hedged(self, fake):
+        """Test that hedging waits for latency samples and the percentile."""
+        service = twitch(fake, hedge=True)
+        for _ in range(30):
+            await service.fetch_live_streams(["live1"])
+
+        assert fake.calls["twitch.streams"] == 30
+        assert service.stats()["hedged_requests"] == 0
+
+
+class TestRefreshEndpointDeadline:
+    """Test the deadline of POST /api/streams/refresh."""
+
+    @pytest.fixture
+    def scheduler(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "STREAM_REFRESH_DEADLINE_SECONDS", 0.2)
+        services = {"twitch": FakePlatformService("twitch", live={"fast"}), "youtube": FakePlatformService("youtube", latency=1.0)}
+        scheduler = scheduler_for(services, rows_for("twitch", ["fast"]) + rows_for("youtube", ["slow"]))
+        app.state.stream_scheduler = scheduler
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield scheduler
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_late_platform_is_reported_per_channel(self, scheduler):
+        """Test a 200 with the finished platform's streams and RefreshError for the rest."""
+        started = time.perf_counter()
+        response = TestClient(app).post("/api/streams/refresh", json={"force_refresh": True})
+
+        assert time.perf_counter() - started < 1.0
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [s["platform_channel_id"] for s in data["streams"]] == ["fast"]
+        assert data["errors"] == [{
+            "channel_id": "row-slow",
+            "platform": "youtube",
+            "error_code": "DEADLINE_EXCEEDED",
+            "error_message": "Refresh deadline passed before the platform answered; serving cached data",
+        }]
@@ -0,0 +1,146 @@
+"""Single-flight refresh coalescing tests."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Request
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.singleflight import SingleFlight
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.routers import streams as streams_router
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from tests.fakes.services import FakePlatformService
+
+
+class TestSingleFlight:
+    """Test the SingleFlight primitive."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test that concurrent callers with one key run fn once."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(100)))
+
+        assert calls == 1
+        assert all(r is results[0] for r in results)
+        assert flight.shared == 99
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_all_waiters_and_is_not_cached(self):
+        """Test that errors propagate to every waiter but are not replayed."""
+        flight = SingleFlight()
+        attempts = 0
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            if attempts == 1:
+                raise RuntimeError("upstream down")
+            return "ok"
+
+        results = await asyncio.gather(*(flight.do("key", flaky) for _ in range(10)), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await flight.do("key", flaky) == "ok"
+        assert attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_work(self):
+        """Test that cancelling one waiter leaves the others unaffected."""
+        flight = SingleFlight()
+        finished = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "done"
+        assert finished.is_set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_independently(self):
+        """Test that keys do not block each other."""
+        flight = SingleFlight()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        a, b = await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+        assert (a, b) == (1, 2)
+        assert flight.started == 2
+
+
+class TestRefreshStress:
+    """Stress POST /api/streams/refresh with many concurrent requests."""
+
+    USERS = 5
+    REQUESTS = 400
+
+    @pytest.fixture
+    def setup(self):
+        """App with a slow fake platform and header-selected users."""
+        twitch = FakePlatformService("twitch", live={f"ch-{i}" for i in range(self.USERS)}, latency=0.05)
+        rows = [
+            ChannelSubscription(f"row-{i}", f"user-{i}", ChannelKey("twitch", f"ch-{i}"))
+            for i in range(self.USERS)
+        ]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({"twitch": twitch}, loader)
+        flight = SingleFlight()
+
+        def current_user(request: Request):
+            return {"sub": request.headers["X-Test-User"]}
+
+        app.state.stream_scheduler = scheduler
+        app.dependency_overrides[get_current_user_async] = current_user
+        original, streams_router._refresh_flight = streams_router._refresh_flight, flight
+        yield twitch, flight
+        streams_router._refresh_flight = original
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    @pytest.mark.asyncio
+    async def test_one_upstream_fetch_per_key(self, setup):
+        """Test that hundreds of concurrent requests cause one fetch per scope."""
+        twitch, flight = setup
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/streams/refresh", headers={"X-Test-User": f"user-{i % self.USERS}"})
+                for i in range(self.REQUESTS)
+            ))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert flight.started == self.USERS
+        assert flight.shared == self.REQUESTS - self.USERS
+        assert sorted(call[0] for call in twitch.calls) == [f"ch-{i}" for i in range(self.USERS)]
+        by_user = {}
+        for i, response in enumerate(responses):
+            by_user.setdefault(i % self.USERS, set()).add(response.text)
+        assert all(len(bodies) == 1 for bodies in by_user.values())
@@ -0,0 +1,100 @@
+"""Cold start tests: lazy imports, startup budget, the startup profile and failed startups."""
+
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+import main
+from app.core.config import Settings
+
+#: Import + create_app() time allowed on top of FastAPI/httpx/pydantic themselves
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "0.5"))
+
+#: SDKs that must not load until the lifespan hook (or first use) needs them
+DEFERRED_MODULES = ("supabase", "gotrue", "postgrest", "realtime", "storage3", "asyncpg")
+
+PROBE = """
+import json, sys, time
+import fastapi, httpx, jwt, pydantic_settings, uvicorn
+started = time.perf_counter()
+import main
+main.create_app()
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def probe_startup() -> dict:
+    # A clean environment: importing the app must not need Supabase settings either
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": os.getcwd()}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, timeout=60, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+class TestColdStart:
+    """Test what happens before the first request."""
+
+    def test_heavy_sdks_are_not_imported(self):
+        """Test that importing main and building the app loads no database SDK."""
+        assert probe_startup()["loaded"] == []
+
+    def test_startup_budget(self):
+        """Test that import + create_app() stays within the startup budget."""
+        # Best of three, so a busy CI machine does not fail the build
+        seconds = min(probe_startup()["seconds"] for _ in range(3))
+
+        assert seconds < STARTUP_BUDGET_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_profile_records_every_phase(self):
+        """Test that the startup profile reaches first_request with increasing timings."""
+        app = main.create_app(Settings(SUPABASE_URL="", STARTUP_PROFILE_ENABLED=True))
+        profile = app.state.startup_profile
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                assert (await client.get("/")).status_code == 200
+                await client.get("/")
+
+        report = profile.report()
+        phases = [report[phase] for phase in ("imported", "app_created", "ready", "first_request")]
+        assert phases == sorted(phases)
+        assert report["process_uptime"] is None or report["process_uptime"] > 0
+
+    def test_profile_off_by_default(self):
+        """Test that no profiling middleware is installed unless enabled."""
+        app = main.create_app(Settings(SUPABASE_URL=""))
+
+        assert app.state.startup_profile is None
+
+    @pytest.mark.asyncio
+    async def test_failed_startup_stops_what_was_started(self, monkeypatch):
+        """Test that a startup step raising still runs the shutdown sequence."""
+        app = main.create_app(Settings(SUPABASE_URL="", EVENT_LOOP_BLOCK_THRESHOLD_MS=100))
+        closed = []
+
+        async def start_coordinator():
+            raise RuntimeError("coordination session refused")
+
+        async def record(name):
+            closed.append(name)
+
+        monkeypatch.setattr(main, "start_coordinator", start_coordinator)
+        monkeypatch.setattr(main, "stop_coordinator", lambda: record("coordinator"))
+        monkeypatch.setattr(main, "close_postgres_pool", lambda: record("postgres"))
+
+        with pytest.raises(RuntimeError):
+            async with app.router.lifespan_context(app):
+                pass
+
+        assert closed == ["coordinator", "postgres"]
+        assert app.state.loop_monitor._task is None
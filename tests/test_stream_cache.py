@@ -0,0 +1,284 @@
+"""Stale-while-revalidate stream list cache tests."""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.core.cache import SWRCache
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services import stream_cache
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from tests.fakes.services import FakePlatformService
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Loader:
+    """Counts loads; returns a new list per call or raises when failing."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("database down")
+        return [f"v{self.calls}"]
+
+
+def make_cache(clock, max_weight: int = 100) -> SWRCache:
+    return SWRCache(fresh_ttl=10, stale_ttl=60, max_weight=max_weight, weigh=len, clock=clock)
+
+
+class TestSWRCache:
+    """Test freshness windows, revalidation and the memory cap."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_is_served_without_loading(self):
+        """Test that a fresh entry is a hit."""
+        clock, load = Clock(), Loader()
+        cache = make_cache(clock)
+
+        first = await cache.get("k", load)
+        clock.now += 5
+        second = await cache.get("k", load)
+
+        assert (first.status, second.status) == ("MISS", "HIT")
+        assert second.value == ["v1"]
+        assert second.age == 5
+        assert load.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_one_revalidation_runs(self):
+        """Test that stale reads answer immediately and share one reload."""
+        clock, load = Clock(), Loader(delay=0.01)
+        cache = make_cache(clock)
+        await cache.get("k", load)
+        clock.now += 20
+
+        lookups = await asyncio.gather(*(cache.get("k", load) for _ in range(50)))
+
+        assert {l.status for l in lookups} == {"STALE"}
+        assert {tuple(l.value) for l in lookups} == {("v1",)}
+        await asyncio.sleep(0.05)
+        assert load.calls == 2
+        assert (await cache.get("k", load)).value == ["v2"]
+
+    @pytest.mark.asyncio
+    async def test_stale_data_served_on_upstream_failure(self):
+        """Test that an expired entry is still served when the reload fails."""
+        clock, load = Clock(), Loader()
+        cache = make_cache(clock)
+        await cache.get("k", load)
+        load.fail = True
+        clock.now += 500
+
+        lookup = await cache.get("k", load)
+
+        assert lookup.status == "STALE"
+        assert lookup.value == ["v1"]
+        assert lookup.age == 500
+        assert cache.stats()["fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_without_cached_value_raises(self):
+        """Test that a failed first load propagates the error."""
+        load = Loader()
+        load.fail = True
+
+        with pytest.raises(RuntimeError):
+            await make_cache(Clock()).get("k", load)
+
+    @pytest.mark.asyncio
+    async def test_invalidated_entry_is_reloaded(self):
+        """Test that invalidation forces a synchronous reload."""
+        clock, load = Clock(), Loader()
+        cache = make_cache(clock)
+        await cache.get(("user-1", "all"), load)
+        await cache.get(("user-2", "all"), load)
+
+        assert cache.invalidate(lambda key: key[0] == "user-1") == 1
+        lookup = await cache.get(("user-1", "all"), load)
+
+        assert lookup.status == "MISS"
+        assert lookup.value == ["v3"]
+        assert (await cache.get(("user-2", "all"), load)).status == "HIT"
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_is_not_lost(self):
+        """Test that data loaded across an invalidation is reloaded next time."""
+        clock, load = Clock(), Loader(delay=0.02)
+        cache = make_cache(clock)
+
+        pending = asyncio.ensure_future(cache.get("k", load))
+        await asyncio.sleep(0.005)
+        cache.invalidate(lambda key: True)
+        await pending
+
+        assert (await cache.get("k", load)).status == "MISS"
+
+    @pytest.mark.asyncio
+    async def test_weight_cap_evicts_least_recently_used(self):
+        """Test that the summed weight never exceeds the cap."""
+        cache = make_cache(Clock(), max_weight=3)
+
+        async def items(n):
+            return list(range(n))
+
+        await cache.get("a", lambda: items(1))
+        await cache.get("b", lambda: items(1))
+        await cache.get("a", lambda: items(1))
+        await cache.get("c", lambda: items(2))
+
+        assert "b" not in cache
+        assert "a" in cache and "c" in cache
+        assert cache.stats()["weight"] == 3
+
+
+def stream_row(row_id: str, platform: str, viewers: int, started_at: str, game: str = "Apex Legends") -> dict:
+    return {
+        "id": row_id,
+        "platform_stream_id": f"vid-{row_id}",
+        "title": f"stream {row_id}",
+        "thumbnail_url": None,
+        "viewer_count": viewers,
+        "game_name": game,
+        "started_at": started_at,
+        "is_live": True,
+        "channels": {
+            "id": f"ch-{row_id}",
+            "channel_id": f"pc-{row_id}",
+            "channel_name": f"chan{row_id}",
+            "display_name": None,
+            "platforms": {"name": platform},
+        },
+    }
+
+
+ROWS = [
+    stream_row("1", "youtube", 10, "2025-08-07T10:00:00+00:00"),
+    stream_row("2", "twitch", 300, "2025-08-07T09:00:00+00:00", game="Just Chatting"),
+    stream_row("3", "youtube", 50, "2025-08-07T11:00:00+00:00"),
+]
+
+
+class FakeDatabase:
+    """Stands in for ``fetch_user_live_streams``."""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+
+    async def __call__(self, user_id, platform=None, category=None, client=None):
+        self.calls.append((user_id, platform, category))
+        if self.fail:
+            raise ConnectionError("supabase unreachable")
+        return [
+            r for r in ROWS
+            if (platform is None or r["channels"]["platforms"]["name"] == platform)
+            and (category is None or r["game_name"] == category)
+        ]
+
+
+class TestListStreamsEndpoint:
+    """Test GET /api/streams served through the cache."""
+
+    @pytest.fixture
+    def database(self, monkeypatch):
+        database = FakeDatabase()
+        monkeypatch.setattr(stream_cache, "fetch_user_live_streams", database)
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield database
+        app.dependency_overrides.clear()
+
+    @pytest_asyncio.fixture
+    async def client(self, database):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_second_read_is_a_cache_hit(self, client, database):
+        """Test that repeated reads hit the cache and report the age."""
+        first = await client.get("/api/streams")
+        second = await client.get("/api/streams")
+
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert "Age" in second.headers
+        assert len(database.calls) == 1
+        data = second.json()["data"]
+        assert [s["id"] for s in data["streams"]] == ["2", "3", "1"]
+        assert data["cache"]["status"] == "HIT"
+
+    @pytest.mark.asyncio
+    async def test_filters_sort_and_pagination(self, client, database):
+        """Test that filters are cache keys and pages are cut from the list."""
+        recent = await client.get("/api/streams", params={"platform": "youtube", "sort": "recent", "limit": 1})
+        category = await client.get("/api/streams", params={"category": "Just Chatting"})
+
+        data = recent.json()["data"]
+        assert [s["id"] for s in data["streams"]] == ["3"]
+        assert data["streams"][0]["url"] == "https://www.youtube.com/watch?v=vid-3"
+        pagination = data["pagination"]
+        assert pagination.pop("nextCursor")
+        assert pagination == {"total": 2, "limit": 1, "offset": 0, "hasMore": True}
+        assert [s["id"] for s in category.json()["data"]["streams"]] == ["2"]
+        assert database.calls == [("user-1", "youtube", None), ("user-1", None, "Just Chatting")]
+
+    @pytest.mark.asyncio
+    async def test_stale_data_served_when_database_fails(self, client, database):
+        """Test that an expired list is served when the reload fails (EDGE-001)."""
+        await client.get("/api/streams")
+        cache = stream_cache.get_stream_cache()
+        cache._clock = lambda: 10 ** 9
+        database.fail = True
+
+        response = await client.get("/api/streams")
+
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "STALE"
+        assert len(response.json()["data"]["streams"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_database_failure_without_cache_is_503(self, client, database):
+        """Test that nothing cached and a failing database gives 503."""
+        database.fail = True
+
+        response = await client.get("/api/streams")
+
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "SERVICE_UNAVAILABLE"
+
+    @pytest.mark.asyncio
+    async def test_scheduler_refresh_invalidates_followers(self, client, database):
+        """Test that a refresh of a followed channel forces a reload."""
+        rows = [ChannelSubscription("row-1", "user-1", ChannelKey("twitch", "c1"))]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({"twitch": FakePlatformService("twitch", live={"c1"})}, loader)
+        scheduler.add_listener(stream_cache.stream_cache_listener(scheduler))
+        await client.get("/api/streams")
+
+        await scheduler.refresh_all()
+        response = await client.get("/api/streams")
+
+        assert response.headers["X-Cache"] == "MISS"
+        assert len(database.calls) == 2
@@ -0,0 +1,283 @@
+"""Live stream push event tests."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+import websockets
+
+from main import app
+from app.core.config import get_settings
+from app.core.exceptions import ServiceUnavailableException
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.refresh_scheduler import ChannelSnapshot
+from app.services.stream_events import EventSubscriber, StreamEvent, StreamEventBroker
+from tests.fakes.server import serve_in_loop
+from tests.fakes.services import make_stream
+
+FOLLOWERS = {
+    "c1": ["user-1", "user-2"],
+    "c2": ["user-2"],
+}
+
+
+def subscriptions_for(key: ChannelKey):
+    return [
+        ChannelSubscription(f"row-{user}-{key.channel_id}", user, key)
+        for user in FOLLOWERS.get(key.channel_id, [])
+    ]
+
+
+def snapshot(channel_id: str, *streams, error_code=None) -> dict:
+    key = ChannelKey("twitch", channel_id)
+    return {key: ChannelSnapshot(key=key, streams=list(streams), error_code=error_code)}
+
+
+def viewer_event(seq: int, stream_id: str = "s1", viewers: int = 1) -> StreamEvent:
+    return StreamEvent(seq, "stream.viewers", ChannelKey("twitch", "c1"), stream_id, {"viewer_count": viewers})
+
+
+def live_event(seq: int, stream_id: str) -> StreamEvent:
+    return StreamEvent(seq, "stream.live", ChannelKey("twitch", "c1"), stream_id, {})
+
+
+class TestEventBroker:
+    """Test delta computation and fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_first_snapshot_is_only_a_baseline(self):
+        """Test that streams already live at startup produce no events."""
+        broker = StreamEventBroker(subscriptions_for)
+        subscriber = broker.subscribe("user-1")
+
+        assert broker.publish(snapshot("c1", make_stream("twitch", "c1"))) == 0
+        assert len(subscriber) == 0
+
+    @pytest.mark.asyncio
+    async def test_live_viewers_updated_and_ended(self):
+        """Test that each kind of change becomes one event."""
+        broker = StreamEventBroker(subscriptions_for)
+        subscriber = broker.subscribe("user-1")
+        broker.publish(snapshot("c1"))
+
+        events = []
+        for streams in (
+            [make_stream("twitch", "c1", 100)],
+            [make_stream("twitch", "c1", 150)],
+            [make_stream("twitch", "c1", 150, title="new title")],
+            [make_stream("twitch", "c1", 150, title="new title")],
+            [],
+        ):
+            broker.publish(snapshot("c1", *streams))
+            batch, resync = await subscriber.next_batch(0)
+            assert not resync
+            events.extend(batch)
+
+        assert [e.type for e in events] == ["stream.live", "stream.viewers", "stream.updated", "stream.ended"]
+        assert events[1].data["viewer_count"] == 150
+        assert events[0].data["stream"]["platform_channel_id"] == "c1"
+        assert [e.seq for e in events] == sorted(e.seq for e in events)
+
+    @pytest.mark.asyncio
+    async def test_events_reach_followers_only_as_one_shared_object(self):
+        """Test that one event object is shared by every follower's connections."""
+        broker = StreamEventBroker(subscriptions_for)
+        first, second, other = broker.subscribe("user-1"), broker.subscribe("user-2"), broker.subscribe("user-3")
+        broker.publish({**snapshot("c1"), **snapshot("c2")})
+
+        broker.publish({**snapshot("c1", make_stream("twitch", "c1")), **snapshot("c2", make_stream("twitch", "c2"))})
+
+        (first_events, _), (second_events, _), (other_events, _) = [
+            await s.next_batch(0) for s in (first, second, other)
+        ]
+        assert [e.key.channel_id for e in first_events] == ["c1"]
+        assert [e.key.channel_id for e in second_events] == ["c1", "c2"]
+        assert other_events == []
+        assert first_events[0] is second_events[0]
+        assert first_events[0].sse is second_events[0].sse
+
+    @pytest.mark.asyncio
+    async def test_failed_snapshot_does_not_end_streams(self):
+        """Test that an errored snapshot publishes nothing."""
+        broker = StreamEventBroker(subscriptions_for)
+        broker.subscribe("user-1")
+        broker.publish(snapshot("c1", make_stream("twitch", "c1")))
+
+        assert broker.publish(snapshot("c1", error_code="API_UNAVAILABLE")) == 0
+        assert broker.publish(snapshot("c1", make_stream("twitch", "c1"))) == 0
+
+    def test_connection_limit(self):
+        """Test that subscribing past max_connections is refused."""
+        broker = StreamEventBroker(subscriptions_for, max_connections=1)
+        subscriber = broker.subscribe("user-1")
+
+        with pytest.raises(ServiceUnavailableException):
+            broker.subscribe("user-2")
+        broker.unsubscribe(subscriber)
+        broker.unsubscribe(subscriber)
+
+        assert broker.stats()["connections"] == 0
+        broker.subscribe("user-2")
+
+
+class TestBackpressure:
+    """Test the bounded per-connection buffer."""
+
+    @pytest.mark.asyncio
+    async def test_viewer_updates_of_one_stream_are_coalesced(self):
+        """Test that only the latest viewer count per stream is kept."""
+        subscriber = EventSubscriber("user-1", max_pending=10)
+        for seq in range(1, 6):
+            subscriber.offer(viewer_event(seq, viewers=seq * 10))
+
+        events, _ = await subscriber.next_batch(0)
+
+        assert [e.data["viewer_count"] for e in events] == [50]
+        assert subscriber.coalesced == 4
+
+    @pytest.mark.asyncio
+    async def test_ended_stream_discards_pending_viewer_update(self):
+        """Test that an ended event replaces the stream's pending viewer count."""
+        subscriber = EventSubscriber("user-1")
+        subscriber.offer(viewer_event(1))
+        subscriber.offer(StreamEvent(2, "stream.ended", ChannelKey("twitch", "c1"), "s1", {}))
+
+        events, _ = await subscriber.next_batch(0)
+
+        assert [e.type for e in events] == ["stream.ended"]
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_drops_oldest_viewer_update(self):
+        """Test that a full buffer sheds viewer counts before anything else."""
+        subscriber = EventSubscriber("user-1", max_pending=3)
+        subscriber.offer(viewer_event(1, "a"))
+        subscriber.offer(live_event(2, "b"))
+        subscriber.offer(viewer_event(3, "c"))
+        subscriber.offer(live_event(4, "d"))
+
+        events, resync = await subscriber.next_batch(0)
+
+        assert [e.seq for e in events] == [2, 3, 4]
+        assert not resync
+        assert subscriber.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_overflow_without_droppable_events_requests_resync(self):
+        """Test that a slow client past the limit gets one resync instead of events."""
+        subscriber = EventSubscriber("user-1", max_pending=3)
+        for seq in range(1, 5):
+            subscriber.offer(live_event(seq, f"s{seq}"))
+
+        events, resync = await subscriber.next_batch(0)
+
+        assert events == []
+        assert resync
+        assert (await subscriber.next_batch(0)) == ([], False)
+
+    @pytest.mark.asyncio
+    async def test_consumer_wakes_on_offer(self):
+        """Test that a waiting consumer is woken by a new event."""
+        subscriber = EventSubscriber("user-1")
+        waiter = asyncio.ensure_future(subscriber.next_batch(5))
+        await asyncio.sleep(0)
+
+        subscriber.offer(live_event(1, "s1"))
+
+        events, _ = await asyncio.wait_for(waiter, 1)
+        assert [e.seq for e in events] == [1]
+
+
+def token(user_id: str) -> str:
+    claims = {"sub": user_id, "role": "authenticated", "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, get_settings().SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+class TestEventEndpoints:
+    """Test the SSE and WebSocket endpoints over a real socket."""
+
+    @pytest_asyncio.fixture
+    async def server(self, monkeypatch):
+        broker = StreamEventBroker(subscriptions_for)
+        broker.publish(snapshot("c1"))
+        app.state.stream_events = broker
+        monkeypatch.setattr(get_settings(), "STREAM_EVENTS_HEARTBEAT_SECONDS", 0.05)
+        async with serve_in_loop(app) as base_url:
+            yield base_url, broker
+        del app.state.stream_events
+
+    @staticmethod
+    async def read_event(lines, event_type: str) -> dict:
+        current = None
+        async for line in lines:
+            if line.startswith("event: "):
+                current = line[len("event: "):]
+            elif line.startswith("data: ") and current == event_type:
+                return json.loads(line[len("data: "):])
+        raise AssertionError(f"stream closed before {event_type}")
+
+    @pytest.mark.asyncio
+    async def test_sse_pushes_changes_of_followed_channels(self, server):
+        """Test that an SSE client receives the ready event, then deltas."""
+        base_url, broker = server
+        async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+            async with client.stream(
+                "GET", "/api/streams/events", headers={"Authorization": f"Bearer {token('user-1')}"}
+            ) as response:
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/event-stream")
+                lines = response.aiter_lines()
+                assert (await self.read_event(lines, "ready")) == {"user_id": "user-1"}
+
+                broker.publish(snapshot("c1", make_stream("twitch", "c1", 42)))
+                live = await self.read_event(lines, "stream.live")
+
+        assert live["stream"]["viewer_count"] == 42
+        for _ in range(100):
+            if broker.connections == 0:
+                break
+            await asyncio.sleep(0.02)
+        assert broker.connections == 0
+
+    @pytest.mark.asyncio
+    async def test_sse_rejects_missing_token(self, server):
+        """Test that the endpoint requires a valid token."""
+        base_url, broker = server
+        async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+            missing = await client.get("/api/streams/events")
+            invalid = await client.get("/api/streams/events", params={"access_token": "not-a-jwt"})
+
+        assert missing.status_code == 401
+        assert invalid.status_code == 401
+        assert broker.connections == 0
+
+    @pytest.mark.asyncio
+    async def test_websocket_pushes_changes(self, server):
+        """Test the WebSocket variant with a query-string token."""
+        base_url, broker = server
+        url = base_url.replace("http://", "ws://") + f"/api/streams/events/ws?access_token={token('user-1')}"
+        async with websockets.connect(url) as ws:
+            assert json.loads(await ws.recv())["type"] == "ready"
+            broker.publish(snapshot("c1", make_stream("twitch", "c1", 7)))
+            message = json.loads(await asyncio.wait_for(ws.recv(), 5))
+
+        assert message["type"] == "stream.live"
+        assert message["data"]["stream"]["viewer_count"] == 7
+        for _ in range(100):
+            if broker.connections == 0:
+                break
+            await asyncio.sleep(0.02)
+        assert broker.connections == 0
+
+    @pytest.mark.asyncio
+    async def test_websocket_rejects_invalid_token(self, server):
+        """Test that the handshake is refused without a valid token."""
+        base_url, _ = server
+        url = base_url.replace("http://", "ws://") + "/api/streams/events/ws?access_token=bad"
+
+        with pytest.raises(websockets.exceptions.InvalidStatus):
+            async with websockets.connect(url):
+                pass
@@ -0,0 +1,230 @@
+"""In-memory live stream search index tests."""
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.routers import streams as streams_router
+from app.services.refresh_scheduler import ChannelSnapshot, StreamRefreshScheduler
+from app.services.stream_search import StreamSearchIndex, parse_query, stream_search_listener, tokenize
+from tests.fakes.services import FakePlatformService, make_stream
+
+
+def snapshot(channel_id: str, *streams, platform: str = "twitch", error_code=None) -> dict:
+    key = ChannelKey(platform, channel_id)
+    return {key: ChannelSnapshot(key=key, streams=list(streams), error_code=error_code)}
+
+
+def found(results):
+    return [stream.platform_stream_id for _, stream in results]
+
+
+def build_index() -> StreamSearchIndex:
+    index = StreamSearchIndex()
+    index.apply({
+        **snapshot("c1", make_stream("twitch", "c1", 500, title="【歌枠】夜のまったり歌配信", game_name="Just Chatting")),
+        **snapshot("c2", make_stream("twitch", "c2", 1200, title="ＡＰＥＸ ランクマ ダイヤ帯", game_name="Apex Legends",
+                                     tags=["日本語", "FPS"])),
+        **snapshot("c3", make_stream("youtube", "c3", 80, title="Apex tournament scrims", game_name="Apex Legends"),
+                   platform="youtube"),
+        **snapshot("c4", make_stream("twitch", "c4", 3000, title="Minecraft 建築配信", game_name="Minecraft")),
+    })
+    return index
+
+
+class TestTokenizer:
+    """Test CJK-aware tokenization."""
+
+    def test_cjk_runs_become_unigrams_and_bigrams(self):
+        """Test that Japanese text is indexed by characters and pairs."""
+        assert tokenize("歌枠") == {"歌", "枠", "歌枠"}
+
+    def test_width_and_case_are_normalized(self):
+        """Test NFKC folding of full-width Latin and half-width kana."""
+        assert tokenize("ＡＰＥＸ ﾗﾝｸ") == {"apex", "ラ", "ン", "ク", "ラン", "ンク"}
+
+    def test_query_parsing(self):
+        """Test required bigrams and a trailing word prefix."""
+        assert parse_query("歌配信 ape") == (["歌配", "配信"], "ape")
+        assert parse_query("apex ") == (["apex"], None)
+        assert parse_query("歌") == (["歌"], None)
+
+
+class TestSearchIndex:
+    """Test queries and incremental updates."""
+
+    def test_japanese_queries(self):
+        """Test bigram and unigram queries against Japanese titles."""
+        index = build_index()
+
+        assert found(index.search("歌枠")) == ["c1-live"]
+        assert found(index.search("配信")) == ["c4-live", "c1-live"]
+        assert found(index.search("ランクマ")) == ["c2-live"]
+        assert found(index.search("日本語")) == ["c2-live"]
+
+    def test_prefix_and_mixed_queries(self):
+        """Test that the word being typed matches as a prefix."""
+        index = build_index()
+
+        assert found(index.search("ap")) == ["c2-live", "c3-live"]
+        assert found(index.search("apex tour")) == ["c3-live"]
+        assert found(index.search("minecraft 建")) == ["c4-live"]
+        assert found(index.search("zzz")) == []
+
+    def test_viewer_bounds_and_filters(self):
+        """Test min/max viewers, platform, game and tag filters."""
+        index = build_index()
+
+        assert found(index.search("", min_viewers=500)) == ["c4-live", "c2-live", "c1-live"]
+        assert found(index.search("", min_viewers=100, max_viewers=1200)) == ["c2-live", "c1-live"]
+        assert found(index.search("apex", platform="youtube")) == ["c3-live"]
+        assert found(index.search("", game_name="Apex Legends")) == ["c2-live", "c3-live"]
+        assert found(index.search("", tags=["fps"])) == ["c2-live"]
+        assert found(index.search("", keys={ChannelKey("twitch", "c1")})) == ["c1-live"]
+
+    def test_incremental_updates(self):
+        """Test ended streams, retitled streams and viewer reordering."""
+        index = build_index()
+
+        index.apply({
+            **snapshot("c1"),
+            **snapshot("c2", make_stream("twitch", "c2", 10, title="雑談", game_name="Just Chatting")),
+            **snapshot("c4", make_stream("twitch", "c4", 5, title="Minecraft 建築配信", game_name="Minecraft")),
+        })
+
+        assert found(index.search("歌枠")) == []
+        assert found(index.search("ランクマ")) == []
+        assert found(index.search("雑談")) == ["c2-live"]
+        assert found(index.search("")) == ["c3-live", "c2-live", "c4-live"]
+        assert len(index) == 3
+
+    def test_viewer_change_resorts_only_lists_of_changed_streams(self):
+        """Test that a viewer update marks the changed stream's lists, sorted when read."""
+        index = build_index()
+        for token in list(index._postings):
+            index._posting(token)
+
+        index.apply(snapshot("c3", make_stream("youtube", "c3", 5000, title="Apex tournament scrims",
+                                               game_name="Apex Legends"), platform="youtube"))
+
+        assert index._unsorted == {"apex", "tournament", "scrims", "legends"}
+        assert found(index.search("apex ")) == ["c3-live", "c2-live"]
+        assert "apex" not in index._unsorted
+        assert found(index.search("", min_viewers=1000)) == ["c3-live", "c4-live", "c2-live"]
+
+    def test_failed_snapshot_keeps_streams(self):
+        """Test that an errored snapshot leaves the channel searchable."""
+        index = build_index()
+
+        index.apply(snapshot("c1", error_code="API_UNAVAILABLE"))
+
+        assert found(index.search("歌枠")) == ["c1-live"]
+
+    def test_freed_slots_are_reused(self):
+        """Test that slots of ended streams are recycled."""
+        index = build_index()
+        index.apply(snapshot("c1"))
+        index.apply(snapshot("c1", make_stream("twitch", "c1", 7, platform_stream_id="next", title="朝活")))
+
+        assert found(index.search("朝活")) == ["next"]
+        assert index.stats()["documents"] == 4
+        assert len(index._docs) == 4
+
+    @pytest.mark.asyncio
+    async def test_listener_prunes_unfollowed_channels(self):
+        """Test that channels dropped from the scheduler leave the index."""
+        rows = [ChannelSubscription("row-1", "user-1", ChannelKey("twitch", "c1"))]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({"twitch": FakePlatformService("twitch", live={"c1"})}, loader)
+        scheduler.min_reload_interval = 0
+        index = StreamSearchIndex()
+        scheduler.add_listener(stream_search_listener(scheduler, index))
+        await scheduler.refresh_all()
+        assert len(index) == 1
+
+        rows.clear()
+        await scheduler.reload_channels(force=True)
+        await stream_search_listener(scheduler, index)({})
+
+        assert len(index) == 0
+
+
+class TestSearchEndpoint:
+    """Test GET /api/streams/search routing between index and database."""
+
+    @pytest_asyncio.fixture
+    async def client(self, monkeypatch):
+        rows = [
+            ChannelSubscription("row-1", "user-1", ChannelKey("twitch", "c1")),
+            ChannelSubscription("row-2", "user-1", ChannelKey("twitch", "c2")),
+            ChannelSubscription("row-4", "user-2", ChannelKey("twitch", "c4")),
+        ]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({}, loader)
+        await scheduler.reload_channels()
+        database_calls = []
+
+        async def search_user_streams(*args):
+            database_calls.append(args)
+            return [{
+                "id": "s9", "platform_stream_id": "old", "title": "過去の歌枠", "viewer_count": 0,
+                "started_at": "2025-08-01T10:00:00+00:00", "is_live": False,
+                "channels": {"id": "row-1", "channel_id": "c1", "platforms": {"name": "twitch"}},
+            }], 1
+
+        monkeypatch.setattr(streams_router, "search_user_streams", search_user_streams)
+        app.state.stream_scheduler = scheduler
+        app.state.stream_search = build_index()
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, database_calls
+        app.dependency_overrides.clear()
+        del app.state.stream_scheduler, app.state.stream_search
+
+    @pytest.mark.asyncio
+    async def test_live_search_uses_index_and_users_channels(self, client):
+        """Test that live searches only see the user's channels, from memory."""
+        client, database_calls = client
+
+        body = (await client.get("/api/streams/search", params={"query": "配信"})).json()
+
+        assert body["data"]["search_meta"]["source"] == "index"
+        assert [s["platform_stream_id"] for s in body["data"]["streams"]] == ["c1-live"]
+        assert body["data"]["streams"][0]["channel_id"] == "row-1"
+        assert body["data"]["meta"] == {
+            "total_count": 1, "page": 1, "per_page": 20, "has_next": False, "has_prev": False,
+        }
+        assert database_calls == []
+
+    @pytest.mark.asyncio
+    async def test_historical_search_falls_back_to_database(self, client):
+        """Test that non-live searches use Postgres full-text search."""
+        client, database_calls = client
+
+        body = (await client.get("/api/streams/search", params={"query": "歌枠", "is_live": "false"})).json()
+
+        assert body["data"]["search_meta"]["source"] == "database"
+        assert body["data"]["streams"][0]["platform_stream_id"] == "old"
+        assert body["data"]["streams"][0]["is_live"] is False
+        assert database_calls[0][:2] == ("user-1", "歌枠")
+
+    @pytest.mark.asyncio
+    async def test_channels_not_yet_indexed_fall_back_to_database(self, client):
+        """Test that a user channel unknown to the index uses the database."""
+        client, database_calls = client
+        app.state.stream_search = StreamSearchIndex()
+
+        body = (await client.get("/api/streams/search", params={"query": "歌"})).json()
+
+        assert body["data"]["search_meta"]["source"] == "database"
+        assert len(database_calls) == 1
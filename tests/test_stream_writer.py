@@ -0,0 +1,241 @@
+"""Diff-based stream writer tests."""
+
+import asyncio
+
+import pytest
+from supabase import create_client
+
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.refresh_scheduler import ChannelSnapshot, StreamRefreshScheduler
+from app.services.stream_writer import StreamStateWriter
+from app.services.supabase_service import fetch_live_stream_rows, upsert_streams
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+from tests.fakes.services import FakePlatformService, make_stream
+
+
+class Clock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingTable:
+    """Collects upserted batches."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, rows):
+        self.batches.append(rows)
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def snapshot(channel_id: str, *streams, error_code=None) -> dict:
+    key = ChannelKey("twitch", channel_id)
+    return {key: ChannelSnapshot(key=key, streams=list(streams), error_code=error_code)}
+
+
+def subscriptions_for(key: ChannelKey):
+    return [ChannelSubscription(f"row-{key.channel_id}", "user-1", key)]
+
+
+def make_writer(table, clock, **kwargs) -> StreamStateWriter:
+    return StreamStateWriter(subscriptions_for, table, clock=clock, **kwargs)
+
+
+class TestDiff:
+    """Test which rows each cycle writes."""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_streams_are_not_rewritten(self):
+        """Test that a second identical cycle writes nothing."""
+        table, clock = RecordingTable(), Clock()
+        writer = make_writer(table, clock)
+
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1"))) == 1
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1"))) == 0
+
+        assert len(table.batches) == 1
+        assert table.rows[0]["channel_id"] == "row-c1"
+        assert writer.stats()["rows_unchanged"] == 1
+
+    @pytest.mark.asyncio
+    async def test_viewer_only_changes_are_throttled(self):
+        """Test that viewer counts are coalesced within the throttle window."""
+        table, clock = RecordingTable(), Clock()
+        writer = make_writer(table, clock, viewer_update_interval=120)
+        await writer.write(snapshot("c1", make_stream("twitch", "c1", 100)))
+
+        clock.now += 60
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1", 150))) == 0
+        clock.now += 30
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1", 170, title="new title"))) == 1
+        clock.now += 60
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1", 180, title="new title"))) == 0
+        clock.now += 60
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1", 190, title="new title"))) == 1
+
+        assert [r["viewer_count"] for r in table.rows] == [100, 170, 190]
+        assert writer.stats()["viewer_updates_deferred"] == 2
+
+    @pytest.mark.asyncio
+    async def test_ended_stream_is_marked_not_live(self):
+        """Test that a stream missing from a snapshot is ended once."""
+        table, clock = RecordingTable(), Clock()
+        writer = make_writer(table, clock)
+        await writer.write(snapshot("c1", make_stream("twitch", "c1")))
+
+        clock.now += 60
+        await writer.write(snapshot("c1"))
+        await writer.write(snapshot("c1"))
+
+        ended = table.rows[-1]
+        assert len(table.rows) == 2
+        assert ended["is_live"] is False
+        assert ended["ended_at"].startswith("1970-01-12")
+
+    @pytest.mark.asyncio
+    async def test_failed_snapshot_does_not_end_streams(self):
+        """Test that an errored snapshot leaves the stream live."""
+        table, clock = RecordingTable(), Clock()
+        writer = make_writer(table, clock)
+        await writer.write(snapshot("c1", make_stream("twitch", "c1")))
+
+        assert await writer.write(snapshot("c1", error_code="API_UNAVAILABLE")) == 0
+
+    @pytest.mark.asyncio
+    async def test_rows_are_sent_in_bulk_batches(self):
+        """Test that changes go out as upserts of at most batch_size rows."""
+        table, clock = RecordingTable(), Clock()
+        writer = make_writer(table, clock, batch_size=100)
+        snapshots = {}
+        for i in range(250):
+            snapshots.update(snapshot(f"c{i}", make_stream("twitch", f"c{i}")))
+
+        await writer.write(snapshots)
+
+        assert [len(b) for b in table.batches] == [100, 100, 50]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried_next_cycle(self):
+        """Test that state only advances after a successful write."""
+        clock, table = Clock(), RecordingTable()
+        failing = True
+
+        async def write_rows(rows):
+            if failing:
+                raise ConnectionError("postgrest down")
+            await table(rows)
+
+        writer = make_writer(write_rows, clock)
+        with pytest.raises(ConnectionError):
+            await writer.write(snapshot("c1", make_stream("twitch", "c1")))
+        failing = False
+
+        assert await writer.write(snapshot("c1", make_stream("twitch", "c1"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_seeded_rows_are_not_rewritten(self):
+        """Test that rows already live in the table are known after a restart."""
+        table, clock = RecordingTable(), Clock()
+        first = make_writer(table, clock)
+        await first.write(snapshot("c1", make_stream("twitch", "c1")))
+
+        async def load_live_rows():
+            return list(table.rows)
+
+        restarted = make_writer(table, clock, load_live_rows=load_live_rows)
+        assert await restarted.write(snapshot("c1", make_stream("twitch", "c1"))) == 0
+
+
+class TestAgainstPostgrest:
+    """Run scheduler cycles against the PostgREST stand-in."""
+
+    CHANNELS = 200
+
+    @pytest.mark.asyncio
+    async def test_rows_written_per_cycle(self):
+        """Test write volume per cycle for a realistic change mix."""
+        fake = FakePostgrest()
+        ids = [f"c{i}" for i in range(self.CHANNELS)]
+        twitch = FakePlatformService("twitch", live=set(ids[:100]))
+        rows = [ChannelSubscription(f"row-{c}", "user-1", ChannelKey("twitch", c)) for c in ids]
+
+        async def loader():
+            return rows
+
+        clock = Clock()
+        scheduler = StreamRefreshScheduler({"twitch": twitch}, loader, interval=60, clock=clock)
+
+        with serve_in_thread(fake.app) as base_url:
+            client = create_client(base_url, "service-key")
+
+            async def write_rows(batch):
+                await asyncio.to_thread(upsert_streams, batch, client)
+
+            writer = StreamStateWriter(scheduler.subscriptions_for, write_rows, viewer_update_interval=120, clock=clock)
+            scheduler.add_listener(writer)
+            per_cycle = []
+            for cycle in range(6):
+                if cycle == 2:
+                    # 10 streams end, 5 start, 30 only change viewers
+                    twitch.live -= set(ids[:10])
+                    twitch.live |= set(ids[100:105])
+                    twitch.viewers.update({c: 500 for c in ids[20:50]})
+                if cycle == 3:
+                    twitch.viewers.update({c: 600 for c in ids[20:50]})
+                fake.reset_counters()
+                await scheduler.refresh_all()
+                per_cycle.append((fake.rows_written, fake.write_requests))
+                clock.now += 60
+
+        # 100 new; unchanged; 10 ended + 5 new + 30 viewer updates; viewers
+        # move again within the throttle window (deferred); window over: the
+        # 30 coalesced viewer counts; unchanged
+        assert per_cycle == [(100, 1), (0, 0), (45, 1), (0, 0), (30, 1), (0, 0)]
+        stored = fake.tables["streams"]
+        assert len(stored) == 105
+        assert sum(1 for r in stored if r["is_live"]) == 95
+        assert {r["viewer_count"] for r in stored if r["channel_id"] == "row-c20"} == {600}
+
+    @pytest.mark.asyncio
+    async def test_seed_pages_past_max_rows(self):
+        """Test that live rows beyond PostgREST's max-rows cap are seeded and ended."""
+        fake = FakePostgrest(max_rows=3)
+        seed(fake, "streams", [
+            {
+                "id": f"s{i}", "channel_id": f"row-c{i}", "platform_stream_id": f"stream-c{i}",
+                "title": "Live", "description": None, "thumbnail_url": None, "viewer_count": 10,
+                "game_name": None, "tags": [], "started_at": "2025-08-07T10:00:00+00:00",
+                "is_live": True, "ended_at": None,
+            }
+            for i in range(8)
+        ])
+
+        with serve_in_thread(fake.app) as base_url:
+            client = create_client(base_url, "service-key")
+
+            async def load_live_rows():
+                return await asyncio.to_thread(fetch_live_stream_rows, 3, client)
+
+            async def write_rows(batch):
+                await asyncio.to_thread(upsert_streams, batch, client)
+
+            assert len(await load_live_rows()) == 8
+            writer = make_writer(write_rows, Clock(), load_live_rows=load_live_rows)
+            # Every channel is checked and found offline (e.g. after downtime)
+            snapshots = {}
+            for i in range(8):
+                snapshots.update(snapshot(f"c{i}"))
+            written = await writer.write(snapshots)
+
+        assert written == 8
+        assert not any(row["is_live"] for row in fake.tables["streams"])
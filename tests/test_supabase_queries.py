@@ -0,0 +1,83 @@
+"""Supabase query tests against the PostgREST stand-in."""
+
+import pytest
+from supabase import create_client
+
+from app.services.supabase_service import fetch_tracked_channels, fetch_user_live_streams, search_user_streams
+from tests.fakes.postgrest import FakePostgrest, seed
+from tests.fakes.server import serve_in_thread
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Supabase client for two users' channels and streams."""
+    fake = FakePostgrest()
+    seed(fake, "platforms", [{"id": "p-tw", "name": "twitch"}, {"id": "p-yt", "name": "youtube"}])
+    seed(fake, "channels", [
+        {"id": "ch-1", "user_id": "user-1", "channel_id": "tw1", "platform_id": "p-tw",
+         "is_active": True, "is_subscribed": True},
+        {"id": "ch-2", "user_id": "user-1", "channel_id": "UC2", "platform_id": "p-yt",
+         "is_active": True, "is_subscribed": True},
+        {"id": "ch-3", "user_id": "user-1", "channel_id": "tw3", "platform_id": "p-tw",
+         "is_active": False, "is_subscribed": True},
+        {"id": "ch-4", "user_id": "user-2", "channel_id": "tw1", "platform_id": "p-tw",
+         "is_active": True, "is_subscribed": True},
+    ])
+    seed(fake, "streams", [
+        {"id": "s-1", "channel_id": "ch-1", "platform_stream_id": "a", "title": "Speedrun live",
+         "viewer_count": 10, "is_live": True, "tags": ["en"]},
+        {"id": "s-2", "channel_id": "ch-2", "platform_stream_id": "b", "title": "Late night speedrun",
+         "viewer_count": 50, "is_live": True, "tags": ["en", "any%"]},
+        {"id": "s-3", "channel_id": "ch-2", "platform_stream_id": "c", "title": "Old speedrun",
+         "viewer_count": 5, "is_live": False, "tags": []},
+        {"id": "s-4", "channel_id": "ch-4", "platform_stream_id": "a", "title": "Speedrun live",
+         "viewer_count": 10, "is_live": True, "tags": ["en"]},
+    ])
+    with serve_in_thread(fake.app) as base_url:
+        yield create_client(base_url, "service-key")
+
+
+class TestReadQueries:
+    """Test the embedded-resource reads used by the scheduler and endpoints."""
+
+    def test_tracked_channels(self, client):
+        """Test that inactive rows are skipped and platform names are embedded."""
+        channels = fetch_tracked_channels(client=client)
+
+        assert sorted((c.id, c.key.platform) for c in channels) == [
+            ("ch-1", "twitch"), ("ch-2", "youtube"), ("ch-4", "twitch"),
+        ]
+
+    def test_tracked_channels_past_max_rows(self):
+        """Test that every subscription is loaded when PostgREST caps each response."""
+        fake = FakePostgrest(max_rows=3)
+        seed(fake, "platforms", [{"id": "p-tw", "name": "twitch"}])
+        seed(fake, "channels", [
+            {"id": f"ch-{i}", "user_id": "user-1", "channel_id": f"tw{i}", "platform_id": "p-tw",
+             "is_active": True, "is_subscribed": True}
+            for i in range(8)
+        ])
+
+        with serve_in_thread(fake.app) as base_url:
+            channels = fetch_tracked_channels(3, create_client(base_url, "service-key"))
+
+        assert sorted(c.id for c in channels) == [f"ch-{i}" for i in range(8)]
+
+    def test_user_live_streams(self, client):
+        """Test user scoping and the nested platform filter."""
+        rows = fetch_user_live_streams("user-1", client=client)
+        twitch_rows = fetch_user_live_streams("user-1", platform="twitch", client=client)
+
+        assert sorted(r["id"] for r in rows) == ["s-1", "s-2"]
+        assert [r["id"] for r in twitch_rows] == ["s-1"]
+        assert twitch_rows[0]["channels"]["platforms"] == {"name": "twitch"}
+
+    def test_search_orders_pages_and_counts(self, client):
+        """Test text search with ordering, range and the exact total."""
+        rows, total = search_user_streams("user-1", query="speedrun", limit=1, client=client)
+        live_rows, live_total = search_user_streams("user-1", query="speedrun", is_live=True, tags=["en"], client=client)
+
+        assert total == 3
+        assert [r["id"] for r in rows] == ["s-2"]
+        assert live_total == 2
+        assert [r["id"] for r in live_rows] == ["s-2", "s-1"]
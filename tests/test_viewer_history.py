@@ -0,0 +1,419 @@
+"""Viewer history tests: rings, downsampling, aggregates, flushing and the stats API."""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.auth import get_current_user_async
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.models.stream import PlatformStream
+from app.routers import stats as stats_router
+from app.services.refresh_scheduler import ChannelSnapshot, StreamRefreshScheduler
+from app.services.viewer_history import ViewerHistory, combined_aggregate
+
+#: Start of an hour, so every tier's buckets line up with it
+T0 = 3600.0 * 500_000
+TIERS = ((60, 10), (600, 6), (3600, 4))
+
+TWITCH = ChannelKey("twitch", "alpha")
+YOUTUBE = ChannelKey("youtube", "beta")
+
+
+def stream(key: ChannelKey, stream_id: str, viewers: int) -> PlatformStream:
+    return PlatformStream(
+        platform=key.platform,
+        platform_channel_id=key.channel_id,
+        platform_stream_id=stream_id,
+        title="Live",
+        viewer_count=viewers,
+        started_at=datetime.fromtimestamp(T0, timezone.utc),
+    )
+
+
+def snapshot(key: ChannelKey, at: float, *streams: PlatformStream, error_code=None) -> ChannelSnapshot:
+    return ChannelSnapshot(key=key, streams=list(streams), fetched_at=at, checked_at=at, error_code=error_code)
+
+
+class TestRings:
+    """Test the per-resolution rings."""
+
+    def test_full_coarse_slot_is_downsampled_to_its_mean(self):
+        """Test that the 10-minute slot gets the mean once the next one starts."""
+        history = ViewerHistory(tiers=TIERS)
+        for minute in range(11):
+            history.record(TWITCH, stream(TWITCH, "s1", 10 * minute), T0 + 60 * minute)
+        slots = history.slots_for([TWITCH])
+
+        assert history.series(slots, 60)[-1] == (T0 + 600, 100)
+        # Minutes 0..9 average 45; minute 10 is the partial current slot
+        assert history.series(slots, 600) == [(T0, 45), (T0 + 600, 100)]
+        # The current hour averages the 10-minute points
+        assert history.series(slots, 3600) == [(T0, round((45 + 100) / 2))]
+
+    def test_ring_keeps_only_its_window(self):
+        """Test that the 1-minute ring drops samples older than its size."""
+        history = ViewerHistory(tiers=TIERS)
+        for minute in range(25):
+            history.record(TWITCH, stream(TWITCH, "s1", minute), T0 + 60 * minute)
+        slots = history.slots_for([TWITCH])
+
+        minutes = history.series(slots, 60)
+        assert [t for t, _ in minutes] == [T0 + 60 * m for m in range(15, 25)]
+        assert history.series(slots, 600) == [(T0, 4), (T0 + 600, 14), (T0 + 1200, 22)]
+        assert history.series(slots, 600, since=T0 + 600) == [(T0 + 600, 14), (T0 + 1200, 22)]
+
+    def test_gap_leaves_empty_slots(self):
+        """Test that minutes without a sample are not reported as zero viewers."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 5), T0)
+        history.record(TWITCH, stream(TWITCH, "s1", 7), T0 + 180)
+
+        assert history.series(history.slots_for([TWITCH]), 60) == [(T0, 5), (T0 + 180, 7)]
+
+    def test_series_sums_streams(self):
+        """Test that a series adds the streams of several channels per point."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 5), T0)
+        history.record(YOUTUBE, stream(YOUTUBE, "v1", 7), T0 + 30)
+
+        assert history.series(history.slots_for([TWITCH, YOUTUBE]), 60) == [(T0, 12)]
+
+    def test_unknown_resolution(self):
+        """Test that only configured resolutions can be read."""
+        with pytest.raises(ValueError):
+            ViewerHistory(tiers=TIERS).series([], 300)
+
+    def test_tiers_must_nest(self):
+        """Test that a ring too short to fill a coarse slot is rejected."""
+        with pytest.raises(ValueError):
+            ViewerHistory(tiers=((60, 5), (600, 6)))
+
+
+class TestAggregates:
+    """Test peak, average and watch time."""
+
+    def test_time_weighted_average_and_watch_time(self):
+        """Test that each sample counts until the next one."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 100), T0)
+        history.record(TWITCH, stream(TWITCH, "s1", 300), T0 + 600)
+        history.record(TWITCH, stream(TWITCH, "s1", 200), T0 + 1800)
+
+        stats = history.aggregate()
+        # 100 x 600s + 300 x 1200s over 1800s, but gaps count at most max_gap
+        assert stats["peak_viewers"] == 300
+        assert stats["current_viewers"] == 200
+        assert stats["samples"] == 3
+        assert stats["watch_time_hours"] == round((100 * 600 + 300 * 900) / 3600, 2)
+        assert stats["average_viewers"] == round((100 * 600 + 300 * 900) / 1800, 1)
+
+    def test_aggregate_over_selected_streams(self):
+        """Test that slots_for limits stats to the given channels."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 10), T0)
+        history.record(TWITCH, stream(TWITCH, "s2", 20), T0)
+        history.record(YOUTUBE, stream(YOUTUBE, "v1", 500), T0)
+
+        stats = history.aggregate(history.slots_for([TWITCH]))
+        assert stats["streams"] == 2
+        assert stats["current_viewers"] == 30
+        assert stats["peak_viewers"] == 20
+        assert history.aggregate([])["streams"] == 0
+
+    def test_late_sample_is_ignored(self):
+        """Test that a sample older than the newest one changes nothing."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 10), T0 + 60)
+        history.record(TWITCH, stream(TWITCH, "s1", 99), T0)
+
+        assert history.aggregate()["peak_viewers"] == 10
+        assert history.aggregate()["samples"] == 1
+
+
+class TestSnapshots:
+    """Test recording from scheduler snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_listener_records_live_streams_and_ends_others(self):
+        """Test that a stream missing from a fetch is no longer live."""
+        history = ViewerHistory(tiers=TIERS)
+        await history({TWITCH: snapshot(TWITCH, T0, stream(TWITCH, "s1", 10), stream(TWITCH, "s2", 20))})
+        await history({TWITCH: snapshot(TWITCH, T0 + 60, stream(TWITCH, "s2", 25))})
+
+        stats = history.aggregate()
+        assert stats["streams"] == 2
+        assert stats["live_streams"] == 1
+        assert stats["current_viewers"] == 25
+
+    def test_error_snapshots_are_skipped(self):
+        """Test that a failing platform neither records nor ends streams."""
+        history = ViewerHistory(tiers=TIERS)
+        history.record_snapshots({TWITCH: snapshot(TWITCH, T0, stream(TWITCH, "s1", 10))})
+        recorded = history.record_snapshots({TWITCH: snapshot(TWITCH, T0 + 60, error_code="CIRCUIT_OPEN")})
+
+        assert recorded == 0
+        assert history.aggregate()["live_streams"] == 1
+
+    def test_ended_streams_expire_after_retention(self):
+        """Test that ended streams are freed and their slot reused."""
+        history = ViewerHistory(tiers=TIERS, retention=3600)
+        history.record_snapshots({TWITCH: snapshot(TWITCH, T0, stream(TWITCH, "s1", 10))})
+        history.record_snapshots({TWITCH: snapshot(TWITCH, T0 + 60)})
+        history._pending_slot = history._pending_slot[:0]
+
+        assert history.expire(T0 + 1800) == 0
+        assert history.expire(T0 + 3700) == 1
+        assert history.stats()["streams"] == 0
+        slot = history.record(YOUTUBE, stream(YOUTUBE, "v1", 3), T0 + 3700)
+        assert history.series([slot], 60) == [(T0 + 3660, 3)]
+        assert history.aggregate([slot])["peak_viewers"] == 3
+
+    def test_live_streams_never_expire(self):
+        """Test that retention only applies to ended streams."""
+        history = ViewerHistory(tiers=TIERS, retention=60)
+        history.record(TWITCH, stream(TWITCH, "s1", 10), T0)
+        history._pending_slot = history._pending_slot[:0]
+
+        assert history.expire(T0 + 86400) == 0
+
+
+class TestFlush:
+    """Test bulk writes of raw samples."""
+
+    @pytest.mark.asyncio
+    async def test_samples_are_written_in_batches(self):
+        """Test the row shape and the batch size."""
+        batches = []
+
+        async def write(rows):
+            batches.append(rows)
+
+        history = ViewerHistory(tiers=TIERS, write_samples=write, flush_batch_size=2)
+        for minute in range(5):
+            history.record(TWITCH, stream(TWITCH, "s1", minute), T0 + 60 * minute)
+
+        assert await history.flush() == 5
+        assert [len(rows) for rows in batches] == [2, 2, 1]
+        assert batches[0][0] == {
+            "platform": "twitch",
+            "platform_channel_id": "alpha",
+            "platform_stream_id": "s1",
+            "sampled_at": datetime.fromtimestamp(T0, timezone.utc).isoformat(),
+            "viewer_count": 0,
+        }
+        assert history.stats()["pending_samples"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_write_keeps_samples(self):
+        """Test that samples are retried at the next flush."""
+        fail = [True]
+        written = []
+
+        async def write(rows):
+            if fail[0]:
+                raise RuntimeError("database down")
+            written.extend(rows)
+
+        history = ViewerHistory(tiers=TIERS, write_samples=write)
+        history.record(TWITCH, stream(TWITCH, "s1", 10), T0)
+
+        assert await history.flush() == 0
+        assert history.stats()["flush_failures"] == 1
+        assert history.stats()["pending_samples"] == 1
+        fail[0] = False
+        assert await history.flush() == 1
+        assert [row["viewer_count"] for row in written] == [10]
+
+    def test_queue_is_bounded(self):
+        """Test that the oldest samples are dropped when writes keep failing."""
+        history = ViewerHistory(tiers=TIERS, max_pending=10)
+        for minute in range(12):
+            history.record(TWITCH, stream(TWITCH, "s1", minute), T0 + 60 * minute)
+
+        stats = history.stats()
+        assert stats["pending_samples"] == 10
+        assert stats["samples_dropped"] == 2
+        assert list(history._pending_viewers) == list(range(2, 12))
+
+
+class TestStatsEndpoints:
+    """Test GET /api/stats/user and /api/stats/channels."""
+
+    @pytest.fixture
+    def history(self):
+        async def loader():
+            return [
+                ChannelSubscription(id="row-a", user_id="user-1", key=TWITCH),
+                ChannelSubscription(id="row-b", user_id="user-1", key=YOUTUBE),
+                ChannelSubscription(id="row-c", user_id="user-2", key=ChannelKey("twitch", "other")),
+            ]
+
+        scheduler = StreamRefreshScheduler({}, loader)
+        history = ViewerHistory(tiers=TIERS)
+        history.record(TWITCH, stream(TWITCH, "s1", 100), T0)
+        history.record(TWITCH, stream(TWITCH, "s1", 100), T0 + 3600)
+        history.record(YOUTUBE, stream(YOUTUBE, "v1", 40), T0)
+        history.record(ChannelKey("twitch", "other"), stream(ChannelKey("twitch", "other"), "x", 9999), T0)
+        asyncio.run(scheduler.reload_channels())
+        app.state.stream_scheduler = scheduler
+        app.state.viewer_history = history
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+        app.state.viewer_history = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_user_stats(self, history):
+        """Test aggregates over the user's channels only."""
+        response = history.get("/api/stats/user")
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["total_channels"] == 2
+        assert data["covered_channels"] == 2 and data["unavailable_channels"] == []
+        assert data["streams"] == 2
+        assert data["peak_viewers"] == 100
+        assert data["current_viewers"] == 140
+        assert data["watch_time_hours"] == 25.0
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_channel_stats_with_series(self, history):
+        """Test per-channel items ordered by watch time, with a series."""
+        response = history.get("/api/stats/channels", params={"resolution": "1h"})
+
+        assert response.status_code == 200
+        items = response.json()["data"]["channels"]
+        assert [item["channel_id"] for item in items] == ["row-a", "row-b"]
+        assert items[0]["series"] == [[T0, 100], [T0 + 3600, 100]]
+        assert items[1]["series"] == [[T0, 40]]
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_platform_filter(self, history):
+        """Test that ``platform`` narrows the channels."""
+        response = history.get("/api/stats/channels", params={"platform": "youtube"})
+
+        items = response.json()["data"]["channels"]
+        assert [item["platform_channel_id"] for item in items] == ["beta"]
+        assert "series" not in items[0]
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_disabled_history(self, history):
+        """Test a 503 when no history is recorded."""
+        app.state.viewer_history = None
+
+        assert history.get("/api/stats/user").status_code == 503
+
+
+def sample_row(key: ChannelKey, stream_id: str, at: float, viewers: int) -> dict:
+    return {
+        "platform": key.platform, "platform_channel_id": key.channel_id, "platform_stream_id": stream_id,
+        "sampled_at": datetime.fromtimestamp(at, timezone.utc).isoformat(), "viewer_count": viewers,
+    }
+
+
+class TestReplica:
+    """Test histories rebuilt from stored samples."""
+
+    def test_replica_matches_recorded_history(self):
+        """Test that stored samples give the same figures as recording them."""
+        history = ViewerHistory(tiers=TIERS)
+        rows = [sample_row(YOUTUBE, "v1", T0 + 60 * minute, 10 * minute) for minute in range(11)]
+        for minute, row in enumerate(rows):
+            history.record(YOUTUBE, stream(YOUTUBE, "v1", row["viewer_count"]), T0 + 60 * minute)
+
+        replica = history.replica(reversed(rows), live_within=120, now=T0 + 600)
+
+        slots = replica.slots_for([YOUTUBE])
+        assert replica.aggregate() == history.aggregate()
+        assert replica.series(slots, 600) == history.series(history.slots_for([YOUTUBE]), 600)
+        assert replica.stats()["pending_samples"] == 0
+        assert replica.replica([], live_within=0).aggregate()["streams"] == 0
+
+    def test_old_last_sample_means_ended(self):
+        """Test that a stream without recent samples is not live."""
+        history = ViewerHistory(tiers=TIERS)
+        rows = [sample_row(YOUTUBE, "v1", T0, 10), sample_row(TWITCH, "s1", T0 + 500, 20)]
+
+        replica = history.replica(rows, live_within=120, now=T0 + 600)
+
+        assert replica.aggregate()["live_streams"] == 1
+        assert replica.aggregate()["current_viewers"] == 20
+        assert combined_aggregate([(history, []), (replica, replica.slots_for([TWITCH]))])["streams"] == 1
+
+
+class TestPartitionedStats:
+    """Test the stats endpoints when another worker owns some of the user's channels."""
+
+    NOW = T0 + 3630
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        """This worker owns the Twitch channel; the YouTube one is recorded elsewhere."""
+        async def loader():
+            return [
+                ChannelSubscription(id="row-a", user_id="user-1", key=TWITCH),
+                ChannelSubscription(id="row-b", user_id="user-1", key=YOUTUBE),
+            ]
+
+        scheduler = StreamRefreshScheduler({}, loader, owns=lambda key: key != YOUTUBE)
+        asyncio.run(scheduler.reload_channels())
+        history = ViewerHistory(tiers=TIERS, clock=lambda: self.NOW)
+        history.record(TWITCH, stream(TWITCH, "s1", 100), T0)
+        history.record(TWITCH, stream(TWITCH, "s1", 100), T0 + 3600)
+        requested = []
+        stored = {"rows": [sample_row(YOUTUBE, "v1", T0, 40), sample_row(YOUTUBE, "v1", T0 + 3600, 60)]}
+
+        async def fetch_viewer_samples(keys, since):
+            requested.append((set(keys), since))
+            if stored["rows"] is None:
+                raise ConnectionError("postgrest down")
+            return stored["rows"]
+
+        monkeypatch.setattr(stats_router, "fetch_viewer_samples", fetch_viewer_samples)
+        app.state.stream_scheduler = scheduler
+        app.state.viewer_history = history
+        app.dependency_overrides[get_current_user_async] = lambda: {"sub": "user-1"}
+        yield TestClient(app), requested, stored
+        app.dependency_overrides.clear()
+        app.state.stream_scheduler = None
+        app.state.viewer_history = None
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_other_workers_channels_come_from_stored_samples(self, client):
+        """Test that the user total includes the channel this worker does not record."""
+        client, requested, _ = client
+
+        data = client.get("/api/stats/user").json()["data"]
+
+        assert requested[0][0] == {YOUTUBE}
+        assert requested[0][1] == datetime.fromtimestamp(self.NOW - 86400, timezone.utc).isoformat()
+        assert data["covered_channels"] == 2 and data["unavailable_channels"] == []
+        assert data["streams"] == 2
+        assert data["live_streams"] == 2
+        assert data["current_viewers"] == 160
+        assert data["peak_viewers"] == 100
+        assert data["watch_time_hours"] == 25.0 + 10.0
+
+        items = client.get("/api/stats/channels", params={"resolution": "1h"}).json()["data"]["channels"]
+        assert [(item["channel_id"], item["source"]) for item in items] == [("row-a", "memory"), ("row-b", "database")]
+        assert items[1]["series"] == [[T0, 40], [T0 + 3600, 60]]
+
+    @pytest.mark.usefixtures("no_rate_limit")
+    def test_unreadable_samples_are_reported(self, client):
+        """Test that channels without figures are named instead of silently undercounted."""
+        client, _, stored = client
+        stored["rows"] = None
+
+        data = client.get("/api/stats/user").json()["data"]
+        items = client.get("/api/stats/channels").json()["data"]["channels"]
+
+        assert data["covered_channels"] == 1
+        assert data["unavailable_channels"] == ["row-b"]
+        assert data["streams"] == 1
+        assert [(item["channel_id"], item["source"], item["streams"]) for item in items] == [
+            ("row-a", "memory", 1), ("row-b", "unavailable", 0),
+        ]
@@ -0,0 +1,311 @@
+"""YouTube quota budget tests."""
+
+import logging
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.core.coordination import ClusterCoordinator, HashRing
+from app.models.channel import ChannelKey, ChannelSubscription
+from app.services.batch_planner import PartialBatchError
+from app.services.refresh_scheduler import StreamRefreshScheduler
+from app.services.youtube_quota import (
+    OPERATION_COSTS,
+    QUOTA_TIMEZONE,
+    QUOTA_TOPIC,
+    SEARCH_STRATEGY,
+    UPLOADS_STRATEGY,
+    YouTubeQuota,
+    cheapest_strategy,
+    quota_usage_listener,
+)
+from app.services.youtube_service import YouTubeService
+from tests.fakes.platforms import FakePlatformAPIs
+
+MIDNIGHT = datetime(2025, 8, 7, tzinfo=QUOTA_TIMEZONE).timestamp()
+
+
+class Clock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now: float = MIDNIGHT):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_service(fake: FakePlatformAPIs, quota: YouTubeQuota, **kwargs) -> YouTubeService:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://fake")
+    return YouTubeService(api_key="key", base_url="http://fake/youtube/v3", http_client=client, quota=quota, **kwargs)
+
+
+def units_billed(fake: FakePlatformAPIs) -> int:
+    """Quota units the fake API would have billed for the calls it saw."""
+    return sum(OPERATION_COSTS[endpoint.split(".")[1]] * n for endpoint, n in fake.calls.items())
+
+
+class TestQuotaLedger:
+    """Test cost accounting, pacing and the Pacific-midnight reset."""
+
+    def test_operations_charged_at_unit_cost(self):
+        """Test that search costs 100 units and list calls 1 unit."""
+        quota = YouTubeQuota(clock=Clock())
+
+        quota.charge("search")
+        quota.charge("videos", calls=3)
+
+        assert quota.used == 103
+        assert quota.stats()["by_operation"] == {"search": 100, "videos": 3}
+
+    def test_budget_resets_at_pacific_midnight(self):
+        """Test that usage resets when the Pacific-time day changes."""
+        clock = Clock(MIDNIGHT + 86400 - 60)
+        quota = YouTubeQuota(daily_limit=100, clock=clock)
+        quota.charge("search")
+        quota.mark_exhausted()
+        assert quota.exhausted
+
+        clock.now += 120
+
+        assert quota.used == 0
+        assert not quota.exhausted
+        assert quota.seconds_until_reset() == pytest.approx(86400 - 60)
+
+    def test_spending_is_paced_over_the_day(self):
+        """Test that only the elapsed share of the budget plus burst is spendable."""
+        clock = Clock()
+        quota = YouTubeQuota(daily_limit=10000, burst_fraction=0.05, clock=clock)
+
+        assert quota.spendable() == 500
+        clock.now += 86400 / 2
+        assert quota.spendable() == 5500
+        quota.charge("videos", calls=5000)
+        assert quota.spendable() == 500
+
+    def test_uploads_strategy_is_cheapest(self):
+        """Test that search is only chosen without an uploads playlist."""
+        assert cheapest_strategy(has_uploads_playlist=True) == UPLOADS_STRATEGY
+        assert cheapest_strategy(has_uploads_playlist=False) == SEARCH_STRATEGY
+
+
+class TestQuotaAwareService:
+    """Test the YouTube service against the quota ledger."""
+
+    @pytest.mark.asyncio
+    async def test_exhausted_quota_makes_no_calls(self, caplog):
+        """Test that an exhausted budget defers every channel and logs a warning."""
+        fake = FakePlatformAPIs()
+        fake.add_youtube_channels(["UC1", "UC2"])
+        quota = YouTubeQuota(daily_limit=10, clock=Clock())
+        quota.mark_exhausted()
+        service = make_service(fake, quota)
+
+        with caplog.at_level(logging.WARNING), pytest.raises(PartialBatchError) as exc_info:
+            await service.fetch_live_streams(["UC1", "UC2"])
+
+        assert sum(fake.calls.values()) == 0
+        assert {e.error_code for e in exc_info.value.errors.values()} == {"QUOTA_EXCEEDED"}
+        assert "quota exhausted" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_quota_error_from_api_exhausts_budget(self):
+        """Test that a 403 quotaExceeded stops further calls for the day."""
+        fake = FakePlatformAPIs()
+        fake.add_youtube_channels(["UC1"])
+        fake.inject("youtube.channels", 403)
+        quota = YouTubeQuota(clock=Clock(MIDNIGHT + 3600))
+        service = make_service(fake, quota)
+
+        with pytest.raises(PartialBatchError):
+            await service.fetch_live_streams(["UC1"])
+        calls = sum(fake.calls.values())
+        with pytest.raises(PartialBatchError):
+            await service.fetch_live_streams(["UC1"])
+
+        assert quota.exhausted
+        assert sum(fake.calls.values()) == calls
+
+    @pytest.mark.asyncio
+    async def test_search_fallback_without_uploads_playlist(self):
+        """Test that search.list is used only for channels lacking uploads."""
+        fake = FakePlatformAPIs()
+        fake.add_youtube_channels(["UC1"], live=True)
+        fake.youtube_live["UCnoplaylist"] = "live-UCnoplaylist"
+        quota = YouTubeQuota(clock=Clock(MIDNIGHT + 3600))
+        service = make_service(fake, quota, search_fallback=True)
+
+        await service.fetch_live_streams(["UC1", "UCnoplaylist"])
+        streams = await service.fetch_live_streams(["UC1", "UCnoplaylist"])
+
+        assert fake.calls["youtube.search"] == 1
+        assert streams["UCnoplaylist"][0].platform_stream_id == "live-UCnoplaylist"
+        assert quota.used == units_billed(fake)
+
+
+class TestQuotaSimulation:
+    """Simulate a full day of scheduler cycles against a small quota."""
+
+    CHANNELS = 100
+    DAILY_LIMIT = 1000
+    INTERVAL = 300
+
+    @pytest.mark.asyncio
+    async def test_synthetic_day_stays_within_budget(self):
+        """Test 24 hours of 5-minute cycles: paced, fair and never over budget."""
+        clock = Clock(MIDNIGHT)
+        fake = FakePlatformAPIs()
+        ids = [f"UC{i}" for i in range(self.CHANNELS)]
+        fake.add_youtube_channels(ids)
+        fake.add_youtube_channels(ids[:10], live=True)
+        quota = YouTubeQuota(daily_limit=self.DAILY_LIMIT, burst_fraction=0.05, clock=clock)
+        service = make_service(fake, quota)
+        rows = [ChannelSubscription(f"row-{c}", "user-1", ChannelKey("youtube", c)) for c in ids]
+
+        async def loader():
+            return rows
+
+        scheduler = StreamRefreshScheduler({"youtube": service}, loader, interval=self.INTERVAL, clock=clock)
+        checks = {c: 0 for c in ids}
+        error_codes = set()
+        cycles = 86400 // self.INTERVAL
+
+        for cycle in range(cycles):
+            clock.now = MIDNIGHT + cycle * self.INTERVAL
+            snapshots = await scheduler.refresh_all()
+            for key, snapshot in snapshots.items():
+                if snapshot.error_code:
+                    error_codes.add(snapshot.error_code)
+                else:
+                    checks[key.channel_id] += 1
+            elapsed = (cycle * self.INTERVAL) / 86400
+            assert quota.used <= self.DAILY_LIMIT * (elapsed + 0.05)
+
+        used = quota.used
+        assert used == units_billed(fake)
+        assert used <= self.DAILY_LIMIT
+        # Budget is actually used, not hoarded
+        assert used >= self.DAILY_LIMIT * 0.9
+        assert fake.calls["youtube.search"] == 0
+        assert error_codes <= {"QUOTA_EXCEEDED"}
+        # Least-recently-checked first: every channel gets a fair share
+        assert max(checks.values()) - min(checks.values()) <= 1
+        assert min(checks.values()) >= 6
+        # Live channels keep their cached streams while deferred
+        live = scheduler.get_snapshot(ChannelKey("youtube", "UC0"))
+        assert live.streams and live.streams[0].platform_stream_id == "live-UC0"
+
+        clock.now = MIDNIGHT + 86400
+        assert quota.used == 0
+
+
+class NotifyBus:
+    """Stands in for the coordinators' Postgres sessions: a NOTIFY reaches every coordinator."""
+
+    def __init__(self):
+        self.coordinators = []
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def execute(self, _query: str, channel: str, payload: str) -> None:
+        for coordinator in self.coordinators:
+            coordinator._on_notification(self, 0, channel, payload)
+
+    def join(self, worker_id: int) -> ClusterCoordinator:
+        """Add a connected coordinator; every member sees the new membership."""
+        coordinator = ClusterCoordinator("postgresql://unused", namespace=1, worker_id=worker_id)
+        coordinator._connection = self
+        self.coordinators.append(coordinator)
+        ring = HashRing([c.worker_id for c in self.coordinators])
+        for member in self.coordinators:
+            member._ring = ring
+        return coordinator
+
+
+class TestSharedQuota:
+    """Test that coordinated workers share one daily quota."""
+
+    CHANNELS = 100
+    DAILY_LIMIT = 1000
+    INTERVAL = 300
+
+    def test_reports_count_against_the_limit(self):
+        """Test that a peer's usage lowers what this worker may spend."""
+        clock = Clock(MIDNIGHT + 86400 / 2)
+        first = YouTubeQuota(daily_limit=10000, clock=clock, workers=lambda: 2)
+        second = YouTubeQuota(daily_limit=10000, clock=clock, workers=lambda: 2)
+        first.charge("videos", calls=4000)
+        second.merge("2", first.usage("1"))
+
+        # (5500 allowed - 4000 used) / 2 workers
+        assert second.spendable() == 750
+        assert second.remaining == 6000
+        second.charge("videos", calls=750)
+        assert second.spendable() == 0
+        # Stale, repeated or other days' reports change nothing
+        second.merge("2", first.usage("1"))
+        second.merge("2", {**first.usage("1"), "day": MIDNIGHT - 86400, "used": {"1": 9000}})
+        assert second.spendable() == 0
+        assert second.stats()["peers_used"] == 4000
+
+    def test_report_of_exhaustion_stops_every_worker(self):
+        """Test that a quotaExceeded seen by one worker exhausts the others."""
+        first, second = YouTubeQuota(clock=Clock()), YouTubeQuota(clock=Clock())
+        first.mark_exhausted()
+        second.merge("2", first.usage("1"))
+
+        assert second.exhausted
+
+    def test_unreported_worker_assumes_the_pace_was_spent(self):
+        """Test that a worker without reports only spends its share of new allowance."""
+        clock = Clock(MIDNIGHT + 86400 / 2)
+        quota = YouTubeQuota(daily_limit=10000, clock=clock, workers=lambda: 2)
+
+        assert quota.spendable() == 0
+        clock.now += 86400 / 10
+        assert quota.spendable() == 500
+
+    @pytest.mark.asyncio
+    async def test_two_workers_stay_within_one_budget(self):
+        """Test a day of two coordinated workers, the second joining at noon."""
+        clock = Clock(MIDNIGHT)
+        fake = FakePlatformAPIs()
+        ids = [f"UC{i}" for i in range(self.CHANNELS)]
+        fake.add_youtube_channels(ids)
+        rows = [ChannelSubscription(f"row-{c}", "user-1", ChannelKey("youtube", c)) for c in ids]
+        bus = NotifyBus()
+
+        async def loader():
+            return rows
+
+        def start_worker(worker_id: int):
+            coordinator = bus.join(worker_id)
+            quota = YouTubeQuota(
+                daily_limit=self.DAILY_LIMIT, clock=clock, workers=lambda: len(coordinator.members),
+            )
+            coordinator.subscribe(QUOTA_TOPIC, lambda usage: quota.merge(str(worker_id), usage))
+            scheduler = StreamRefreshScheduler(
+                {"youtube": make_service(fake, quota)}, loader, interval=self.INTERVAL, clock=clock,
+                owns=lambda key: coordinator.owns(f"{key.platform}:{key.channel_id}"),
+            )
+            scheduler.add_listener(quota_usage_listener(quota, lambda: str(worker_id), coordinator.publish))
+            return quota, scheduler
+
+        workers = [start_worker(1)]
+        for cycle in range(86400 // self.INTERVAL):
+            clock.now = MIDNIGHT + cycle * self.INTERVAL
+            if cycle == 86400 // self.INTERVAL // 2:
+                workers.append(start_worker(2))
+            for _, scheduler in workers:
+                await scheduler.refresh_all()
+            elapsed = (cycle * self.INTERVAL) / 86400
+            assert units_billed(fake) <= self.DAILY_LIMIT * (elapsed + 0.05)
+
+        billed = units_billed(fake)
+        assert billed == sum(quota.used for quota, _ in workers)
+        assert billed <= self.DAILY_LIMIT
+        assert billed >= self.DAILY_LIMIT * 0.9
+        # The late joiner spent a fair part of the afternoon's half of the budget
+        assert workers[1][0].used >= self.DAILY_LIMIT / 2 / 3